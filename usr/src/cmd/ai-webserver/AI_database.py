@@ -26,6 +26,9 @@ AI Database Routines
 
 '''
 
+import binascii
+import logging
+import os
 import Queue
 import threading
 import sys
@@ -39,51 +42,204 @@ PROFILES_TABLE = 'profiles'    # DB table name for profiles
 # Defined list of criteria that we treat as case sensitive.
 CRIT_LIST_CASE_SENSITIVE = ['zonename']
 
+# Number of prepared statements each connection keeps, so that queries
+# issued again with different parameters aren't compiled again.
+STATEMENT_CACHE_SIZE = 200
+
+# SQLite increments the 4 byte counter at this offset in a database file's
+# header each time a transaction changing the database is committed.
+SQLITE_CHANGE_COUNTER_OFFSET = 24
+
+# Columns of the manifests and profiles tables which are not criteria
+NON_CRITERIA_COLUMNS = ["file", "instance", "name"]
+
+
+class DBError(StandardError):
+    ''' Raised by DBrequest.result() for a request which failed '''
+    pass
+
+
+def get_file_signature(path):
+    '''Returns a tuple which changes when the file at path is replaced or
+    modified, or None if there is no such file.
+    '''
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime)
+
+
+def get_database_signature(path):
+    '''Returns a tuple which changes when the AI database at path is replaced
+    or a change to it is committed, or None if there is no such database.
+
+    As well as the file's signature, the SQLite change counter is read, so
+    that commits are noticed even where they don't change the file's
+    modification time, as when made within its granularity.
+    '''
+    signature = get_file_signature(path)
+    if signature is None:
+        return None
+    try:
+        with open(path, 'rb') as db_file:
+            db_file.seek(SQLITE_CHANGE_COUNTER_OFFSET)
+            counter = db_file.read(4)
+    except IOError:
+        counter = None
+    return signature + (counter,)
+
+
+class CriteriaCache(object):
+    ''' Class to keep the criteria columns of a database's tables, and which
+    of them are in use, until a change to the database is committed.
+
+    Reading the database's signature costs a stat, an open and a read, so
+    it isn't done for each lookup: a caller keeping the DB across requests
+    calls validate() once at the start of each, which drops the cache if
+    another process has committed a change since.  Changes committed
+    through the DB itself drop the cache as they are made, and the first
+    lookup after the cache is created or dropped validates it.  The hits
+    and misses attributes count the lookups answered from the cache, and
+    those which queried the database.
+    '''
+
+    def __init__(self, db):
+        self._dBfile = db
+        self._lock = threading.Lock()
+        self._signature = None
+        self._validated = False
+        # incremented each time the cache is dropped, so that a value loaded
+        # from the database before then isn't kept
+        self._generation = 0
+        self._entries = dict()
+        self.hits = 0
+        self.misses = 0
+
+    def validate(self, signature=None):
+        ''' Drop everything cached if a change to the database has been
+        committed since the cache was last validated.  signature is the
+        database's get_database_signature(), where the caller already has
+        it.
+        '''
+        if signature is None:
+            signature = get_database_signature(self._dBfile)
+        with self._lock:
+            if signature is None or signature != self._signature:
+                self._entries.clear()
+                self._generation += 1
+            self._signature = signature
+            # nothing is kept for a database which can't be read
+            self._validated = signature is not None
+
+    def get(self, key, load):
+        ''' Return the cached value for key, or the value returned by calling
+        load(), which is cached unless the cache has since been dropped.
+        '''
+        if not self._validated:
+            self.validate()
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            generation = self._generation
+
+        value = load()
+        with self._lock:
+            if self._validated and generation == self._generation:
+                self._entries[key] = value
+        return value
+
+    def clear(self):
+        ''' Drop everything cached '''
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self._signature = None
+            self._validated = False
+
+
+class DBqueue(Queue.Queue):
+    ''' Class for the request queue of a DB, which also carries the DB's
+    CriteriaCache to the functions given the queue.
+    '''
+
+    def __init__(self, criteria_cache):
+        Queue.Queue.__init__(self)
+        self.criteria_cache = criteria_cache
+
 
 class DB:
     ''' Class to connect to, and look-up entries in the SQLite database '''
 
-    def __init__(self, db, commit=False):
-        ''' Here we initialize the queue the DB thread will run, the
-        DB thread itself (as well as daemonize it, and start it)
+    def __init__(self, db, commit=False, threads=1):
+        ''' Here we initialize the queue the DB threads will run, the
+        DB threads themselves (as well as daemonize them, and start them).
+        A committable DB has a single thread, so that changes are made one
+        at a time.  Otherwise, threads connections are opened, each taking
+        requests from the queue as it becomes free.
         '''
-        self._requests = Queue.Queue()
-        self._runner = DBthread(db, self._requests, commit)
-        self._runner.setDaemon(True)
-        self._runner.start()
+        if commit:
+            threads = 1
+        self._criteria_cache = CriteriaCache(db)
+        self._requests = DBqueue(self._criteria_cache)
+        self._runners = list()
+        for number in range(threads):
+            runner = DBthread(db, self._requests, commit)
+            runner.setDaemon(True)
+            runner.start()
+            self._runners.append(runner)
 
     def getQueue(self):
         ''' Return the database request queue.'''
         return self._requests
 
+    def getCriteriaCache(self):
+        ''' Return the CriteriaCache of the database, for its hits and misses
+        counters.
+        '''
+        return self._criteria_cache
+
+    def execute(self, sql, params=(), commit=False):
+        ''' Queue a query, returning its DBrequest, whose result() is the
+        query's response once it has been run.
+        '''
+        return execute(self._requests, sql, params, commit)
+
+    def close(self):
+        ''' Stop the DB threads once they have handled the requests already
+        queued, closing the DB connections.
+        '''
+        for runner in self._runners:
+            self._requests.put(DBthread.STOP)
+
     def verifyDBStructure(self):
         '''Ensures reasonable DB schema and columns or else
         raises a SystemExit
         '''
         # get the names of each table in the database
-        query = DBrequest("SELECT * FROM SQLITE_MASTER")
-        self._requests.put(query)
-        query.waitAns()
-
-        # if query fails, getResponse prints error message
-        if query.getResponse() is None:
-            raise SystemExit(1)
+        try:
+            tables = self.execute("SELECT * FROM SQLITE_MASTER").result()
+        except DBError as err:
+            raise SystemExit(err)
 
         # iterate over each table in the database
-        for row in iter(query.getResponse()):
+        for row in tables:
             if "manifests" == row['tbl_name']:
                 break
         # if we do not break out we do not have a manifest table
         else:
             raise SystemExit(_("Error:\tNo manifests table"))
         # iterate over each column of the manifests table
-        query = DBrequest("PRAGMA table_info(manifests)")
-        self._requests.put(query)
-        query.waitAns()
+        try:
+            rsp = self.execute("PRAGMA table_info(manifests)").result()
+        except DBError as err:
+            raise SystemExit(err)
 
         # gather column names in a list
         columns = list()
-        for col in iter(query.getResponse()):
+        for col in rsp:
             columns.append(col['name'])
 
         # ensure we have a name, instance and at least one criteria column
@@ -95,17 +251,21 @@ class DB:
 class DBrequest(object):
     ''' Class to hold SQL queries and their responses '''
 
-    def __init__(self, query, commit=False):
+    def __init__(self, query, commit=False, params=()):
         ''' Set the private SQL query and create the event to flag when
-        the query has returned.
+        the query has returned.  The query may have ? placeholders for
+        params, so that values needn't be sanitized in to the SQL, and the
+        statement can be reused for other values.
         '''
         self._sql = str(query)
+        self._params = tuple(params)
         self._e = threading.Event()
         self._ans = None
         self._committable = commit
 
     def __repr__(self):
         result = ["DBrequest:_sql:%s" % self._sql]
+        result += ["          _params:%s" % (self._params,)]
         result += ["          _ans:%s" % self._ans]
         result += ["          _committable:%s" % self._committable]
         return "\n".join(result)
@@ -120,6 +280,22 @@ class DBrequest(object):
         ''' Use getSql() to access the SQL query string. '''
         return(self._sql)
 
+    def getParams(self):
+        ''' Use getParams() to access the parameters of the SQL query. '''
+        return(self._params)
+
+    def getStatements(self):
+        ''' Use getStatements() to access the list of (SQL, parameters)
+        pairs the DBthread should execute, in one transaction.
+        '''
+        return [(self._sql, self._params)]
+
+    def setResponses(self, responses):
+        ''' Use setResponses() to set the DB response from the rows
+        returned by each of getStatements().
+        '''
+        self.setResponse(responses[0])
+
     def setResponse(self, resp):
         ''' Use setResponse() to set the DB response and update the event flag.
         (Will throw a RuntimeError if already set.)
@@ -149,15 +325,68 @@ class DBrequest(object):
         return(self._e.isSet())
 
     def waitAns(self):
-        ''' Use waitAns() to wait for setResponse() to set the event '''
+        ''' Use waitAns() to wait for setResponse() to set the event.  (This
+        polls; result() waits for the response without polling.)
+        '''
 
         # 15 second timeout is arbitrary to prevent possible deadlock
         self._e.wait(15)
 
+    def result(self, timeout=None):
+        ''' Use result() to wait for the DB response and return it.  (Will
+        raise a DBError if the request fails, or isn't handled within timeout
+        seconds.)
+        '''
+        self._e.wait(timeout)
+        if not self._e.isSet():
+            raise DBError(_("Database request timed out: %s") % self._sql)
+        if isinstance(self._ans, basestring):
+            raise DBError(self._ans)
+        return self._ans
+
+
+class DBbatch(DBrequest):
+    ''' Class to hold SQL statements to execute in one transaction, and
+    their responses.  If any statement fails, none of the changes are
+    committed.  The response is a list of the rows returned by each
+    statement.
+    '''
+
+    def __init__(self, statements=(), commit=False):
+        ''' statements is a list of SQL strings, or (SQL, parameters) pairs
+        '''
+        self._statements = list()
+        DBrequest.__init__(self, "", commit=commit)
+        for statement in statements:
+            if isinstance(statement, basestring):
+                self.add(statement)
+            else:
+                self.add(*statement)
+
+    def add(self, query, params=()):
+        ''' Add a statement to the batch (before it is queued) '''
+        self._statements.append((str(query), tuple(params)))
+        self._sql = "; ".join([sql for (sql, params) in self._statements])
+
+    def getStatements(self):
+        ''' Use getStatements() to access the list of (SQL, parameters)
+        pairs the DBthread should execute, in one transaction.
+        '''
+        return list(self._statements)
+
+    def setResponses(self, responses):
+        ''' Use setResponses() to set the DB response from the rows
+        returned by each of getStatements().
+        '''
+        self.setResponse(responses)
+
 
 class DBthread(threading.Thread):
     '''Class to interface with SQLite as the provider is single threaded'''
 
+    # Queued by DB.close() to stop the thread
+    STOP = object()
+
     def __init__(self, db, queue, commit):
         ''' Here we create a new thread object, create a DB connection object,
         keep track of the DB filename and track the request queue to run on.
@@ -174,6 +403,14 @@ class DBthread(threading.Thread):
         if self._con is not None:
             self._con.close()
 
+    def _criteria_changed(self):
+        ''' Drop the criteria cached for the DB, once a change has been
+        committed to it
+        '''
+        cache = getattr(self._requests, "criteria_cache", None)
+        if cache is not None:
+            cache.clear()
+
     def run(self):
         '''Here we simply iterate over the request queue executing queries
         and reporting responses. Errors are set as strings for that DBrequest.
@@ -184,13 +421,17 @@ class DBthread(threading.Thread):
                 # changing the DB while we are working on it (but don't use
                 # EXCLUSIVE since there may be persistent readers)
                 self._con = sqlite.connect(self._dBfile,
-                                           isolation_level="IMMEDIATE")
+                    isolation_level="IMMEDIATE",
+                    cached_statements=STATEMENT_CACHE_SIZE)
             else:
-                self._con = sqlite.connect(self._dBfile)
+                self._con = sqlite.connect(self._dBfile,
+                    cached_statements=STATEMENT_CACHE_SIZE)
         except sqlite.OperationalError:
             while True:
-                self._requests.get().setResponse(
-                        _("Database open error."))
+                request = self._requests.get()
+                if request is DBthread.STOP:
+                    return
+                request.setResponse(_("Database open error."))
             self._con.close()
             return
 
@@ -207,27 +448,27 @@ class DBthread(threading.Thread):
         # iterate over each DBrequest object in the queue
         while True:
             request = self._requests.get()
+            if request is DBthread.STOP:
+                self._con.close()
+                self._con = None
+                return
             # skip already processed DBrequest's
             if request is not None and not request.isFinished():
                 # if the connection and query are committable then execute the
-                # query and commit it
-                if request.needsCommit() and self._committable:
+                # statements and commit them together, or the query does not
+                # need to commit
+                if self._committable or not request.needsCommit():
+                    responses = list()
                     try:
-                        self._cursor.execute(request.getSql())
-                        self._con.commit()
-                    except StandardError as ex:
-                        # save error string for caller to trigger
-                        request.setResponse(_("Database failure with "
-                                              "SQL: %s") % request.getSql() +
-                                            "\n\t" +
-                                            _("Error: %s") % str(ex))
-                        # ensure we do not continue processing this request
-                        continue
-                # the query does not need to commit
-                elif not request.needsCommit():
-                    try:
-                        self._cursor.execute(request.getSql())
+                        for (sql, params) in request.getStatements():
+                            self._cursor.execute(sql, params)
+                            responses.append(self._cursor.fetchall())
+                        if request.needsCommit():
+                            self._con.commit()
+                            self._criteria_changed()
                     except StandardError as ex:
+                        if request.needsCommit():
+                            self._con.rollback()
                         # save error string for caller to trigger
                         request.setResponse(_("Database failure with "
                                               "SQL: %s") % request.getSql() +
@@ -235,6 +476,7 @@ class DBthread(threading.Thread):
                                             _("Error: %s") % str(ex))
                         # ensure we do not continue processing this request
                         continue
+                    request.setResponses(responses)
                 # the query needs commit access and the connection does not
                 # support it
                 else:
@@ -243,9 +485,15 @@ class DBthread(threading.Thread):
                                         request.getSql() +
                                         "\n\t" +
                                         _("Error: Connection not committable"))
-                    # ensure we do not continue processing this request
-                    continue
-                request.setResponse(self._cursor.fetchall())
+
+
+def execute(queue, sql, params=(), commit=False):
+    ''' Queue a query on the request queue of a DB, returning its DBrequest,
+    whose result() is the query's response once it has been run.
+    '''
+    request = DBrequest(sql, commit=commit, params=params)
+    queue.put(request)
+    return request
 
 
 def is_in_list(crit_name, value, value_list, list_separator=None):
@@ -346,11 +594,8 @@ def sanitizeSQL(text):
 
 def numInstances(manifest, queue):
     ''' Run to return the number of instances for manifest in the DB '''
-    query = DBrequest('SELECT COUNT(instance) FROM manifests WHERE ' +
-                      'name = "' + manifest + '"')
-    queue.put(query)
-    query.waitAns()
-    rsp = query.getResponse()
+    rsp = execute(queue, 'SELECT COUNT(instance) FROM manifests WHERE '
+                  'name = ?', (manifest,)).result()
     if rsp:
         return rsp[0][0]
     return 0
@@ -374,10 +619,8 @@ def numNames(queue, dbtable):
     # AI service pre-dates profiles
     if not tableExists(queue, dbtable):
         return 0
-    query = DBrequest('SELECT COUNT(DISTINCT(name)) FROM ' + dbtable)
-    queue.put(query)
-    query.waitAns()
-    rsp = query.getResponse()
+    rsp = execute(queue, 'SELECT COUNT(DISTINCT(name)) FROM ' +
+                  dbtable).result()
     if rsp:
         return rsp[0][0]
     return 0
@@ -394,18 +637,15 @@ def getManNames(queue):
 def getNames(queue, dbtable):
     '''Create generator which provides the names of manifests/profiles in DB
     '''
-    # Whether the DBrequest should be in or out of the for loop depends on if
-    # doing one large SQL query and iterating the responses (but holding the
-    # response in memory) is better than requesting row by row, and
-    # doing more DB transactions in less memory
-    for i in range(numNames(queue, dbtable)):
-        query = DBrequest('SELECT DISTINCT(name) FROM ' + dbtable +
-                          ' LIMIT 1 OFFSET %s' % i)
-        queue.put(query)
-        query.waitAns()
-        rsp = query.getResponse()
-        if rsp:   # make sure it wasn't just deleted
-            yield rsp[0][0]
+    # Backward compatibility - do not try to read profile table if
+    # AI service pre-dates profiles
+    if not tableExists(queue, dbtable):
+        return
+    # One query for all the names, rather than one per name, as the names
+    # are small even for a service with many manifests or profiles
+    for row in execute(queue, 'SELECT DISTINCT(name) FROM ' +
+                       dbtable).result():
+        yield row[0]
 
 
 def tableExists(queue, dbtable):
@@ -415,11 +655,9 @@ def tableExists(queue, dbtable):
         queue - database queue
         dbtable - name of database table in question
     '''
-    query = DBrequest('SELECT * from sqlite_master where name="' + dbtable +
-                      '" and type="table"')
-    queue.put(query)
-    query.waitAns()
-    return len(query.getResponse()) > 0
+    rsp = execute(queue, 'SELECT * from sqlite_master where name = ? and '
+                  'type = "table"', (dbtable,)).result()
+    return len(rsp) > 0
 
 
 def getSpecificCriteria(queue, criteria, criteria2=None,
@@ -457,52 +695,29 @@ def getSpecificCriteria(queue, criteria, criteria2=None,
             query_str += (criteria + " FROM manifests WHERE " + criteria +
                           " IS NOT NULL")
 
+    params = list()
     if excludeManifests is not None:
         for manifest in excludeManifests:
-            query_str += " AND name IS NOT '" + manifest + "'"
+            query_str += " AND name IS NOT ?"
+            params.append(manifest)
 
-    query = DBrequest(query_str)
-    queue.put(query)
-    query.waitAns()
-    rsp = query.getResponse()
-    if rsp:
-        return rsp
-    return []
+    return execute(queue, query_str, params).result()
 
 
 def getCriteria(queue, table=MANIFESTS_TABLE, onlyUsed=True, strip=True):
     ''' Provides a list of criteria which are used in the DB (i.e. what
     needs to be queried on the client). If strip is False, return
-    exact DB column names not (more) human names.
+    exact DB column names not (more) human names.  The columns of the table,
+    and which are used, are kept in the DB's CriteriaCache until the DB
+    changes.
     '''
-    # first get the names of the columns (criteria) by using the SQL PRAGMA
-    # statement on the manifest table
-    query = DBrequest("PRAGMA table_info(" + table + ")")
-    queue.put(query)
-    query.waitAns()
-
-    columns = list()
-    query_str = "SELECT "
-    # build a query so we can determine which columns (criteria) are in use
-    # using the output from the PRAGMA statement
-    for col in iter(query.getResponse()):
-        col_name = col['name']
-        # skip columns which are not criteria
-        if col_name in  ["file", "instance", "name"]:
-            continue
-        # use the SQL COUNT() aggregator to determine if the criteria is in use
-        query_str += "COUNT(" + col_name + ") as " + col_name + ", "
-        # add the column name to the list of columns
-        columns.append(col_name)
-    else:
-        # strip extra ", " from the query
-        query_str = query_str[:-2]
-        query_str += " FROM " + table
+    columns = _getCachedCriteria(queue, ("columns", table),
+                                 lambda: _getCriteriaColumns(queue, table))
 
     if not (onlyUsed or strip):
         # if we are not gleaning the unused columns and not stripping the
         # column names then return them now
-        return columns
+        return list(columns)
 
     elif not onlyUsed:
         # if we are only stripping the column names return the result now
@@ -510,18 +725,15 @@ def getCriteria(queue, table=MANIFESTS_TABLE, onlyUsed=True, strip=True):
                 for column in columns if not column.startswith('MAX')]
 
     else:
-        # we need to run the query from above and determine which columns are
-        # in use we will gather used criteria for the response from the above
-        # query which is like:
-        # "SELECT COUNT(memMIN), COUNT(memMAX), ... FROM manifests"
-        query = DBrequest(query_str)
-        queue.put(query)
-        query.waitAns()
+        # determine which columns are in use, and gather used criteria for
+        # the response
+        used = _getCachedCriteria(queue, ("used", table),
+            lambda: _getUsedCriteriaColumns(queue, table, columns))
         rlist = list()
         # iterate over each column
         for col_name in columns:
             # only take columns which have a positive count
-            if query.getResponse()[0][str(col_name)] > 0:
+            if col_name in used:
                 if strip:
                     # take only the criteria name, not a qualifier
                     # (i.e. MIN, MAX) but use both MAX and MIN in case one is
@@ -537,6 +749,44 @@ def getCriteria(queue, table=MANIFESTS_TABLE, onlyUsed=True, strip=True):
         return rlist
 
 
+def _getCachedCriteria(queue, key, load):
+    ''' Returns the value for key from the CriteriaCache of the DB whose
+    queue is given, or that returned by load() if there is no cache.
+    '''
+    cache = getattr(queue, "criteria_cache", None)
+    if cache is None:
+        return load()
+    return cache.get(key, load)
+
+
+def _getCriteriaColumns(queue, table):
+    ''' Returns the names of the criteria columns of a table '''
+    # get the names of the columns (criteria) by using the SQL PRAGMA
+    # statement on the table
+    rsp = execute(queue, "PRAGMA table_info(" + table + ")").result()
+
+    # skip columns which are not criteria
+    return tuple([col['name'] for col in rsp
+                  if col['name'] not in NON_CRITERIA_COLUMNS])
+
+
+def _getUsedCriteriaColumns(queue, table, columns):
+    ''' Returns the set of the criteria columns of a table which are set
+    for any row
+    '''
+    if not columns:
+        return frozenset()
+    # use the SQL COUNT() aggregator to determine if the criteria is in use,
+    # with a query like:
+    # "SELECT COUNT(memMIN), COUNT(memMAX), ... FROM manifests"
+    query_str = "SELECT " + ", ".join(["COUNT(" + col_name + ") as " +
+                                       col_name for col_name in columns]) + \
+                " FROM " + table
+    response = execute(queue, query_str).result()
+    return frozenset([col_name for col_name in columns
+                      if response[0][str(col_name)] > 0])
+
+
 def isRangeCriteria(queue, name, table=MANIFESTS_TABLE):
     ''' Returns True if the criteria 'name' is a range criteria in the DB.
     Returns False otherwise.
@@ -591,29 +841,33 @@ def getTableCriteria(name, instance, queue, table, humanOutput=False,
     # Now narrow down to the desired manifest.
     if found_crit:
         query_str = query_str[:-2]
-        query_str += ' FROM ' + table + ' WHERE name = "' + name + '"'
+        query_str += ' FROM ' + table + ' WHERE name = ?'
+        params = [name]
         if table == MANIFESTS_TABLE:
-            query_str += ' AND instance = "' + str(instance) + '"'
-        query = DBrequest(query_str)
-        queue.put(query)
-        query.waitAns()
-        rsp = query.getResponse()
+            query_str += ' AND instance = ?'
+            params.append(instance)
+        rsp = execute(queue, query_str, params).result()
         if rsp:  # make sure it wasn't just deleted
             return rsp[0]
     return None
 
 
-def findManifest(criteria, db):
+def findManifest(criteria, db, index=None):
     '''Used to find a non-default manifest.
     Provided a criteria dictionary, findManifest returns a query
     response containing a single manifest (or None if there are no matching
     manifests).  Manifests with no criteria set (as they are either
-    inactive or the default) are screened out.
+    inactive or the default) are screened out.  If a criteria_index.
+    CriteriaIndex of the manifests table is given, it is used rather than
+    querying the database.
     '''
     # If we didn't get any criteria, bail providing no manifest
     if len(criteria) == 0:
         return None
 
+    if index is not None:
+        return index.find_manifest(criteria)
+
     # create list of criteria in use that are set in the db
     criteria_set_in_db = list(getCriteria(db.getQueue(), strip=False))
     if len(criteria_set_in_db) == 0:
@@ -629,11 +883,12 @@ def findManifest(criteria, db):
                                 all_criteria_in_db)
     if not query_str:
         return None
-    query = DBrequest(query_str)
-    db.getQueue().put(query)
-    query.waitAns()
-
-    response = query.getResponse()
+    try:
+        response = execute(db.getQueue(), query_str).result()
+    except DBError as err:
+        # a value the query can't use matches no manifest
+        logging.error(str(err))
+        return None
 
     if response and len(response) == 1:    # got a manifest
         return response[0]['name']
@@ -752,6 +1007,110 @@ def build_query_str(criteria, criteria_set_in_db, all_criteria_in_db):
     return query_str
 
 
+def findProfiles(criteria, db, no_default=False, index=None):
+    '''Used to find the profiles for a client.
+    Provided a criteria dictionary, findProfiles returns a query response
+    containing the name and file of each profile matching the criteria, or
+    None if the database query fails.  Profiles must match each criteria
+    the client provides, or not have it set unless no_default is True.
+    Profiles must not have set any criteria the client does not provide.
+    If a criteria_index.CriteriaIndex of the profiles table is given, it is
+    used rather than querying the database.
+    '''
+    if index is not None:
+        return index.find_profiles(criteria, no_default)
+
+    query_str = build_profile_query_str(criteria, db.getQueue(), no_default)
+    if not query_str:
+        return None
+    logging.info("Profile query: " + query_str)
+    try:
+        return execute(db.getQueue(), query_str).result()
+    except DBError as err:
+        # no profiles are sent, rather than failing the request
+        logging.error(str(err))
+        return None
+
+
+def build_profile_query_str(criteria, queue, no_default):
+    '''  build a query to find the profiles which match the client.
+    Args:
+        criteria: dictionary of client criteria
+        queue: the database request queue
+        no_default: if True, profiles must match each client criteria,
+                    rather than match or not have it set
+    Returns: query string or None if the profiles table has no criteria
+    '''
+    q_str = "SELECT DISTINCT name, file FROM " + PROFILES_TABLE + " WHERE "
+    nvpairs = list()  # accumulate criteria values from post-data
+    # for all AI client criteria
+    for crit in getCriteria(queue, table=PROFILES_TABLE, onlyUsed=False):
+        if crit not in criteria:
+            # fetch only global profiles destined for all clients
+            if isRangeCriteria(queue, crit, PROFILES_TABLE):
+                nvpairs += ["MIN" + crit + " IS NULL"]
+                nvpairs += ["MAX" + crit + " IS NULL"]
+            else:
+                nvpairs += [crit + " IS NULL"]
+            continue
+
+        # prepare criteria value to add to query
+        envval = sanitizeSQL(criteria[crit])
+        if isRangeCriteria(queue, crit, PROFILES_TABLE):
+            # If no default profiles are requested, then we mustn't allow
+            # this criteria to be NULL.  It must match the client's given
+            # value for this criteria.
+            if no_default:
+                if crit == "mac":
+                    nvpairs += ["(HEX(MIN" + crit + ")<=HEX(X'" + envval + \
+                        "'))"]
+
+                    nvpairs += ["(HEX(MAX" + crit + ")>=HEX(X'" + envval + \
+                        "'))"]
+                else:
+                    nvpairs += ["(MIN" + crit + "<='" + envval + "')"]
+                    nvpairs += ["(MAX" + crit + ">='" + envval + "')"]
+            else:
+                if crit == "mac":
+                    nvpairs += ["(MIN" + crit + " IS NULL OR "
+                        "HEX(MIN" + crit + ")<=HEX(X'" + envval + "'))"]
+                    nvpairs += ["(MAX" + crit + " IS NULL OR HEX(MAX" +
+                        crit + ")>=HEX(X'" + envval + "'))"]
+                else:
+                    nvpairs += ["(MIN" + crit + " IS NULL OR MIN" +
+                        crit + "<='" + envval + "')"]
+                    nvpairs += ["(MAX" + crit + " IS NULL OR MAX" +
+                        crit + ">='" + envval + "')"]
+        else:
+            # If no default profiles are requested, then we mustn't allow
+            # this criteria to be NULL.  It must match the client's given
+            # value for this criteria.
+            #
+            # Also, since this is a non-range criteria, the value stored
+            # in the DB may be a whitespace separated list of single
+            # values.  We use a special user-defined function in the
+            # determine if the given criteria is in that textual list.
+            if no_default:
+                if crit == "hostname":
+                    nvpairs += ["(match_hostname('" + envval + \
+                                "', hostname, 0) == 1)"]
+                else:
+                    nvpairs += ["(is_in_list('" + crit + "', '" + envval + \
+                                "', " + crit + ", 'None') == 1)"]
+            else:
+                if crit == "hostname":
+                    nvpairs += ["( hostname IS NULL OR match_hostname('" + \
+                                envval + "', hostname, 0) == 1)"]
+                else:
+                    nvpairs += ["(" + crit + " IS NULL OR is_in_list('" + \
+                                crit + "', '" + envval + "', " + crit + \
+                                ", 'None') == 1)"]
+
+    if len(nvpairs) == 0:
+        return None
+    return q_str + " AND ".join(nvpairs)
+
+
 def formatValue(key, value, units=True):
     ''' Format and stringify database values.
 
@@ -810,3 +1169,26 @@ def format_value(crit, value):
     if crit == "mac":
         return "x" + formatted_val
     return formatted_val
+
+
+def format_param(crit, value):
+    ''' Format a value based on its criteria type for use as a parameter of
+    a database query, as format_value() does for use in the query itself.
+    Args: crit - criteria name.
+          value - value to format.
+    Returns:
+          None for "unbounded", a buffer of the bytes of a mac address, or
+          the value as a string
+    Raises:
+          TypeError if a mac address is not a hexadecimal string
+    '''
+    # For the value "unbounded", we store this as "NULL" in the DB.
+    if value == "unbounded" or value is None:
+        return None
+    # Values are sanitized as they are by format_value(), so that they
+    # compare equal to the sanitized values of clients.
+    value = sanitizeSQL(str(value))
+    # mac addresses are stored as blobs, as x'<hex>' literals would be
+    if crit == "mac":
+        return buffer(binascii.unhexlify(value))
+    return value
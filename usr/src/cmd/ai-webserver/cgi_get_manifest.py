@@ -58,11 +58,67 @@ AI_DBGLVL_NONE = 0
 AI_DBGLVL_INFO = 4
 
 
-def get_parameters(form):
+class ServiceLookup(object):
+    '''Looks up AI services, their configuration and their databases on
+    behalf of a request.
+
+    Run as a CGI script, each request reads the service configuration and
+    opens and verifies the database afresh.  A long-lived server passes a
+    subclass which keeps them between requests instead (see
+    manifest_server.CachedServiceLookup).
+    '''
+
+    # Number of connections each database is opened with
+    db_threads = 1
+
+    def get_service_names(self):
+        '''Returns the names of all services'''
+        return config.get_all_service_names()
+
+    def is_service(self, name):
+        '''Returns True if name is a service'''
+        return config.is_service(name)
+
+    def get_service_port(self, name):
+        '''Returns the port of a service (compatibility with old services)'''
+        return config.get_service_port(name)
+
+    def get_service(self, name):
+        '''Returns the AIService for a service'''
+        return AIService(name)
+
+    def get_default_manifest(self, service):
+        '''Returns the name of the default manifest of an AIService'''
+        return service.get_default_manifest()
+
+    def get_database(self, path):
+        '''Returns an AI_database.DB for the database at path, having
+        verified its structure.
+        '''
+        aisql = AIdb.DB(path, threads=self.db_threads)
+        try:
+            aisql.verifyDBStructure()
+        except:
+            # stop the database's threads, which would otherwise be left
+            # waiting for requests
+            aisql.close()
+            raise
+        return aisql
+
+    def get_criteria_index(self, aisql, table):
+        '''Returns a criteria_index.CriteriaIndex of a table of a database
+        returned by get_database(), or None to query the database itself.
+        '''
+        return None
+
+
+def get_parameters(form, set_log_level=None):
     '''Gets the CGI parameters.
 
     Args
-        form    - form data in dictionary
+        form          - form data in dictionary
+        set_log_level - function to set the logging level the client asks
+                        for with, the root logger's setLevel if None
 
     Returns
         protocol_version   - the request version number, 0.5 indicates that the
@@ -94,7 +150,9 @@ def get_parameters(form):
                 # mapping of installer debug levels to Python logging levels
                 dbglogmap = [logging.NOTSET, logging.CRITICAL, logging.ERROR,
                             logging.WARN, logging.DEBUG]
-                logging.getLogger().setLevel(dbglogmap[int(sol_dbg)])
+                if set_log_level is None:
+                    set_log_level = logging.getLogger().setLevel
+                set_log_level(dbglogmap[int(sol_dbg)])
             else:
                 logging.warning(_(
                         "Unrecognized logging level from POST REQUEST:  ")
@@ -107,12 +165,12 @@ def get_parameters(form):
     return (protocol_version, service_name, no_default, post_data)
 
 
-def get_environment_information():
+def get_environment_information(environ=None):
     '''Gets the environment information for old client requests
        for the port number and request type (GET or POST).
 
     Args
-        None
+        environ - the request's CGI environment, os.environ if None
 
     Returns
         method - either GET or POST -- GET indicates that the client
@@ -125,17 +183,21 @@ def get_environment_information():
     Raises
         None
     '''
-    method = os.environ['REQUEST_METHOD']
-    port = int(os.environ['SERVER_PORT'])
+    if environ is None:
+        environ = os.environ
+    method = environ['REQUEST_METHOD']
+    port = int(environ['SERVER_PORT'])
 
     return (method, port)
 
 
-def send_needed_criteria(port):
+def send_needed_criteria(port, out=None, lookup=None):
     '''Replies to the old client with the needed criteria
 
     Args
-        port - the originating port for the old client
+        port   - the originating port for the old client
+        out    - file to write the reply to, sys.stdout if None
+        lookup - ServiceLookup to find the database with
 
     Returns
         None
@@ -144,26 +206,30 @@ def send_needed_criteria(port):
         None
     
     '''
+    if out is None:
+        out = sys.stdout
+    if lookup is None:
+        lookup = ServiceLookup()
+
     # Establish the service SQL database based upon the
     # port number for the service
     path = os.path.join(com.AI_SERVICE_DIR_PATH, str(port), 'AI.db')
     if os.path.exists(path):
         try:
-            aisql = AIdb.DB(path)
-            aisql.verifyDBStructure()
+            aisql = lookup.get_database(path)
         except StandardError as err:
             # internal error, record the error in the server error_log
             sys.stderr.write(_('error:AI database access error\n%s\n') % err)
             # report the error to the requesting client
-            print "Content-Type: text/html"    # HTML is following
-            print                              # blank line, end of headers
-            sys.stdout.write(_("error:AI database access error\n%s\n") % err)
+            print >> out, "Content-Type: text/html"  # HTML is following
+            print >> out                       # blank line, end of headers
+            out.write(_("error:AI database access error\n%s\n") % err)
             sys.exit(1)
     else:
         # not an internal error, report to the requesting client only
-        print "Content-Type: text/html"    # HTML is following
-        print                              # blank line, end of headers
-        print _("Error:unable to determine criteria "
+        print >> out, "Content-Type: text/html"  # HTML is following
+        print >> out                       # blank line, end of headers
+        print >> out, _("Error:unable to determine criteria "
                 "for service associated with port"), port
         return
 
@@ -181,14 +247,15 @@ def send_needed_criteria(port):
     xmlstr = lxml.etree.tostring(xml, pretty_print=True)
 
     # report the results
-    print "Content-Length:", len(xmlstr)  # Length of XML reply
-    print "Content-Type: text/xml"        # XML is following
-    print                                 # blank line, end of headers
-    print xmlstr
+    print >> out, "Content-Length:", len(xmlstr)  # Length of XML reply
+    print >> out, "Content-Type: text/xml"  # XML is following
+    print >> out                          # blank line, end of headers
+    print >> out, xmlstr
 
 
 def send_manifest(form_data, port=0, servicename=None,
-        protocolversion=COMPATIBILITY_VERSION, no_default=False):
+        protocolversion=COMPATIBILITY_VERSION, no_default=False, out=None,
+        lookup=None):
     '''Replies to the client with matching service for a service.
     
     Args
@@ -199,6 +266,8 @@ def send_manifest(form_data, port=0, servicename=None,
         no_default  - boolean flag to signify whether or not we should hand
                       back the default manifest and profiles if one cannot
                       be matched based on the client criteria.
+        out         - file to write the reply to, sys.stdout if None
+        lookup      - ServiceLookup to find the service and database with
 
     Returns
         None
@@ -213,46 +282,51 @@ def send_manifest(form_data, port=0, servicename=None,
     # When the cherrypy webserver new service directories should be
     # separated via service-name only.  Old services will still use
     # port numbers as the separation mechanism.
+    if out is None:
+        out = sys.stdout
+    if lookup is None:
+        lookup = ServiceLookup()
+
     path = None
     found_servicename = None
     service = None
     port = str(port)
     
     if servicename:
-        service = AIService(servicename)
+        service = lookup.get_service(servicename)
         path = service.database_path
     else:
-        for name in config.get_all_service_names():
-            if config.get_service_port(name) == port:
+        for name in lookup.get_service_names():
+            if lookup.get_service_port(name) == port:
                 found_servicename = name
-                service = AIService(name)
+                service = lookup.get_service(name)
                 path = service.database_path
                 break
     
     # Check to insure that a valid path was found
     if not path or not os.path.exists(path):
-        print 'Content-Type: text/html'     # HTML is following
-        print                               # blank line, end of headers
+        print >> out, 'Content-Type: text/html'  # HTML is following
+        print >> out                        # blank line, end of headers
         if servicename:
-            print '<pre><b>Error</b>:unable to find<i>', servicename + '</i>.'
+            print >> out, '<pre><b>Error</b>:unable to find<i>', \
+                servicename + '</i>.'
         else:
-            print '<pre><b>Error</b>:unable to find<i>', port + '</i>.'
-        print 'Available services are:<p><ol><i>'
+            print >> out, '<pre><b>Error</b>:unable to find<i>', port + '</i>.'
+        print >> out, 'Available services are:<p><ol><i>'
         hostname = socket.gethostname()
-        for name in config.get_all_service_names():
-            port = config.get_service_port(name)
-            sys.stdout.write('<a href="http://%s:%d/cgi-bin/'
+        for name in lookup.get_service_names():
+            port = lookup.get_service_port(name)
+            out.write('<a href="http://%s:%d/cgi-bin/'
                    'cgi_get_manifest.py?version=%s&service=%s">%s</a><br>\n' %
                    (hostname, port, VERSION, name, name))
-        print '</i></ol>Please select a service from the above list.'
+        print >> out, '</i></ol>Please select a service from the above list.'
         return
 
     if found_servicename:
         servicename = found_servicename
 
     # load to the AI database
-    aisql = AIdb.DB(path)
-    aisql.verifyDBStructure()
+    aisql = lookup.get_database(path)
 
     # convert the form data into a criteria dictionary
     criteria = dict()
@@ -277,25 +351,26 @@ def send_manifest(form_data, port=0, servicename=None,
             
     # find the appropriate manifest
     try:
-        manifest = AIdb.findManifest(criteria, aisql)
+        manifest = AIdb.findManifest(criteria, aisql,
+            index=lookup.get_criteria_index(aisql, AIdb.MANIFESTS_TABLE))
     except StandardError as err:
-        print 'Content-Type: text/html'     # HTML is following
-        print                               # blank line, end of headers
-        print '<pre><b>Error</b>:findManifest criteria<br>'
-        print err, '<br>'
-        print '<ol>servicename =', servicename
-        print 'port        =', port
-        print 'path        =', path
-        print 'form_data   =', orig_data
-        print 'criteria    =', criteria
-        print 'servicename found by port =', found_servicename, '</ol>'
-        print '</pre>'
+        print >> out, 'Content-Type: text/html'  # HTML is following
+        print >> out                        # blank line, end of headers
+        print >> out, '<pre><b>Error</b>:findManifest criteria<br>'
+        print >> out, err, '<br>'
+        print >> out, '<ol>servicename =', servicename
+        print >> out, 'port        =', port
+        print >> out, 'path        =', path
+        print >> out, 'form_data   =', orig_data
+        print >> out, 'criteria    =', criteria
+        print >> out, 'servicename found by port =', found_servicename, '</ol>'
+        print >> out, '</pre>'
         return
 
     # check if findManifest() returned a number equal to 0
     # (means we got no manifests back -- thus we serve the default if desired)
     if manifest is None and not no_default:
-        manifest = service.get_default_manifest()
+        manifest = lookup.get_default_manifest(service)
 
     # if we have a manifest to return, prepare its return
     if manifest is not None:
@@ -310,27 +385,28 @@ def send_manifest(form_data, port=0, servicename=None,
             if servicename is None or \
                     float(protocolversion) < float(PROFILES_VERSION):
                 content_type = mimetypes.types_map.get('.xml', 'text/plain')
-                print 'Content-Length:', len(manifest_str) # Length of the file
-                print 'Content-Type:', content_type        # XML is following
-                print                              # blank line, end of headers
-                print manifest_str
+                # Length of the file
+                print >> out, 'Content-Length:', len(manifest_str)
+                print >> out, 'Content-Type:', content_type  # XML is following
+                print >> out                       # blank line, end of headers
+                print >> out, manifest_str
                 logging.info('Manifest sent from %s.' % filename)
                 return
 
         except OSError as err:
-            print 'Content-Type: text/html'     # HTML is following
-            print                               # blank line, end of headers
-            print '<pre>'
+            print >> out, 'Content-Type: text/html'  # HTML is following
+            print >> out                        # blank line, end of headers
+            print >> out, '<pre>'
             # report the internal error to error_log and requesting client
             sys.stderr.write(_('error:manifest (%s) %s\n') % \
                             (str(manifest), err))
-            sys.stdout.write(_('error:manifest (%s) %s\n') % \
+            out.write(_('error:manifest (%s) %s\n') % \
                             (str(manifest), err))
-            print '</pre>'
+            print >> out, '</pre>'
             return
 
     # get AI service image path
-    service = AIService(servicename)
+    service = lookup.get_service(servicename)
     image_dir = service.image.path
     # construct object to contain MIME multipart message
     outermime = MIMEMultipart()
@@ -346,94 +422,32 @@ def send_manifest(form_data, port=0, servicename=None,
         outermime.attach(msg)  # add manifest as an attachment
 
     # search for any profiles matching client criteria
-    # formulate database query to profiles table
-    q_str = "SELECT DISTINCT name, file FROM " + \
-        AIdb.PROFILES_TABLE + " WHERE "
-    nvpairs = list()  # accumulate criteria values from post-data
+    profiles_index = lookup.get_criteria_index(aisql, AIdb.PROFILES_TABLE)
+    if profiles_index is not None:
+        profile_criteria = profiles_index.criteria
+    else:
+        profile_criteria = AIdb.getCriteria(aisql.getQueue(),
+                                            table=AIdb.PROFILES_TABLE,
+                                            onlyUsed=False)
     # for all AI client criteria
-    for crit in AIdb.getCriteria(aisql.getQueue(), table=AIdb.PROFILES_TABLE,
-                                 onlyUsed=False):
+    for crit in profile_criteria:
         if crit not in criteria:
             msgtxt = _("Warning: client criteria \"%s\" not provided in "
                        "request.  Setting value to NULL for profile lookup.") \
                        % crit
             client_msg += [msgtxt]
             logging.warn(msgtxt)
-            # fetch only global profiles destined for all clients
-            if AIdb.isRangeCriteria(aisql.getQueue(), crit,
-                                    AIdb.PROFILES_TABLE):
-                nvpairs += ["MIN" + crit + " IS NULL"]
-                nvpairs += ["MAX" + crit + " IS NULL"]
-            else:
-                nvpairs += [crit + " IS NULL"]
-            continue
-
-        # prepare criteria value to add to query
-        envval = AIdb.sanitizeSQL(criteria[crit])
-        if AIdb.isRangeCriteria(aisql.getQueue(), crit, AIdb.PROFILES_TABLE):
-            # If no default profiles are requested, then we mustn't allow
-            # this criteria to be NULL.  It must match the client's given
-            # value for this criteria.
-            if no_default:
-                if crit == "mac":
-                    nvpairs += ["(HEX(MIN" + crit + ")<=HEX(X'" + envval + \
-                        "'))"]
-
-                    nvpairs += ["(HEX(MAX" + crit + ")>=HEX(X'" + envval + \
-                        "'))"]
-                else:
-                    nvpairs += ["(MIN" + crit + "<='" + envval + "')"]
-                    nvpairs += ["(MAX" + crit + ">='" + envval + "')"]
-            else:
-                if crit == "mac":
-                    nvpairs += ["(MIN" + crit + " IS NULL OR "
-                        "HEX(MIN" + crit + ")<=HEX(X'" + envval + "'))"]
-                    nvpairs += ["(MAX" + crit + " IS NULL OR HEX(MAX" +
-                        crit + ")>=HEX(X'" + envval + "'))"]
-                else:
-                    nvpairs += ["(MIN" + crit + " IS NULL OR MIN" +
-                        crit + "<='" + envval + "')"]
-                    nvpairs += ["(MAX" + crit + " IS NULL OR MAX" +
-                        crit + ">='" + envval + "')"]
-        else:
-            # If no default profiles are requested, then we mustn't allow
-            # this criteria to be NULL.  It must match the client's given
-            # value for this criteria.
-            #
-            # Also, since this is a non-range criteria, the value stored
-            # in the DB may be a whitespace separated list of single
-            # values.  We use a special user-defined function in the
-            # determine if the given criteria is in that textual list.
-            if no_default:
-                if crit == "hostname":
-                    nvpairs += ["(match_hostname('" + envval + \
-                                "', hostname, 0) == 1)"]
-                else:
-                    nvpairs += ["(is_in_list('" + crit + "', '" + envval + \
-                                "', " + crit + ", 'None') == 1)"]
-            else:
-                if crit == "hostname":
-                    nvpairs += ["( hostname IS NULL OR match_hostname('" + \
-                                envval + "', hostname, 0) == 1)"]
-                else:
-                    nvpairs += ["(" + crit + " IS NULL OR is_in_list('" + \
-                                crit + "', '" + envval + "', " + crit + \
-                                ", 'None') == 1)"]
-
-    if len(nvpairs) > 0:
-        q_str += " AND ".join(nvpairs)
 
+    if len(profile_criteria) > 0:
         # issue database query
-        logging.info("Profile query: " + q_str)
-        query = AIdb.DBrequest(q_str)
-        aisql.getQueue().put(query)
-        query.waitAns()
-        if query.getResponse() is None or len(query.getResponse()) == 0:
+        profiles = AIdb.findProfiles(criteria, aisql, no_default=no_default,
+                                     index=profiles_index)
+        if profiles is None or len(profiles) == 0:
             msgtxt = _("No profiles found.")
             client_msg += [msgtxt]
             logging.info(msgtxt)
         else:
-            for row in query.getResponse():
+            for row in profiles:
                 profpath = row['file']
                 profname = row['name']
                 if profname is None:  # should not happen
@@ -510,15 +524,17 @@ def send_manifest(form_data, port=0, servicename=None,
         msg = MIMEText(outtxt, 'plain')  # create MIME message
         outermime.attach(msg)  # attach MIME message to response
 
-    print outermime.as_string()  # send MIME-formatted message
+    print >> out, outermime.as_string()  # send MIME-formatted message
 
 
-def list_manifests(service):
+def list_manifests(service, out=None, lookup=None):
     '''Replies to the client with criteria list for a service.
        The output should be similar to installadm list.
 
     Args
         service - the name of the service being listed
+        out     - file to write the reply to, sys.stdout if None
+        lookup  - ServiceLookup to find the service and database with
 
     Returns
         None
@@ -526,13 +542,18 @@ def list_manifests(service):
     Raises
         None
     '''
-    print 'Content-Type: text/html'     # HTML is following
-    print                               # blank line, end of headers
-    print '<html>'
-    print '<head>'
-    sys.stdout.write('<title>%s %s</title>' %
+    if out is None:
+        out = sys.stdout
+    if lookup is None:
+        lookup = ServiceLookup()
+
+    print >> out, 'Content-Type: text/html'  # HTML is following
+    print >> out                        # blank line, end of headers
+    print >> out, '<html>'
+    print >> out, '<head>'
+    out.write('<title>%s %s</title>' %
                      (_('Manifest list for'), service))
-    print '</head><body>'
+    print >> out, '</head><body>'
 
     port = 0
     try:
@@ -541,32 +562,31 @@ def list_manifests(service):
         # report the internal error to error_log and requesting client
         sys.stderr.write(_("error:The system does not have the "
                            "system/install/server SMF service."))
-        sys.stdout.write(_("error:The system does not have the "
+        out.write(_("error:The system does not have the "
                            "system/install/server SMF service."))
         return
-    services = config.get_all_service_names()
+    services = lookup.get_service_names()
     if not services:
         # report the error to the requesting client only
-        sys.stdout.write(_('error:no services on this server.\n'))
+        out.write(_('error:no services on this server.\n'))
         return
 
     found = False
-    if config.is_service(service):
-        service_ctrl = AIService(service)
+    if lookup.is_service(service):
+        service_ctrl = lookup.get_service(service)
         found = True
 
         # assume new service setup
         path = service_ctrl.database_path
         if os.path.exists(path):
             try:
-                aisql = AIdb.DB(path)
-                aisql.verifyDBStructure()
+                aisql = lookup.get_database(path)
             except StandardError as err:
                 # report the internal error to error_log and
                 # requesting client
                 sys.stderr.write(_('error:AI database access '
                                    'error\n%s\n') % err)
-                sys.stdout.write(_('error:AI database access '
+                out.write(_('error:AI database access '
                                    'error\n%s\n') % err)
                 return
 
@@ -646,69 +666,99 @@ def list_manifests(service):
                                     border="1", align="center"),
                           )
                      )
-            print lxml.etree.tostring(web_page, pretty_print=True)
+            print >> out, lxml.etree.tostring(web_page, pretty_print=True)
 
     # service is not found, provide available services on host
     if not found:
-        sys.stdout.write(_('Service <i>%s</i> not found.  ') % service)
-        sys.stdout.write(_('Available services are:<p><ol><i>'))
+        out.write(_('Service <i>%s</i> not found.  ') % service)
+        out.write(_('Available services are:<p><ol><i>'))
         host = socket.gethostname()
-        for service_name in config.get_all_service_names():
+        for service_name in lookup.get_service_names():
             # assume new service setup
-            port = config.get_service_port(service_name)
-            sys.stdout.write('<a href="http://%s:%d/cgi-bin/'
+            port = lookup.get_service_port(service_name)
+            out.write('<a href="http://%s:%d/cgi-bin/'
                    'cgi_get_manifest.py?version=%s&service=%s">%s</a><br>\n' %
                    (host, port, VERSION, service_name, service_name))
-        sys.stdout.write('</i></ol>%s' % _('Please select a service '
+        out.write('</i></ol>%s' % _('Please select a service '
                    'from the above list.'))
 
-    print '</body></html>'
+    print >> out, '</body></html>'
 
-if __name__ == '__main__':
-    gettext.install("solaris_install_aiwebserver", "/usr/share/locale")
-    DEFAULT_PORT = libaimdns.getinteger_property(com.SRVINST, com.PORTPROP)
-    (PARAM_VERSION, SERVICE, NO_DEFAULT, FORM_DATA) = \
-        get_parameters(cgi.FieldStorage())
-    print >> sys.stderr, PARAM_VERSION, SERVICE, NO_DEFAULT, FORM_DATA
-    if PARAM_VERSION == COMPATIBILITY_VERSION or SERVICE is None:
+def respond(form, default_port, environ=None, out=None, lookup=None,
+            set_log_level=None):
+    '''Replies to a client request, as described by its form data and CGI
+    environment.
+
+    Args
+        form          - the request's form data, such as a cgi.FieldStorage
+        default_port  - the port of the default webserver, which only new
+                        clients use
+        environ       - the request's CGI environment, os.environ if None
+        out           - file to write the reply to, sys.stdout if None
+        lookup        - ServiceLookup to find services and databases with
+        set_log_level - function to set the logging level the client asks
+                        for with, the root logger's setLevel if None
+
+    Returns
+        None
+
+    Raises
+        None
+    '''
+    if out is None:
+        out = sys.stdout
+    if lookup is None:
+        lookup = ServiceLookup()
+
+    (param_version, servicename, no_default, form_data) = \
+        get_parameters(form, set_log_level)
+    print >> sys.stderr, param_version, servicename, no_default, form_data
+    if param_version == COMPATIBILITY_VERSION or servicename is None:
         # Old client
-        (REQUEST_METHOD, REQUEST_PORT) = get_environment_information()
-        if REQUEST_PORT == DEFAULT_PORT:  # only new clients use default port
-            HOST = socket.gethostname()
-            print 'Content-Type: text/html'     # HTML is following
-            print                               # blank line, end of headers
-            print '<pre>'
-            sys.stdout.write(_('error:must supply a service name\n'))
-            sys.stdout.write(_('The request should look like:\n'))
-            sys.stdout.write('<ol>http://%s:%d/cgi_get_manifest.py?'
-                             'version=%s&service=<i>servicename</i></ol>' %
-                             (HOST, DEFAULT_PORT, VERSION))
-            print '</pre>'
-            sys.exit(0)
-        if REQUEST_METHOD == 'GET':
-            send_needed_criteria(REQUEST_PORT)
+        (request_method, request_port) = get_environment_information(environ)
+        if request_port == default_port:  # only new clients use default port
+            host = socket.gethostname()
+            print >> out, 'Content-Type: text/html'  # HTML is following
+            print >> out                        # blank line, end of headers
+            print >> out, '<pre>'
+            out.write(_('error:must supply a service name\n'))
+            out.write(_('The request should look like:\n'))
+            out.write('<ol>http://%s:%d/cgi_get_manifest.py?'
+                      'version=%s&service=<i>servicename</i></ol>' %
+                      (host, default_port, VERSION))
+            print >> out, '</pre>'
+            return
+        if request_method == 'GET':
+            send_needed_criteria(request_port, out=out, lookup=lookup)
         else:
-            send_manifest(FORM_DATA, port=REQUEST_PORT)
-    elif FORM_DATA is None:
+            send_manifest(form_data, port=request_port, out=out,
+                          lookup=lookup)
+    elif form_data is None:
         # do manifest table list
-        list_manifests(SERVICE)
+        list_manifests(servicename, out=out, lookup=lookup)
     else:
         # do manifest criteria match
         try:
-            send_manifest(FORM_DATA, servicename=SERVICE,
-                          protocolversion=PARAM_VERSION,
-                          no_default=NO_DEFAULT)
+            send_manifest(form_data, servicename=servicename,
+                          protocolversion=param_version,
+                          no_default=no_default, out=out, lookup=lookup)
         except:
-            # send error report to client (through stdout), log
-            print "Content-Type: text/html"     # HTML is following
-            print                               # blank line, end of headers
-            ERRMSG = _(
+            # send error report to client (through out), log
+            print >> out, "Content-Type: text/html"  # HTML is following
+            print >> out                       # blank line, end of headers
+            errmsg = _(
                 'Unexpected error in AI server script locating SC profiles. '
                 'Script traceback from server:')
-            print ERRMSG
-            logging.error(ERRMSG)
-            # traceback to stdout and log
+            print >> out, errmsg
+            logging.error(errmsg)
+            # traceback to out and log
             import traceback
-            TB = traceback.format_exc() # traceback to stdout and log
-            logging.error(TB)
-            print TB
+            tb = traceback.format_exc()  # traceback to out and log
+            logging.error(tb)
+            print >> out, tb
+
+
+if __name__ == '__main__':
+    gettext.install("solaris_install_aiwebserver", "/usr/share/locale")
+    DEFAULT_PORT = libaimdns.getinteger_property(com.SRVINST, com.PORTPROP)
+    respond(cgi.FieldStorage(), DEFAULT_PORT)
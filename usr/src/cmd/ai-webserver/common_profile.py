@@ -188,10 +188,7 @@ def is_name_in_table(name, queue, table):
     '''
     query_str = "SELECT * FROM %s WHERE name='%s'" % \
         (table, AIdb.sanitizeSQL(name))
-    query = AIdb.DBrequest(query_str)
-    queue.put(query)
-    query.waitAns()
-    return len(query.getResponse()) > 0
+    return len(AIdb.execute(queue, query_str).result()) > 0
 
 
 def get_columns(queue, table):
@@ -201,13 +198,11 @@ def get_columns(queue, table):
         queue - database queue object
         table - database table name
     '''
-    query = AIdb.DBrequest("PRAGMA table_info(" + table + ")")
-    queue.put(query)
-    query.waitAns()
+    rsp = AIdb.execute(queue, "PRAGMA table_info(" + table + ")").result()
     columns = list()
     # build a query so we can determine which columns (criteria) are in use
     # using the output from the PRAGMA statement
-    for col in iter(query.getResponse()):
+    for col in rsp:
         columns += [col['name']]
     return columns
 
@@ -143,10 +143,10 @@ def add_profile(criteria, profile_name, profile_file, queue, table):
     # clear any profiles exactly matching the criteria
     wherel += ["name=" + AIdb.format_value('name', profile_name)]
     q_str = "DELETE FROM " + table + " WHERE " + " AND ".join(wherel)
-    query = AIdb.DBrequest(q_str, commit=True)
-    queue.put(query)
-    query.waitAns()
-    if query.getResponse() is None:
+    try:
+        AIdb.execute(queue, q_str, commit=True).result()
+    except AIdb.DBError as err:
+        print >> sys.stderr, err
         return False
 
     # add profile to database
@@ -156,10 +156,10 @@ def add_profile(criteria, profile_name, profile_file, queue, table):
     valuesl += [AIdb.format_value('name', profile_file)]
     q_str = "INSERT INTO " + table + "(" + ", ".join(insertl) + \
             ") VALUES (" + ", ".join(valuesl) + ")"
-    query = AIdb.DBrequest(q_str, commit=True)
-    queue.put(query)
-    query.waitAns()
-    if query.getResponse() is None:
+    try:
+        AIdb.execute(queue, q_str, commit=True).result()
+    except AIdb.DBError as err:
+        print >> sys.stderr, err
         return False
 
     print >> sys.stderr, _('Profile %s added to database.') % profile_name
@@ -351,12 +351,11 @@ def do_update_profile(cmd_options=None):
     # get the path of profile in db
     q_str = "SELECT file FROM " + AIdb.PROFILES_TABLE + " WHERE name=" \
                 + AIdb.format_value('name', profile_name)
-    query = AIdb.DBrequest(q_str)
-    queue.put(query)
-    query.waitAns()
-    response = query.getResponse()
-    # database error
-    if response is None:
+    try:
+        response = AIdb.execute(queue, q_str).result()
+    except AIdb.DBError as err:
+        # database error
+        print >> sys.stderr, err
         raise SystemExit(missing_profile_error.format(
                          service=options.service_name, profile=profile_name))
 
@@ -0,0 +1,473 @@
+#!/usr/bin/python
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+'''
+
+In-memory indexes of the criteria in an AI database table, for matching
+clients to manifests and profiles without an SQL query calling back in to
+is_in_list() and match_hostname() for every row.
+
+A CriteriaIndex finds the same manifest as findManifest(), including the
+precedence of the ORDER BY clause of build_query_str(), and the same profiles
+as findProfiles().  Values are compared as SQLite compares them: numbers
+before text, text before blobs, and MAC addresses by their HEX() strings.
+
+'''
+
+import binascii
+import bisect
+import re
+
+import osol_install.auto_install.AI_database as AIdb
+
+# Columns of the manifests and profiles tables which aren't criteria
+NON_CRITERIA = ("name", "instance", "file")
+
+# A numeric literal, as SQLite parses one in a query, or accepts as a number
+# when converting text to INTEGER affinity.
+_NUMBER_RE = re.compile(r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$')
+_HEX_RE = re.compile(r'^([0-9a-fA-F]{2})*$')
+_HEX_NUMBER_RE = re.compile(r'^0[xX][0-9a-fA-F]+$')
+
+# Sort keys below and above those of every value
+_LOWEST = (0,)
+_HIGHEST = (4,)
+
+# Range criteria, and then list criteria, by which the best manifest is
+# chosen, in the order of build_query_str()'s ORDER BY clause, with hostname
+# inserted after ipv4 when the client gives one.
+_ORDER_RANGES = ("mac", "ipv4")
+_ORDER_LISTS = ("platform", "arch", "cpu")
+_ORDER_RANGES_LAST = ("network", "mem")
+
+
+class InvalidValue(ValueError):
+    '''A client value which can't be part of an SQL query, so that the query
+    fails rather than matching anything.
+    '''
+    pass
+
+
+def _text(value):
+    '''Returns value as unicode, as SQLite passes text to functions'''
+    if isinstance(value, unicode):
+        return value
+    return str(value).decode('utf-8', 'replace')
+
+
+def _number(text):
+    '''Returns text as a number if it's a numeric literal, else None'''
+    text = text.strip()
+    if not _NUMBER_RE.match(text):
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def sql_key(value):
+    '''Returns a key sorting non-NULL values as SQLite does, with the BINARY
+    collation: numbers, then text, then blobs.
+    '''
+    if isinstance(value, (int, long, float)):
+        return (1, value)
+    if isinstance(value, buffer):
+        return (3, str(value))
+    return (2, _text(value))
+
+
+def sql_hex(value):
+    '''Returns what SQLite's HEX() does for a non-NULL value'''
+    if isinstance(value, buffer):
+        data = str(value)
+    elif isinstance(value, (int, long)):
+        data = str(value)
+    elif isinstance(value, float):
+        data = '%.15g' % value
+        if '.' not in data and 'e' not in data:
+            data += '.0'
+    else:
+        data = _text(value).encode('utf-8')
+    return binascii.hexlify(data).upper()
+
+
+class IntervalTree(object):
+    '''A static, centered interval tree, for finding the closed intervals
+    which contain a point.  Intervals are given as (low, high, item) tuples.
+    '''
+
+    def __init__(self, intervals):
+        self.root = IntervalTree._build([interval for interval in intervals
+                                         if interval[0] <= interval[1]])
+
+    @staticmethod
+    def _build(intervals):
+        '''Returns the root node of a tree of intervals, or None'''
+        if not intervals:
+            return None
+
+        endpoints = sorted([interval[0] for interval in intervals] +
+                           [interval[1] for interval in intervals])
+        center = endpoints[len(endpoints) // 2]
+        left = list()
+        right = list()
+        here = list()
+        for interval in intervals:
+            if interval[1] < center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                here.append(interval)
+
+        # The intervals about the center, by low and by high, with their
+        # lows and highs to bisect.
+        by_low = sorted(here, key=lambda interval: interval[0])
+        by_high = sorted(here, key=lambda interval: interval[1])
+        return (center,
+                [interval[0] for interval in by_low],
+                [interval[2] for interval in by_low],
+                [interval[1] for interval in by_high],
+                [interval[2] for interval in by_high],
+                IntervalTree._build(left), IntervalTree._build(right))
+
+    def find(self, point):
+        '''Returns a list of the items of intervals containing point'''
+        found = list()
+        node = self.root
+        while node is not None:
+            (center, lows, low_items, highs, high_items, left, right) = node
+            if point < center:
+                found.extend(low_items[:bisect.bisect_right(lows, point)])
+                node = left
+            elif point > center:
+                found.extend(high_items[bisect.bisect_left(highs, point):])
+                node = right
+            else:
+                found.extend(low_items)
+                break
+        return found
+
+
+class ListCriterion(object):
+    '''Index of a criterion whose values are whitespace separated lists,
+    matched as is_in_list() and match_hostname() match them.
+    '''
+
+    def __init__(self, name, values):
+        '''values is the value of the criterion for each row'''
+        self.name = name
+        self.is_hostname = (name == "hostname")
+        self.case_sensitive = (not self.is_hostname and
+                               name.lower() in AIdb.CRIT_LIST_CASE_SENSITIVE)
+        self.nulls = set()
+        self.rows = dict()
+        self.row_values = dict()
+        for (row, value) in enumerate(values):
+            if value is None:
+                self.nulls.add(row)
+                continue
+            tokens = _text(value).split()
+            if not self.case_sensitive:
+                tokens = [token.lower() for token in tokens]
+            self.row_values[row] = frozenset(tokens)
+            for token in tokens:
+                self.rows.setdefault(token, set()).add(row)
+
+    def client_values(self, value):
+        '''Returns the values to look up for a client's value: each of the
+        possible matches of a hostname, longest first, or the value itself.
+        '''
+        value = _text(AIdb.sanitizeSQL(value))
+        if "'" in value:
+            raise InvalidValue(value)
+        if self.is_hostname:
+            parts = value.split(".")
+            return [".".join(parts[:index])
+                    for index in range(len(parts), 0, -1)]
+        return [value]
+
+    def match(self, value):
+        '''Returns the rows whose list includes the client's value'''
+        matched = set()
+        for client_value in self.client_values(value):
+            if not self.case_sensitive:
+                client_value = client_value.lower()
+            matched.update(self.rows.get(client_value, ()))
+        return matched
+
+    def matched_hostname(self, row, hostnames):
+        '''Returns what match_hostname() does for a row, given the possible
+        matches of a client's hostname.
+        '''
+        tokens = self.row_values.get(row)
+        if tokens:
+            for hostname in hostnames:
+                if hostname.lower() in tokens:
+                    return hostname
+        return u""
+
+
+class RangeCriterion(object):
+    '''Index of a criterion with MIN and MAX values'''
+
+    def __init__(self, name, mins, maxs):
+        '''mins and maxs are the MIN and MAX values for each row'''
+        self.name = name
+        self.is_mac = (name == "mac")
+        self.nulls = set()
+        self.bounded = set()
+        self.has_value = list()
+        intervals = list()
+        for (row, (low, high)) in enumerate(zip(mins, maxs)):
+            self.has_value.append(low is not None or high is not None)
+            if low is None and high is None:
+                self.nulls.add(row)
+                continue
+            if low is not None and high is not None:
+                self.bounded.add(row)
+            intervals.append((self.stored_key(low, _LOWEST),
+                              self.stored_key(high, _HIGHEST), row))
+        self.tree = IntervalTree(intervals)
+
+    def stored_key(self, value, default):
+        '''Returns the sort key of a MIN or MAX value'''
+        if value is None:
+            return default
+        if self.is_mac:
+            return (2, sql_hex(value))
+        return sql_key(value)
+
+    def client_key(self, value, quoted):
+        '''Returns the sort key of a client's value, as the SQL query would
+        compare it.  findManifest() puts numbers in the query as they are,
+        findProfiles() quotes them, for them to be converted by the column's
+        INTEGER affinity.
+        '''
+        value = AIdb.sanitizeSQL(value)
+        if "'" in value:
+            raise InvalidValue(value)
+        if self.is_mac:
+            if not _HEX_RE.match(value):
+                raise InvalidValue(value)
+            return (2, value.upper())
+        number = _number(value)
+        if number is not None:
+            return (1, number)
+        if quoted:
+            return (2, _text(value))
+        # SQLite takes hexadecimal literals in queries, but not as text
+        if _HEX_NUMBER_RE.match(value.strip()):
+            return (1, int(value.strip(), 16))
+        raise InvalidValue(value)
+
+    def match(self, value, quoted=False):
+        '''Returns the rows whose range includes the client's value, or is
+        open ended on the side of it.
+        '''
+        return set(self.tree.find(self.client_key(value, quoted)))
+
+
+class CriteriaIndex(object):
+    '''In-memory index of the criteria of the manifests or profiles table'''
+
+    def __init__(self, table, columns, rows):
+        '''Args:
+            table: MANIFESTS_TABLE or PROFILES_TABLE
+            columns: the criteria columns of the table, as returned by
+                     getCriteria(onlyUsed=False, strip=False)
+            rows: the rows of the table, in the order SQLite scans them
+        '''
+        self.table = table
+        # sqlite3.Row can't be indexed by the unicode names getCriteria()
+        # returns
+        columns = [str(column) for column in columns]
+        self.rows = [dict((key, row[key]) for key in row.keys()
+                          if key in NON_CRITERIA) for row in rows]
+
+        self.criteria = list()
+        self.ranges = dict()
+        self.lists = dict()
+        for column in columns:
+            if column.startswith('MAX'):
+                continue
+            if column.startswith('MIN'):
+                name = column.replace('MIN', '', 1)
+                self.ranges[name] = RangeCriterion(name,
+                    self._column(rows, columns, column),
+                    self._column(rows, columns, 'MAX' + name))
+            else:
+                name = column
+                self.lists[name] = ListCriterion(name,
+                    self._column(rows, columns, column))
+            self.criteria.append(name)
+
+        # Manifests with no criteria set (inactive or default) never match.
+        self.has_criteria = [any(row[column] is not None for column in columns)
+                             for row in rows]
+        self.order = [self._order_key(number, rows)
+                      for number in range(len(rows))]
+
+    @staticmethod
+    def _column(rows, columns, column):
+        '''Returns the values of a column, all NULL if there's no column'''
+        if column not in columns:
+            return [None] * len(rows)
+        return [row[column] for row in rows]
+
+    def _order_key(self, number, rows):
+        '''Returns the sort key of a row for the ORDER BY clause of
+        build_query_str(), without the client's hostname.
+        '''
+        key = list()
+        for name in _ORDER_RANGES:
+            key.append(name in self.ranges and
+                       self.ranges[name].has_value[number])
+        for name in _ORDER_LISTS:
+            value = rows[number][name] if name in self.lists else None
+            key.append(_LOWEST if value is None else sql_key(value))
+        for name in _ORDER_RANGES_LAST:
+            key.append(name in self.ranges and
+                       self.ranges[name].has_value[number])
+        return tuple(key)
+
+    @classmethod
+    def load(cls, queue, table=AIdb.MANIFESTS_TABLE):
+        '''Returns a CriteriaIndex of a table of the database whose request
+        queue is given, or None if the table can't be read.
+        '''
+        columns = AIdb.getCriteria(queue, table=table, onlyUsed=False,
+                                   strip=False)
+        try:
+            rows = AIdb.execute(queue, "SELECT * FROM " + table).result()
+        except AIdb.DBError:
+            return None
+        return cls(table, columns, rows)
+
+    def is_range(self, name):
+        '''Returns True if name is a range criterion'''
+        return name in self.ranges
+
+    def _candidates(self, criteria, allow_null, quoted, only_used):
+        '''Returns the rows matching every criterion: those whose value
+        matches the client's, or is NULL where allow_null is True or the
+        client gives no value.  With only_used, criteria no row has a value
+        for are ignored, as build_query_str() ignores them.
+        '''
+        sets = list()
+        for name in self.criteria:
+            if name in self.ranges:
+                index = self.ranges[name]
+            else:
+                index = self.lists[name]
+            if only_used and len(index.nulls) == len(self.rows):
+                continue
+
+            if name in self.ranges:
+                if name in criteria:
+                    matched = index.match(criteria[name], quoted)
+                    if not allow_null:
+                        matched &= index.bounded
+                        sets.append((matched, ()))
+                        continue
+                else:
+                    matched = ()
+            else:
+                if name in criteria:
+                    matched = index.match(criteria[name])
+                    if not allow_null:
+                        sets.append((matched, ()))
+                        continue
+                else:
+                    matched = ()
+            sets.append((matched, index.nulls))
+
+        if not sets:
+            return set(range(len(self.rows)))
+
+        # Start with the rows of the most selective criterion.
+        sets.sort(key=lambda pair: len(pair[0]) + len(pair[1]))
+        (matched, nulls) = sets[0]
+        candidates = set(matched)
+        candidates.update(nulls)
+        for (matched, nulls) in sets[1:]:
+            if not candidates:
+                break
+            candidates = candidates.intersection(matched) | \
+                candidates.intersection(nulls)
+        return candidates
+
+    def find_manifest(self, criteria):
+        '''Returns the name of the best matching manifest for a client's
+        criteria, or None, as findManifest() does.
+        '''
+        if not criteria:
+            return None
+        hostname_index = self.lists.get("hostname")
+        if hostname_index is None:
+            hostname_index = ListCriterion("hostname", ())
+        try:
+            candidates = self._candidates(criteria, True, False, True)
+            hostnames = None
+            if "hostname" in criteria:
+                hostnames = hostname_index.client_values(
+                    criteria["hostname"])
+        except InvalidValue:
+            return None
+
+        best = None
+        best_key = None
+        for row in candidates:
+            if not self.has_criteria[row]:
+                continue
+            key = self.order[row]
+            if hostnames is not None:
+                matched = hostname_index.matched_hostname(row, hostnames)
+                key = key[:2] + (matched,) + key[2:]
+            # the first row in the table wins a tie
+            key += (-row,)
+            if best_key is None or key > best_key:
+                (best, best_key) = (row, key)
+
+        if best is None:
+            return None
+        return self.rows[best]['name']
+
+    def find_profiles(self, criteria, no_default=False):
+        '''Returns a list of the distinct name and file of the profiles
+        matching a client's criteria, as findProfiles() does.
+        '''
+        try:
+            candidates = self._candidates(criteria, not no_default, True,
+                                          False)
+        except InvalidValue:
+            return None
+
+        profiles = list()
+        seen = set()
+        for row in sorted(candidates):
+            profile = (self.rows[row]['name'], self.rows[row]['file'])
+            if profile not in seen:
+                seen.add(profile)
+                profiles.append({'name': profile[0], 'file': profile[1]})
+        return profiles
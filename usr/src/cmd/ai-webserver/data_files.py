@@ -194,10 +194,8 @@ def insert_SQL(files):
     Args: None
     Returns: None
     """
-    query = "INSERT INTO manifests VALUES("
-
-    # add the manifest name to the query string
-    query += "'" + AIdb.sanitizeSQL(files.manifest_name) + "',"
+    # the manifest name, then the instance, then each criteria
+    params = [AIdb.sanitizeSQL(files.manifest_name)]
     # check to see if manifest name is already in database (affects instance
     # number)
     if AIdb.sanitizeSQL(files.manifest_name) in \
@@ -210,8 +208,8 @@ def insert_SQL(files):
     else:
         instance = 0
 
-    # actually add the instance to the query string
-    query += str(instance) + ","
+    # actually add the instance to the parameters
+    params.append(instance)
 
     # we need to fill in the criteria or NULLs for each criteria the database
     # supports (so iterate over each criteria)
@@ -229,43 +227,34 @@ def insert_SQL(files):
         if values is None:
             # use the criteria name to determine if this is a range
             if crit.startswith('MAX'):
-                query += "NULL,NULL,"
+                params.extend([None, None])
             # this is a single value
             else:
-                query += "NULL,"
+                params.append(None)
 
         # Else if this is a value criteria (not a range), insert the value
         # as a space-separated list of values which will account for the case
         # where a list of values have been given.
         elif not crit.startswith('MAX'):
             # Join the values of the list with a space separator.
-            query += "'" + AIdb.sanitizeSQL(" ".join(values)) + "',"
+            params.append(AIdb.sanitizeSQL(" ".join(values)))
         # else values is a range
         else:
             for value in values:
-                # translate "unbounded" to a database NULL
-                if value == "unbounded":
-                    query += "NULL,"
-                # we need to deal with mac addresses specially being
-                # hexadecimal
-                elif crit.endswith("mac"):
-                    # need to insert with hex operand x'<val>'
-                    # use an upper case string for hex values
-                    query += "x'" + AIdb.sanitizeSQL(str(value).upper()) + \
-                             "',"
-                else:
-                    query += AIdb.sanitizeSQL(str(value).upper()) + ","
-
-    # strip trailing comma and close parentheses
-    query = query[:-1] + ")"
-
-    # update the database
-    query = AIdb.DBrequest(query, commit=True)
-    files.database.getQueue().put(query)
-    query.waitAns()
-    # in case there's an error call the response function (which will print the
-    # error)
-    query.getResponse()
+                # translate "unbounded" to a database NULL, and mac addresses
+                # to the bytes they are stored as
+                params.append(AIdb.format_param(
+                    crit.replace('MAX', '', 1), value))
+
+    query = "INSERT INTO manifests VALUES(" + \
+            ",".join(["?"] * len(params)) + ")"
+
+    # update the database, printing any error
+    try:
+        AIdb.execute(files.database.getQueue(), query, params,
+                     commit=True).result()
+    except AIdb.DBError as err:
+        print >> sys.stderr, err
 
 
 def place_manifest(files, manifest_path):
@@ -106,12 +106,11 @@ def delete_manifest_from_db(db, manifest_instance, service_name, data_loc):
     # if we do not have an instance remove the entire manifest
     if instance is None:
         # remove manifest from database
-        query = AIdb.DBrequest("DELETE FROM manifests WHERE name = '%s'" %
-                               AIdb.sanitizeSQL(man_name), commit=True)
-        db.getQueue().put(query)
-        query.waitAns()
-        # run getResponse to handle and errors
-        query.getResponse()
+        try:
+            db.execute("DELETE FROM manifests WHERE name = ?",
+                       (AIdb.sanitizeSQL(man_name),), commit=True).result()
+        except AIdb.DBError as err:
+            print >> sys.stderr, err
 
         # clean up file on file system
         try:
@@ -130,32 +129,24 @@ def delete_manifest_from_db(db, manifest_instance, service_name, data_loc):
                                "instances" % {'name': man_name, 'num':
                                AIdb.numInstances(man_name, db.getQueue())}))
 
-        # remove instance from database
-        query = ("DELETE FROM manifests WHERE name = '%s' AND "
-                "instance = '%i'") % (AIdb.sanitizeSQL(man_name), instance)
-        query = AIdb.DBrequest(query, commit=True)
+        # Remove the instance from the database, and reshuffle manifests to
+        # prevent gaps in instance numbering as the DB routines expect
+        # instances to be contiguous and increasing.  We may have removed an
+        # instance with instances numbered above thus leaving a gap, so
+        # decrement the instance number of those, in the same transaction.
+        # Both statements must match the same name, or the renumbering
+        # would miss the rows the delete leaves a gap between.
+        name = AIdb.sanitizeSQL(man_name)
+        query = AIdb.DBbatch(commit=True)
+        query.add("DELETE FROM manifests WHERE name = ? AND instance = ?",
+                  (name, instance))
+        query.add("UPDATE manifests SET instance = instance - 1 WHERE "
+                  "name = ? AND instance > ?", (name, instance))
         db.getQueue().put(query)
-        query.waitAns()
-        # run getResponse to handle and errors
-        query.getResponse()
-
-        # We may need to reshuffle manifests to prevent gaps in instance
-        # numbering as the DB routines expect instances to be contiguous and
-        # increasing. We may have removed an instance with instances numbered
-        # above thus leaving a gap.
-
-        # get the number of instances with a larger instance
-        for num in range(instance, AIdb.numInstances(man_name,
-                                                     db.getQueue()) + 1):
-            # now decrement the instance number
-            query = ("UPDATE manifests SET instance = '%i' WHERE "
-                    "name = '%s' ") % (num - 1, AIdb.sanitizeSQL(man_name))
-            query += "AND instance = '%i'" % num
-            query = AIdb.DBrequest(query, commit=True)
-            db.getQueue().put(query)
-            query.waitAns()
-            # run getResponse to handle and errors
-            query.getResponse()
+        try:
+            query.result()
+        except AIdb.DBError as err:
+            print >> sys.stderr, err
 
         # remove file if manifest is no longer in database
         if man_name not in AIdb.getManNames(db.getQueue()):
@@ -94,12 +94,10 @@ def delete_profiles(profs, dbo, table):
         query_str = "SELECT " + ", ".join(db_cols) + " FROM " + table + \
                 " WHERE name=" + AIdb.format_value('name', profile_name)
         logging.debug("query=" + query_str)
-        query = AIdb.DBrequest(query_str, commit=True)
-        queue.put(query)
-        query.waitAns()
-        # check response, if failure, getResponse prints error
-        rsp = query.getResponse()
-        if rsp is None:
+        try:
+            rsp = AIdb.execute(queue, query_str, commit=True).result()
+        except AIdb.DBError as err:
+            print >> sys.stderr, err
             has_errors = True
             continue
         if len(rsp) == 0:
@@ -114,11 +112,10 @@ def delete_profiles(profs, dbo, table):
                 deldict[crit] = next(iresponse)
             query_str = "DELETE FROM %s WHERE rowid=%d" % \
                     (table, deldict['rowid'])
-            delquery = AIdb.DBrequest(query_str, commit=True)
-            queue.put(delquery)
-            delquery.waitAns()
-            # check response, if failure, getResponse prints error
-            if delquery.getResponse() is None:
+            try:
+                AIdb.execute(queue, query_str, commit=True).result()
+            except AIdb.DBError as err:
+                print >> sys.stderr, err
                 has_errors = True
                 continue
             print >> sys.stderr, _("\tDeleted profile %s.") % profile_name
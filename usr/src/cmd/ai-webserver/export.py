@@ -193,16 +193,15 @@ def do_export_profile(options):
         fmtname = AIdb.format_value('name', pname)
         q_str = "SELECT file FROM  " + AIdb.PROFILES_TABLE + \
                 " WHERE name=" + fmtname
-        query = AIdb.DBrequest(q_str)
-        queue.put(query)
-        query.waitAns()
-        # check response, if failure, getResponse prints error
-        if query.getResponse() is None:
+        try:
+            rsp = AIdb.execute(queue, q_str).result()
+        except AIdb.DBError as err:
+            print >> sys.stderr, err
             continue
-        if len(query.getResponse()) == 0:
+        if len(rsp) == 0:
             print >> sys.stderr, _("Profile %s not found.") % fmtname
             continue
-        for row in query.getResponse():
+        for row in rsp:
             profpath = row['file']
 
             if options.output_isdir:
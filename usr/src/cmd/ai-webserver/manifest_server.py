@@ -0,0 +1,435 @@
+#!/usr/bin/python2.6
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+'''
+manifest_server answers AI client requests for manifests and profiles from
+a long-lived process, rather than starting cgi_get_manifest as a CGI script
+for each request.
+
+Requests and replies are exactly those of cgi_get_manifest.  Service
+configuration and AI databases are kept between requests, and refreshed
+when installadm changes them.  ManifestApplication is a WSGI application,
+which can be run by any WSGI server; run as a script, this module serves it
+itself, answering requests from a fixed pool of threads:
+
+    python -m osol_install.auto_install.manifest_server -p <port> \
+        [-a <address>] [-t <threads>]
+'''
+import cgi
+import gettext
+import logging
+import os
+import Queue
+import sys
+import threading
+
+from optparse import OptionParser
+from StringIO import StringIO
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+import osol_install.auto_install.cgi_get_manifest as cgi_get_manifest
+import osol_install.auto_install.criteria_index as criteria_index
+import osol_install.auto_install.installadm_common as com
+import osol_install.auto_install.service_config as config
+import osol_install.libaimdns as libaimdns
+
+from osol_install.auto_install.AI_database import get_database_signature, \
+    get_file_signature
+from osol_install.auto_install.installadm_common import _
+
+
+DEFAULT_THREADS = 16
+
+
+class CachedDatabase(object):
+    '''An AI_database.DB kept by CachedServiceLookup.
+
+    Once dropped from the cache, the database is closed when the last
+    request using it has finished with it.  Indexes of its criteria are kept
+    with it, and so are dropped along with it when the database changes.
+    '''
+
+    def __init__(self, aisql):
+        self._aisql = aisql
+        self._indexes_lock = threading.Lock()
+        # table name -> criteria_index.CriteriaIndex
+        self._indexes = dict()
+
+    def get_criteria_index(self, table):
+        '''Returns a CriteriaIndex of a table, loading it on first use, or
+        None if the table can't be read.
+        '''
+        with self._indexes_lock:
+            if table not in self._indexes:
+                self._indexes[table] = criteria_index.CriteriaIndex.load(
+                    self._aisql.getQueue(), table)
+            return self._indexes[table]
+
+    def __getattr__(self, name):
+        return getattr(self._aisql, name)
+
+    def __del__(self):
+        self._aisql.close()
+
+
+class CachedService(object):
+    '''What CachedServiceLookup keeps of a service's configuration'''
+
+    def __init__(self, name):
+        self.name = name
+        self.service = None
+        self.port = None
+        self.default_manifest = None
+
+
+class CachedServiceLookup(cgi_get_manifest.ServiceLookup):
+    '''Keeps services' configuration, and AI databases, between requests.
+
+    A service's configuration is read again once its .config file changes.
+    A database is opened and verified again once it is replaced, or a
+    change to it is committed by installadm, as by publish_manifest,
+    set_criteria or delete_manifest.  Files are only checked with stat(2)
+    and a small read, rather than parsed, for each request.  Clients are
+    matched to manifests and profiles with in-memory indexes of each
+    database, rebuilt whenever the database is.  A database which fails
+    to open or verify isn't tried again until it changes.
+    '''
+
+    # Concurrent requests share each database, so it's opened with a pool
+    # of connections.
+    db_threads = 4
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # service name -> (signature of .config file, CachedService)
+        self._services = dict()
+        # database path -> (signature of database, CachedDatabase)
+        self._databases = dict()
+        # database path -> (signature of database, exception raised opening
+        # or verifying it)
+        self._failed_databases = dict()
+
+    def clear(self):
+        '''Drops everything kept, closing the databases'''
+        with self._lock:
+            self._services.clear()
+            self._databases.clear()
+            self._failed_databases.clear()
+
+    def _get_cached_service(self, name):
+        '''Returns the CachedService for a service, replacing it if the
+        service's configuration has changed since it was created.
+        '''
+        signature = get_file_signature(os.path.join(
+            config.AI_SERVICE_DIR_PATH, name, config.CFGFILE))
+        with self._lock:
+            (cached_signature, cached) = self._services.get(name,
+                                                            (None, None))
+            if cached is None or cached_signature != signature:
+                cached = CachedService(name)
+                self._services[name] = (signature, cached)
+            return cached
+
+    def get_service_port(self, name):
+        '''Returns the port of a service (compatibility with old services)'''
+        cached = self._get_cached_service(name)
+        if cached.port is None:
+            cached.port = super(CachedServiceLookup,
+                                self).get_service_port(name)
+        return cached.port
+
+    def get_service(self, name):
+        '''Returns the AIService for a service'''
+        cached = self._get_cached_service(name)
+        if cached.service is None:
+            cached.service = super(CachedServiceLookup,
+                                   self).get_service(name)
+        return cached.service
+
+    def get_default_manifest(self, service):
+        '''Returns the name of the default manifest of an AIService'''
+        cached = self._get_cached_service(service.name)
+        if cached.default_manifest is None:
+            cached.default_manifest = super(CachedServiceLookup,
+                self).get_default_manifest(service)
+        return cached.default_manifest
+
+    def get_database(self, path):
+        '''Returns an AI_database.DB for the database at path, having
+        verified its structure.
+        '''
+        signature = get_database_signature(path)
+        with self._lock:
+            (cached_signature, aisql) = self._databases.get(path,
+                                                            (None, None))
+            if aisql is None or cached_signature != signature:
+                # Drop the old database first, so it isn't kept if the new
+                # one can't be opened.
+                self._databases.pop(path, None)
+                (failed_signature, failure) = \
+                    self._failed_databases.pop(path, (None, None))
+                if failure is not None and failed_signature == signature:
+                    self._failed_databases[path] = (signature, failure)
+                    raise failure
+                try:
+                    aisql = CachedDatabase(super(CachedServiceLookup,
+                                                 self).get_database(path))
+                except (StandardError, SystemExit) as err:
+                    self._failed_databases[path] = (signature, err)
+                    raise
+                self._databases[path] = (signature, aisql)
+        # the signature has been read for this request, so lookups of the
+        # database's criteria needn't read it again
+        aisql.getCriteriaCache().validate(signature)
+        return aisql
+
+    def get_criteria_index(self, aisql, table):
+        '''Returns a criteria_index.CriteriaIndex of a table of a database
+        returned by get_database(), or None to query the database itself.
+        '''
+        if not isinstance(aisql, CachedDatabase):
+            return None
+        return aisql.get_criteria_index(table)
+
+
+def parse_cgi_output(output):
+    '''Splits the output of a CGI script in to an HTTP status, a list of
+    headers and a body.
+    '''
+    (head, separator, body) = output.partition('\n\n')
+    if not separator:
+        (head, body) = ('', output)
+
+    status = '200 OK'
+    headers = list()
+    for line in head.splitlines():
+        # a continuation of the previous header
+        if line[:1] in (' ', '\t') and headers:
+            headers[-1] = (headers[-1][0], headers[-1][1] + ' ' +
+                           line.strip())
+            continue
+        (name, separator, value) = line.partition(':')
+        if not separator:
+            continue
+        if name.lower() == 'status':
+            status = value.strip()
+        # the script's Content-Length doesn't count the newline print adds
+        elif name.lower() != 'content-length':
+            headers.append((name.strip(), value.strip()))
+
+    headers.append(('Content-Length', str(len(body))))
+    return (status, headers, body)
+
+
+class RequestLogLevel(logging.Filter):
+    '''Logging filter applying the logging level a client asks for to the
+    records logged while answering its request.  The level is kept per
+    thread, as requests are answered at once by a pool of threads which
+    all log with the root logger.
+    '''
+
+    def __init__(self, level=logging.WARNING):
+        '''level - the level of records logged outside of a request, or in
+                   a request which doesn't ask for one
+        '''
+        logging.Filter.__init__(self)
+        self.level = level
+        self._local = threading.local()
+
+    def install(self, logger):
+        '''Filters the records of logger, which is set to log records of
+        all levels for the filter to choose from.
+        '''
+        logger.addFilter(self)
+        logger.setLevel(logging.NOTSET)
+
+    def set_level(self, level):
+        '''Sets the logging level of the calling thread's request'''
+        self._local.level = level
+
+    def clear_level(self):
+        '''Forgets the logging level of the calling thread's request'''
+        self._local.__dict__.pop('level', None)
+
+    def filter(self, record):
+        return record.levelno >= getattr(self._local, 'level', self.level)
+
+
+class ManifestApplication(object):
+    '''WSGI application answering AI client requests as cgi_get_manifest
+    does, using a CachedServiceLookup shared by all requests.
+    '''
+
+    def __init__(self, default_port=None, lookup=None):
+        '''Args
+            default_port - the port of the default webserver, which only
+                           new clients use.  Read from SMF if None.
+            lookup       - ServiceLookup to find services and databases
+                           with, a new CachedServiceLookup if None.
+        '''
+        if default_port is None:
+            default_port = libaimdns.getinteger_property(com.SRVINST,
+                                                         com.PORTPROP)
+        if lookup is None:
+            lookup = CachedServiceLookup()
+        self.default_port = default_port
+        self.lookup = lookup
+        self.log_level = RequestLogLevel(logging.getLogger().level)
+
+    def __call__(self, environ, start_response):
+        form = cgi.FieldStorage(fp=environ['wsgi.input'], environ=environ)
+        out = StringIO()
+
+        # clients may change the logging level for their own request
+        try:
+            cgi_get_manifest.respond(form, self.default_port,
+                                     environ=environ, out=out,
+                                     lookup=self.lookup,
+                                     set_log_level=self.log_level.set_level)
+        except SystemExit:
+            # a CGI script exits on errors it has already reported
+            pass
+        finally:
+            self.log_level.clear_level()
+
+        (status, headers, body) = parse_cgi_output(out.getvalue())
+        start_response(status, headers)
+        return [body]
+
+
+class ThreadPoolMixIn:
+    '''Mix-in class to handle each request in one of a fixed pool of
+    threads, rather than in a new thread as SocketServer.ThreadingMixIn
+    does.  Accepted requests wait in a queue of up to queue_size for a
+    thread to become free.
+    '''
+
+    pool_size = DEFAULT_THREADS
+    queue_size = 1024
+
+    _pool = None
+
+    def start_pool(self):
+        '''Starts the pool of threads'''
+        self._pool_queue = Queue.Queue(self.queue_size)
+        self._pool = list()
+        for number in range(self.pool_size):
+            thread = threading.Thread(target=self.process_queued_requests,
+                                      name="request-%d" % number)
+            thread.setDaemon(True)
+            thread.start()
+            self._pool.append(thread)
+
+    def process_queued_requests(self):
+        '''Handles queued requests until a None is queued'''
+        while True:
+            queued = self._pool_queue.get()
+            if queued is None:
+                return
+            (request, client_address) = queued
+            try:
+                self.finish_request(request, client_address)
+            except:
+                self.handle_error(request, client_address)
+            finally:
+                self.close_request(request)
+
+    def process_request(self, request, client_address):
+        '''Queues a request for the pool of threads'''
+        if self._pool is None:
+            self.start_pool()
+        self._pool_queue.put((request, client_address))
+
+    def stop_pool(self):
+        '''Stops the pool of threads, once they've handled the requests
+        already queued.
+        '''
+        if self._pool is not None:
+            for thread in self._pool:
+                self._pool_queue.put(None)
+            for thread in self._pool:
+                thread.join()
+            self._pool = None
+
+
+class ManifestServer(ThreadPoolMixIn, WSGIServer):
+    '''HTTP server running a WSGI application with a pool of threads'''
+
+    allow_reuse_address = True
+    # clients booting together connect at once
+    request_queue_size = 1024
+
+    def server_close(self):
+        '''Stops the pool of threads and closes the server'''
+        self.stop_pool()
+        WSGIServer.server_close(self)
+
+
+class ManifestRequestHandler(WSGIRequestHandler):
+    '''Logs requests with the logging module, rather than to stderr'''
+
+    def log_message(self, format, *args):
+        logging.info("%s %s", self.address_string(), format % args)
+
+
+def make_server(address, port, application, threads=DEFAULT_THREADS):
+    '''Returns a ManifestServer serving application on address and port'''
+    server = ManifestServer((address, port), ManifestRequestHandler)
+    server.pool_size = threads
+    server.set_app(application)
+    return server
+
+
+def main(args=None):
+    '''Serves ManifestApplication until interrupted'''
+    gettext.install("solaris_install_aiwebserver", "/usr/share/locale")
+    usage = _("%prog -p <port> [-a <address>] [-t <threads>]")
+    parser = OptionParser(usage=usage)
+    parser.add_option("-p", "--port", dest="port", type="int",
+                      help=_("port to serve AI clients on"))
+    parser.add_option("-a", "--address", dest="address", default="",
+                      help=_("address to serve AI clients on"))
+    parser.add_option("-t", "--threads", dest="threads", type="int",
+                      default=DEFAULT_THREADS,
+                      help=_("number of requests to answer at once"))
+    (options, args) = parser.parse_args(args)
+    if options.port is None:
+        parser.error(_("a port must be specified"))
+    if options.threads < 1:
+        parser.error(_("at least one thread is needed"))
+
+    application = ManifestApplication()
+    application.log_level.install(logging.getLogger())
+    server = make_server(options.address, options.port, application,
+                         options.threads)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.get_app().lookup.clear()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
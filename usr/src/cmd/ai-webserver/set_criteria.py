@@ -177,8 +177,9 @@ def set_criteria(criteria, iname, dbn, table, append=False):
     set for the manifest, and use only the criteria specified.
     """
 
-    # Build a list of criteria nvpairs to update
+    # Build a list of criteria nvpairs to update, and their values
     nvpairs = list()
+    params = list()
 
     # we need to fill in the criteria or NULLs for each criteria the database
     # supports (so iterate over each criteria)
@@ -200,39 +201,40 @@ def set_criteria(criteria, iname, dbn, table, append=False):
                 # if the criteria we're processing is a range criteria, fill in
                 # NULL for two columns, MINcrit and MAXcrit
                 if is_range_crit:
-                    nvpairs.append("MIN" + crit + "=NULL")
-                    nvpairs.append("MAX" + crit + "=NULL")
+                    nvpairs.append("MIN" + crit + "=?")
+                    nvpairs.append("MAX" + crit + "=?")
+                    params.extend([None, None])
                 # this is a single value
                 else:
-                    nvpairs.append(crit + "=NULL")
+                    nvpairs.append(crit + "=?")
+                    params.append(None)
 
         # Else if this is a value criteria (not a range), insert the
         # value as a space-separated list of values in case a list of
         # values have been given. 
         elif not is_range_crit:
-            nvstr = crit + "='" + AIdb.sanitizeSQL(" ".join(values)) + "'"
-            nvpairs.append(nvstr)
+            nvpairs.append(crit + "=?")
+            params.append(AIdb.sanitizeSQL(" ".join(values)))
 
         # Else the values are a list this is a range criteria
         else:
             # Set the MIN column for this range criteria
-            nvpairs.append("MIN" + crit + "=" +
-                           AIdb.format_value(crit, values[0]))
+            nvpairs.append("MIN" + crit + "=?")
+            params.append(AIdb.format_param(crit, values[0]))
 
             # Set the MAX column for this range criteria
-            nvpairs.append("MAX" + crit + "=" +
-                           AIdb.format_value(crit, values[1]))
+            nvpairs.append("MAX" + crit + "=?")
+            params.append(AIdb.format_param(crit, values[1]))
 
     query = "UPDATE " + table + " SET " + ",".join(nvpairs) + \
-            " WHERE name='" + iname + "'"
-
-    # update the DB
-    query = AIdb.DBrequest(query, commit=True)
-    dbn.getQueue().put(query)
-    query.waitAns()
-    # in case there's an error call the response function (which
-    # will print the error)
-    query.getResponse()
+            " WHERE name=?"
+    params.append(iname)
+
+    # update the DB, printing any error
+    try:
+        AIdb.execute(dbn.getQueue(), query, params, commit=True).result()
+    except AIdb.DBError as err:
+        print >> sys.stderr, err
 
 
 def do_set_criteria(cmd_options=None):
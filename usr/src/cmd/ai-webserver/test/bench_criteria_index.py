@@ -0,0 +1,119 @@
+#!/usr/bin/python2.6
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+'''Micro-benchmark of matching clients to manifests and profiles, with and
+without a criteria_index.CriteriaIndex.
+
+Creates an AI database of random manifests and profiles, with the criteria
+used by test_criteria_index, and then finds the manifest and profiles of
+random clients using:
+
+    query       - findManifest() and findProfiles() building an SQL query,
+                  which calls is_in_list() and match_hostname() per row.
+
+    indexed     - the same, given a CriteriaIndex of each table, loaded once.
+
+Run directly, not as part of the test suite:
+
+    python bench_criteria_index.py [manifests] [profiles] [clients]
+'''
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlite3 import dbapi2 as sqlite3
+
+import osol_install.auto_install.AI_database as AIdb
+import osol_install.auto_install.criteria_index as criteria_index
+
+from test_criteria_index import MANIFESTS_SCHEMA, PROFILES_SCHEMA, \
+    random_client, random_criteria_values
+
+
+def create_database(path, manifest_count, profile_count, rand):
+    '''Create an AI database of random manifests and profiles'''
+    db = sqlite3.connect(path)
+    db.execute(MANIFESTS_SCHEMA)
+    db.execute(PROFILES_SCHEMA)
+    for number in range(manifest_count):
+        db.execute("INSERT INTO manifests VALUES('manifest%d', 0, %s)" %
+                   (number, ", ".join(random_criteria_values(rand))))
+    for number in range(profile_count):
+        db.execute("INSERT INTO profiles VALUES('profile%d', "
+                   "'/tmp/profile%d', %s)" %
+                   (number, number, ", ".join(random_criteria_values(rand))))
+    db.commit()
+    db.close()
+
+
+def match(clients, aidb, manifests=None, profiles=None):
+    '''Find the manifest and profiles of each client'''
+    return [(AIdb.findManifest(client, aidb, index=manifests),
+             sorted(row['name'] for row in
+                    AIdb.findProfiles(client, aidb, index=profiles)))
+            for client in clients]
+
+
+def run(manifest_count=10000, profile_count=1000, client_count=200):
+    '''Time matching clients, with and without the indexes'''
+    rand = random.Random(14)
+    dbfile = tempfile.NamedTemporaryFile(dir="/tmp", delete=False)
+    dbfile.close()
+    try:
+        create_database(dbfile.name, manifest_count, profile_count, rand)
+        clients = [random_client(rand) for number in range(client_count)]
+        aidb = AIdb.DB(dbfile.name)
+
+        print "%d manifests, %d profiles, %d clients" % \
+            (manifest_count, profile_count, client_count)
+
+        start = time.time()
+        manifests = criteria_index.CriteriaIndex.load(aidb.getQueue(),
+                                                      AIdb.MANIFESTS_TABLE)
+        profiles = criteria_index.CriteriaIndex.load(aidb.getQueue(),
+                                                     AIdb.PROFILES_TABLE)
+        print "%-8s %12.4f" % ("load(s)", time.time() - start)
+
+        start = time.time()
+        queried = match(clients, aidb)
+        query = time.time() - start
+        start = time.time()
+        indexed = match(clients, aidb, manifests, profiles)
+        index = time.time() - start
+        # Check both find the same manifests and profiles.
+        assert queried == indexed
+
+        print "%-8s %12s %12s %8s" % \
+            ("test", "query(s)", "indexed(s)", "speedup")
+        print "%-8s %12.4f %12.4f %7.1fx" % ("match", query, index,
+                                             query / index)
+        aidb.close()
+    finally:
+        os.remove(dbfile.name)
+
+
+if __name__ == '__main__':
+    run(*[int(arg) for arg in sys.argv[1:4]])
@@ -72,21 +72,19 @@ class MockQuery(object):
     '''Class for mock query '''
     def __init__(self):
         self.query = None
+        self.params = None
 
     # Disable "method could be a function" errors as inappropriate here.
     # Disable unused-args message here as this is a dummy function.
     # pylint: disable-msg=W0613, R0201
-    def __call__(self, query, commit=False):
+    def __call__(self, query, commit=False, params=()):
         self.query = query
+        self.params = tuple(params)
         return self
 
-    def waitAns(self):
-        '''Dummy waitAns method'''
-        return
-
-    def getResponse(self):
-        '''Dummy getResponse method'''
-        return
+    def result(self):
+        '''Dummy result method'''
+        return list()
 
 
 class MockGetCriteria(object):
@@ -144,8 +142,9 @@ class getSpecificCriteria(unittest.TestCase):
         queue = self.files.database.getQueue()
         AIdb.getSpecificCriteria(queue, criteria, excludeManifests=["suexml"])
         expect_query = "SELECT arch FROM manifests WHERE arch IS NOT NULL " + \
-                       "AND name IS NOT 'suexml'"
+                       "AND name IS NOT ?"
         self.assertEquals(expect_query, self.mockquery.query)
+        self.assertEquals(("suexml",), self.mockquery.params)
 
     def test_MINipv4(self):
         '''Verify single MIN query string '''
@@ -512,6 +511,174 @@ class findManifest(unittest.TestCase):
         self.assertEquals(manifest, None)
 
 
+class DBrequests(unittest.TestCase):
+    '''Tests for parameterized and batched DBrequests'''
+
+    def setUp(self):
+        '''unit test set up'''
+        dbname = tempfile.NamedTemporaryFile(dir="/tmp", delete=False)
+        self.dbname = dbname.name
+        dbname.close()
+        db = sqlite3.connect(self.dbname, isolation_level=None)
+        db.execute("CREATE TABLE manifests(name TEXT, instance INTEGER, "
+                   "MINmac INTEGER, MAXmac INTEGER)")
+        db.close()
+        self.aidb = AIdb.DB(self.dbname, commit=True)
+
+    def tearDown(self):
+        '''unit test tear down'''
+        self.aidb.close()
+        os.remove(self.dbname)
+
+    def names(self):
+        '''Return the name and instance of each manifest'''
+        return [tuple(row) for row in self.aidb.execute(
+            "SELECT name, instance FROM manifests ORDER BY name, "
+            "instance").result()]
+
+    def test_params(self):
+        '''Verify parameters are bound rather than parsed as SQL'''
+        name = "a'); DROP TABLE manifests; --"
+        self.aidb.execute("INSERT INTO manifests VALUES(?, ?, ?, ?)",
+                          (name, 0, AIdb.format_param("mac", "aabbccddeeff"),
+                           AIdb.format_param("mac", "unbounded")),
+                          commit=True).result()
+        self.assertEquals(self.names(), [(name, 0)])
+        self.assertEquals(AIdb.numInstances(name, self.aidb.getQueue()), 1)
+        rsp = self.aidb.execute("SELECT HEX(MINmac), MAXmac FROM "
+                                "manifests").result()
+        self.assertEquals(tuple(rsp[0]), ("AABBCCDDEEFF", None))
+
+    def test_result_error(self):
+        '''Verify result() raises DBError for a failed request'''
+        request = self.aidb.execute("SELECT * FROM no_such_table")
+        self.assertRaises(AIdb.DBError, request.result)
+
+    def test_helper_error(self):
+        '''Verify the query helpers raise DBError rather than hiding it'''
+        self.assertRaises(AIdb.DBError, AIdb.getSpecificCriteria,
+                          self.aidb.getQueue(), "no_such_column")
+        self.assertEquals(AIdb.numNames(self.aidb.getQueue(),
+                                        AIdb.PROFILES_TABLE), 0)
+
+    def test_batch(self):
+        '''Verify a batch is committed together, with each response'''
+        batch = AIdb.DBbatch(["INSERT INTO manifests(name, instance) "
+                              "VALUES('a', 0)"], commit=True)
+        batch.add("INSERT INTO manifests(name, instance) VALUES(?, ?)",
+                  ("a", 1))
+        batch.add("SELECT COUNT(*) FROM manifests")
+        self.aidb.getQueue().put(batch)
+        responses = batch.result()
+        self.assertEquals(len(responses), 3)
+        self.assertEquals(responses[2][0][0], 2)
+        self.assertEquals(self.names(), [("a", 0), ("a", 1)])
+
+    def test_batch_rollback(self):
+        '''Verify a failed batch changes nothing'''
+        batch = AIdb.DBbatch([("INSERT INTO manifests(name, instance) "
+                               "VALUES(?, ?)", ("a", 0)),
+                              "INSERT INTO no_such_table VALUES(1)"],
+                             commit=True)
+        self.aidb.getQueue().put(batch)
+        self.assertRaises(AIdb.DBError, batch.result)
+        self.assertEquals(self.names(), [])
+
+    def test_threads(self):
+        '''Verify a DB with several connections answers every request'''
+        self.aidb.execute("INSERT INTO manifests(name, instance) "
+                          "VALUES('a', 0)", commit=True).result()
+        aidb = AIdb.DB(self.dbname, threads=4)
+        try:
+            requests = [aidb.execute("SELECT name FROM manifests WHERE "
+                                     "instance = ?", (0,))
+                        for number in range(50)]
+            for request in requests:
+                self.assertEquals(request.result()[0][0], "a")
+        finally:
+            aidb.close()
+
+
+class CriteriaCache(unittest.TestCase):
+    '''Tests for the criteria cached by a DB'''
+
+    def setUp(self):
+        '''unit test set up'''
+        dbname = tempfile.NamedTemporaryFile(dir="/tmp", delete=False)
+        self.dbname = dbname.name
+        dbname.close()
+        self.db = sqlite3.connect(self.dbname, isolation_level=None)
+        self.db.execute("CREATE TABLE manifests(name TEXT, instance INTEGER, "
+                        "arch TEXT, MINmem INTEGER, MAXmem INTEGER)")
+        self.db.execute("INSERT INTO manifests VALUES('a', 0, 'i86pc', NULL, "
+                        "NULL)")
+        self.aidb = AIdb.DB(self.dbname)
+        self.cache = self.aidb.getCriteriaCache()
+
+    def tearDown(self):
+        '''unit test tear down'''
+        self.aidb.close()
+        self.db.close()
+        os.remove(self.dbname)
+
+    def test_hits(self):
+        '''Verify criteria are only queried once while the DB is unchanged'''
+        queue = self.aidb.getQueue()
+        self.assertEquals(AIdb.getCriteria(queue), ["arch"])
+        self.assertEquals(self.cache.misses, 2)
+        self.assertEquals(AIdb.getCriteria(queue), ["arch"])
+        self.assertTrue(AIdb.isRangeCriteria(queue, "mem"))
+        self.assertFalse(AIdb.isRangeCriteria(queue, "arch"))
+        self.assertEquals(self.cache.misses, 2)
+        self.assertEquals(self.cache.hits, 4)
+
+    def test_changed(self):
+        '''Verify criteria are queried again once the DB changes'''
+        queue = self.aidb.getQueue()
+        self.assertEquals(AIdb.getCriteria(queue), ["arch"])
+        self.db.execute("INSERT INTO manifests VALUES('b', 0, NULL, 1024, "
+                        "NULL)")
+        self.cache.validate()
+        self.assertEquals(AIdb.getCriteria(queue), ["arch", "mem"])
+        self.assertEquals(self.cache.misses, 4)
+        self.db.execute("ALTER TABLE manifests ADD COLUMN zonename TEXT")
+        self.cache.validate()
+        self.assertEquals(AIdb.getCriteria(queue, onlyUsed=False),
+                          ["arch", "mem", "zonename"])
+
+    def test_commit(self):
+        '''Verify criteria are queried again once the DB commits a change'''
+        aidb = AIdb.DB(self.dbname, commit=True)
+        try:
+            queue = aidb.getQueue()
+            self.assertEquals(AIdb.getCriteria(queue), ["arch"])
+            AIdb.execute(queue, "INSERT INTO manifests VALUES('b', 0, NULL, "
+                         "1024, NULL)", commit=True).result()
+            self.assertEquals(AIdb.getCriteria(queue), ["arch", "mem"])
+        finally:
+            aidb.close()
+
+    def test_signature_read_once(self):
+        '''Verify the DB's signature isn't read for each lookup'''
+        queue = self.aidb.getQueue()
+        reads = list()
+        get_database_signature = AIdb.get_database_signature
+
+        def counted(path):
+            '''get_database_signature, counting its calls'''
+            reads.append(path)
+            return get_database_signature(path)
+
+        AIdb.get_database_signature = counted
+        try:
+            self.cache.validate()
+            for name in ("mem", "arch", "mem", "arch"):
+                AIdb.isRangeCriteria(queue, name)
+        finally:
+            AIdb.get_database_signature = get_database_signature
+        self.assertEquals(len(reads), 1)
+
+
 class is_in_list(unittest.TestCase):
     '''Tests for is_in_list'''
 
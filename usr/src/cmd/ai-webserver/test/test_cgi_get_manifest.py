@@ -107,15 +107,12 @@ class MockQuery(object):
     def __init__(self):
         self.query = None
 
-    def __call__(self, query, commit=False):
+    def __call__(self, query, commit=False, params=()):
         self.query = query
         return self
 
-    def waitAns(self):
-        return
-
-    def getResponse(self):
-        return
+    def result(self):
+        return list()
 
 
 class MockGetCriteria(object):
@@ -0,0 +1,356 @@
+#!/usr/bin/python2.6
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+
+'''
+To run these tests, see the instructions in usr/src/tools/tests/README.
+Remember that since the proto area is used for the PYTHONPATH, the gate
+must be rebuilt for these tests to pick up any changes in the tested code.
+
+'''
+
+import gettext
+import os
+import random
+import tempfile
+import unittest
+
+from sqlite3 import dbapi2 as sqlite3
+
+import osol_install.auto_install.AI_database as AIdb
+import osol_install.auto_install.criteria_index as criteria_index
+
+
+gettext.install("ai-test")
+
+# The tables as the Makefile creates them
+MANIFESTS_SCHEMA = ("CREATE TABLE manifests (name TEXT, instance INTEGER, "
+    "arch TEXT, hostname TEXT, MINmac INTEGER, MAXmac INTEGER, "
+    "MINipv4 INTEGER, MAXipv4 INTEGER, cpu TEXT, platform TEXT, "
+    "MINnetwork INTEGER, MAXnetwork INTEGER, MINmem INTEGER, "
+    "MAXmem INTEGER, zonename TEXT)")
+PROFILES_SCHEMA = ("CREATE TABLE profiles (name TEXT, file TEXT, arch TEXT, "
+    "hostname TEXT, MINmac INTEGER, MAXmac INTEGER, MINipv4 INTEGER, "
+    "MAXipv4 INTEGER, cpu TEXT, platform TEXT, MINnetwork INTEGER, "
+    "MAXnetwork INTEGER, MINmem INTEGER, MAXmem INTEGER, zonename TEXT)")
+
+ARCHES = ["i86pc", "sun4v", "sun4u"]
+CPUS = ["i386", "sparc"]
+PLATFORMS = ["i86pc", "SUNW,Sun-Fire-T200", "SUNW,SPARC-Enterprise"]
+ZONENAMES = ["zone1", "Zone1", "zone2"]
+HOSTNAMES = ["host1", "host1.example", "host1.example.com", "host2",
+             "host2.example.com", "HOST3"]
+
+
+def random_list(rand, values):
+    '''Returns NULL, or a whitespace separated list of some of values'''
+    if rand.random() < 0.5:
+        return None
+    return " ".join(rand.sample(values, rand.randint(1, 2)))
+
+
+def random_range(rand, low, high, mac=False):
+    '''Returns a MIN and MAX for a range criterion, either of which may be
+    NULL (unbounded), formatted for an INSERT as publish_manifest does.
+    '''
+    if rand.random() < 0.5:
+        return ("NULL", "NULL")
+    bounds = sorted([rand.randint(low, high), rand.randint(low, high)])
+    if mac:
+        bounds = ["x'%012X'" % bound for bound in bounds]
+    else:
+        bounds = ["%d" % bound for bound in bounds]
+    if rand.random() < 0.2:
+        bounds[0] = "NULL"
+    elif rand.random() < 0.2:
+        bounds[1] = "NULL"
+    return tuple(bounds)
+
+
+def quote(value):
+    '''Returns value as an SQL literal'''
+    if value is None:
+        return "NULL"
+    return "'" + value + "'"
+
+
+def random_criteria_values(rand):
+    '''Returns the values of the criteria columns of a row, in the order of
+    the tables' columns, as SQL literals.
+    '''
+    values = [quote(random_list(rand, ARCHES)),
+              quote(random_list(rand, HOSTNAMES))]
+    values.extend(random_range(rand, 0xAABBCCDD0000, 0xAABBCCDD00FF,
+                               mac=True))
+    values.extend(random_range(rand, 192168001000, 192168001255))
+    values.extend([quote(random_list(rand, CPUS)),
+                   quote(random_list(rand, PLATFORMS))])
+    values.extend(random_range(rand, 10000000000, 10000000004))
+    values.extend(random_range(rand, 512, 8192))
+    values.append(quote(random_list(rand, ZONENAMES)))
+    return values
+
+
+def random_client(rand):
+    '''Returns the criteria of a client, some of which may be missing'''
+    client = {
+        'arch': rand.choice(ARCHES + ["I86PC"]),
+        'hostname': rand.choice(HOSTNAMES + ["host1.example.com.",
+                                             "host3.example.com"]),
+        'mac': "%012x" % rand.randint(0xAABBCCDD0000, 0xAABBCCDD0100),
+        'ipv4': "%d" % rand.randint(192168001000, 192168001260),
+        'cpu': rand.choice(CPUS),
+        'platform': rand.choice(PLATFORMS),
+        'network': "%d" % rand.randint(10000000000, 10000000004),
+        'mem': "%d" % rand.randint(256, 9000),
+        'zonename': rand.choice(ZONENAMES),
+    }
+    for crit in list(client):
+        if rand.random() < 0.15:
+            del client[crit]
+    return client
+
+
+class CriteriaIndexTestCase(unittest.TestCase):
+    '''Base class for tests with an AI database'''
+
+    def setUp(self):
+        '''Creates an empty AI database'''
+        dbname = tempfile.NamedTemporaryFile(dir="/tmp", delete=False)
+        self.dbname = dbname.name
+        dbname.close()
+        self.db = sqlite3.connect(self.dbname, isolation_level=None)
+        self.db.execute(MANIFESTS_SCHEMA)
+        self.db.execute(PROFILES_SCHEMA)
+        self.aidb = None
+
+    def tearDown(self):
+        '''Removes the AI database'''
+        if self.aidb is not None:
+            self.aidb.close()
+        self.db.close()
+        os.remove(self.dbname)
+
+    def open(self):
+        '''Returns an AIdb.DB of the database'''
+        self.aidb = AIdb.DB(self.dbname)
+        return self.aidb
+
+    def index(self, table):
+        '''Returns a CriteriaIndex of a table'''
+        return criteria_index.CriteriaIndex.load(self.aidb.getQueue(), table)
+
+    def add_manifest(self, name, values):
+        '''Adds a manifest with the criteria values given as SQL literals'''
+        self.db.execute("INSERT INTO manifests VALUES('%s', 0, %s)" %
+                        (name, ", ".join(values)))
+
+    def add_profile(self, name, values):
+        '''Adds a profile with the criteria values given as SQL literals'''
+        self.db.execute("INSERT INTO profiles VALUES('%s', '/tmp/%s', %s)" %
+                        (name, name, ", ".join(values)))
+
+
+class IntervalTree(unittest.TestCase):
+    '''Tests for criteria_index.IntervalTree'''
+
+    def test_find(self):
+        '''validate the intervals containing a point are found'''
+        intervals = [(low, low + length, (low, length))
+                     for low in range(0, 50, 3) for length in (0, 1, 7)]
+        tree = criteria_index.IntervalTree(intervals)
+        for point in range(-2, 60):
+            expected = sorted([item for (low, high, item) in intervals
+                               if low <= point <= high])
+            self.assertEqual(sorted(tree.find(point)), expected)
+
+    def test_empty(self):
+        '''validate an empty tree finds nothing'''
+        self.assertEqual(criteria_index.IntervalTree([]).find(1), [])
+
+    def test_inverted(self):
+        '''validate an interval whose low is above its high is ignored'''
+        tree = criteria_index.IntervalTree([(5, 1, 'a'), (1, 5, 'b')])
+        self.assertEqual(tree.find(3), ['b'])
+
+
+class ListCriterion(unittest.TestCase):
+    '''Tests for criteria_index.ListCriterion'''
+
+    def test_case_insensitive(self):
+        '''validate lists are matched as is_in_list matches them'''
+        index = criteria_index.ListCriterion("arch", ["i86pc sun4v", None,
+                                                      "SUN4U"])
+        self.assertEqual(index.match("SUN4V"), set([0]))
+        self.assertEqual(index.match("sun4u"), set([2]))
+        self.assertEqual(index.nulls, set([1]))
+
+    def test_case_sensitive(self):
+        '''validate zonename is matched case sensitively'''
+        index = criteria_index.ListCriterion("zonename", ["zone1", "Zone1"])
+        self.assertEqual(index.match("Zone1"), set([1]))
+
+    def test_hostname(self):
+        '''validate hostname matches any leading part of the client's'''
+        index = criteria_index.ListCriterion("hostname", ["x", "x.y",
+                                                          "x.y.com", "y"])
+        self.assertEqual(index.match("x.y.com"), set([0, 1, 2]))
+        self.assertEqual(index.matched_hostname(1, index.client_values(
+            "x.y.com")), "x.y")
+
+
+class findManifest(CriteriaIndexTestCase):
+    '''Tests that findManifest finds the same manifest with an index'''
+
+    def assertSameManifest(self, criteria, index):
+        '''Asserts the index finds the manifest the query does'''
+        self.assertEqual(AIdb.findManifest(criteria, self.aidb, index=index),
+                         AIdb.findManifest(criteria, self.aidb),
+                         "different manifests for %s" % criteria)
+
+    def test_precedence(self):
+        '''validate the most specific manifest is chosen'''
+        nulls = ["NULL"] * 13
+        mac = list(nulls)
+        mac[2:4] = ["x'AABBCCDDEEFF'", "x'AABBCCDDEEFF'"]
+        self.add_manifest("mac", mac)
+        ipv4 = list(nulls)
+        ipv4[4] = "192168001010"
+        self.add_manifest("ipv4", ipv4)
+        hostname = list(nulls)
+        hostname[1] = "'host1 host1.example'"
+        self.add_manifest("hostname", hostname)
+        arch = list(nulls)
+        arch[0] = "'i86pc'"
+        self.add_manifest("arch", arch)
+        self.add_manifest("default", nulls)
+        self.open()
+        index = self.index(AIdb.MANIFESTS_TABLE)
+
+        client = {'mac': 'aabbccddeeff', 'ipv4': '192168001020',
+                  'hostname': 'host1.example.com', 'arch': 'i86pc'}
+        self.assertEqual(AIdb.findManifest(client, self.aidb, index=index),
+                         "mac")
+        del client['mac']
+        self.assertEqual(AIdb.findManifest(client, self.aidb, index=index),
+                         "ipv4")
+        del client['ipv4']
+        self.assertEqual(AIdb.findManifest(client, self.aidb, index=index),
+                         "hostname")
+        del client['hostname']
+        self.assertEqual(AIdb.findManifest(client, self.aidb, index=index),
+                         "arch")
+        client['arch'] = 'sun4v'
+        self.assertEqual(AIdb.findManifest(client, self.aidb, index=index),
+                         None)
+        self.assertEqual(AIdb.findManifest({}, self.aidb, index=index), None)
+
+    def test_invalid_value(self):
+        '''validate a value the query can't use matches nothing'''
+        nulls = ["NULL"] * 13
+        mem = list(nulls)
+        mem[11] = "2048"
+        self.add_manifest("mem", mem)
+        self.open()
+        index = self.index(AIdb.MANIFESTS_TABLE)
+        for value in ("lots", "1'; DROP TABLE manifests"):
+            self.assertSameManifest({'mem': value}, index)
+        self.assertSameManifest({'mac': 'not hex'}, index)
+
+    def test_empty_table(self):
+        '''validate no manifest is found in an empty table'''
+        self.open()
+        index = self.index(AIdb.MANIFESTS_TABLE)
+        self.assertSameManifest({'arch': 'i86pc'}, index)
+
+    def test_parity(self):
+        '''validate the index finds the same manifests as the query'''
+        rand = random.Random(14)
+        for number in range(300):
+            self.add_manifest("manifest%d" % number,
+                              random_criteria_values(rand))
+        self.open()
+        index = self.index(AIdb.MANIFESTS_TABLE)
+        found = 0
+        for number in range(200):
+            client = random_client(rand)
+            self.assertSameManifest(client, index)
+            if AIdb.findManifest(client, self.aidb, index=index):
+                found += 1
+        # the clients should have exercised matching, not only misses
+        self.assertTrue(found > 40)
+
+
+class findProfiles(CriteriaIndexTestCase):
+    '''Tests that findProfiles finds the same profiles with an index'''
+
+    def profiles(self, criteria, no_default, index=None):
+        '''Returns the sorted name and file of each profile found'''
+        profiles = AIdb.findProfiles(criteria, self.aidb,
+                                     no_default=no_default, index=index)
+        if profiles is None:
+            return None
+        return sorted((row['name'], row['file']) for row in profiles)
+
+    def assertSameProfiles(self, criteria, index):
+        '''Asserts the index finds the profiles the query does'''
+        for no_default in (False, True):
+            self.assertEqual(self.profiles(criteria, no_default, index),
+                             self.profiles(criteria, no_default),
+                             "different profiles for %s" % criteria)
+
+    def test_no_default(self):
+        '''validate no_default excludes profiles not setting criteria'''
+        nulls = ["NULL"] * 13
+        self.add_profile("global", nulls)
+        arch = list(nulls)
+        arch[0] = "'i86pc sun4v'"
+        self.add_profile("arch", arch)
+        self.open()
+        index = self.index(AIdb.PROFILES_TABLE)
+        client = {'arch': 'SUN4V'}
+        self.assertEqual(self.profiles(client, False, index),
+                         [("arch", "/tmp/arch"), ("global", "/tmp/global")])
+        self.assertEqual(self.profiles(client, True, index),
+                         [("arch", "/tmp/arch")])
+        client = {'arch': 'sun4u'}
+        self.assertEqual(self.profiles(client, False, index),
+                         [("global", "/tmp/global")])
+        self.assertEqual(self.profiles(client, True, index), [])
+        self.assertSameProfiles(client, index)
+
+    def test_parity(self):
+        '''validate the index finds the same profiles as the query'''
+        rand = random.Random(15)
+        for number in range(300):
+            # some profiles share a name and file
+            self.add_profile("profile%d" % (number % 250),
+                             random_criteria_values(rand))
+        self.open()
+        index = self.index(AIdb.PROFILES_TABLE)
+        for number in range(200):
+            self.assertSameProfiles(random_client(rand), index)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -31,8 +31,11 @@ must be rebuilt for these tests to pick up any changes in the tested code.
 
 import gettext
 import os
+import shutil
+import sqlite3
 import tempfile
 import unittest
+import osol_install.auto_install.AI_database as AIdb
 import osol_install.auto_install.delete_manifest as delete_manifest
 
 from nose.plugins.skip import SkipTest
@@ -91,5 +94,58 @@ class DoDeleteManifest(unittest.TestCase):
             raise SkipTest("Not root")
 
 
+class MockAIService(object):
+    '''Class for mock AIService'''
+    manifest_dir = None
+
+    def __init__(self, name):
+        self.name = name
+
+    def get_default_manifest(self):
+        '''Returns the name of the default manifest'''
+        return "default.xml"
+
+
+class DeleteManifestFromDB(unittest.TestCase):
+    '''Tests for delete_manifest_from_db'''
+
+    def setUp(self):
+        '''unit test set up'''
+        self.tmp_dir = tempfile.mkdtemp(dir="/tmp")
+        self.dbname = os.path.join(self.tmp_dir, "AI.db")
+        db = sqlite3.connect(self.dbname, isolation_level=None)
+        db.execute("CREATE TABLE manifests(name TEXT, instance INTEGER, "
+                   "arch TEXT)")
+        for name in ("default.xml", "o'brien.xml"):
+            for instance in range(3):
+                db.execute("INSERT INTO manifests VALUES(?, ?, ?)",
+                           (name, instance, "i86pc"))
+        db.close()
+        self.aidb = AIdb.DB(self.dbname, commit=True)
+        self.AIService = delete_manifest.AIService
+        delete_manifest.AIService = MockAIService
+        MockAIService.manifest_dir = self.tmp_dir
+
+    def tearDown(self):
+        '''unit test tear down'''
+        delete_manifest.AIService = self.AIService
+        self.aidb.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def instances(self, name):
+        '''Return the instances of a manifest'''
+        return [row[0] for row in self.aidb.execute(
+            "SELECT instance FROM manifests WHERE name = ? ORDER BY "
+            "instance", (name,)).result()]
+
+    def test_delete_instance_quoted_name(self):
+        '''instances above one deleted are renumbered, for a quoted name'''
+        delete_manifest.delete_manifest_from_db(self.aidb,
+                                                ("o'brien.xml", 1),
+                                                "aservice", None)
+        self.assertEqual(self.instances("o'brien.xml"), [0, 1])
+        self.assertEqual(self.instances("default.xml"), [0, 1, 2])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -73,14 +73,11 @@ class MockQuery(object):
         self.name = name
         self.file = file
 
-    def __call__(self, query, commit=False):
+    def __call__(self, query, commit=False, params=()):
         self.query = query
         return self
 
-    def waitAns(self):
-        return
-
-    def getResponse(self):
+    def result(self):
         return [(12, self.file)]
 
 class MockDataFiles(object):
@@ -0,0 +1,314 @@
+#!/usr/bin/python2.6
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+
+'''
+To run these tests, see the instructions in usr/src/tools/tests/README.
+Remember that since the proto area is used for the PYTHONPATH, the gate
+must be rebuilt for these tests to pick up any changes in the tested code.
+
+'''
+
+import gc
+import gettext
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+import urllib2
+
+import osol_install.auto_install.AI_database as AIdb
+import osol_install.auto_install.cgi_get_manifest as cgi_get_manifest
+import osol_install.auto_install.manifest_server as manifest_server
+import osol_install.auto_install.service_config as config
+
+
+gettext.install("ai-test")
+
+
+class MockDB(object):
+    '''Class for mock AI_database.DB, counting those opened and closed'''
+    opened = 0
+    closed = 0
+    malformed = False
+
+    def __init__(self, path, commit=False, threads=1):
+        MockDB.opened += 1
+        self.criteria_cache = AIdb.CriteriaCache(path)
+
+    def getCriteriaCache(self):
+        return self.criteria_cache
+
+    def verifyDBStructure(self):
+        if MockDB.malformed:
+            raise SystemExit("Error:\tNo manifests table")
+
+    def close(self):
+        MockDB.closed += 1
+
+
+class MockGetServicePort(object):
+    '''Class for mock get_service_port, counting the calls'''
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, service):
+        self.calls += 1
+        return '46501'
+
+
+class testParseCGIOutput(unittest.TestCase):
+    '''Tests for parse_cgi_output'''
+
+    def test_headers(self):
+        '''validate headers and body are split, and the length corrected'''
+        output = 'Content-Length: 3\nContent-Type: text/xml\n\n<a/>\n'
+        (status, headers, body) = manifest_server.parse_cgi_output(output)
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers, [('Content-Type', 'text/xml'),
+                                   ('Content-Length', '5')])
+        self.assertEqual(body, '<a/>\n')
+
+    def test_mime_headers(self):
+        '''validate continued headers and Status are handled'''
+        output = ('Status: 404 Not Found\nContent-Type: multipart/mixed;\n'
+                  '\tboundary="xyz"\nMIME-Version: 1.0\n\n--xyz\n\nbody\n')
+        (status, headers, body) = manifest_server.parse_cgi_output(output)
+        self.assertEqual(status, '404 Not Found')
+        self.assertEqual(headers[0],
+                         ('Content-Type', 'multipart/mixed; boundary="xyz"'))
+        self.assertEqual(headers[1], ('MIME-Version', '1.0'))
+        self.assertEqual(body, '--xyz\n\nbody\n')
+
+
+class testCachedServiceLookup(unittest.TestCase):
+    '''Tests for CachedServiceLookup'''
+
+    def setUp(self):
+        '''unit test set up'''
+        self.tmp_dir = tempfile.mkdtemp(prefix="manifest_server_test")
+        self.aidb_DB = AIdb.DB
+        AIdb.DB = MockDB
+        MockDB.opened = 0
+        MockDB.closed = 0
+        MockDB.malformed = False
+        self.config_get_service_port = config.get_service_port
+        self.get_service_port = MockGetServicePort()
+        config.get_service_port = self.get_service_port
+        self.ai_service_dir_path = config.AI_SERVICE_DIR_PATH
+        config.AI_SERVICE_DIR_PATH = self.tmp_dir
+        self.lookup = manifest_server.CachedServiceLookup()
+
+    def tearDown(self):
+        '''unit test tear down
+        Functions originally saved in setUp are restored to their
+        original values.
+        '''
+        AIdb.DB = self.aidb_DB
+        config.get_service_port = self.config_get_service_port
+        config.AI_SERVICE_DIR_PATH = self.ai_service_dir_path
+        shutil.rmtree(self.tmp_dir)
+
+    def test_database_kept(self):
+        '''validate a database is opened once while unchanged'''
+        path = os.path.join(self.tmp_dir, "AI.db")
+        with open(path, "w") as db_file:
+            db_file.write("database")
+
+        aisql = self.lookup.get_database(path)
+        self.assertTrue(self.lookup.get_database(path) is aisql)
+        self.assertEqual(MockDB.opened, 1)
+        # the signature read for the request validates the criteria cache
+        self.assertTrue(aisql.getCriteriaCache()._validated)
+
+    def test_database_malformed(self):
+        '''validate a malformed database is closed, and not opened again
+        until it changes
+        '''
+        path = os.path.join(self.tmp_dir, "AI.db")
+        with open(path, "w") as db_file:
+            db_file.write("database")
+        MockDB.malformed = True
+
+        for attempt in range(3):
+            self.assertRaises(SystemExit, self.lookup.get_database, path)
+        self.assertEqual(MockDB.opened, 1)
+        self.assertEqual(MockDB.closed, 1)
+
+        MockDB.malformed = False
+        with open(path, "a") as db_file:
+            db_file.write(" fixed")
+        self.lookup.get_database(path)
+        self.assertEqual(MockDB.opened, 2)
+
+    def test_database_changed(self):
+        '''validate a changed database is opened again, and the old closed'''
+        path = os.path.join(self.tmp_dir, "AI.db")
+        with open(path, "w") as db_file:
+            db_file.write("database")
+        aisql = self.lookup.get_database(path)
+
+        with open(path, "a") as db_file:
+            db_file.write(" changed")
+        self.assertFalse(self.lookup.get_database(path) is aisql)
+        self.assertEqual(MockDB.opened, 2)
+
+        # the old database is only closed once no longer used
+        self.assertEqual(MockDB.closed, 0)
+        del aisql
+        gc.collect()
+        self.assertEqual(MockDB.closed, 1)
+
+        self.lookup.clear()
+        gc.collect()
+        self.assertEqual(MockDB.closed, 2)
+
+    def test_database_signature(self):
+        '''validate the signature of a database changes on commit'''
+        path = os.path.join(self.tmp_dir, "AI.db")
+        con = sqlite3.connect(path)
+        try:
+            con.execute("CREATE TABLE manifests (name TEXT)")
+            con.commit()
+            signature = manifest_server.get_database_signature(path)
+            con.execute("INSERT INTO manifests VALUES ('a')")
+            con.commit()
+            changed = manifest_server.get_database_signature(path)
+        finally:
+            con.close()
+        self.assertNotEqual(changed[3], signature[3])
+        self.assertEqual(manifest_server.get_database_signature(
+            os.path.join(self.tmp_dir, "none")), None)
+
+    def test_service_config_changed(self):
+        '''validate service configuration is read again once changed'''
+        os.mkdir(os.path.join(self.tmp_dir, "aservice"))
+        cfg_path = os.path.join(self.tmp_dir, "aservice", config.CFGFILE)
+        with open(cfg_path, "w") as cfg_file:
+            cfg_file.write("config")
+
+        self.assertEqual(self.lookup.get_service_port("aservice"), '46501')
+        self.assertEqual(self.lookup.get_service_port("aservice"), '46501')
+        self.assertEqual(self.get_service_port.calls, 1)
+
+        with open(cfg_path, "a") as cfg_file:
+            cfg_file.write(" changed")
+        self.assertEqual(self.lookup.get_service_port("aservice"), '46501')
+        self.assertEqual(self.get_service_port.calls, 2)
+
+
+class testManifestServer(unittest.TestCase):
+    '''Tests for ManifestApplication and ManifestServer'''
+
+    def setUp(self):
+        '''unit test set up'''
+        self.respond = cgi_get_manifest.respond
+        cgi_get_manifest.respond = self.mock_respond
+        self.threads = set()
+        self.lock = threading.Lock()
+
+        app = manifest_server.ManifestApplication(default_port=5555,
+                                                  lookup=object())
+        self.server = manifest_server.make_server("127.0.0.1", 0, app,
+                                                  threads=4)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        '''unit test tear down
+        Functions originally saved in setUp are restored to their
+        original values.
+        '''
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        cgi_get_manifest.respond = self.respond
+
+    def mock_respond(self, form, default_port, environ=None, out=None,
+                     lookup=None, set_log_level=None):
+        '''mock cgi_get_manifest.respond, replying with the service'''
+        with self.lock:
+            self.threads.add(threading.currentThread().getName())
+        out.write("Content-Type: text/plain\n\n%s %s\n" %
+                  (form['service'].value, default_port))
+
+    def get(self, service):
+        '''request a service's manifest list from the server'''
+        return urllib2.urlopen("http://127.0.0.1:%d/cgi-bin/"
+                               "cgi_get_manifest.py?version=1.0&service=%s" %
+                               (self.server.server_address[1], service))
+
+    def test_reply(self):
+        '''validate the reply is that of cgi_get_manifest'''
+        reply = self.get("aservice")
+        self.assertEqual(reply.info().gettype(), "text/plain")
+        self.assertEqual(reply.read(), "aservice 5555\n")
+
+    def test_thread_pool(self):
+        '''validate concurrent requests are answered by the pool'''
+        replies = list()
+
+        def request(number):
+            '''make a request, keeping the reply'''
+            reply = self.get("service%d" % number).read()
+            with self.lock:
+                replies.append(reply)
+
+        requests = [threading.Thread(target=request, args=(number,))
+                    for number in range(20)]
+        for thread in requests:
+            thread.start()
+        for thread in requests:
+            thread.join()
+
+        self.assertEqual(sorted(replies),
+                         sorted(["service%d 5555\n" % number
+                                 for number in range(20)]))
+        self.assertTrue(self.threads.issubset(
+            set(["request-%d" % number for number in range(4)])))
+
+    def test_request_log_level(self):
+        '''validate a request's logging level applies to its thread only'''
+        log_level = manifest_server.RequestLogLevel(logging.WARNING)
+        debug = logging.makeLogRecord({"levelno": logging.DEBUG})
+        filtered = list()
+
+        def request():
+            '''log at the debug level a request asked for'''
+            log_level.set_level(logging.DEBUG)
+            filtered.append(log_level.filter(debug))
+            log_level.clear_level()
+            filtered.append(log_level.filter(debug))
+
+        thread = threading.Thread(target=request)
+        thread.start()
+        thread.join()
+        self.assertEqual(filtered, [True, False])
+        self.assertFalse(log_level.filter(debug))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -83,17 +83,13 @@ class MockQuery(object):
     def __init__(self):
         self.query = None
 
-    def __call__(self, query, commit=False):
+    def __call__(self, query, commit=False, params=()):
         self.query = query
         return self
 
-    def waitAns(self):
-        '''Dummy waitAns routine'''
-        return
-
-    def getResponse(self):
-        '''Dummy getResponse routine'''
-        return
+    def result(self):
+        '''Dummy result routine'''
+        return list()
 
 
 class MockQueue(object):
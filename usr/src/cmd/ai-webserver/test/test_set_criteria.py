@@ -66,16 +66,15 @@ class MockQuery(object):
     '''Class for mock query '''
     def __init__(self):
         self.query = None
+        self.params = None
 
-    def __call__(self, query, commit=False):
+    def __call__(self, query, commit=False, params=()):
         self.query = query
+        self.params = tuple(params)
         return self
 
-    def waitAns(self):
-        return
-
-    def getResponse(self):
-        return
+    def result(self):
+        return list()
 
 
 class MockGetCriteria(object):
@@ -160,10 +159,13 @@ class SetCriteria(unittest.TestCase):
         criteria.setdefault("mac")
         set_criteria.set_criteria(criteria, "myxml", self.files.database,
                                   'manifests')
-        expect_query = "UPDATE manifests SET arch='i86pc',MINmem=NULL," + \
-                       "MAXmem='4096',MINipv4=NULL,MAXipv4=NULL," +\
-                       "MINmac=NULL,MAXmac=NULL WHERE name='myxml'"
+        expect_query = "UPDATE manifests SET arch=?,MINmem=?," + \
+                       "MAXmem=?,MINipv4=?,MAXipv4=?," +\
+                       "MINmac=?,MAXmac=? WHERE name=?"
         self.assertEquals(expect_query, self.mockquery.query)
+        expect_params = ('i86pc', None, '4096', None, None, None, None,
+                         'myxml')
+        self.assertEquals(expect_params, self.mockquery.params)
 
     def test_unbounded_max(self):
         '''Ensure set_criteria max query constructed properly '''
@@ -172,10 +174,13 @@ class SetCriteria(unittest.TestCase):
         criteria.setdefault("mac")
         set_criteria.set_criteria(criteria, "myxml", self.files.database,
                                   'manifests')
-        expect_query = "UPDATE manifests SET arch='i86pc',MINmem='1024'," + \
-                       "MAXmem=NULL,MINipv4=NULL,MAXipv4=NULL,MINmac=NULL," + \
-                       "MAXmac=NULL WHERE name='myxml'"
+        expect_query = "UPDATE manifests SET arch=?,MINmem=?," + \
+                       "MAXmem=?,MINipv4=?,MAXipv4=?,MINmac=?," + \
+                       "MAXmac=? WHERE name=?"
         self.assertEquals(expect_query, self.mockquery.query)
+        expect_params = ('i86pc', '1024', None, None, None, None, None,
+                         'myxml')
+        self.assertEquals(expect_params, self.mockquery.params)
 
     def test_range(self):
         '''Ensure set_criteria max query constructed properly '''
@@ -184,11 +189,14 @@ class SetCriteria(unittest.TestCase):
         criteria.setdefault("mem")
         set_criteria.set_criteria(criteria, "myxml", self.files.database,
                                   'manifests')
-        expect_query = "UPDATE manifests SET arch='i86pc',MINmem=NULL," + \
-                       "MAXmem=NULL,MINipv4='10.0.30.100'," + \
-                       "MAXipv4='10.0.50.400',MINmac=NULL,MAXmac=NULL " + \
-                       "WHERE name='myxml'"
+        expect_query = "UPDATE manifests SET arch=?,MINmem=?," + \
+                       "MAXmem=?,MINipv4=?," + \
+                       "MAXipv4=?,MINmac=?,MAXmac=? " + \
+                       "WHERE name=?"
         self.assertEquals(expect_query, self.mockquery.query)
+        expect_params = ('i86pc', None, None, '10.0.30.100', '10.0.50.400',
+                         None, None, 'myxml')
+        self.assertEquals(expect_params, self.mockquery.params)
 
     def test_append_unbounded_min(self):
         '''Ensure set_criteria append min query constructed properly '''
@@ -197,9 +205,11 @@ class SetCriteria(unittest.TestCase):
         criteria.setdefault("mac")
         set_criteria.set_criteria(criteria, "myxml", self.files.database,
                                   AIdb.PROFILES_TABLE, append=True)
-        expect_query = "UPDATE " + AIdb.PROFILES_TABLE + " SET arch='i86pc',"\
-                "MINmem=NULL,MAXmem='4096' WHERE name='myxml'"
+        expect_query = "UPDATE " + AIdb.PROFILES_TABLE + " SET arch=?,"\
+                "MINmem=?,MAXmem=? WHERE name=?"
         self.assertEquals(expect_query, self.mockquery.query)
+        expect_params = ('i86pc', None, '4096', 'myxml')
+        self.assertEquals(expect_params, self.mockquery.params)
 
     def test_append_unbounded_max(self):
         '''Ensure set_criteria append max query constructed properly '''
@@ -208,9 +218,11 @@ class SetCriteria(unittest.TestCase):
         criteria.setdefault("mac")
         set_criteria.set_criteria(criteria, "myxml", self.files.database,
                                   'manifests', append=True)
-        expect_query = "UPDATE manifests SET arch='i86pc',MINmem='2048'," \
-                       "MAXmem=NULL WHERE name='myxml'"
+        expect_query = "UPDATE manifests SET arch=?,MINmem=?," \
+                       "MAXmem=? WHERE name=?"
         self.assertEquals(expect_query, self.mockquery.query)
+        expect_params = ('i86pc', '2048', None, 'myxml')
+        self.assertEquals(expect_params, self.mockquery.params)
 
     def test_append_range(self):
         '''Ensure set_criteria append range query constructed properly '''
@@ -219,9 +231,11 @@ class SetCriteria(unittest.TestCase):
         criteria.setdefault("mac")
         set_criteria.set_criteria(criteria, "myxml", self.files.database,
                                   'manifests', append=True)
-        expect_query = "UPDATE manifests SET arch='i86pc',MINipv4=" + \
-                       "'10.0.10.10',MAXipv4='10.0.10.300' WHERE name='myxml'"
+        expect_query = "UPDATE manifests SET arch=?,MINipv4=" + \
+                       "?,MAXipv4=? WHERE name=?"
         self.assertEquals(expect_query, self.mockquery.query)
+        expect_params = ('i86pc', '10.0.10.10', '10.0.10.300', 'myxml')
+        self.assertEquals(expect_params, self.mockquery.params)
 
 
 class CheckPublishedManifest(unittest.TestCase):
@@ -74,14 +74,11 @@ class MockQuery(object):
     def __init__(self):
         self.query = None
 
-    def __call__(self, query, commit=False):
+    def __call__(self, query, commit=False, params=()):
         self.query = query
         return self
 
-    def waitAns(self):
-        return
-
-    def getResponse(self):
+    def result(self):
         return [(1, 'myprofile', None, None,
             None, None, None, None,
             None, None, None,
@@ -113,18 +113,17 @@ def validate_internal(profile_list, database, table, image_dir):
     for profile in profile_list:
         qstr = "SELECT name, file FROM %s WHERE name = %s" % \
                 (table, AIdb.format_value('name', profile))
-        query = AIdb.DBrequest(qstr, commit=True)
-        queue.put(query)
-        query.waitAns()
-        # check response, if failure, getResponse prints error
-        if query.getResponse() is None:  # database error
+        try:
+            rsp = AIdb.execute(queue, qstr, commit=True).result()
+        except AIdb.DBError as err:  # database error
+            print >> sys.stderr, err
             return False  # give up
-        if len(query.getResponse()) == 0:
+        if len(rsp) == 0:
             print >> sys.stderr, \
                     _('No profiles in database with basename ') + profile
             isvalid = False
             continue  # to the next profile
-        for response in query.getResponse():
+        for response in rsp:
             if not df.validate_file(response[0], response[1], image_dir):
                 isvalid = False
     return isvalid
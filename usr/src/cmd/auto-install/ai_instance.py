@@ -20,7 +20,7 @@
 # CDDL HEADER END
 #
 
-# Copyright (c) 2010, 2011, Oracle and/or its affiliates. All rights reserved.
+# Copyright (c) 2010, 2012, Oracle and/or its affiliates. All rights reserved.
 
 from lxml import etree
 
@@ -31,6 +31,8 @@ class AIInstance(DataObject):
     """
     ai_instance xml tag handler class
     """
+    XML_TAGS = ("ai_instance",)
+
     def __init__(self, name):
         """
         Class constructor
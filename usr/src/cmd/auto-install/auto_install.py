@@ -101,6 +101,7 @@ class AutoInstall(object):
 
     BE_LOG_DIR = post_install_logs_path("")
     INSTALL_LOG = "install_log"
+    TIMING_REPORT = "install_timing.json"
     AI_EXIT_SUCCESS = 0
     AI_EXIT_FAILURE = 1
     AI_EXIT_AUTO_REBOOT = 64
@@ -167,6 +168,15 @@ class AutoInstall(object):
                 loglevel=logging.DEBUG, stop_on_error=True)
         self.doc = self.engine.data_object_cache
 
+        # Report the time and resources used by each checkpoint next to
+        # the install log
+        self.engine.timing_report = os.path.join(
+            os.path.dirname(self.install_log), self.TIMING_REPORT)
+
+        # Checkpoints are executed one at a time, with the engine's default
+        # max_workers, as each one uses the target or the image the ones
+        # before it set up.
+
         # Establish the logger instance for AI
         self.logger = logging.getLogger(INSTALL_LOGGER_NAME)
 
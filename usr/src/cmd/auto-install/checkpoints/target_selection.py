@@ -27,6 +27,7 @@
 ''' target_selection.py - Select Install Target(s)
 '''
 from collections import Iterable
+import bisect
 import copy
 import os
 import platform
@@ -50,7 +51,8 @@ from solaris_install.target.logical import Logical, Zpool, Vdev, BE, Zvol, \
 from solaris_install.target.physical import Disk, Iscsi, GPTPartition, \
     Partition, Slice, InsufficientSpaceError, NoPartitionSlotsFree, \
     NoGPTPartitionSlotsFree
-from solaris_install.target.shadow.physical import ShadowPhysical
+from solaris_install.target.shadow.physical import DISK_NAME_ATTRS, \
+    ShadowPhysical
 from solaris_install.target.size import Size
 
 DISK_RE = "c\d+(?:t\d+)?d\d+"
@@ -88,6 +90,89 @@ class DiskMatches(object):
         self.matches.append(match)
 
 
+class DiskIndex(object):
+    '''Indexes of the discovered disks by the names and disk properties
+       which disk specifications in the AI manifest are matched on, so each
+       specification can be matched without comparing it to every disk.
+    '''
+    PROP_ATTRS = ("dev_type", "dev_vendor", "dev_chassis")
+
+    def __init__(self, disks):
+        self.disks = list(disks)
+        self.names = dict()      # (attribute, name) to first disk position
+        self.props = dict()      # (attribute, lower-case value) to positions
+        self.sizes = list()      # sorted list of (dev_size bytes, position)
+        self.prop_disks = list()  # positions of disks with a disk_prop
+        self.boot_disk = None    # position of the first boot disk
+
+        for position, disk in enumerate(self.disks):
+            for attr in DISK_NAME_ATTRS:
+                value = getattr(disk, attr)
+                if value is not None:
+                    self.names.setdefault((attr, value), position)
+            for ctd in disk.active_ctds:
+                self.names.setdefault(("active_ctds", ctd), position)
+
+            if self.boot_disk is None and disk.is_boot_disk():
+                self.boot_disk = position
+
+            if disk.disk_prop is not None:
+                self.prop_disks.append(position)
+                for attr in DiskIndex.PROP_ATTRS:
+                    value = getattr(disk.disk_prop, attr)
+                    if value is not None:
+                        self.props.setdefault((attr, value.lower()),
+                                              set()).add(position)
+                if disk.disk_prop.dev_size is not None:
+                    self.sizes.append((disk.disk_prop.dev_size.byte_value,
+                                       position))
+        self.sizes.sort()
+
+    def name_match(self, disk):
+        '''Returns the position of the first discovered disk whose name
+           matches 'disk', as Disk.name_matches() does, or None.
+        '''
+        positions = [self.names.get((attr, getattr(disk, attr)))
+                     for attr in DISK_NAME_ATTRS
+                     if getattr(disk, attr) is not None]
+        positions.append(self.names.get(("active_ctds", disk.ctd)))
+        positions = [position for position in positions
+                     if position is not None]
+        if not positions:
+            return None
+        return min(positions)
+
+    def prop_matches(self, disk_prop, end=None):
+        '''Returns the discovered disks before position 'end' whose
+           disk_prop matches 'disk_prop', in discovered order.
+        '''
+        positions = None
+        for attr in DiskIndex.PROP_ATTRS:
+            value = getattr(disk_prop, attr)
+            if value is not None:
+                found = self.props.get((attr, value.lower()), set())
+                if positions is None:
+                    positions = set(found)
+                else:
+                    positions &= found
+        if disk_prop.dev_size is not None:
+            start = bisect.bisect_left(self.sizes,
+                                       (disk_prop.dev_size.byte_value,))
+            found = set(position for size, position in self.sizes[start:])
+            if positions is None:
+                positions = found
+            else:
+                positions &= found
+        if positions is None:
+            positions = self.prop_disks
+
+        # The indexes only narrow down the candidates, prop_matches() has
+        # the final say.
+        return [self.disks[position] for position in sorted(positions)
+                if (end is None or position < end) and
+                self.disks[position].disk_prop.prop_matches(disk_prop)]
+
+
 class TargetSelection(Checkpoint):
     '''TargetSelection - Checkpoint to select install target.
 
@@ -119,6 +204,7 @@ class TargetSelection(Checkpoint):
         self._discovered = None
         self._wipe_disk = False
         self._discovered_disks = list()
+        self._discovered_disk_index = DiskIndex(self._discovered_disks)
         self._discovered_zpools = list()
         self._discovered_zpool_map = dict()
         self._remaining_zpool_map = dict()
@@ -1123,9 +1209,7 @@ class TargetSelection(Checkpoint):
                                     devsize = dsize
                                     if vdev.redundancy == "none":
                                         # Concatenate device sizes together
-                                        retsize = Size(str(retsize.byte_value +
-                                            devsize.byte_value) +
-                                            Size.byte_units)
+                                        retsize = retsize + devsize
                                     else:
                                         # Get size of smallest device
                                         if devsize < retsize:
@@ -3245,34 +3329,76 @@ class TargetSelection(Checkpoint):
         '''
 
         matched_disks = DiskMatches(disk)
-        for discovered_disk in self._discovered_disks:
-            # Attempt to match ctd/volid/devpath/devid first
-            if discovered_disk.name_matches(disk):
-                # there will only be a single match so return
-                matched_disks.add_match(discovered_disk)
-                return matched_disks
-
-            # Attempt to match each of the discovered disks against disk_prop.
-            # Only match disk properties if all ctd/receptacle/wwn are None,
-            # then attempt to match on boot disk or one of the disk properties
-            # specified
-            if disk.ctd is None and disk.volid is None and \
-               disk.devpath is None and disk.devid is None and \
-               disk.receptacle is None and disk.wwn is None:
-                # Attempt to match disk_prop. Any of the properties
-                # dev_type/dev_vendor/dev_size must been specified
-                if discovered_disk.disk_prop is not None and \
-                   disk.disk_prop is not None:
-                    if discovered_disk.disk_prop.prop_matches(disk.disk_prop):
-                        matched_disks.add_match(discovered_disk)
-
-                # Attempt to match on boot_disk
-                if disk.is_boot_disk() and discovered_disk.is_boot_disk():
+        index = self._discovered_disk_index
+
+        # Attempt to match ctd/volid/devpath/devid first, there will only be
+        # a single match.  Disks after it are not considered.
+        end = index.name_match(disk)
+
+        # Only match disk properties if all ctd/receptacle/wwn are None,
+        # then attempt to match on boot disk or one of the disk properties
+        # specified
+        if disk.ctd is None and disk.volid is None and \
+           disk.devpath is None and disk.devid is None and \
+           disk.receptacle is None and disk.wwn is None:
+            # Attempt to match on boot_disk, again no disks after it are
+            # considered
+            if disk.is_boot_disk() and index.boot_disk is not None:
+                if end is None or index.boot_disk < end:
+                    end = index.boot_disk
+
+            # Attempt to match disk_prop. Any of the properties
+            # dev_type/dev_vendor/dev_size must been specified
+            if disk.disk_prop is not None:
+                for discovered_disk in index.prop_matches(disk.disk_prop,
+                                                          end):
                     matched_disks.add_match(discovered_disk)
-                    return matched_disks
+
+        if end is not None:
+            matched_disks.add_match(index.disks[end])
 
         return matched_disks
 
+    @staticmethod
+    def _remap_candidate_disks(candidate_disk, mapped_disks):
+        ''' Look for a chain of disk specifications, starting with the
+            unmapped candidate_disk, where each could take the disk mapped
+            to the next and the last could take a disk which isn't mapped.
+            If there is one, move each specification along the chain to its
+            new disk and return True, otherwise return False.
+
+            mapped_disks is a dictionary of ctd to the DiskMatches mapped to
+            that disk, and is updated.
+        '''
+        visited = set()
+        chain = [(candidate_disk, iter(candidate_disk.matches))]
+        new_disks = list()
+        while chain:
+            candidate, matches = chain[-1]
+            for matched_disk in matches:
+                if matched_disk.ctd in visited:
+                    continue
+                visited.add(matched_disk.ctd)
+                new_disks.append(matched_disk)
+
+                mapped = mapped_disks.get(matched_disk.ctd)
+                if mapped is None:
+                    for (candidate, matches), new_disk in \
+                        zip(chain, new_disks):
+                        candidate.mapped_disk = new_disk
+                        mapped_disks[new_disk.ctd] = candidate
+                    return True
+
+                chain.append((mapped, iter(mapped.matches)))
+                break
+            else:
+                # no chain through this specification's matches
+                chain.pop()
+                if new_disks:
+                    new_disks.pop()
+
+        return False
+
     def _generate_candidate_disk_list(self, disks):
         ''' Map all of the disks specified in the AI manifest to devices
             specified in the discovered tree.  This will be a candidate
@@ -3302,24 +3428,31 @@ class TargetSelection(Checkpoint):
 
         # Now process the disks in order of possible matches (least to most)
         candidate_disk_list.sort(key=lambda obj: obj.nr_matches)
-        mapped_disk_list = list()
+        mapped_disks = dict()
         for candidate_disk in candidate_disk_list:
             # Traverse the set of matches looking for an unused disk
             for matched_disk in candidate_disk.matches:
-                if matched_disk.ctd not in mapped_disk_list:
+                if matched_disk.ctd not in mapped_disks:
                     candidate_disk.mapped_disk = matched_disk
-                    mapped_disk_list.append(matched_disk.ctd)
-
-                    self.logger.debug(
-                        "Mapped disk specification %s -> %s." %
-                        (self._pretty_print_disk(candidate_disk.disk),
-                        self._pretty_print_disk(candidate_disk.mapped_disk)))
+                    mapped_disks[matched_disk.ctd] = candidate_disk
                     break
-            else:
+
+        # Taking the first unused disk can leave a specification without a
+        # disk when there is a mapping for all of them, so move the mapped
+        # specifications to other disks to make room where possible.
+        for candidate_disk in candidate_disk_list:
+            if candidate_disk.mapped_disk is None and \
+               not self._remap_candidate_disks(candidate_disk, mapped_disks):
                 raise SelectionError(
                     "Unable to locate the disk '%s' on the system." %
                     self._pretty_print_disk(candidate_disk.disk))
 
+        for candidate_disk in candidate_disk_list:
+            self.logger.debug(
+                "Mapped disk specification %s -> %s." %
+                (self._pretty_print_disk(candidate_disk.disk),
+                self._pretty_print_disk(candidate_disk.mapped_disk)))
+
         return candidate_disk_list
 
     def _handle_target(self, target):
@@ -3556,6 +3689,7 @@ class TargetSelection(Checkpoint):
 
         # Store list of discovered disks
         self._discovered_disks = discovered.get_children(class_type=Disk)
+        self._discovered_disk_index = DiskIndex(self._discovered_disks)
 
         # Store list of discovered zpools
         self._discovered_zpools = discovered.get_descendants(class_type=Zpool)
@@ -32,13 +32,15 @@ import unittest
 import osol_install.errsvc as errsvc
 from lxml import etree
 from solaris_install.auto_install.checkpoints.target_selection \
-    import TargetSelection
+    import DiskIndex, TargetSelection
 from solaris_install.data_object import ObjectNotFoundError
 from solaris_install.engine import InstallEngine
 from solaris_install.engine.test.engine_test_utils import \
     get_new_engine_instance, reset_engine
 from solaris_install.target import Target, logical
-from solaris_install.target.physical import Disk, Partition, Slice
+from solaris_install.target.physical import Disk, DiskProp, Partition, \
+    Slice
+from solaris_install.target.size import Size
 
 
 class  TestTargetSelectionTestCase(unittest.TestCase):
@@ -3452,5 +3454,34 @@ class  TestTargetSelectionTestCase(unittest.TestCase):
         self.__run_simple_test(test_manifest_xml, expected_xml)
 
 
+    def test_target_selection_disk_mapping(self):
+        '''Test all disk properties are mapped when mapping each to its first
+        unused disk would fail'''
+        discovered_disks = dict((disk.ctd, disk) for disk in self.disks)
+        self.target_selection._discovered_disks = [discovered_disks[ctd]
+            for ctd in ["c97d0", "c99t0d0", "c99t1d0"]]
+        self.target_selection._discovered_disk_index = \
+            DiskIndex(self.target_selection._discovered_disks)
+
+        # c97d0 and c99t0d0 are FIXED, c99t0d0 and c99t1d0 are large enough
+        disks = list()
+        for dev_type, dev_size in [("FIXED", None),
+                                   (None, Size("625141760secs")),
+                                   ("FIXED", None)]:
+            disk = Disk("disk")
+            disk.disk_prop = DiskProp()
+            disk.disk_prop.dev_type = dev_type
+            disk.disk_prop.dev_size = dev_size
+            disks.append(disk)
+
+        candidate_disks = \
+            self.target_selection._generate_candidate_disk_list(disks)
+        self.assertEqual([candidate.disk for candidate in candidate_disks],
+                         disks)
+        self.assertEqual([candidate.mapped_disk.ctd
+                          for candidate in candidate_disks],
+                         ["c99t0d0", "c99t1d0", "c97d0"])
+
+
 if __name__ == '__main__':
     unittest.main()
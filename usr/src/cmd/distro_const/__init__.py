@@ -63,6 +63,8 @@ from solaris_install.transfer.info import Destination, Dir, Image, Software, \
     Source
 
 DC_LOCKFILE = "distro_const.lock"
+DC_TIMING_REPORT = "timing-%s.json"
+DC_TIMING_HISTORY = "timing_history.json"
 DC_LOGGER = None
 LOG_TIMESTAMP = time.strftime("%Y-%m-%d.%H:%M")
 DEFAULTLOG = system_temp_path("dc" + str(os.getpid()) + "/default_log")
@@ -479,7 +481,9 @@ def main():
         # validate the target section of the manifest
         zpool, fs = validate_target()
 
-        # set the engine's dataset to enable snapshots
+        # set the engine's dataset to enable snapshots.  Checkpoints are
+        # executed one at a time, with the engine's default max_workers, so
+        # that a build can be resumed from any of them.
         eng.dataset = os.path.join(zpool.name, fs.name, "build_data")
 
         if list_cps:
@@ -506,6 +510,13 @@ def main():
 		# log location.
 		shutil.rmtree(os.path.dirname(DEFAULTLOG))
 
+                # report the time and resources used by each checkpoint
+                # with the logs, and keep a history of them there to
+                # estimate the progress of later builds from
+                eng.timing_report = os.path.join(logs_mp,
+                    DC_TIMING_REPORT % LOG_TIMESTAMP)
+                eng.timing_history = os.path.join(logs_mp, DC_TIMING_HISTORY)
+
                 # set the http_proxy if one is specified in the manifest
                 dc_set_http_proxy(DC_LOGGER)
 
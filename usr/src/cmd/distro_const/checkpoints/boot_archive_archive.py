@@ -31,12 +31,16 @@ import math
 import os
 import platform
 import stat
+import struct
+import time
+import zlib
 
+from multiprocessing.pool import ThreadPool
 from solaris_install import DC_LABEL, run, run_silent
 from solaris_install.engine.checkpoint import AbstractCheckpoint as Checkpoint
 from solaris_install.data_object.data_dict import DataObjectDict
 from solaris_install.engine import InstallEngine
-from osol_install.install_utils import dir_size
+from osol_install.install_utils import dir_stats, invalidate_dir_stats
 from solaris_install.target.logical import Lofi
 from solaris_install.transfer.cpio import TransferCPIOAttr
 from solaris_install.transfer.info import INSTALL
@@ -45,13 +49,103 @@ from solaris_install.transfer.info import INSTALL
 import solaris_install.distro_const.cli as cli
 cli = cli.CLI()
 
+# size of the blocks of the boot archive gzip_file() compresses concurrently
+GZIP_BLOCKSIZE = 1024 * 1024
+
+
+def map_workers(function, items, workers):
+    """ map_workers() - return the result of function for each of items, in
+    the same order, calling it from a pool of workers threads if more than one
+    """
+    if workers == 1 or len(items) < 2:
+        return [function(item) for item in items]
+
+    pool = ThreadPool(min(workers, len(items)))
+    try:
+        return pool.map(function, items, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def gzip_file(src, dst, level=9, workers=1, blocksize=GZIP_BLOCKSIZE):
+    """ gzip_file() - compress src into the gzip file dst, compressing
+    blocksize blocks of src with a pool of workers threads.
+
+    The compressed blocks make up a single deflate stream in a single gzip
+    member, as gzip(1) writes, so the file can be read by anything which
+    reads gzip files, including the boot loaders.  Each block is compressed
+    without the blocks before it, which costs a little compression.
+    """
+    def compress(block):
+        """ compress a block at the requested level """
+        data, final = block
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        if final:
+            return compressor.compress(data) + compressor.flush(zlib.Z_FINISH)
+
+        # end on a byte boundary without ending the deflate stream
+        return compressor.compress(data) + \
+               compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    crc = 0
+    size = 0
+    if level == 9:
+        extra_flags = 2
+    elif level == 1:
+        extra_flags = 4
+    else:
+        extra_flags = 0
+
+    if workers > 1:
+        pool = ThreadPool(workers)
+    else:
+        pool = None
+
+    try:
+        with open(src, "rb") as src_fh:
+            with open(dst, "wb") as dst_fh:
+                # gzip header: magic, deflate, no flags, mtime, extra flags
+                # and Unix as the OS
+                dst_fh.write(struct.pack("<BBBBIBB", 0x1f, 0x8b, 8, 0,
+                                         int(time.time()), extra_flags, 3))
+
+                # read a block ahead to know which block is the final one
+                data = src_fh.read(blocksize)
+                final = False
+                while not final:
+                    # compress up to two blocks per worker at a time
+                    blocks = list()
+                    while not final and len(blocks) < workers * 2:
+                        next_data = src_fh.read(blocksize)
+                        final = not next_data
+                        blocks.append((data, final))
+                        crc = zlib.crc32(data, crc)
+                        size += len(data)
+                        data = next_data
+
+                    if pool is not None:
+                        compressed = pool.map(compress, blocks, chunksize=1)
+                    else:
+                        compressed = [compress(block) for block in blocks]
+                    dst_fh.write("".join(compressed))
+
+                # gzip trailer: CRC32 and size modulo 2^32 of the data
+                dst_fh.write(struct.pack("<II", crc & 0xffffffffL,
+                                         size & 0xffffffffL))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
 
 class BootArchiveArchive(Checkpoint):
     """ class to archive the boot archive directory
     """
 
     DEFAULT_ARG = {"compression_type": "gzip", "compression_level": 9,
-                   "size_pad": 0, "bytes_per_inode": 0}
+                   "size_pad": 0, "bytes_per_inode": 0,
+                   "compression_workers": 1}
     DEFAULT_ARGLIST = {"uncompressed_files": []}
 
     MIN_PADDING_SIZE_IN_MB = 35
@@ -68,6 +162,13 @@ class BootArchiveArchive(Checkpoint):
         self.nbpi = int(arg.get("bytes_per_inode",
                         self.DEFAULT_ARG.get("bytes_per_inode")))
 
+        # number of threads compressing files concurrently, 0 for one per
+        # online CPU
+        self.comp_workers = int(arg.get("compression_workers",
+                                self.DEFAULT_ARG.get("compression_workers")))
+        if self.comp_workers < 1:
+            self.comp_workers = max(os.sysconf("SC_NPROCESSORS_ONLN"), 1)
+
         self.uncompressed_files = arglist.get("uncompressed_files",
                                               self.DEFAULT_ARGLIST.get(
                                                   "uncompressed_files"))
@@ -112,15 +213,9 @@ class BootArchiveArchive(Checkpoint):
         directory - root of the boot archive
         size - the size of the boot archive
         """
-        file_count = 0
-
-        # get the cwd to return to later
-        cwd = os.getcwd()
-
-        # change to the boot_archive directory
-        os.chdir(directory)
-        for _none, dirs, files in os.walk("."):
-            file_count += len(files) + len(dirs)
+        # the number of files and directories is found by the same walk as
+        # the size, in calculate_ba_size()
+        file_count = dir_stats(directory, self.comp_workers).entries
 
         # Add inode overhead for multiple disk systems using 500 disks as a
         # target upper bound.
@@ -145,9 +240,6 @@ class BootArchiveArchive(Checkpoint):
             self.logger.debug("Calculated number of bytes per inode: %d" % \
                               nbpi)
 
-        # return back to the cwd
-        os.chdir(cwd)
-
         return nbpi
 
     def calculate_ba_size(self, directory):
@@ -155,7 +247,9 @@ class BootArchiveArchive(Checkpoint):
 
         directory - root of the boot archive
         """
-        size = dir_size(directory) / 1024
+        # ba-config has just changed the boot archive, so walk it again
+        invalidate_dir_stats(directory)
+        size = dir_stats(directory, self.comp_workers).size / 1024
 
         self.logger.debug("BA size before padding: %d", size)
 
@@ -198,6 +292,7 @@ class BootArchiveArchive(Checkpoint):
             with open(etc_system, "a+") as fh:
                 fh.write("set root_is_ramdisk=1\n")
                 fh.write("set ramdisk_size=%d\n" % size)
+            invalidate_dir_stats(etc_system)
 
         self.lofi = Lofi(ramdisk, mountpoint, size)
         self.lofi.nbpi = self.nbpi
@@ -231,6 +326,9 @@ class BootArchiveArchive(Checkpoint):
         # get the cwd
         cwd = os.getcwd()
 
+        # list of fiocompress commands to run once the walk is done
+        cmds = list()
+
         os.chdir(self.ba_build)
         for root, dirs, files in os.walk("."):
             # strip off the leading . or ./
@@ -274,12 +372,15 @@ class BootArchiveArchive(Checkpoint):
                    statinfo.st_size == 0 and \
                    statinfo.st_nlink < 2:
                     # fiocompress the file
-                    cmd = [cli.FIOCOMPRESS, "-mc", ba_path, mp_path]
-                    run(cmd)
+                    cmds.append([cli.FIOCOMPRESS, "-mc", ba_path, mp_path])
 
         # return to the original directory
         os.chdir(cwd)
 
+        self.logger.debug("fiocompressing %d files with %d workers",
+                          len(cmds), self.comp_workers)
+        map_workers(run, cmds, self.comp_workers)
+
     def create_archives(self):
         """ class method to walk the list of lofi entries and create the
         archives
@@ -320,10 +421,16 @@ class BootArchiveArchive(Checkpoint):
 
         if self.kernel_arch == "x86":
             # use gzip to compress the boot archives on x86
-            cmd = [cli.CMD7ZA, "a", "-tgzip",
-                   "-mx=%d" % self.comp_level,
-                   self.lofi.ramdisk + ".gz", self.lofi.ramdisk]
-            run_silent(cmd)
+            if self.comp_workers > 1:
+                self.logger.debug("compressing %s with %d workers",
+                                  self.lofi.ramdisk, self.comp_workers)
+                gzip_file(self.lofi.ramdisk, self.lofi.ramdisk + ".gz",
+                          self.comp_level, self.comp_workers)
+            else:
+                cmd = [cli.CMD7ZA, "a", "-tgzip",
+                       "-mx=%d" % self.comp_level,
+                       self.lofi.ramdisk + ".gz", self.lofi.ramdisk]
+                run_silent(cmd)
 
             # move the file into the proper place in the pkg image area
             os.rename(self.lofi.ramdisk + ".gz", self.lofi.ramdisk)
@@ -340,6 +447,11 @@ class BootArchiveArchive(Checkpoint):
         # chmod the boot_archive file to 0644
         os.chmod(self.lofi.ramdisk, 0644)
 
+        invalidate_dir_stats(self.lofi.ramdisk)
+        if self.kernel_arch == "sparc":
+            invalidate_dir_stats(os.path.join(self.pkg_img_path,
+                                              "platform/sun4v"))
+
     def execute(self, dry_run=False):
         """ Primary execution method used by the Checkpoint parent class.
         dry_run is not used in DC
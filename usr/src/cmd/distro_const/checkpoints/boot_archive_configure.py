@@ -31,7 +31,7 @@ import os
 import shutil
 import datetime
 
-from osol_install.install_utils import dir_size
+from osol_install.install_utils import dir_stats, invalidate_dir_stats
 from solaris_install import DC_LABEL, run
 from solaris_install.data_object.data_dict import DataObjectDict
 from solaris_install.transfer.info import Software, Source, Destination, \
@@ -283,19 +283,26 @@ class BootArchiveConfigure(Checkpoint):
         dst = Destination()
         dst.insert_children(dst_path)
 
+        # ba-init has just populated ba_build.  The pkg_image area has only
+        # been read since pre-pkg-img-mod walked it, so the sizes of usr and
+        # dev are found without walking them again.
+        invalidate_dir_stats(self.ba_build)
+
         dot_node = CPIOSpec()
         dot_node.action = CPIOSpec.INSTALL
-        dot_node.size = str(dir_size(os.path.join(self.ba_build, "")))
+        dot_node.size = str(dir_stats(os.path.join(self.ba_build, "")).size)
         dot_node.contents = ["."]
 
         usr_node = CPIOSpec()
         usr_node.action = CPIOSpec.INSTALL
-        usr_node.size = str(dir_size(os.path.join(self.pkg_img_path, "usr")))
+        usr_node.size = str(dir_stats(os.path.join(self.pkg_img_path,
+                                                   "usr")).size)
         usr_node.contents = ["usr"]
 
         dev_node = CPIOSpec()
         dev_node.action = CPIOSpec.INSTALL
-        dev_node.size = str(dir_size(os.path.join(self.pkg_img_path, "dev")))
+        dev_node.size = str(dir_stats(os.path.join(self.pkg_img_path,
+                                                   "dev")).size)
         dev_node.contents = ["dev"]
 
         software_node = Software(TRANSFER_ROOT, type="CPIO")
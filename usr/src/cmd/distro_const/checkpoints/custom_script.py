@@ -26,6 +26,7 @@
 
 """ custom_script.py - Runs a custom script as a checkpoint.
 """
+from osol_install.install_utils import invalidate_dir_stats
 from solaris_install import DC_LABEL, run
 from solaris_install.data_object.data_dict import DataObjectDict
 from solaris_install.engine import InstallEngine
@@ -85,3 +86,6 @@ class CustomScript(Checkpoint):
 
         if not dry_run:
             run(self.command, shell=True)
+
+            # the script may have changed any part of the image
+            invalidate_dir_stats()
@@ -34,7 +34,8 @@ import os
 import platform
 import shutil
 
-from osol_install.install_utils import dir_size, file_size
+from osol_install.install_utils import dir_stats, file_size, \
+    invalidate_dir_stats
 from solaris_install import CalledProcessError, DC_LABEL, Popen, run
 from solaris_install.data_object.data_dict import DataObjectDict
 from solaris_install.engine import InstallEngine
@@ -97,6 +98,10 @@ class PkgImgMod(Checkpoint):
             raise RuntimeError("Error retrieving a value from the DOC: " +
                                 str(msg))
 
+        # every execute() path rewrites the package image, so drop any
+        # directory stats gathered by the earlier checkpoints
+        invalidate_dir_stats(self.pkg_img_path)
+
     def strip_root(self):
         """ class method to clean up the root of the package image path
         """
@@ -229,8 +234,9 @@ class PkgImgMod(Checkpoint):
         tr_install_misc = CPIOSpec()
         tr_install_misc.action = CPIOSpec.INSTALL
         tr_install_misc.contents = ["."]
-        tr_install_misc.size = str(dir_size(os.path.join(self.pkg_img_path,
-                                                         "miscdirs")))
+        miscdirs = os.path.join(self.pkg_img_path, "miscdirs")
+        invalidate_dir_stats(miscdirs)
+        tr_install_misc.size = str(dir_stats(miscdirs).size)
 
         misc_software_node = Software(TRANSFER_MISC, type="CPIO")
         misc_software_node.insert_children([src, dst, tr_install_misc])
@@ -264,6 +270,7 @@ class PkgImgMod(Checkpoint):
                       ignore_errors=True)
         shutil.rmtree(os.path.join(self.pkg_img_path, "usr"),
                       ignore_errors=True)
+        invalidate_dir_stats(self.pkg_img_path)
 
     def add_content_list_to_doc(self, content_list):
         src_path = Dir(MEDIA_DIR_VAR)
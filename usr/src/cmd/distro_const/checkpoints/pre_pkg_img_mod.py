@@ -36,7 +36,8 @@ import tempfile
 
 from distutils.text_file import TextFile
 
-from osol_install.install_utils import dir_size, encrypt_password
+from osol_install.install_utils import dir_stats, encrypt_password, \
+    invalidate_dir_stats
 from pkg.cfgfiles import PasswordFile
 from solaris_install import CalledProcessError, DC_LABEL, DC_PERS_LABEL, \
     path_matches_dtd, run
@@ -326,7 +327,13 @@ class PrePkgImgMod(Checkpoint):
         image.
         """
         self.logger.debug("calculating size of the pkg_image area")
-        image_size = int(round((dir_size(self.pkg_img_path) / 1024)))
+
+        # walk the whole pkg_image area once, with a thread per CPU.  The
+        # sizes of the directories under it are kept for later checkpoints,
+        # such as boot-archive-configure's sizes of usr and dev.
+        invalidate_dir_stats(self.pkg_img_path)
+        image_size = int(round((dir_stats(self.pkg_img_path,
+                                          workers=0).size / 1024)))
 
         with open(self.img_info_path, "a+") as fh:
             fh.write("IMAGE_SIZE=%d\n" % image_size)
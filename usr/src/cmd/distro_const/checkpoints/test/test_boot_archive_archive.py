@@ -30,6 +30,7 @@
 
 """
 
+import gzip
 import os
 import shutil
 import tempfile
@@ -39,7 +40,7 @@ import testlib
 
 from solaris_install import run, run_silent
 from solaris_install.distro_const.checkpoints.boot_archive_archive \
-    import BootArchiveArchive
+    import BootArchiveArchive, gzip_file
 from solaris_install.engine.test import engine_test_utils
 
 
@@ -157,3 +158,48 @@ class TestCreateRamdisksAndArchives(unittest.TestCase):
         # create a symlink in /usr to the bootblock
         os.symlink(bb, os.path.join(self.baa.pkg_img_path,
                                     "usr/platform/sun4u/lib/fs/ufs/bootblk"))
+
+
+class TestGzipFile(unittest.TestCase):
+    """ test case to test compressing the boot archive with gzip_file()
+    """
+
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp(dir="/var/tmp", prefix="baa_gzip_")
+        self.src = os.path.join(self.tdir, "boot_archive")
+        self.dst = self.src + ".gz"
+
+    def tearDown(self):
+        shutil.rmtree(self.tdir, ignore_errors=True)
+
+    def gzip_and_check(self, data, workers, blocksize):
+        """ compress data and verify gzip reads it back
+        """
+        with open(self.src, "wb") as fh:
+            fh.write(data)
+        gzip_file(self.src, self.dst, 9, workers, blocksize)
+
+        fh = gzip.open(self.dst, "rb")
+        try:
+            self.assertEqual(fh.read(), data)
+        finally:
+            fh.close()
+
+        # gzip(1) can read the archive too
+        run(["/usr/bin/gzip", "-t", self.dst])
+
+    def test_single_worker(self):
+        """ test case for compressing with a single worker
+        """
+        self.gzip_and_check("boot archive " * 10000, 1, 4096)
+
+    def test_workers(self):
+        """ test case for compressing many blocks with a pool of workers
+        """
+        data = "".join(chr(number % 251) for number in range(100000))
+        self.gzip_and_check(data, 4, 4096)
+
+    def test_empty(self):
+        """ test case for compressing an empty file
+        """
+        self.gzip_and_check("", 4, 4096)
@@ -1187,9 +1187,13 @@ def find_clients(lservices, sname=None):
 
     """
     sdict = dict()
+    all_clients = config.get_all_clients()
     for servicename in lservices.keys():
         if sname and sname != servicename:
             continue
+        # don't look up services that have no clients to list
+        if servicename not in all_clients:
+            continue
         try:
             service = AIService(servicename)
         except VersionError as version_err:
@@ -1197,7 +1201,7 @@ def find_clients(lservices, sname=None):
             continue
         arch = which_arch(service)
         image_path = [service.image.path]
-        client_info = config.get_clients(servicename)
+        client_info = all_clients[servicename]
         for clientkey in client_info:
             # strip off the leading '01' and reinsert ':'s
             client = AIdb.formatValue('mac', clientkey[2:])
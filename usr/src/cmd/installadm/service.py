@@ -430,6 +430,7 @@ class AIService(object):
         self.remove_profiles()
         for path in self.get_files_to_remove():
             force_delete(path)
+        config.update_client_index(self.name)
 
     def version(self):
         '''Look up and return the version of this service. See module
@@ -569,6 +570,8 @@ class AIService(object):
 
         logging.debug("rename from %s to %s", self.config_dir, newsvcdir)
         os.rename(self.config_dir, newsvcdir)
+        config.update_client_index(self.name)
+        config.update_client_index(os.path.basename(newsvcdir))
 
     def _update_name_in_service_props(self, newsvcname):
         '''Set service_name property to newsvcname'''
@@ -965,10 +968,9 @@ class AIService(object):
         queue = dbn.getQueue()
         if not AIdb.tableExists(queue, AIdb.PROFILES_TABLE):
             return
-        query = AIdb.DBrequest("SELECT file FROM " + AIdb.PROFILES_TABLE)
-        queue.put(query)
-        query.waitAns()
-        for row in iter(query.getResponse()):
+        rsp = AIdb.execute(queue, "SELECT file FROM " +
+                           AIdb.PROFILES_TABLE).result()
+        for row in rsp:
             filename = row['file']
             try:
                 if os.path.exists(filename):
@@ -992,11 +994,12 @@ class AIService(object):
             return failures
         db_conn = self.database()
         queue = db_conn.getQueue()
-        profile_request = AIdb.DBrequest("select name, file from " +
-                                         AIdb.PROFILES_TABLE)
-        queue.put(profile_request)
-        profile_request.waitAns()
-        profiles = profile_request.getResponse() or list()
+        try:
+            profiles = AIdb.execute(queue, "select name, file from " +
+                                    AIdb.PROFILES_TABLE).result()
+        except AIdb.DBError as err:
+            print >> sys.stderr, err
+            profiles = list()
 
         for profile_name, profile_path in profiles:
             valid = validate_file(profile_name, profile_path,
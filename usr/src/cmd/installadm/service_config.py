@@ -30,6 +30,7 @@ import ConfigParser
 import errno
 import logging
 import os
+import sqlite3
 import sys
 import tempfile
 
@@ -65,6 +66,12 @@ BOOTARGS = 'bootargs'
 
 AI_SERVICE_DIR_PATH = com.AI_SERVICE_DIR_PATH
 CFGFILE = '.config'
+# index of the clients in all services' .config files, kept in
+# AI_SERVICE_DIR_PATH so that finding a client doesn't read every .config.
+# It's built on first use, and then updated as .config files are written,
+# and services are renamed or deleted.
+CLIENT_INDEX = '.clients.db'
+CLIENT_INDEX_TIMEOUT = 30
 
 COMPATIBILITY_PORTS = ('/var/ai/ai-webserver/'
                        'compatibility-configuration/ports.conf')
@@ -152,6 +159,7 @@ def delete_service_props(service_name):
     logging.log(com.XDEBUG, "deleting props for service %s", service_name)
     cfgpath = _get_configfile_path(service_name)
     os.remove(cfgpath)
+    _update_client_index(service_name, None)
 
 
 def get_service_props(service_name):
@@ -409,20 +417,22 @@ def find_client(client_id):
                 client_id)
     service = None
     files = None
-    for svc in get_all_service_names():
-        cfg = _read_config_file(svc)
-        if cfg is None:
-            raise ServiceCfgError(_("\nMissing configuration file for "
-                                    "service: %s\n" % svc))
-        if CLIENTS not in cfg.sections():
-            continue
-        clients = dict(cfg.items(CLIENTS))
-        # cfgparser changes client_id to lower
-        if client_id.lower() in clients:
-            data = clients[client_id.lower()]
-            files = ast.literal_eval(data)
-            service = svc
-            break
+    # cfgparser changes client_id to lower
+    client_id = client_id.lower()
+    # a client in more than one service is found in the first by name
+    rows = _query_client_index("SELECT service, data FROM clients "
+                               "WHERE client_id = ? "
+                               "ORDER BY service LIMIT 1", (client_id,))
+    if rows is not None:
+        if rows:
+            service = rows[0][0]
+            files = ast.literal_eval(rows[0][1])
+    else:
+        for svc, clients in sorted(_read_all_clients()):
+            if client_id in clients:
+                files = ast.literal_eval(clients[client_id])
+                service = svc
+                break
     logging.log(com.XDEBUG, 'service is %s, files are %s', service, files)
     return (service, files)
 
@@ -439,19 +449,8 @@ def is_client(client_id):
     '''
     logging.log(com.XDEBUG, "**** START service_config.is_client: %s ****",
                 client_id)
-    exists = False
-    all_svc_names = get_all_service_names()
-    for svc in all_svc_names:
-        cfg = _read_config_file(svc)
-        if cfg is None:
-            raise ServiceCfgError(_("\nMissing configuration file for "
-                                    "service: %s\n" % svc))
-        if CLIENTS not in cfg.sections():
-            continue
-        clients = dict(cfg.items(CLIENTS))
-        # cfgparser changes client_id to lower
-        if client_id.lower() in clients:
-            exists = True
+    service = find_client(client_id)[0]
+    exists = service is not None
     logging.log(com.XDEBUG, 'client exists: %s', exists)
     return exists
 
@@ -483,6 +482,56 @@ def remove_client_from_config(service_name, client_id):
     _write_config_file(service_name, cfg)
 
 
+def get_all_clients():
+    '''
+    Get info on the clients of all services
+    Returns: dictionary keyed by service name of dictionaries of clients,
+             as returned by get_clients(). Services without clients are
+             left out.
+    Raises:
+        ServiceCfgError if service missing .config file
+
+    '''
+    logging.log(com.XDEBUG, "**** START service_config.get_all_clients ****")
+    all_clients = dict()
+    rows = _query_client_index("SELECT service, client_id, data "
+                               "FROM clients")
+    if rows is not None:
+        for svc, client, data in rows:
+            clients = all_clients.setdefault(svc, dict())
+            clients[client.upper()] = ast.literal_eval(data)
+    else:
+        for svc, clients in _read_all_clients():
+            if clients:
+                all_clients[svc] = dict((client.upper(),
+                                         ast.literal_eval(clients[client]))
+                                        for client in clients)
+    logging.log(com.XDEBUG, 'clients are %s', all_clients)
+    return all_clients
+
+
+def rebuild_client_index():
+    '''
+    Rebuild the client index from the .config files of all services,
+    discarding the current index (e.g., if it is corrupt)
+    Raises:
+        ServiceCfgError if the index can't be rebuilt
+
+    '''
+    logging.log(com.XDEBUG,
+                "**** START service_config.rebuild_client_index ****")
+    try:
+        _remove_client_index()
+    except OSError as err:
+        raise ServiceCfgError(_("\nUnable to remove client index: "
+                                "%s\n") % err)
+    try:
+        _build_client_index()
+    except (sqlite3.Error, OSError) as err:
+        raise ServiceCfgError(_("\nUnable to rebuild client index: %s\n") %
+                              err)
+
+
 def get_service_port(svcname):
     ''' Get the port for a service (compatibility with old services)
 
@@ -739,6 +788,182 @@ def _get_configfile_path(service_name):
     return cfgpath
 
 
+def _get_client_index_path():
+    '''get the path to the client index'''
+    return os.path.join(AI_SERVICE_DIR_PATH, CLIENT_INDEX)
+
+
+def _build_client_index():
+    ''' Build the client index from the .config files of all services,
+    replacing any existing index
+
+    Raises:
+        ServiceCfgError if service missing .config file
+        sqlite3.Error or OSError if the index can't be written
+
+    '''
+    logging.log(com.XDEBUG, 'building client index')
+    index_path = _get_client_index_path()
+    # build it in a file of its own, so the index is only seen once it's
+    # complete, even by installadm commands run at the same time
+    new_path = '%s.%d' % (index_path, os.getpid())
+    try:
+        index = sqlite3.connect(new_path)
+        try:
+            index.text_factory = str
+            index.execute("CREATE TABLE clients "
+                          "(client_id TEXT, service TEXT, data TEXT, "
+                          "PRIMARY KEY (client_id, service))")
+            for svc, clients in _read_all_clients():
+                index.executemany("INSERT INTO clients VALUES (?, ?, ?)",
+                                  [(client, svc, data) for client, data in
+                                   clients.iteritems()])
+            index.commit()
+        finally:
+            index.close()
+        os.rename(new_path, index_path)
+    except (sqlite3.Error, OSError, ServiceCfgError):
+        try:
+            os.remove(new_path)
+        except OSError:
+            pass
+        raise
+
+
+def _remove_client_index():
+    ''' Remove the client index, so that it is built again on its next use
+
+    Raises:
+        OSError if the index can't be removed
+
+    '''
+    try:
+        os.remove(_get_client_index_path())
+    except OSError as err:
+        if err.errno != errno.ENOENT:
+            raise
+
+
+def _open_client_index():
+    ''' Open the client index, building it if it doesn't exist
+
+    Return:
+        A sqlite3 connection to the index, to be closed by the caller, or
+        None if the index can't be used (e.g., it isn't writable)
+    Raises:
+        ServiceCfgError if service missing .config file
+
+    '''
+    try:
+        if not os.path.exists(_get_client_index_path()):
+            _build_client_index()
+        index = sqlite3.connect(_get_client_index_path(),
+                                timeout=CLIENT_INDEX_TIMEOUT)
+    except (sqlite3.Error, OSError) as err:
+        logging.log(com.XDEBUG, 'unable to open client index: %s', err)
+        return None
+    index.text_factory = str
+    return index
+
+
+def _query_client_index(query, params=()):
+    ''' Run a query on the client index
+
+    Input:
+        query - SQL query
+        params - parameters of the query
+    Return:
+        A list of the rows returned, or None if the index can't be used,
+        and the .config files have to be read instead
+    Raises:
+        ServiceCfgError if service missing .config file
+
+    '''
+    index = _open_client_index()
+    if index is None:
+        return None
+    try:
+        return index.execute(query, params).fetchall()
+    except sqlite3.Error as err:
+        logging.log(com.XDEBUG, 'unable to read client index: %s', err)
+        return None
+    finally:
+        index.close()
+
+
+def _update_client_index(service_name, cfg):
+    ''' Replace the clients of a service in the client index, if there
+    is one. An index which can't be updated is removed, to be built again
+    on its next use.
+
+    Input:
+        service_name - An AI service name
+        cfg - A ConfigParser object with the current config, or None if
+              the service has no .config file
+
+    '''
+    if not os.path.exists(_get_client_index_path()):
+        return
+    logging.log(com.XDEBUG, 'indexing clients of service %s', service_name)
+    try:
+        index = sqlite3.connect(_get_client_index_path(),
+                                timeout=CLIENT_INDEX_TIMEOUT)
+        try:
+            index.text_factory = str
+            with index:
+                index.execute("DELETE FROM clients WHERE service = ?",
+                              (service_name,))
+                if cfg is not None and CLIENTS in cfg.sections():
+                    index.executemany("INSERT INTO clients "
+                                      "VALUES (?, ?, ?)",
+                                      [(client, service_name, data)
+                                       for client, data in
+                                       cfg.items(CLIENTS)])
+        finally:
+            index.close()
+    except sqlite3.Error as err:
+        logging.log(com.XDEBUG, 'unable to update client index: %s', err)
+        try:
+            _remove_client_index()
+        except OSError as err:
+            logging.log(com.XDEBUG, 'unable to remove client index: %s',
+                        err)
+
+
+def update_client_index(service_name):
+    ''' Bring the clients of a service in the client index up to date
+    with its .config file, after the service has been renamed or deleted.
+    Writing a .config file updates the index itself.
+
+    Input:
+        service_name - An AI service name
+
+    '''
+    _update_client_index(service_name, _read_config_file(service_name))
+
+
+def _read_all_clients():
+    ''' Read the clients of all services from their .config files
+
+    Return:
+        A list of (service name, dict of client id to raw client data)
+    Raises:
+        ServiceCfgError if service missing .config file
+
+    '''
+    all_clients = list()
+    for svc in get_all_service_names():
+        cfg = _read_config_file(svc)
+        if cfg is None:
+            raise ServiceCfgError(_("\nMissing configuration file for "
+                                    "service: %s\n" % svc))
+        if CLIENTS in cfg.sections():
+            all_clients.append((svc, dict(cfg.items(CLIENTS))))
+        else:
+            all_clients.append((svc, dict()))
+    return all_clients
+
+
 def _read_config_file(service_name):
     ''' Get the current ConfigParser object for an installation service
 
@@ -796,6 +1021,8 @@ def _write_config_file(service_name, cfg):
 
     os.umask(orig_umask)
 
+    _update_client_index(service_name, cfg)
+
 
 def _write_service_config(service_name, props):
     '''Writes out the service related info to the .config file
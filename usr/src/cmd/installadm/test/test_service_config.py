@@ -235,6 +235,108 @@ class ServiceConfig(unittest.TestCase):
         clientdict = config.get_clients('s1')
         self.assertTrue('01AABBCCDDAABB' not in clientdict)
 
+    def test_client_index(self):
+        '''test client index follows changes to services'''
+
+        for svc in ('s1', 's2', 's3'):
+            config._write_service_config(svc, {config.PROP_SERVICE_NAME: svc})
+        config.add_client_info('s1', '01AABBCCDDAABB',
+                               {config.FILES: ['/tmp/foo']})
+        config.add_client_info('s2', '01AAAAAAAAAAAA',
+                               {config.BOOTARGS: 'console=ttya'})
+        # the index is built on its first use
+        self.assertFalse(os.path.exists(config._get_client_index_path()))
+        self.assertEqual(config.get_all_clients(),
+            {'s1': {'01AABBCCDDAABB': {config.FILES: ['/tmp/foo']}},
+             's2': {'01AAAAAAAAAAAA': {config.BOOTARGS: 'console=ttya'}}})
+        self.assertTrue(os.path.exists(config._get_client_index_path()))
+        config.add_client_info('s1', '01CCCCCCCCCCCC', {})
+        self.assertEqual(config.find_client('01CCCCCCCCCCCC'), ('s1', {}))
+
+        # lookups only read the index
+        read_config_file = config._read_config_file
+        config._read_config_file = None
+        try:
+            self.assertEqual(config.find_client('01AABBCCDDAABB'),
+                             ('s1', {config.FILES: ['/tmp/foo']}))
+            self.assertFalse(config.is_client('01BBBBBBBBBBBB'))
+        finally:
+            config._read_config_file = read_config_file
+
+        # .config changed by hand, and the index rebuilt
+        cfgpath = config._get_configfile_path('s3')
+        with open(cfgpath, 'a') as cfgfile:
+            cfgfile.write("[%s]\n01bbbbbbbbbbbb = {}\n" % config.CLIENTS)
+        config.rebuild_client_index()
+        self.assertEqual(config.find_client('01BBBBBBBBBBBB'), ('s3', {}))
+
+        # service directory removed, as by delete-service
+        shutil.rmtree(os.path.join(config.AI_SERVICE_DIR_PATH, 's1'))
+        config.update_client_index('s1')
+        self.assertFalse(config.is_client('01AABBCCDDAABB'))
+        self.assertEqual(config.find_client('01AABBCCDDAABB'), (None, None))
+
+        # service directory renamed, as by rename-service
+        os.rename(os.path.join(config.AI_SERVICE_DIR_PATH, 's3'),
+                  os.path.join(config.AI_SERVICE_DIR_PATH, 's4'))
+        config.update_client_index('s3')
+        config.update_client_index('s4')
+        self.assertEqual(config.find_client('01BBBBBBBBBBBB'), ('s4', {}))
+
+        config.remove_client_from_config('s2', '01AAAAAAAAAAAA')
+        self.assertFalse(config.is_client('01AAAAAAAAAAAA'))
+        self.assertEqual(config.get_all_clients().keys(), ['s4'])
+
+        config.delete_service_props('s4')
+        self.assertFalse(config.is_client('01BBBBBBBBBBBB'))
+
+    def test_client_index_order_and_errors(self):
+        '''test find_client order and errors with the client index'''
+
+        for svc in ('s2', 's1'):
+            config._write_service_config(svc, {config.PROP_SERVICE_NAME: svc})
+            config.add_client_info(svc, '01AABBCCDDAABB',
+                                   {config.BOOTARGS: svc})
+        # a client in two services is found in the first by name
+        self.assertEqual(config.find_client('01AABBCCDDAABB'),
+                         ('s1', {config.BOOTARGS: 's1'}))
+
+        # a service that is missing its .config file is an error, when
+        # the index is built
+        os.remove(config._get_client_index_path())
+        get_all_service_names = config.get_all_service_names
+        config.get_all_service_names = lambda: ['s1', 's2', 's3']
+        try:
+            self.assertRaises(config.ServiceCfgError, config.find_client,
+                              '01AABBCCDDAABB')
+        finally:
+            config.get_all_service_names = get_all_service_names
+
+    def test_rebuild_client_index(self):
+        '''test rebuilding a corrupt client index'''
+
+        config._write_service_config('s1', {config.PROP_SERVICE_NAME: 's1'})
+        config.add_client_info('s1', '01AABBCCDDAABB',
+                               {config.FILES: ['/tmp/foo']})
+        with open(config._get_client_index_path(), 'w') as index:
+            index.write('not a database')
+        # a corrupt index falls back to reading the .config files
+        self.assertEqual(config.find_client('01AABBCCDDAABB'),
+                         ('s1', {config.FILES: ['/tmp/foo']}))
+        config.rebuild_client_index()
+        index = config._open_client_index()
+        self.assertTrue(index is not None)
+        index.close()
+        self.assertTrue(config.is_client('01AABBCCDDAABB'))
+
+        # an index which can't be updated is removed, and built again
+        with open(config._get_client_index_path(), 'w') as index:
+            index.write('not a database')
+        config.add_client_info('s1', '01AAAAAAAAAAAA', {})
+        self.assertFalse(os.path.exists(config._get_client_index_path()))
+        self.assertEqual(config.find_client('01AAAAAAAAAAAA'), ('s1', {}))
+        self.assertTrue(os.path.exists(config._get_client_index_path()))
+
     def test_configfile_permissions(self):
         '''test permissions of .config file'''
 
@@ -21,7 +21,7 @@
 #
 
 #
-# Copyright (c) 2011, Oracle and/or its affiliates. All rights reserved.
+# Copyright (c) 2011, 2012, Oracle and/or its affiliates. All rights reserved.
 #
 """ boot_spec.py -- library containing class definitions for boot DOC objects,
     including BootMods and BootEntry.
@@ -40,6 +40,8 @@ class BootMods(DataObject):
     TITLE_LABEL = "title"
     TIMEOUT_LABEL = "timeout"
 
+    XML_TAGS = (BOOT_MODS_LABEL,)
+
     def __init__(self, name):
         """ Initialize the DataObject object with name.
         """
@@ -105,6 +107,8 @@ class BootEntry(DataObject):
     TITLE_SUFFIX_LABEL = "title_suffix"
     KERNEL_ARGS_LABEL = "kernel_args"
 
+    XML_TAGS = (BOOT_ENTRY_LABEL,)
+
     def __init__(self, name):
         """ Initialize the DataObject object with name.
         """
@@ -32,6 +32,10 @@ import copy
 import logging
 import re
 import sys
+import threading
+
+from itertools import islice
+from operator import attrgetter
 
 from abc import ABCMeta, abstractmethod
 from lxml import etree
@@ -40,6 +44,14 @@ from urllib import quote, unquote
 
 DEFAULTLOG = "/system/volatile/install_log"
 
+# Shared by all objects without children, instead of each having its own
+# empty list, which is replaced by a list when children are inserted.
+_NO_CHILDREN = ()
+
+# Names of the attributes kept in the slots of each class and its bases,
+# cached by _get_slot_attrs().
+_SLOT_ATTRS = dict()
+
 
 # Define various Data Object specific exceptions
 
@@ -64,6 +76,540 @@ class PathError(DataObjectError):
     pass
 
 
+class DataObjectIndex(object):
+    '''Index of the objects in a tree of DataObjects, by name and by class.
+
+    An index is enabled on the root of a tree by calling
+    DataObjectBase.enable_index(), and is then kept up to date by
+    insert_children(), delete_children() and delete(). It is used by
+    get_descendants() to find the candidates for a search, without having
+    to walk every object in the tree.
+
+    Results are returned in the same depth-first order that a walk of
+    the tree would return them in. This is done by sorting the candidates
+    on their path of positions from the object being searched, where the
+    positions of the children of each object are cached until that object
+    has children inserted or deleted.
+
+    The index is only used where it has fewer candidates than the number
+    of objects that a walk would have to visit, so it will never be
+    noticeably slower than walking the tree.
+
+    Objects of classes that override the 'name' property can't have their
+    name tracked, so these are always considered as candidates when
+    searching by name.
+
+    The index is guarded by a lock, so that independent parts of the tree
+    may be changed and searched by more than one thread, such as
+    checkpoints being executed in parallel by the InstallEngine.
+    '''
+
+    def __init__(self, root):
+        self._root = root
+        self._lock = threading.RLock()
+
+        # All indexed objects, and the name they were indexed with, keyed
+        # by id().
+        self._nodes = dict()
+        self._names = dict()
+
+        # Lookups by name, and by the class of the object, each value is a
+        # dictionary of objects keyed by id().
+        self._by_name = dict()
+        self._by_class = dict()
+        self._dynamic_names = dict()
+
+        # Number of objects in the sub-tree of each object, including itself.
+        self._sizes = dict()
+
+        # Cached position of each child, keyed by id() of the parent.
+        self._positions = dict()
+
+        self.__register(root)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, obj):
+        return id(obj) in self._nodes
+
+    def __register(self, obj):
+        '''Add obj and its descendants to the index, returns number added.'''
+        key = id(obj)
+        self._nodes[key] = obj
+
+        if type(obj).name is DataObjectBase.name:
+            self._names[key] = obj._name
+            self._by_name.setdefault(obj._name, dict())[key] = obj
+        else:
+            self._dynamic_names[key] = obj
+
+        self._by_class.setdefault(type(obj), dict())[key] = obj
+
+        size = 1
+        for child in obj._children:
+            if id(child) not in self._nodes:
+                size += self.__register(child)
+
+        self._sizes[key] = size
+        return size
+
+    def __unregister(self, obj):
+        '''Remove obj and its descendants from the index.'''
+        key = id(obj)
+        del self._nodes[key]
+
+        if key in self._names:
+            name = self._names.pop(key)
+            named = self._by_name[name]
+            del named[key]
+            if not named:
+                del self._by_name[name]
+        else:
+            del self._dynamic_names[key]
+
+        classed = self._by_class[type(obj)]
+        del classed[key]
+        if not classed:
+            del self._by_class[type(obj)]
+
+        self._positions.pop(key, None)
+
+        for child in obj._children:
+            if id(child) in self._nodes:
+                self.__unregister(child)
+
+        return self._sizes.pop(key)
+
+    def __update_sizes(self, parent, delta):
+        '''Update the sizes of parent and its ancestors by delta.'''
+        while parent is not None:
+            key = id(parent)
+            if key in self._sizes:
+                self._sizes[key] += delta
+            parent = parent._parent
+
+    def add(self, obj):
+        '''Adds a newly inserted obj, and its descendants, to the index.
+
+        Does nothing if the parent of obj is not itself in the index.
+        '''
+        with self._lock:
+            if id(obj) in self._nodes or id(obj._parent) not in self._nodes:
+                return
+
+            self._positions.pop(id(obj._parent), None)
+            self.__update_sizes(obj._parent, self.__register(obj))
+
+    def remove(self, obj, parent):
+        '''Removes obj, just deleted from parent, and its descendants.'''
+        with self._lock:
+            self._positions.pop(id(parent), None)
+            if id(obj) in self._nodes:
+                self.__update_sizes(parent, -self.__unregister(obj))
+
+    def rename(self, obj, new_name):
+        '''Moves an indexed obj to being indexed by new_name.'''
+        key = id(obj)
+        with self._lock:
+            if key not in self._names:
+                return
+
+            old_name = self._names[key]
+            named = self._by_name[old_name]
+            del named[key]
+            if not named:
+                del self._by_name[old_name]
+
+            self._names[key] = new_name
+            self._by_name.setdefault(new_name, dict())[key] = obj
+
+    def __child_position(self, parent, child):
+        '''Returns the position of child in parent, or None if not there.'''
+        positions = self._positions.get(id(parent))
+        if positions is not None:
+            position = positions.get(id(child))
+            # Guard against re-ordering of the children list in-place, e.g.
+            # by sort(), which isn't seen by the index.
+            if position is not None and position < len(parent._children) \
+               and parent._children[position] is child:
+                return position
+
+        positions = dict()
+        for position, sibling in enumerate(parent._children):
+            positions[id(sibling)] = position
+        self._positions[id(parent)] = positions
+
+        return positions.get(id(child))
+
+    def __path_from(self, start, obj, max_depth):
+        '''Returns a tuple of positions leading from start to obj.
+
+        Returns None if obj is not a descendant of start, or if it's deeper
+        than max_depth.
+        '''
+        path = list()
+        node = obj
+        while node is not start:
+            parent = node._parent
+            if parent is None:
+                return None
+
+            position = self.__child_position(parent, node)
+            if position is None:
+                return None
+
+            path.append(position)
+            if max_depth is not None and len(path) > max_depth:
+                return None
+
+            node = parent
+
+        if not path:
+            # obj is start, which isn't one of its own descendants.
+            return None
+
+        path.reverse()
+        return tuple(path)
+
+    def lookup(self, start, name=None, class_type=None, max_depth=None):
+        '''Returns a list of descendants of start that match the criteria.
+
+        The list is in depth-first order, as get_descendants() would return.
+
+        Returns None if the index isn't able to help with this search,
+        because start is not indexed, or if walking the tree would be
+        quicker.
+        '''
+        with self._lock:
+            key = id(start)
+            if key not in self._nodes:
+                return None
+
+            if class_type is None:
+                class_type = DataObjectBase
+
+            if not max_depth:
+                max_depth = None
+
+            if name is not None:
+                buckets = [self._by_name.get(name, dict()),
+                           self._dynamic_names]
+            else:
+                buckets = [classed
+                           for (cls, classed) in self._by_class.iteritems()
+                           if issubclass(cls, class_type)]
+
+            if max_depth == 1:
+                to_walk = len(start._children)
+            else:
+                to_walk = self._sizes[key]
+
+            if sum(len(bucket) for bucket in buckets) >= to_walk:
+                return None
+
+            matches = list()
+            candidates = (obj for bucket in buckets
+                          for obj in bucket.itervalues())
+            for obj in candidates:
+                if not isinstance(obj, class_type):
+                    continue
+                if name is not None and name != obj.name:
+                    continue
+
+                path = self.__path_from(start, obj, max_depth)
+                if path is not None:
+                    matches.append((path, obj))
+
+            matches.sort(key=lambda match: match[0])
+
+            return [obj for (path, obj) in matches]
+
+
+class DataObjectPath(object):
+    '''A path, as used by DataObjectBase.find_path(), compiled for re-use.
+
+    Compiling a path breaks it down, once, into a step for each level of
+    the tree it descends, holding the arguments to pass to
+    iter_descendants() at that level. Class names are resolved to classes
+    the first time that a step is used, and then kept.
+
+    Use DataObjectPath.compile() to get a compiled path, which keeps the
+    CACHE_SIZE most recently used paths, so that repeated searches with
+    the same path skip the parsing and class lookups altogether.
+    '''
+
+    CACHE_SIZE = 256
+
+    # Define regular expressions for matching values in a path specification.
+    __NAME_RE = re.compile("^([^\[\].]+)")
+    __TYPE_RE = re.compile("^.*\[.*@((\w|\.)+)[#?\.]*.*\].*")
+    __COUNT_RE = re.compile("^.*\[.*#(-*\d+).*\].*")
+    __DEPTH_RE = re.compile("^.*\[.*\?(-*\d+).*\].*")
+    __ATTR_RE = re.compile(".*\.(\w+)$")
+
+    # Most recently used compiled paths, keyed by path string.  Each is
+    # held in a link, [previous link, next link, path string, path], of a
+    # circular list running from the least to the most recently used,
+    # which starts and ends at __cache_root.
+    __cache = dict()
+    __cache_root = []
+    __cache_root[:] = [__cache_root, __cache_root, None, None]
+    __cache_lock = threading.Lock()
+
+    def __init__(self, path_string):
+        '''Compiles path_string, raises PathError if it's not valid.'''
+        self.path_string = path_string
+        self._steps = list()
+
+        remaining_path = path_string
+        while remaining_path is not None:
+            # Used to enforce a max_depth if only one '/' specified.
+            max_depth = None
+            if (remaining_path.startswith("//")):
+                # Use descendants
+                tokens = remaining_path.split("/", 3)
+                to_eval = tokens[2]
+                remaining_path = None
+                if (len(tokens) > 3 and tokens[3] != ""):
+                    remaining_path = "/" + tokens[3]
+            elif (remaining_path.startswith("/")):
+                # Use get_children OR max_depth = 1
+                tokens = remaining_path.split("/", 2)
+                to_eval = tokens[1]
+                remaining_path = None
+                if (len(tokens) > 2 and tokens[2] != ""):
+                    remaining_path = "/" + tokens[2]
+                max_depth = 1
+            else:
+                # Raise error
+                raise PathError("Invalid path: '%s'" % (path_string))
+
+            self._steps.append(self.__parse_step(to_eval, max_depth))
+
+    def __repr__(self):
+        return "DataObjectPath(%r)" % (self.path_string)
+
+    @classmethod
+    def compile(cls, path_string):
+        '''Returns a compiled DataObjectPath for path_string.
+
+        Paths are only parsed the first time they are seen, after that
+        the same compiled path is returned from the cache.
+
+        Exceptions:
+
+            PathError       - Raised if invalid path is provided.
+        '''
+        with cls.__cache_lock:
+            root = cls.__cache_root
+            link = cls.__cache.get(path_string)
+            if link is not None:
+                # Take the path out of the list, to add it back at the end.
+                link_prev, link_next, _key, path = link
+                link_prev[1] = link_next
+                link_next[0] = link_prev
+            else:
+                path = cls(path_string)
+                if len(cls.__cache) >= cls.CACHE_SIZE:
+                    # Forget the least recently used path.
+                    oldest = root[1]
+                    oldest[0][1] = oldest[1]
+                    oldest[1][0] = oldest[0]
+                    del cls.__cache[oldest[2]]
+                link = [None, None, path_string, path]
+                cls.__cache[path_string] = link
+
+            # Add the path as the most recently used.
+            last = root[0]
+            link[0] = last
+            link[1] = root
+            last[1] = link
+            root[0] = link
+
+        return path
+
+    @classmethod
+    def clear_cache(cls):
+        '''Forgets all previously compiled paths.'''
+        with cls.__cache_lock:
+            cls.__cache.clear()
+            root = cls.__cache_root
+            root[:] = [root, root, None, None]
+
+    @staticmethod
+    def __parse_step(value_string, max_depth):
+        '''Convert a path element to a step, holding kwargs for the search.
+
+        The class name, if any, is kept as a string in the step until
+        the step is first used, since the module it's in may not have
+        been loaded when the path is compiled.
+        '''
+        args = dict()
+        class_name = None
+        match = DataObjectPath.__NAME_RE.match(value_string)
+        if match:
+            args["name"] = unquote(match.group(1))
+        match = DataObjectPath.__TYPE_RE.match(value_string)
+        if match:
+            class_name = unquote(match.group(1))
+        elif "name" not in args:
+            # If neither specified assume DataObjectBase for the class_type
+            args["class_type"] = DataObjectBase
+
+        match = DataObjectPath.__COUNT_RE.match(value_string)
+        if match:
+            args["max_count"] = int(unquote(match.group(1)))
+        match = DataObjectPath.__DEPTH_RE.match(value_string)
+        if match:
+            args["max_depth"] = int(unquote(match.group(1)))
+
+        # Enforce a max_depth is we set one ourselves.
+        if max_depth is not None:
+            args["max_depth"] = max_depth
+
+        # Keep attribute apart since it's not a valid parameter
+        # to get_descendants
+        attribute = None
+        match = DataObjectPath.__ATTR_RE.match(value_string)
+        if match:
+            attribute = unquote(match.group(1))
+
+        return {"kwargs": args, "class_name": class_name,
+                "attribute": attribute}
+
+    @staticmethod
+    def __locate_class_by_name(class_name):
+        '''Locates a class by name, using modules already loaded
+
+        The class_name should in general be fully-qualified, i.e. it should be
+        using something like:
+
+            package.module.Class
+
+        but, we will assume that an un-qualified class name is part of this
+        module to allow for short-hand.
+        '''
+
+        # Do we have a fully-qualifed class-name - containing dots
+        mod_name = None
+        class_not_qualified = False
+        mods = class_name.split(".")
+        if len(mods) > 1:
+            mod_name = ".".join(mods[:-1])
+            class_name_only = mods[-1:][0]
+        else:
+            # Assume it's relative to own module, for now.
+            mod_name = DataObjectBase.__module__
+            class_name_only = class_name
+            class_not_qualified = True
+
+        try:
+            mod = sys.modules[mod_name]
+        except KeyError:
+            raise PathError("Invalid module name: %s" %
+                (mod_name))
+
+        if hasattr(mod, class_name_only):
+            class_obj = getattr(mod, class_name_only)
+        else:
+            if class_not_qualified:
+                # Don't confuse user with reference to module
+                # they didn't provide
+                raise PathError("Invalid non-qualified class name: %s" %
+                    (class_name))
+            else:
+                raise PathError("No such class %s in module %s" %
+                    (class_name_only, mod_name))
+
+        return(class_obj)
+
+    def find(self, data_object, not_found_is_err=False):
+        '''Fetches the objects matching this path, relative to data_object.
+
+        See DataObjectBase.find_path() for the meaning of the path, the
+        values returned and exceptions raised.
+        '''
+        matched = self.__find_from(data_object, 0)
+
+        if len(matched) == 0 and not_found_is_err:
+            raise ObjectNotFoundError("No children found matching : '%s'" %
+                (self.path_string))
+
+        return matched
+
+    def __find_from(self, data_object, step_number):
+        '''Returns matches for steps from step_number on, under data_object.
+
+        Errors for a step are only raised if the search gets as far as
+        that step, as would happen if the path was parsed level by level.
+        '''
+        step = self._steps[step_number]
+
+        if step["class_name"] is not None:
+            step["kwargs"]["class_type"] = \
+                DataObjectPath.__locate_class_by_name(step["class_name"])
+            step["class_name"] = None
+
+        attribute = step["attribute"]
+        if attribute is not None and attribute.startswith("_"):
+            raise AttributeError("Invalid attribute: '%s'" % (attribute))
+
+        children = data_object.iter_descendants(**step["kwargs"])
+        if step_number + 1 < len(self._steps):
+            # Keep descending, don't include intermediate matches.
+            matched = list()
+            for child in children:
+                matched.extend(self.__find_from(child, step_number + 1))
+        else:
+            # As deep as possible, return these children.
+            matched = list(children)
+
+        if attribute is not None:
+            attr_values = list()
+            for match in matched:
+                # getattr() will generate AttributeErrors if invalid attribute.
+                attr_values.append(getattr(match, attribute))
+            return attr_values
+        else:
+            return matched
+
+
+def _get_slot_attrs(cls):
+    '''Returns a tuple of the names of the attributes kept in the slots
+    declared by cls and its base classes, other than __dict__ and
+    __weakref__.
+    '''
+    attrs = _SLOT_ATTRS.get(cls)
+    if attrs is None:
+        attrs = list()
+        for klass in reversed(cls.__mro__):
+            slots = klass.__dict__.get("__slots__", ())
+            if isinstance(slots, basestring):
+                slots = (slots,)
+            for attr in slots:
+                if attr in ("__dict__", "__weakref__"):
+                    continue
+                if attr.startswith("__") and not attr.endswith("__"):
+                    # Private names are mangled, as for any attribute.
+                    attr = "_%s%s" % (klass.__name__.lstrip("_"), attr)
+                attrs.append(attr)
+        attrs = tuple(attrs)
+        _SLOT_ATTRS[cls] = attrs
+    return attrs
+
+
+def _get_slot(obj, attr, default=None):
+    '''Returns the value of attribute attr of obj, or default if it hasn't
+    been set yet. Unlike getattr(), any __getattr__() method of obj isn't
+    called, since it may rely on obj being initialized.
+    '''
+    try:
+        return object.__getattribute__(obj, attr)
+    except AttributeError:
+        return default
+
+
 class DataObjectBase(object):
     '''Core abstract base class for the Data Object Cache contents.
 
@@ -83,15 +629,31 @@ class DataObjectBase(object):
         the tree.
     - the XML import/export mechanism.
     - path-based searching.
+
+    The attributes every object has are kept in slots, rather than in the
+    object's dictionary, to reduce the memory used by large trees. A
+    sub-class which doesn't declare slots has a dictionary for its own
+    attributes, as usual. Sub-classes with many instances may instead
+    declare slots for all of their attributes, and then have no
+    dictionary, unless they include "__dict__" in their slots. Objects are
+    pickled with all of their attributes in a single dictionary, whether
+    kept in slots or not.
+
+    Setting an attribute, or inserting or deleting children, marks the
+    object and those above it as changed, for delta snapshots of the
+    DataObjectCache to only pickle the sub-trees that have changed. An
+    attribute changed in place, such as a list appended to, isn't seen, so
+    mark_changed() should be called after such a change.
     '''
     __metaclass__ = ABCMeta
 
-    # Define regular expressions for matching values in a path specification.
-    __NAME_RE = re.compile("^([^\[\].]+)")
-    __TYPE_RE = re.compile("^.*\[.*@((\w|\.)+)[#?\.]*.*\].*")
-    __COUNT_RE = re.compile("^.*\[.*#(-*\d+).*\].*")
-    __DEPTH_RE = re.compile("^.*\[.*\?(-*\d+).*\].*")
-    __ATTR_RE = re.compile(".*\.(\w+)$")
+    __slots__ = ("__name", "_parent", "_children", "__changed", "_index",
+                 "generates_xml_for_children", "__weakref__")
+
+    # Attributes set without changing the object, as a snapshot sees it.
+    # Inserting and deleting children mark the objects they change.
+    __UNCHANGING_ATTRS = frozenset(["_parent", "_children", "_index",
+                                    "_DataObjectBase__changed"])
 
     # Define regular expression for extracting paths from strings.
     __STRING_REPLACEMENT_RE = re.compile("%{([^}]+)}")
@@ -99,6 +661,11 @@ class DataObjectBase(object):
     # Reference for Install Logger
     __logger = None
 
+    # Tags of the XML Elements that can_handle() may return True for, used
+    # by the DataObjectCache to only try this class on Elements with one of
+    # these tags. None means it is tried on every Element.
+    XML_TAGS = None
+
     def __init__(self, name):
         self._name = name
         self._parent = None
@@ -107,7 +674,7 @@ class DataObjectBase(object):
 
         # instead of simple list, _children could be a
         # MutatableSequence sub-class
-        self._children = []
+        self._children = _NO_CHILDREN
 
     @classmethod
     def get_logger(cls):
@@ -133,6 +700,60 @@ class DataObjectBase(object):
         '''
         return DataObjectBase.get_logger()
 
+    # The name is kept in the __name slot, and pickled as '_name', as it
+    # always has been, but changes to it are passed on to any index on the
+    # tree.
+    def __set_name_value(self, name):
+        '''Stores the name, and updates the tree's index, if there is one'''
+        old_name = _get_slot(self, "_DataObjectBase__name")
+        self.__name = name
+        # Objects still being initialized, without _parent set, can't be in
+        # an index yet.
+        initialized = _get_slot(self, "_parent", self) is not self
+        if old_name != name and initialized:
+            index = self._get_index()
+            if index is not None:
+                index.rename(self, name)
+
+    _name = property(attrgetter("_DataObjectBase__name"), __set_name_value)
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name not in DataObjectBase.__UNCHANGING_ATTRS:
+            self.mark_changed()
+
+    def mark_changed(self):
+        '''Marks this object, and those above it, as changed since the last
+        delta snapshot of the DataObjectCache it's in.
+
+        This is done when an attribute is set, or children are inserted or
+        deleted, but needs to be called after changing an attribute in place.
+        '''
+        obj = self
+        # Objects above one already marked are marked too.
+        while obj is not None and \
+              not _get_slot(obj, "_DataObjectBase__changed", False):
+            object.__setattr__(obj, "_DataObjectBase__changed", True)
+            obj = _get_slot(obj, "_parent")
+
+    @property
+    def changed(self):
+        '''Returns True if this object, or one below it, has changed since
+        the last delta snapshot of the DataObjectCache it's in.
+        '''
+        return _get_slot(self, "_DataObjectBase__changed", False)
+
+    def _clear_changed(self):
+        '''Clears the marks of this object, and those below it, once a delta
+        snapshot has been taken. Only the objects marked are visited.
+        '''
+        pending = [self]
+        while pending:
+            obj = pending.pop()
+            if _get_slot(obj, "_DataObjectBase__changed", False):
+                object.__setattr__(obj, "_DataObjectBase__changed", False)
+                pending.extend(obj._children)
+
     # Abstract class methods.
     # These methods must be implemented by DataObject sub-classes or an
     # Exception will be raised when they are instantiated.
@@ -195,9 +816,23 @@ class DataObjectBase(object):
 
         False   - Returned if this XML Element cannot be handled by this
                   class.
+
+        Classes that only handle Elements with particular tags should list
+        them in XML_TAGS, or return them from get_xml_tags(), so that the
+        DataObjectCache doesn't call this method for any other Elements.
         '''
         return False
 
+    @classmethod
+    def get_xml_tags(cls):
+        '''
+        Returns the tags of the XML Elements that can_handle() may return
+        True for, or None if it might return True for any Element.
+
+        The default is to return XML_TAGS.
+        '''
+        return cls.XML_TAGS
+
     @classmethod
     @abstractmethod
     def from_xml(cls, xml_node):
@@ -258,6 +893,57 @@ class DataObjectBase(object):
         '''Returns True if the class has any children, False otherwise.'''
         return (len(self._children) > 0)
 
+    # Methods for maintaining an index on a tree, to speed up searches.
+    def enable_index(self):
+        '''Enables an index on the tree of objects under this object.
+
+        This object should be the root of the tree, i.e. have no parent.
+
+        Once enabled, searches using get_descendants(), and so find_path(),
+        anywhere in the tree are done using a lookup by name or class in the
+        index, rather than walking the tree. The results are the same, and
+        in the same order, as they would be without the index.
+
+        Exceptions:
+
+            ValueError
+                Thrown if this object is not the root of a tree.
+        '''
+        if self._parent is not None:
+            raise ValueError("An index may only be enabled on the root "
+                             "of a tree, '%s' has a parent" % (self.name))
+
+        # The _index slot is only set on the root of a tree with an index.
+        if _get_slot(self, "_index") is None:
+            self._index = DataObjectIndex(self)
+
+    def disable_index(self):
+        '''Disables any index enabled on this object using enable_index().'''
+        if _get_slot(self, "_index") is not None:
+            del self._index
+
+    @property
+    def indexed(self):
+        '''Returns True if the tree this object is in has an index.'''
+        index = self._get_index()
+        return index is not None and self in index
+
+    def _get_index(self):
+        '''THIS IS A PRIVATE METHOD
+
+        Returns the DataObjectIndex for the tree this object is in, or None
+        if the tree has no index enabled.
+        '''
+        root_object = self
+        while root_object._parent is not None:
+            if root_object._parent is root_object:
+                # An object inserted as its own child isn't in any tree
+                # that could have an index.
+                return None
+            root_object = root_object._parent
+
+        return _get_slot(root_object, "_index")
+
     # Methods for searching the cache, we provide 3 variants:
     #
     # - get_children:       returns a list of direct children matching
@@ -305,6 +991,8 @@ class DataObjectBase(object):
         # Special case request for all children.
         if name is None and class_type is None:
             if max_count is None:
+                if self._children is _NO_CHILDREN:
+                    return list()
                 return copy.copy(self._children)
 
         # If no class_type given, assume DataObjectBase, otherwise
@@ -347,13 +1035,11 @@ class DataObjectBase(object):
             else:
                 return None
 
-        try:
-            child_list = self.get_descendants(name=name,
-                class_type=class_type, max_depth=1, max_count=1,
-                not_found_is_err=True)
-            return child_list[0]
-        except ObjectNotFoundError:
-            return None
+        for child in self.iter_descendants(name=name,
+            class_type=class_type, max_depth=1, max_count=1):
+            return child
+
+        return None
 
     def get_descendants(self, name=None, class_type=None, max_depth=None,
                         max_count=None, not_found_is_err=False):
@@ -405,6 +1091,38 @@ class DataObjectBase(object):
 
         '''
 
+        new_list = list(self.iter_descendants(name=name,
+            class_type=class_type, max_depth=max_depth, max_count=max_count))
+
+        if len(new_list) == 0 and not_found_is_err:
+            if class_type is None:
+                class_type = DataObjectBase
+            raise ObjectNotFoundError(\
+                "No matching objects found: name = '%s' "
+                "and class_type = %s" %
+                (str(name), str(class_type)))
+
+        return new_list
+
+    def iter_descendants(self, name=None, class_type=None, max_depth=None,
+                         max_count=None):
+        '''Returns an iterator over descendents that match the criteria.
+
+        This is the lazy equivalent of get_descendants(), taking the same
+        criteria, and yielding the same objects in the same depth-first
+        order, but one at a time as they are found. The tree is only
+        searched as far as is needed to yield the objects consumed, so
+        it's the better choice when only the first few matches are used.
+
+        The tree should not be modified while the iterator is in use.
+
+        Exceptions:
+
+            ValueError
+                Thrown if both of the name or class_type are not specified,
+                or if an invalid value is specified.
+        '''
+
         if max_depth is not None and max_depth < 0:
             raise ValueError(
                 "max_depth should be greater than or equal to 0, got %d" %
@@ -424,52 +1142,50 @@ class DataObjectBase(object):
         if class_type is None:
             class_type = DataObjectBase
 
-        new_list = list()
-        new_max_count = None
-        for child in self._children:
-            if max_count is not None:
-                new_max_count = max_count - len(new_list)
-                if new_max_count < 1:
-                    # Reached limit, stop now.
-                    break
+        # A max_depth of 0 means the depth is not limited.
+        if not max_depth:
+            max_depth = None
 
-            # Look for matches to criteria
-            if isinstance(child, class_type):
-                if name is None or name == child.name:
-                    new_list.append(child)
-                    # Double check max_count after adding to the list.
-                    if max_count is not None:
-                        if len(new_list) >= max_count:
-                            break
-                        else:
-                            new_max_count -= 1
-
-            # Now search children's children, using recursion...
-            if child.has_children:
-                new_max_depth = None
-                if max_depth is not None:
-                    if max_depth > 1:
-                        new_max_depth = max_depth - 1
-                    elif max_depth == 1:
-                        # Don't go any deeper than current child level.
-                        continue
-
-                try:
-                    children_list = child.get_descendants(name=name,
-                        class_type=class_type, max_depth=new_max_depth,
-                        max_count=new_max_count)
-                    new_list.extend(children_list)
-                except ObjectNotFoundError:
-                    # Don't throw here, will throw later if still none found.
-                    pass
+        found = None
+        index = self._get_index()
+        if index is not None:
+            found = index.lookup(self, name=name, class_type=class_type,
+                max_depth=max_depth)
 
-        if len(new_list) == 0 and not_found_is_err:
-            raise ObjectNotFoundError(\
-                "No matching objects found: name = '%s' "
-                "and class_type = %s" %
-                (str(name), str(class_type)))
+        if found is None:
+            found = self.__walk_descendants(name, class_type, max_depth)
 
-        return new_list
+        if max_count is not None:
+            found = islice(found, max_count)
+
+        return iter(found)
+
+    def __walk_descendants(self, name, class_type, max_depth):
+        '''THIS IS A PRIVATE METHOD
+
+        Generator that walks the tree for iter_descendants(), yielding the
+        matching descendants in depth-first order.
+
+        Rather than recursing, keeps a stack of iterators over the children
+        of each object on the way down to the current one.
+        '''
+        stack = [iter(self._children)]
+        while stack:
+            for child in stack[-1]:
+                # Look for matches to criteria
+                if isinstance(child, class_type):
+                    if name is None or name == child.name:
+                        yield child
+
+                # Now search children's children, unless that would take us
+                # deeper than max_depth.
+                if child.has_children and \
+                   (max_depth is None or len(stack) < max_depth):
+                    stack.append(iter(child._children))
+                    break
+            else:
+                # No more children at this level, go back up.
+                stack.pop()
 
     @staticmethod
     def _check_object_type(obj):
@@ -489,21 +1205,58 @@ class DataObjectBase(object):
 
     # Methods for cloning / duplication objects
     def __getstate__(self):
-        '''Provide a copy of the internal dictionary to be used in deepcopy'''
-        # Take a copy of the internal dictionary using constructor
-        state = dict(self.__dict__)
+        '''Provide a copy of the internal dictionary to be used in deepcopy
+
+        The dictionary includes the attributes kept in slots, so it is the
+        same as it was before slots were used, and snapshots can be loaded
+        whether or not the classes in them use slots.
+        '''
+        # Take a copy of the internal dictionary, if there is one, using
+        # constructor
+        obj_dict = _get_slot(self, "__dict__")
+        state = dict(obj_dict or ())
+        if obj_dict is not None and not state:
+            # Don't keep the empty dictionary created by looking at it.
+            del self.__dict__
+        for attr in _get_slot_attrs(self.__class__):
+            try:
+                state[attr] = getattr(self, attr)
+            except AttributeError:
+                # Slots are only set if the attribute has been.
+                pass
+        if "_DataObjectBase__name" in state:
+            state["_name"] = state.pop("_DataObjectBase__name")
+        # Whether it has changed is only known to this tree.
+        state.pop("_DataObjectBase__changed", None)
+        if state.get('_children') is _NO_CHILDREN:
+            state['_children'] = list()
         # Ensure that copy doesn't have a parent to avoid recusion up tree.
         state['_parent'] = None
+        # An index refers to the objects in this tree, not those in the copy.
+        state.pop('_index', None)
         return state
 
     def __setstate__(self, state):
         '''Set the internal dictionary to construct new copy for deepcopy()'''
-        self.__dict__ = state
+        self.__set_attrs(state)
         # Since we removed the parent refs in __getstate__ we need to restore
         # them to our children, which are copies when using deepcopy().
         for child in self._children:
             child._parent = self
 
+    def __set_attrs(self, state):
+        '''THIS IS A PRIVATE METHOD
+
+        Sets the attributes in state, as returned by __getstate__(), in
+        slots or the object's dictionary.
+        '''
+        for (attr, value) in state.iteritems():
+            object.__setattr__(self, attr, value)
+        if type(self._children) is list and not self._children:
+            object.__setattr__(self, "_children", _NO_CHILDREN)
+        # Setting the name marks the object, but it's not changed yet.
+        object.__setattr__(self, "_DataObjectBase__changed", False)
+
     def __copy__(self):
         '''Create a copy of ourselves for use by copy.copy()
 
@@ -517,11 +1270,12 @@ class DataObjectBase(object):
 
         # Construct a new class to match self
         new_copy = self.__class__.__new__(self.__class__)
-        # Set the dictionary.
-        new_copy.__dict__.update(self.__dict__)
+        # Set the attributes, without the index, which refers to the
+        # objects in this tree.
+        new_copy.__set_attrs(DataObjectBase.__getstate__(self))
         # Clear the parent and children since we want to omit them.
         new_copy._parent = None
-        new_copy._children = []
+        new_copy._children = _NO_CHILDREN
 
         return new_copy
 
@@ -702,71 +1456,8 @@ class DataObjectBase(object):
 
         '''
 
-        # Used to enforce a max_depth if only one '/' specified.
-        max_depth = None
-        # Tokenize string specific to this level, will call recursively.
-        matched = list()
-        remaining_path = None
-        if (path_string.startswith("//")):
-            # Use descendants
-            tokens = path_string.split("/", 3)
-            to_eval = tokens[2]
-            if (len(tokens) > 3 and tokens[3] != ""):
-                remaining_path = "/" + tokens[3]
-        elif (path_string.startswith("/")):
-            # Use get_children OR max_depth = 1
-            tokens = path_string.split("/", 2)
-            to_eval = tokens[1]
-            if (len(tokens) > 2 and tokens[2] != ""):
-                remaining_path = "/" + tokens[2]
-            max_depth = 1
-        else:
-            # Raise error
-            raise PathError("Invalid path: '%s'" % (path_string))
-
-        kwargs = self.__convert_to_kwargs(to_eval)
-
-        # Remove attribute if found since it's not a valid parameter
-        # to get_descendants
-        attribute = None
-        if "attribute" in kwargs:
-            attribute = kwargs["attribute"]
-            del kwargs["attribute"]
-
-            if attribute.startswith("_"):
-                raise AttributeError("Invalid attribute: '%s'" % (attribute))
-
-        # Enforce a max_depth is we set one ourselves.
-        if max_depth is not None:
-            kwargs["max_depth"] = max_depth
-
-        children = self.get_descendants(**kwargs)
-        if remaining_path is not None:
-             # Keep descending, don't include intermediate matches.
-            child_matched = list()
-            for child in children:
-                try:
-                    child_list = child.find_path(remaining_path)
-                    child_matched.extend(child_list)
-                except ObjectNotFoundError:
-                    pass
-            matched.extend(child_matched)
-        else:
-            # As deep as possible, return these children.:
-            matched.extend(children)
-
-        if len(matched) == 0 and not_found_is_err:
-            raise ObjectNotFoundError("No children found matching : '%s'" %
-                (path_string))
-
-        if attribute is not None:
-            attr_values = list()
-            for match in matched:
-                # getattr() will generate AttributeErrors if invalid attribute.
-                attr_values.append(getattr(match, attribute))
-            return attr_values
-        else:
-            return matched
+        return DataObjectPath.compile(path_string).find(self,
+            not_found_is_err=not_found_is_err)
 
     def str_replace_paths_refs(self, orig_string, value_separator=",",
                                quote=False):
@@ -826,80 +1517,6 @@ class DataObjectBase(object):
 
         return new_string
 
-    @staticmethod
-    def __locate_class_by_name(class_name):
-        '''Locates a class by name, using modules already loaded
-
-        The class_name should in general be fully-qualified, i.e. it should be
-        using something like:
-
-            package.module.Class
-
-        but, we will assume that an un-qualified class name is part of this
-        module to allow for short-hand.
-        '''
-
-        # Do we have a fully-qualifed class-name - containing dots
-        mod_name = None
-        class_not_qualified = False
-        mods = class_name.split(".")
-        if len(mods) > 1:
-            mod_name = ".".join(mods[:-1])
-            class_name_only = mods[-1:][0]
-        else:
-            # Assume it's relative to own module, for now.
-            mod_name = DataObjectBase.__module__
-            class_name_only = class_name
-            class_not_qualified = True
-
-        try:
-            mod = sys.modules[mod_name]
-        except KeyError:
-            raise PathError("Invalid module name: %s" %
-                (mod_name))
-
-        if hasattr(mod, class_name_only):
-            class_obj = getattr(mod, class_name_only)
-        else:
-            if class_not_qualified:
-                # Don't confuse user with reference to module
-                # they didn't provide
-                raise PathError("Invalid non-qualified class name: %s" %
-                    (class_name))
-            else:
-                raise PathError("No such class %s in module %s" %
-                    (class_name_only, mod_name))
-
-        return(class_obj)
-
-    @staticmethod
-    def __convert_to_kwargs(value_string):
-        '''Convert a path element to a series of kwargs for get_descendants'''
-        args = dict()
-        match = DataObjectBase.__NAME_RE.match(value_string)
-        if match:
-            args["name"] = unquote(match.group(1))
-        match = DataObjectBase.__TYPE_RE.match(value_string)
-        if match:
-            args["class_type"] = \
-                DataObjectBase.__locate_class_by_name(unquote(match.group(1)))
-
-        # If neither specified assume DataObjectBase for the class_type
-        if "name" not in args and "class_type" not in args:
-            args["class_type"] = DataObjectBase
-
-        match = DataObjectBase.__COUNT_RE.match(value_string)
-        if match:
-            args["max_count"] = int(unquote(match.group(1)))
-        match = DataObjectBase.__DEPTH_RE.match(value_string)
-        if match:
-            args["max_depth"] = int(unquote(match.group(1)))
-        match = DataObjectBase.__ATTR_RE.match(value_string)
-        if match:
-            args["attribute"] = unquote(match.group(1))
-
-        return args
-
 
 class DataObject(DataObjectBase):
     '''A variant of DataObjectBase which allows insertion and deletion.
@@ -908,6 +1525,8 @@ class DataObject(DataObjectBase):
     an object for insertion in to the Data Object Cache.
     '''
 
+    __slots__ = ()
+
     # Methods for adding objects to the cache and deleting them from it.
     def insert_children(self, new_children, before=None, after=None):
         '''Inserts new_children into the list of children.
@@ -969,14 +1588,23 @@ class DataObject(DataObjectBase):
             # Single instance of DataObject, and put it in a list.
             new_children = [new_children]
 
+        index = self._get_index()
+
+        if self._children is _NO_CHILDREN:
+            self._children = list()
+
         # Check for iterator support on object, raises exception if not
         offset = 0
         for child in new_children:
             self._check_object_type(child)
             self._children.insert(insert_at + offset, child)
             child._parent = self
+            if index is not None:
+                index.add(child)
             offset += 1
 
+        self.mark_changed()
+
     def __delete_child(self, child, not_found_is_err=False):
         '''THIS IS A PRIVATE CLASS METHOD
 
@@ -990,6 +1618,10 @@ class DataObject(DataObjectBase):
         try:
             self._children.remove(child)
             child._parent = None
+            self.mark_changed()
+            index = self._get_index()
+            if index is not None:
+                index.remove(child, self)
         except ValueError:
             if not_found_is_err:
                 raise ObjectNotFoundError(
@@ -1085,3 +1717,7 @@ class DataObject(DataObjectBase):
 
         if self._parent is not None:
             self._parent._children.remove(self)
+            self._parent.mark_changed()
+            index = self._parent._get_index()
+            if index is not None:
+                index.remove(self, self._parent)
@@ -21,13 +21,15 @@
 #
 
 #
-# Copyright (c) 2010, Oracle and/or its affiliates. All rights reserved.
+# Copyright (c) 2010, 2012, Oracle and/or its affiliates. All rights reserved.
 #
 """Mechanism for providing a central store of in-memory data in the installer.
 """
 
 import inspect
+import os
 import pickle
+import uuid
 
 from lxml import etree
 
@@ -39,6 +41,83 @@ from solaris_install.data_object import \
 # classes at that priority level.
 _CACHE_CLASS_REGISTRY = dict()
 
+# Index of the registered classes to try for each XML Element tag, built on
+# demand by find_class_to_handle(). A tuple of the registry it was built from
+# and a dictionary, with keys being tags, and values being a tuple of the
+# classes that might handle them, in the order they're checked.
+_CACHE_DISPATCH = (None, dict())
+
+# Identifies a delta snapshot, the first thing stored in one is a dictionary
+# with the 'format' key set to this value.
+SNAPSHOT_JOURNAL_FORMAT = "DataObjectCache snapshot journal"
+SNAPSHOT_JOURNAL_VERSION = 1
+
+
+class SnapshotJournal(object):
+    '''Tracks changes to the 'persistent' sub-tree for delta snapshots.
+
+    Each child of the 'persistent' sub-tree is a unit of the journal, and is
+    given a key the first time it's written to a snapshot. A delta snapshot
+    only writes the units that have changed since the previous snapshot,
+    and refers to that snapshot, its base, for the others. A complete
+    snapshot writes all of the units, and has no base.
+
+    A unit has changed if it, or an object below it, has been marked as
+    changed (see DataObjectBase.mark_changed()) since the previous snapshot.
+    Only the units that have changed are pickled, and the marks are cleared
+    once the snapshot is taken.
+
+    Every MAX_CHAIN_LENGTH-th snapshot is a complete one, to limit the
+    number of files read when loading a snapshot.
+    '''
+
+    MAX_CHAIN_LENGTH = 10
+
+    def __init__(self):
+        '''Initialization function for SnapshotJournal class.'''
+        self.reset()
+
+    def reset(self, chain=None, units=None, length=0):
+        '''Records the units of a snapshot that was just taken or loaded.
+
+        chain   - list of (path, id) of that snapshot and the bases of it
+                  that were read, or None if it's not a delta snapshot.
+
+        units   - dictionary of the units in the snapshot, keyed by key.
+
+        length  - number of delta snapshots in the chain.
+        '''
+        self.chain = chain or list()
+        self.length = length
+        self._keys = dict()
+        if units is not None:
+            for (key, unit) in units.iteritems():
+                self._keys[id(unit)] = (key, unit)
+
+    def get_base(self, path):
+        '''Returns the (path, id) of the base for a snapshot to path.
+
+        Returns None if the next snapshot should be a complete one.
+        '''
+        if path is None or not self.chain or self.chain[0][0] is None:
+            return None
+
+        if self.length >= SnapshotJournal.MAX_CHAIN_LENGTH:
+            return None
+
+        # Never overwrite a snapshot that the new one would be based on.
+        if path in [base_path for (base_path, base_id) in self.chain]:
+            return None
+
+        return self.chain[0]
+
+    def get_key(self, unit):
+        '''Returns the key of a unit, or None if it's not been seen.'''
+        entry = self._keys.get(id(unit))
+        if entry is None:
+            return None
+        return entry[0]
+
 
 class DataObjectCacheChild(DataObject):
     '''Object to represent the sub-trees of the DataObjectCache
@@ -46,6 +125,8 @@ class DataObjectCacheChild(DataObject):
     Doesn't generate any XML or import any XML it-self.
     '''
 
+    XML_TAGS = ()
+
     def __init__(self, name):
         '''Initialization function for DataObjectCacheChild class.'''
         super(DataObjectCacheChild, self).__init__(name)
@@ -132,6 +213,12 @@ class DataObjectCache(DataObjectBase):
         self._persistent_tree._parent = self
         self._volatile_tree._parent = self
 
+        # Index the cache, since it's searched a lot by checkpoints.
+        self.enable_index()
+
+        # Only created once a delta snapshot is taken.
+        self._journal = None
+
     @property
     def persistent(self):
         '''Returns the persistent tree child_node'''
@@ -168,12 +255,23 @@ class DataObjectCache(DataObjectBase):
         return not self._persistent_tree.has_children and \
                 not self._volatile_tree.has_children
 
-    def take_snapshot(self, file_obj):
+    def take_snapshot(self, file_obj, delta=False):
         '''Takes a snapshot of the 'persistent' sub-tree.
 
         This method writes the contents of the 'persistent' sub-tree to the
         destination provided by 'file_obj'.
 
+        If 'delta' is True, then the snapshot is written as a journal, which
+        only contains the children of the 'persistent' sub-tree that have
+        changed since the previous delta snapshot was taken, or loaded, and
+        refers to that snapshot for the others. Changes are tracked from the
+        first delta snapshot, which is written in full. A snapshot written
+        to 'file_obj' other than a path is always written in full.
+
+        Only the children that have changed are pickled, so an attribute
+        changed in place has to be followed by a call to mark_changed() for
+        the change to be written.
+
         'file_obj' may be one of the following:
 
         a string    - this is used as the path of a file to open for writing.
@@ -205,11 +303,131 @@ class DataObjectCache(DataObjectBase):
             raise ValueError("'file_obj' should be either a file path string \
                                or object with write(string) method")
 
-        pickle.dump(self._persistent_tree, outfile)
+        if delta:
+            if close_at_end:
+                path = os.path.abspath(file_obj)
+            else:
+                path = None
+            self.__write_journal(outfile, path)
+        else:
+            pickle.dump(self._persistent_tree, outfile)
 
         if close_at_end:
             outfile.close()
 
+    def __write_journal(self, outfile, path):
+        '''Writes a delta snapshot to outfile, path is None for a non-file'''
+        if self._journal is None:
+            # Start tracking changes from now, so this will be complete.
+            self._journal = SnapshotJournal()
+
+        snapshot_id = uuid.uuid4().hex
+        base = self._journal.get_base(path)
+        if base is None:
+            length = 0
+        else:
+            length = self._journal.length + 1
+
+        keys = list()
+        units = dict()
+        records = list()
+        for (number, unit) in enumerate(self._persistent_tree.children):
+            key = self._journal.get_key(unit)
+            if key is None:
+                key = "%s-%d" % (snapshot_id, number)
+                write_unit = True
+            else:
+                write_unit = base is None or unit.changed
+
+            keys.append(key)
+            units[key] = unit
+            if write_unit:
+                records.append((key,
+                                pickle.dumps(unit, pickle.HIGHEST_PROTOCOL)))
+
+        header = {"format": SNAPSHOT_JOURNAL_FORMAT,
+                  "version": SNAPSHOT_JOURNAL_VERSION,
+                  "id": snapshot_id,
+                  "base": base,
+                  "length": length,
+                  "units": keys}
+        pickle.dump(header, outfile, pickle.HIGHEST_PROTOCOL)
+        for record in records:
+            pickle.dump(record, outfile, pickle.HIGHEST_PROTOCOL)
+
+        for unit in self._persistent_tree.children:
+            unit._clear_changed()
+
+        if base is None:
+            chain = [(path, snapshot_id)]
+        else:
+            chain = [(path, snapshot_id)] + self._journal.chain
+        self._journal.reset(chain, units, length)
+
+    @staticmethod
+    def __read_journal_records(infile, needed, found):
+        '''Reads units in needed, not already found, from infile to found'''
+        while True:
+            try:
+                (key, data) = pickle.load(infile)
+            except EOFError:
+                break
+
+            if key in needed and key not in found:
+                found[key] = data
+
+    @staticmethod
+    def __is_journal(header):
+        '''Returns True if header is the start of a delta snapshot'''
+        return isinstance(header, dict) and \
+            header.get("format") == SNAPSHOT_JOURNAL_FORMAT
+
+    def __read_journal(self, header, infile, path):
+        '''Reads the units of a delta snapshot, and its bases as needed.
+
+        Returns a list of the units, in order, and the chain of snapshots
+        read to get them.
+        '''
+        if header["version"] > SNAPSHOT_JOURNAL_VERSION:
+            raise IOError("Unsupported snapshot journal version %d" %
+                          (header["version"]))
+
+        needed = set(header["units"])
+        found = dict()
+        chain = [(path, header["id"])]
+        DataObjectCache.__read_journal_records(infile, needed, found)
+
+        base = header["base"]
+        while base is not None and len(found) < len(needed):
+            (base_path, base_id) = base
+            if not os.path.exists(base_path) and path is not None:
+                # The snapshots may have been moved together, e.g. by
+                # mounting a dataset elsewhere.
+                base_path = os.path.join(os.path.dirname(path),
+                                         os.path.basename(base_path))
+
+            with open(base_path, "rb") as base_file:
+                base_header = pickle.load(base_file)
+                if not DataObjectCache.__is_journal(base_header) or \
+                   base_header["id"] != base_id:
+                    raise IOError("Snapshot '%s' has been replaced since "
+                                  "the snapshot based on it was taken" %
+                                  (base_path))
+                DataObjectCache.__read_journal_records(base_file, needed,
+                                                       found)
+
+            chain.append((base_path, base_id))
+            base = base_header["base"]
+
+        missing = needed.difference(found)
+        if missing:
+            raise IOError("Snapshot is missing %d objects from its bases" %
+                          (len(missing)))
+
+        units = [pickle.loads(found[key]) for key in header["units"]]
+
+        return (units, chain)
+
     def load_from_snapshot(self, file_obj):
         '''Load a snapshot in to the 'persistent' sub-tree.
 
@@ -236,8 +454,13 @@ class DataObjectCache(DataObjectBase):
                       'file_obj'
 
         IOError     - This will be thrown if there is a problem opening the
-                      specified file_obj path string.
+                      specified file_obj path string, or if it's a delta
+                      snapshot and the snapshots it's based on can't be read.
 
+        Both complete snapshots, and delta snapshots taken with 'delta' set
+        to True, can be loaded. A delta snapshot is loaded by reading the
+        snapshots it is based on too, as needed, which are expected to be
+        where they were when it was taken, or in the same directory as it.
         '''
 
         close_at_end = False
@@ -253,14 +476,34 @@ class DataObjectCache(DataObjectBase):
             raise ValueError("'file_obj' should be either a file path string \
                                or object with read and readline methods")
 
-        new_cache_peristent_tree = pickle.load(infile)
-
         if close_at_end:
-            infile.close()
+            path = os.path.abspath(file_obj)
+        else:
+            path = None
+
+        chain = None
+        try:
+            new_cache_peristent_tree = pickle.load(infile)
+            if DataObjectCache.__is_journal(new_cache_peristent_tree):
+                header = new_cache_peristent_tree
+                (new_children, chain) = self.__read_journal(header, infile,
+                                                            path)
+            else:
+                new_children = new_cache_peristent_tree.children
+        finally:
+            if close_at_end:
+                infile.close()
 
         self._persistent_tree.delete_children()
-        self._persistent_tree.insert_children(
-            new_cache_peristent_tree.children)
+        self._persistent_tree.insert_children(new_children)
+
+        if self._journal is not None:
+            if chain is None:
+                # Not a delta snapshot, so the next delta will be complete.
+                self._journal.reset()
+            else:
+                units = dict(zip(header["units"], new_children))
+                self._journal.reset(chain, units, header["length"])
 
     @classmethod
     def register_class(cls, new_class_obj, priority=50):
@@ -325,6 +568,7 @@ class DataObjectCache(DataObjectBase):
                 # It's definitely a valid class to register it.
                 _CACHE_CLASS_REGISTRY.setdefault(priority, [])\
                     .append(class_ref)
+                DataObjectCache.__reset_dispatch()
             else:
                 raise TypeError("Class '%s' is not a sub-class of %s" %
                                 (str(class_ref), str(DataObject)))
@@ -343,14 +587,54 @@ class DataObjectCache(DataObjectBase):
 
     @classmethod
     def find_class_to_handle(cls, node):
-        """Find a class that handles a node in the known_classes list."""
-        for prio in sorted(_CACHE_CLASS_REGISTRY.keys()):
-            for cls in _CACHE_CLASS_REGISTRY[prio]:
-                if cls.can_handle(node):
-                    return cls
+        """Find a class that handles a node in the known_classes list.
+
+        Only the classes whose get_xml_tags() include the node's tag, or
+        return None, are checked, in the same order as the registry.
+        """
+        (registry, dispatch) = _CACHE_DISPATCH
+        if registry is not _CACHE_CLASS_REGISTRY:
+            # The registry was replaced since the index was built.
+            dispatch = DataObjectCache.__reset_dispatch()
+
+        candidates = dispatch.get(node.tag)
+        if candidates is None:
+            candidates = DataObjectCache.__classes_for_tag(node.tag)
+            dispatch[node.tag] = candidates
+
+        for class_ref in candidates:
+            if class_ref.can_handle(node):
+                return class_ref
 
         return None
 
+    @classmethod
+    def __reset_dispatch(cls):
+        '''THIS IS A PRIVATE CLASS METHOD
+
+        Discards the index of classes to try for each tag, since the
+        registry has changed, and returns the new, empty, index.
+        '''
+        global _CACHE_DISPATCH
+        _CACHE_DISPATCH = (_CACHE_CLASS_REGISTRY, dict())
+        return _CACHE_DISPATCH[1]
+
+    @classmethod
+    def __classes_for_tag(cls, tag):
+        '''THIS IS A PRIVATE CLASS METHOD
+
+        Returns a tuple of the registered classes that might handle an
+        XML Element with the given tag, in priority order.
+        '''
+        candidates = list()
+        for prio in sorted(_CACHE_CLASS_REGISTRY.keys()):
+            for class_ref in _CACHE_CLASS_REGISTRY[prio]:
+                tags = class_ref.get_xml_tags()
+                if tags is None or tag in tags:
+                    candidates.append(class_ref)
+
+        return tuple(candidates)
+
     @classmethod
     def __create_doc_from_xml(cls, parent, node):
         '''Given an XML tree, generates the contents of the DataObjectCache'''
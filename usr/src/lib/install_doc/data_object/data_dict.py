@@ -21,7 +21,7 @@
 #
 
 #
-# Copyright (c) 2010, 2011, Oracle and/or its affiliates. All rights reserved.
+# Copyright (c) 2010, 2012, Oracle and/or its affiliates. All rights reserved.
 #
 '''Defines the DataObjectDict class to allow storage of a dictionary in cache.
 '''
@@ -145,6 +145,11 @@ class DataObjectDict(DataObjectBase):
 
         return element
 
+    @classmethod
+    def get_xml_tags(cls):
+        '''Only Elements with the tag TAG_NAME are handled'''
+        return (cls.TAG_NAME,)
+
     @classmethod
     def can_handle(cls, xml_node):
         '''Determines if this class can import XML as generated by to_xml().
@@ -21,7 +21,7 @@
 #
 
 #
-# Copyright (c) 2010, Oracle and/or its affiliates. All rights reserved.
+# Copyright (c) 2010, 2012, Oracle and/or its affiliates. All rights reserved.
 #
 '''Defines the SimpleXmlHandlerBase class to convert simple XML to DataObject
 '''
@@ -82,6 +82,11 @@ class SimpleXmlHandlerBase(DataObject):
 
         return(elem)
 
+    @classmethod
+    def get_xml_tags(cls):
+        '''Only Elements with the tag TAG_NAME are handled'''
+        return (cls.TAG_NAME,)
+
     @classmethod
     def can_handle(cls, element):
         '''Check if XML tag matches TAG_NAME'''
@@ -0,0 +1,202 @@
+#!/usr/bin/python
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+'''Micro-benchmark of the memory used by DataObject trees.
+
+Builds a target of many disks, partitions and slices, like one created by
+target discovery, with the same attributes as the target classes, laid out
+as:
+
+    dict        - every attribute in the object's dictionary, and an empty
+                  list for each object without children, as DataObjects
+                  used to be.
+
+    base slots  - DataObject sub-classes without slots of their own, so
+                  only the attributes common to every DataObject are kept
+                  in slots.
+
+    slots       - DataObject sub-classes declaring slots for their own
+                  attributes, as physical.Disk, Partition and Slice do.
+
+and reports the bytes used per object, and the size of, and time taken by,
+a snapshot of the DataObjectCache.
+
+Run directly, not as part of the test suite:
+
+    python bench_data_object_memory.py [disks]
+'''
+
+import gc
+import sys
+import time
+
+from StringIO import StringIO
+
+from solaris_install.data_object.cache import DataObjectCache
+from simple_data_object import SimpleDataObject
+
+# Attributes of each of the target classes, and the number of each under
+# their parent.
+DISK_ATTRS = ("validate_children", "disk_prop", "disk_keyword", "ctd",
+              "volid", "devpath", "devid", "receptacle", "opath", "wwn",
+              "iscdrom", "requires_mbr_efi_partition", "geometry",
+              "kernel_arch", "in_zpool", "in_vdev", "_whole_disk", "_label",
+              "write_cache", "_sysboot_guid", "_required_guids",
+              "active_ctds", "passive_ctds")
+PARTITION_ATTRS = ("action", "validate_children", "part_type", "bootid",
+                   "is_linux_swap", "size", "start_sector", "in_zpool",
+                   "in_vdev", "_is_pcfs_formatted", "size_in_sectors")
+SLICE_ATTRS = ("action", "force", "is_swap", "size", "start_sector", "tag",
+               "flag", "in_use", "in_zpool", "in_vdev", "size_in_sectors")
+
+PARTITIONS = 4
+SLICES = 8
+
+
+class DictNode(object):
+    '''Stand-in for a DataObject keeping everything in its dictionary'''
+
+    def __init__(self, name):
+        self._name = name
+        self._parent = None
+        self.generates_xml_for_children = False
+        self._children = []
+
+    def insert_children(self, child):
+        '''Append child to the children'''
+        self._children.append(child)
+        child._parent = self
+
+
+def make_class(name, base, attrs, slots=False):
+    '''Create a sub-class of base initializing attrs to None, and declaring
+       slots for them if slots is True.
+    '''
+    def __init__(self, obj_name):
+        base.__init__(self, obj_name)
+        for attr in attrs:
+            setattr(self, attr, None)
+
+    # Named as in this module, so they can be pickled.
+    namespace = dict(__init__=__init__, __module__=__name__)
+    if slots:
+        namespace["__slots__"] = attrs
+    return type(name, (base,), namespace)
+
+
+DictDisk = make_class("DictDisk", DictNode, DISK_ATTRS)
+DictPartition = make_class("DictPartition", DictNode, PARTITION_ATTRS)
+DictSlice = make_class("DictSlice", DictNode, SLICE_ATTRS)
+
+Disk = make_class("Disk", SimpleDataObject, DISK_ATTRS)
+Partition = make_class("Partition", SimpleDataObject, PARTITION_ATTRS)
+Slice = make_class("Slice", SimpleDataObject, SLICE_ATTRS)
+
+SlotsDisk = make_class("SlotsDisk", SimpleDataObject, DISK_ATTRS, True)
+SlotsPartition = make_class("SlotsPartition", SimpleDataObject,
+                            PARTITION_ATTRS, True)
+SlotsSlice = make_class("SlotsSlice", SimpleDataObject, SLICE_ATTRS, True)
+
+
+def create_target(disk_count, disk_cls, partition_cls, slice_cls):
+    '''Create a target of disk_count disks, returning the list of disks'''
+    disks = list()
+    for disk_number in range(disk_count):
+        disk = disk_cls("c0t%dd0" % (disk_number))
+        disks.append(disk)
+        for part_number in range(1, PARTITIONS + 1):
+            partition = partition_cls(str(part_number))
+            disk.insert_children(partition)
+            for slice_number in range(SLICES):
+                partition.insert_children(slice_cls(str(slice_number)))
+
+    return disks
+
+
+def object_size(obj):
+    '''Returns the bytes used by obj, its dictionary and list of children,
+       without creating a dictionary where it doesn't have one.
+    '''
+    size = sys.getsizeof(obj)
+    for referent in gc.get_referents(obj):
+        if isinstance(referent, dict) or referent is obj._children:
+            size += sys.getsizeof(referent)
+    return size
+
+
+def tree_size(disks):
+    '''Returns the number of objects in, and bytes used by, the tree'''
+    (count, size) = (0, 0)
+    to_walk = list(disks)
+    while to_walk:
+        obj = to_walk.pop()
+        count += 1
+        size += object_size(obj)
+        to_walk.extend(obj._children)
+    return (count, size)
+
+
+def snapshot(disks):
+    '''Returns the size of a snapshot of the disks, and the time taken'''
+    doc = DataObjectCache()
+    doc.persistent.insert_children(disks)
+    snapshot_file = StringIO()
+    start = time.time()
+    doc.take_snapshot(snapshot_file)
+    return (len(snapshot_file.getvalue()), time.time() - start)
+
+
+def run(disk_count=200):
+    '''Report the memory used by each layout of the target'''
+    layouts = [
+        ("dict", (DictDisk, DictPartition, DictSlice)),
+        ("base slots", (Disk, Partition, Slice)),
+        ("slots", (SlotsDisk, SlotsPartition, SlotsSlice)),
+    ]
+
+    print "Target of %d disks, %d partitions and %d slices each" % \
+        (disk_count, PARTITIONS, PARTITIONS * SLICES)
+    print "%-12s %10s %12s %10s %14s %12s" % ("layout", "objects",
+        "bytes", "bytes/obj", "snapshot bytes", "snapshot(s)")
+
+    for (layout, classes) in layouts:
+        disks = create_target(disk_count, *classes)
+        (count, size) = tree_size(disks)
+        if layout == "dict":
+            # Not DataObjects, so can't be put in the DataObjectCache.
+            (snapshot_size, snapshot_time) = ("-", "-")
+        else:
+            (snapshot_size, snapshot_time) = snapshot(disks)
+            snapshot_time = "%.3f" % (snapshot_time)
+            # Taking a snapshot doesn't leave dictionaries behind.
+            assert tree_size(disks) == (count, size)
+        print "%-12s %10d %12d %10.1f %14s %12s" % (layout, count, size,
+            float(size) / count, snapshot_size, snapshot_time)
+
+
+if __name__ == '__main__':
+    run(*[int(arg) for arg in sys.argv[1:2]])
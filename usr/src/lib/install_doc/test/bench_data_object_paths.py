@@ -0,0 +1,169 @@
+#!/usr/bin/python
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+'''Micro-benchmark of find_path() with and without compiled path caching.
+
+Builds a DOC shaped like one created from an AI manifest, with a target
+of many disks, partitions and slices, and a software section, then times
+the same find_path() and str_replace_paths_refs() queries as checkpoints
+make, using:
+
+    uncached    - parsing the path and resolving classes on every call, as
+                  find_path() used to.
+
+    cached      - find_path(), using DataObjectPath.compile()
+
+Run directly, not as part of the test suite:
+
+    python bench_data_object_paths.py [disks] [iterations]
+'''
+
+import sys
+import timeit
+
+from solaris_install.data_object import DataObjectPath
+from solaris_install.data_object.cache import DataObjectCache
+from simple_data_object import SimpleDataObject
+
+
+class AIInstance(SimpleDataObject):
+    '''Stand-in for auto_install.ai_instance.AIInstance'''
+    pass
+
+
+class Target(SimpleDataObject):
+    '''Stand-in for target.Target'''
+    pass
+
+
+class Disk(SimpleDataObject):
+    '''Stand-in for target.physical.Disk'''
+    pass
+
+
+class Partition(SimpleDataObject):
+    '''Stand-in for target.physical.Partition'''
+    pass
+
+
+class Slice(SimpleDataObject):
+    '''Stand-in for target.physical.Slice'''
+    pass
+
+
+class Software(SimpleDataObject):
+    '''Stand-in for transfer.info.Software'''
+    pass
+
+
+class Source(SimpleDataObject):
+    '''Stand-in for transfer.info.Source'''
+    pass
+
+
+# Qualify the stand-in classes, as real paths do for their classes.
+MODULE = __name__
+
+PATHS = [
+    "//[@%s.AIInstance?2]//[@%s.Target?2]" % (MODULE, MODULE),
+    "//[@%s.Disk]" % (MODULE),
+    "/persistent/ai_instance/desired[@%s.Target]/[@%s.Disk#1].name" %
+        (MODULE, MODULE),
+    "//software[@%s.Software]//[@%s.Source].name" % (MODULE, MODULE),
+    "//c0t5d0/[@%s.Partition]/[@%s.Slice]" % (MODULE, MODULE),
+]
+
+STRINGS = [
+    "%%{//software[@%s.Software]/[@%s.Source#1].name}" % (MODULE, MODULE),
+    "zpool create %{//c0t1d0.name} %{//c0t2d0.name}",
+]
+
+
+def create_doc(disk_count):
+    '''Create a DOC with a target of disk_count disks, and some software'''
+    doc = DataObjectCache()
+    instance = AIInstance("ai_instance")
+    doc.persistent.insert_children(instance)
+
+    for target_name in ("discovered", "desired"):
+        target = Target(target_name)
+        instance.insert_children(target)
+        for disk_number in range(disk_count):
+            disk = Disk("c0t%dd0" % (disk_number))
+            target.insert_children(disk)
+            for part_number in range(1, 5):
+                partition = Partition(str(part_number))
+                disk.insert_children(partition)
+                partition.insert_children(
+                    [Slice(str(slice_number)) for slice_number in range(8)])
+
+    for software_number in range(10):
+        software = Software("software")
+        instance.insert_children(software)
+        source = Source("source-%d" % (software_number))
+        software.insert_children(source)
+
+    return doc
+
+
+def uncached_find_path(doc, path_string):
+    '''Parse path_string and resolve its classes each time, as before'''
+    return DataObjectPath(path_string).find(doc)
+
+
+def run(disk_count=100, iterations=200):
+    '''Time each of the queries, with and without caching'''
+    doc = create_doc(disk_count)
+    print "DOC with %d disks, %d objects, %d iterations per query" % \
+        (disk_count, len(doc._index), iterations)
+    print "%-8s %12s %12s %8s  %s" % \
+        ("query", "uncached(s)", "cached(s)", "speedup", "path")
+
+    for (number, path) in enumerate(PATHS):
+        # Check both give the same results before timing them.
+        assert uncached_find_path(doc, path) == doc.find_path(path)
+        uncached = timeit.timeit(lambda: uncached_find_path(doc, path),
+                                 number=iterations)
+        cached = timeit.timeit(lambda: doc.find_path(path),
+                               number=iterations)
+        print "%-8s %12.4f %12.4f %7.1fx  %s" % \
+            ("path%d" % (number), uncached, cached, uncached / cached, path)
+
+    for (number, string) in enumerate(STRINGS):
+        def uncached_replace():
+            '''Clear the cache each time, so paths are always parsed'''
+            DataObjectPath.clear_cache()
+            return doc.str_replace_paths_refs(string)
+
+        uncached = timeit.timeit(uncached_replace, number=iterations)
+        cached = timeit.timeit(lambda: doc.str_replace_paths_refs(string),
+                               number=iterations)
+        print "%-8s %12.4f %12.4f %7.1fx  %s" % \
+            ("string%d" % (number), uncached, cached, uncached / cached,
+             string)
+
+
+if __name__ == '__main__':
+    run(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,207 @@
+#!/usr/bin/python
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+'''Micro-benchmark of importing XML into the DOC, with and without the index
+of classes by tag.
+
+Registers stand-ins for the classes an AI client registers, handling the
+tags of an AI manifest, then imports a manifest with a target of many disks,
+partitions and slices, and a software section of many packages, using:
+
+    full scan   - calling can_handle() of every registered class, in
+                  priority order, for every element, as
+                  find_class_to_handle() used to.
+
+    indexed     - find_class_to_handle(), only calling can_handle() of the
+                  classes declaring the element's tag, or no tags at all.
+
+Run directly, not as part of the test suite:
+
+    python bench_data_object_xml_import.py [disks] [packages] [iterations]
+'''
+
+import sys
+import timeit
+
+from lxml import etree
+
+from solaris_install.data_object import DataObject
+from solaris_install.data_object.cache import DataObjectCache
+from solaris_install.data_object.simple import SimpleXmlHandlerBase
+import solaris_install.data_object.cache as DOC
+
+# Tags of the AI manifest, target, transfer, boot and configuration
+# elements handled by the classes registered by an AI client.
+HANDLED_TAGS = [
+    "ai_instance", "target", "logical", "zpool", "vdev", "filesystem",
+    "zvol", "be", "options", "pool_options", "dataset_options", "disk",
+    "partition", "gpt_partition", "slice", "iscsi", "backup_entry",
+    "software", "source", "destination", "dir", "image", "img_type",
+    "facet", "property", "args", "publisher", "origin", "mirror",
+    "boot_mods", "boot_entry", "configuration", "sc_embedded_manifest",
+    "service_bundle", "distro", "distro_spec", "img_params", "media_im",
+    "vm_im", "max_size", "execution", "checkpoint",
+]
+
+# Registered classes which don't declare tags, and so are tried for every
+# element, like those of system-config.
+UNTAGGED_COUNT = 5
+
+
+def stand_in_classes():
+    '''Create a class handling each of the HANDLED_TAGS, and some untagged
+       classes which handle none of them.
+    '''
+    classes = list()
+    for tag in HANDLED_TAGS:
+        name = "Handler_%s" % (tag)
+        classes.append(type(name, (SimpleXmlHandlerBase,),
+                            dict(TAG_NAME=tag)))
+
+    def can_handle(cls, element):
+        '''Check for the tag, as SimpleXmlHandlerBase does, without
+           declaring it.
+        '''
+        return element.tag == cls.UNTAGGED_NAME
+
+    for number in range(UNTAGGED_COUNT):
+        name = "Untagged_%d" % (number)
+        classes.append(type(name, (SimpleXmlHandlerBase,),
+                            dict(UNTAGGED_NAME=name,
+                                 can_handle=classmethod(can_handle),
+                                 get_xml_tags=DataObject.get_xml_tags)))
+
+    return classes
+
+
+def create_manifest(disk_count, package_count):
+    '''Create an AI manifest with a target of disk_count disks, and
+       package_count packages to install.
+    '''
+    root = etree.Element("auto_install")
+    instance = etree.SubElement(root, "ai_instance", name="default")
+    target = etree.SubElement(instance, "target")
+    for disk_number in range(disk_count):
+        disk = etree.SubElement(target, "disk")
+        etree.SubElement(disk, "disk_name", name="c0t%dd0" % (disk_number),
+                         name_type="ctd")
+        for part_number in range(1, 5):
+            partition = etree.SubElement(disk, "partition",
+                                         action="create",
+                                         name=str(part_number))
+            etree.SubElement(partition, "size", val="10gb")
+            for slice_number in range(8):
+                etree.SubElement(partition, "slice", action="create",
+                                 name=str(slice_number))
+
+    logical = etree.SubElement(target, "logical")
+    zpool = etree.SubElement(logical, "zpool", name="rpool", is_root="true")
+    etree.SubElement(zpool, "vdev", name="mirror", redundancy="mirror")
+    etree.SubElement(zpool, "be", name="solaris")
+
+    software = etree.SubElement(instance, "software", type="IPS")
+    source = etree.SubElement(software, "source")
+    publisher = etree.SubElement(source, "publisher", name="solaris")
+    etree.SubElement(publisher, "origin", name="http://pkg.oracle.com/")
+    data = etree.SubElement(software, "software_data", action="install")
+    for package_number in range(package_count):
+        etree.SubElement(data, "name").text = \
+            "pkg:/package/number%d" % (package_number)
+
+    return root
+
+
+def full_scan(cls, node):
+    '''Find a class to handle node, checking every class, as before'''
+    for prio in sorted(DOC._CACHE_CLASS_REGISTRY.keys()):
+        for class_ref in DOC._CACHE_CLASS_REGISTRY[prio]:
+            if class_ref.can_handle(node):
+                return class_ref
+
+    return None
+
+
+def import_manifest(manifest):
+    '''Import the manifest into a new DOC'''
+    doc = DataObjectCache()
+    doc.import_from_manifest_xml(manifest)
+    return doc
+
+
+def describe(doc):
+    '''List the class and name of each object imported into doc'''
+    return [(obj.__class__.__name__, obj.name)
+            for obj in doc.persistent.get_descendants(class_type=DataObject)]
+
+
+def run(disk_count=100, package_count=2000, iterations=10):
+    '''Time importing the manifest, with and without the index'''
+    orig_registry = DOC._CACHE_CLASS_REGISTRY
+    DOC._CACHE_CLASS_REGISTRY = dict()
+    DataObjectCache.register_class(stand_in_classes())
+
+    manifest = create_manifest(disk_count, package_count)
+    elements = list(manifest.iter())
+    print "Manifest of %d elements, %d registered classes, %d iterations" % \
+        (len(elements), len(DOC._CACHE_CLASS_REGISTRY[50]), iterations)
+    print "%-8s %12s %12s %8s" % \
+        ("test", "full scan(s)", "indexed(s)", "speedup")
+
+    indexed_find = DataObjectCache.__dict__["find_class_to_handle"]
+    for element in elements:
+        # Check both find the same classes before timing them.
+        assert full_scan(DataObjectCache, element) == \
+            DataObjectCache.find_class_to_handle(element)
+
+    full = timeit.timeit(lambda: [full_scan(DataObjectCache, element)
+                                  for element in elements],
+                         number=iterations)
+    indexed = timeit.timeit(
+        lambda: [DataObjectCache.find_class_to_handle(element)
+                 for element in elements],
+        number=iterations)
+    print "%-8s %12.4f %12.4f %7.1fx" % ("find", full, indexed,
+                                         full / indexed)
+
+    expected = describe(import_manifest(manifest))
+    try:
+        DataObjectCache.find_class_to_handle = classmethod(full_scan)
+        assert describe(import_manifest(manifest)) == expected
+        full = timeit.timeit(lambda: import_manifest(manifest),
+                             number=iterations)
+    finally:
+        DataObjectCache.find_class_to_handle = indexed_find
+    indexed = timeit.timeit(lambda: import_manifest(manifest),
+                            number=iterations)
+    print "%-8s %12.4f %12.4f %7.1fx" % ("import", full, indexed,
+                                         full / indexed)
+
+    DOC._CACHE_CLASS_REGISTRY = orig_registry
+
+
+if __name__ == '__main__':
+    run(*[int(arg) for arg in sys.argv[1:4]])
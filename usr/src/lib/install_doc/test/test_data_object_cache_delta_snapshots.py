@@ -0,0 +1,291 @@
+#!/usr/bin/python
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+'''Tests to validate DOC delta snapshots support'''
+
+import pickle
+import shutil
+import unittest
+
+from StringIO import StringIO
+from tempfile import mkdtemp
+from os import path, rename
+
+from solaris_install.data_object.cache import DataObjectCache, SnapshotJournal
+from simple_data_object import create_simple_data_obj_tree, SimpleDataObject
+
+
+class CountedDataObject(SimpleDataObject):
+    '''SimpleDataObject counting the times objects of it are pickled'''
+
+    pickled = 0
+
+    def __getstate__(self):
+        CountedDataObject.pickled += 1
+        return super(CountedDataObject, self).__getstate__()
+
+
+class TestDataObjectCacheDeltaSnapshots(unittest.TestCase):
+    '''Tests to validate DOC delta snapshots support'''
+
+    def setUp(self):
+        '''Create a DOC with a few sub-trees in the persistent tree'''
+        self.temp_dir = mkdtemp(prefix="doc_test-")
+
+        self.doc = DataObjectCache()
+        self.data_objs = create_simple_data_obj_tree()
+        self.small_root = SimpleDataObject("small_root")
+        self.other_root = SimpleDataObject("other_root")
+        self.other_root.insert_children(SimpleDataObject("other_child"))
+        self.doc.persistent.insert_children([self.data_objs["data_obj"],
+            self.small_root, self.other_root])
+
+        self.volatile_root = SimpleDataObject("volatile_root")
+        self.doc.volatile.insert_children(self.volatile_root)
+        CountedDataObject.pickled = 0
+
+    def tearDown(self):
+        '''Cleanup test environment and references.'''
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        self.doc.clear()
+        self.doc = None
+        self.data_objs = None
+        self.small_root = None
+        self.other_root = None
+        self.volatile_root = None
+
+    def snapshot_path(self, name):
+        '''Returns path of a snapshot file in the temporary directory'''
+        return path.join(self.temp_dir, name)
+
+    def read_journal(self, name):
+        '''Returns header and keys of units written to a delta snapshot'''
+        with open(self.snapshot_path(name), "rb") as infile:
+            header = pickle.load(infile)
+            keys = list()
+            while True:
+                try:
+                    keys.append(pickle.load(infile)[0])
+                except EOFError:
+                    break
+        return (header, keys)
+
+    def assert_loads_same(self, name, expected):
+        '''Load a snapshot in to a new DOC, and compare to expected'''
+        new_doc = DataObjectCache()
+        new_doc.load_from_snapshot(self.snapshot_path(name))
+        self.assertEquals(str(new_doc.persistent), expected)
+
+    def test_delta_snapshot_first_is_complete(self):
+        '''Validate the first delta snapshot contains everything'''
+        self.doc.take_snapshot(self.snapshot_path("first"), delta=True)
+        (header, keys) = self.read_journal("first")
+
+        self.assertEquals(header["base"], None)
+        self.assertEquals(keys, header["units"])
+        self.assertEquals(len(keys), 3)
+        self.assert_loads_same("first", str(self.doc.persistent))
+
+    def test_delta_snapshot_only_changes(self):
+        '''Validate delta snapshots only contain changed sub-trees'''
+        self.doc.take_snapshot(self.snapshot_path("first"), delta=True)
+        self.data_objs["child_5_2_3_1"].new_attr = "changed"
+        self.doc.take_snapshot(self.snapshot_path("second"), delta=True)
+        self.doc.take_snapshot(self.snapshot_path("third"), delta=True)
+
+        (first, first_keys) = self.read_journal("first")
+        (second, second_keys) = self.read_journal("second")
+        (third, third_keys) = self.read_journal("third")
+
+        self.assertEquals(second["base"][1], first["id"])
+        self.assertEquals(second_keys, [first_keys[0]])
+        self.assertEquals(third["base"][1], second["id"])
+        self.assertEquals(third_keys, [])
+
+        expected = str(self.doc.persistent)
+        self.assert_loads_same("third", expected)
+
+        new_doc = DataObjectCache()
+        new_doc.load_from_snapshot(self.snapshot_path("third"))
+        self.assertEquals(new_doc.find_path("//child_5_2_3_1.new_attr"),
+            ["changed"])
+
+    def test_delta_snapshot_insert_and_delete(self):
+        '''Validate delta snapshots follow insertion and deletion'''
+        self.doc.take_snapshot(self.snapshot_path("first"), delta=True)
+        self.data_objs["child_3_1"].delete()
+        self.small_root.insert_children(SimpleDataObject("new_child"))
+        self.doc.persistent.delete_children(self.other_root)
+        new_root = SimpleDataObject("new_root")
+        self.doc.persistent.insert_children(new_root, before=self.small_root)
+        self.doc.take_snapshot(self.snapshot_path("second"), delta=True)
+
+        (first, first_keys) = self.read_journal("first")
+        (second, second_keys) = self.read_journal("second")
+        self.assertEquals(len(second["units"]), 3)
+        self.assertEquals(len(second_keys), 3)
+        self.assertFalse(first_keys[2] in second["units"])
+
+        self.assert_loads_same("second", str(self.doc.persistent))
+
+    def test_delta_snapshot_after_load(self):
+        '''Validate the delta after loading a snapshot only has changes'''
+        self.doc.take_snapshot(self.snapshot_path("first"), delta=True)
+        self.doc.load_from_snapshot(self.snapshot_path("first"))
+        self.doc.find_path("//small_root")[0].new_attr = "changed"
+        self.doc.take_snapshot(self.snapshot_path("second"), delta=True)
+
+        (first, first_keys) = self.read_journal("first")
+        (second, second_keys) = self.read_journal("second")
+        self.assertEquals(second["base"][1], first["id"])
+        self.assertEquals(second_keys, [first_keys[1]])
+
+    def test_delta_snapshot_changed_in_place(self):
+        '''Validate changes made in place are written once marked'''
+        self.doc.take_snapshot(self.snapshot_path("first"), delta=True)
+        self.small_root.in_place = list()
+        self.doc.take_snapshot(self.snapshot_path("second"), delta=True)
+        self.small_root.in_place.append("value")
+        self.assertFalse(self.small_root.changed)
+        self.small_root.mark_changed()
+        self.doc.take_snapshot(self.snapshot_path("third"), delta=True)
+
+        self.assertEquals(len(self.read_journal("third")[1]), 1)
+        new_doc = DataObjectCache()
+        new_doc.load_from_snapshot(self.snapshot_path("third"))
+        self.assertEquals(new_doc.find_path("//small_root.in_place"),
+            [["value"]])
+
+    def test_delta_snapshot_clean_not_pickled(self):
+        '''Validate unchanged sub-trees aren't pickled for a delta'''
+        counted = CountedDataObject("counted")
+        counted.insert_children(CountedDataObject("counted_child"))
+        self.doc.persistent.insert_children(counted)
+        self.doc.take_snapshot(self.snapshot_path("first"), delta=True)
+        self.assertEquals(CountedDataObject.pickled, 2)
+        self.assertFalse(counted.changed)
+        self.assertFalse(counted.children[0].changed)
+
+        self.small_root.new_attr = "changed"
+        self.doc.take_snapshot(self.snapshot_path("second"), delta=True)
+        self.assertEquals(CountedDataObject.pickled, 2)
+
+        counted.children[0].new_attr = "changed"
+        self.assertTrue(counted.changed)
+        self.doc.take_snapshot(self.snapshot_path("third"), delta=True)
+        self.assertEquals(CountedDataObject.pickled, 4)
+        self.assertFalse(self.doc.persistent.children[0].changed)
+
+    def test_delta_snapshot_volatile_ignored(self):
+        '''Validate changes to the volatile tree aren't in delta snapshots'''
+        self.doc.take_snapshot(self.snapshot_path("first"), delta=True)
+        self.volatile_root.insert_children(SimpleDataObject("new_child"))
+        self.volatile_root.new_attr = "changed"
+        self.doc.take_snapshot(self.snapshot_path("second"), delta=True)
+
+        self.assertEquals(self.read_journal("second")[1], [])
+
+    def test_delta_snapshot_rollback(self):
+        '''Validate loading a delta snapshot, and taking more after it'''
+        self.doc.take_snapshot(self.snapshot_path("first"), delta=True)
+        expected_first = str(self.doc.persistent)
+        self.small_root.insert_children(SimpleDataObject("new_child"))
+        self.doc.take_snapshot(self.snapshot_path("second"), delta=True)
+
+        self.doc.load_from_snapshot(self.snapshot_path("first"))
+        self.assertEquals(str(self.doc.persistent), expected_first)
+        self.assertEquals(self.doc.find_path("//new_child"), [])
+
+        # Re-writing the file loaded from can't be based on itself.
+        self.doc.take_snapshot(self.snapshot_path("first"), delta=True)
+        self.assertEquals(self.read_journal("first")[0]["base"], None)
+
+        # Snapshots based on a replaced snapshot can't be loaded.
+        self.assertRaises(IOError, self.doc.load_from_snapshot,
+            self.snapshot_path("second"))
+
+    def test_delta_snapshot_moved(self):
+        '''Validate delta snapshots can be loaded from a new directory'''
+        self.doc.take_snapshot(self.snapshot_path("first"), delta=True)
+        self.small_root.new_attr = "changed"
+        self.doc.take_snapshot(self.snapshot_path("second"), delta=True)
+
+        new_dir = self.temp_dir + ".moved"
+        rename(self.temp_dir, new_dir)
+        try:
+            new_doc = DataObjectCache()
+            new_doc.load_from_snapshot(path.join(new_dir, "second"))
+            self.assertEquals(str(new_doc.persistent),
+                              str(self.doc.persistent))
+
+            # The base is needed though.
+            rename(path.join(new_dir, "first"), path.join(new_dir, "gone"))
+            self.assertRaises(IOError, new_doc.load_from_snapshot,
+                path.join(new_dir, "second"))
+        finally:
+            rename(new_dir, self.temp_dir)
+
+    def test_delta_snapshot_chain_limit(self):
+        '''Validate a complete snapshot is taken when the chain is too long'''
+        for number in range(SnapshotJournal.MAX_CHAIN_LENGTH + 2):
+            self.small_root.counter = number
+            self.doc.take_snapshot(self.snapshot_path(str(number)),
+                                   delta=True)
+            header = self.read_journal(str(number))[0]
+            self.assertEquals(header["length"],
+                number % (SnapshotJournal.MAX_CHAIN_LENGTH + 1))
+
+        self.assert_loads_same(str(number), str(self.doc.persistent))
+
+    def test_delta_snapshot_file_object(self):
+        '''Validate delta snapshots to file objects are complete'''
+        self.doc.take_snapshot(self.snapshot_path("first"), delta=True)
+        buf = StringIO()
+        self.doc.take_snapshot(buf, delta=True)
+        buf.seek(0)
+        self.assertEquals(pickle.load(buf)["base"], None)
+
+        buf.seek(0)
+        new_doc = DataObjectCache()
+        new_doc.load_from_snapshot(buf)
+        self.assertEquals(str(new_doc.persistent), str(self.doc.persistent))
+
+    def test_full_snapshot_still_loads(self):
+        '''Validate complete snapshots load after taking delta snapshots'''
+        self.doc.take_snapshot(self.snapshot_path("first"), delta=True)
+        self.doc.take_snapshot(self.snapshot_path("full"))
+        expected = str(self.doc.persistent)
+        self.doc.persistent.delete_children()
+
+        self.doc.load_from_snapshot(self.snapshot_path("full"))
+        self.assertEquals(str(self.doc.persistent), expected)
+
+        # After loading a complete snapshot, the next delta is complete too.
+        self.doc.take_snapshot(self.snapshot_path("second"), delta=True)
+        self.assertEquals(self.read_journal("second")[0]["base"], None)
+
+
+if __name__ == '__main__':
+    unittest.main()
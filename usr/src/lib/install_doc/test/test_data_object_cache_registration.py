@@ -21,7 +21,7 @@
 #
 
 #
-# Copyright (c) 2010, Oracle and/or its affiliates. All rights reserved.
+# Copyright (c) 2010, 2012, Oracle and/or its affiliates. All rights reserved.
 #
 '''Tests to validate DataObjectCache registration mechanism'''
 
@@ -31,6 +31,7 @@ from lxml import etree
 
 from solaris_install.data_object import DataObject
 from solaris_install.data_object.cache import DataObjectCache
+from solaris_install.data_object.simple import SimpleXmlHandlerBase
 import solaris_install.data_object.cache as DOC
 from simple_data_object import SimpleDataObject, SimpleDataObject2, \
     SimpleDataObject3, SimpleDataObject4
@@ -72,6 +73,26 @@ class SimpleDataObjectSameTagHighPrio(SimpleDataObjectSameTagNormPrio):
     pass
 
 
+class SimpleDataObjectTagged(SimpleDataObjectSameTagNormPrio):
+    '''Define a similar class, that declares the tag it handles'''
+
+    XML_TAGS = (COMMON_TAG,)
+
+    # Elements can_handle() was called for.
+    checked = list()
+
+    @classmethod
+    def can_handle(cls, xml_node):
+        '''Record the XML node checked'''
+        cls.checked.append(xml_node.tag)
+        return super(SimpleDataObjectTagged, cls).can_handle(xml_node)
+
+
+class SimpleXmlHandlerTagged(SimpleXmlHandlerBase):
+    '''Define a simple XML handler, for a different tag'''
+    TAG_NAME = "other_tag"
+
+
 class TestDataObjectCacheRegistration(unittest.TestCase):
     '''Tests to validate DataObjectCache registration mechanism'''
 
@@ -262,6 +283,58 @@ class TestDataObjectCacheRegistration(unittest.TestCase):
 
         self.assertEqual(class_obj, SimpleDataObjectSameTagHighPrio)
 
+    def test_doc_registration_tagged_only_checked_for_tags(self):
+        '''Validate classes declaring XML_TAGS are only checked for them'''
+        DataObjectCache.register_class(SimpleDataObjectTagged)
+        DataObjectCache.register_class(SimpleXmlHandlerTagged)
+        SimpleDataObjectTagged.checked = list()
+
+        for tag in ("unknown", COMMON_TAG, "other_tag", "unknown"):
+            xml_elem = etree.Element(tag, name="some name")
+            class_obj = DataObjectCache.find_class_to_handle(xml_elem)
+            if tag == COMMON_TAG:
+                self.assertEqual(class_obj, SimpleDataObjectTagged)
+            elif tag == "other_tag":
+                self.assertEqual(class_obj, SimpleXmlHandlerTagged)
+            else:
+                self.assertEqual(class_obj, None)
+
+        self.assertEqual(SimpleDataObjectTagged.checked, [COMMON_TAG])
+        self.assertEqual(SimpleXmlHandlerTagged.get_xml_tags(),
+                         ("other_tag",))
+
+    def test_doc_registration_tagged_and_untagged_prio(self):
+        '''Validate priority order is kept between tagged and untagged'''
+        DataObjectCache.register_class(SimpleDataObjectTagged, priority=50)
+        DataObjectCache.register_class(SimpleDataObjectSameTagHighPrio,
+            priority=30)
+
+        xml_elem = etree.Element(COMMON_TAG, name="some name")
+        class_obj = DataObjectCache.find_class_to_handle(xml_elem)
+        self.assertEqual(class_obj, SimpleDataObjectSameTagHighPrio)
+
+        DOC._CACHE_CLASS_REGISTRY = dict()
+        DataObjectCache.register_class(SimpleDataObjectTagged, priority=30)
+        DataObjectCache.register_class(SimpleDataObjectSameTagHighPrio,
+            priority=50)
+
+        class_obj = DataObjectCache.find_class_to_handle(xml_elem)
+        self.assertEqual(class_obj, SimpleDataObjectTagged)
+
+    def test_doc_registration_after_find(self):
+        '''Validate classes registered after a search are found'''
+        xml_elem = etree.Element(COMMON_TAG, name="some name")
+        self.assertEqual(DataObjectCache.find_class_to_handle(xml_elem), None)
+
+        DataObjectCache.register_class(SimpleDataObjectTagged, priority=50)
+        class_obj = DataObjectCache.find_class_to_handle(xml_elem)
+        self.assertEqual(class_obj, SimpleDataObjectTagged)
+
+        DataObjectCache.register_class(SimpleDataObjectSameTagHighPrio,
+            priority=30)
+        class_obj = DataObjectCache.find_class_to_handle(xml_elem)
+        self.assertEqual(class_obj, SimpleDataObjectSameTagHighPrio)
+
     def test_doc_registration_no_handler_found(self):
         '''Validate failure of no handler is found'''
         DataObjectCache.register_class(SimpleDataObject)
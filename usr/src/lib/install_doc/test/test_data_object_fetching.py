@@ -449,5 +449,46 @@ class  TestDataObjectFetching(unittest.TestCase):
             [self.data_objs["child_1"], self.data_objs["child_1_1"],
              self.data_objs["child_1_2"], self.data_objs["child_2"]])
 
+    #
+    # Test 'iter_descendants()'
+    #
+    def test_dobj_iter_descendants_same_as_get_descendants(self):
+        '''Validate iter_descendants yields as get_descendants returns'''
+        for max_depth in (None, 0, 1, 2, 3):
+            for max_count in (None, 1, 2, 4):
+                self.assertEqual(
+                    list(self.data_objs["data_obj"].iter_descendants(
+                        class_type=SimpleDataObject, max_depth=max_depth,
+                        max_count=max_count)),
+                    self.data_objs["data_obj"].get_descendants(
+                        class_type=SimpleDataObject, max_depth=max_depth,
+                        max_count=max_count))
+
+    def test_dobj_iter_descendants_by_name(self):
+        '''Validate iter_descendants yields matches one at a time'''
+        found = self.data_objs["data_obj"].iter_descendants(
+            name="child_5_2_3_3")
+
+        self.assertEqual(found.next(), self.data_objs["child_5_2_3_3"])
+        self.assertEqual(found.next(),
+            self.data_objs["child_5_2_3_3_same_name"])
+        self.assertRaises(StopIteration, found.next)
+
+    def test_dobj_iter_descendants_by_name_not_exist(self):
+        '''Validate iter_descendants yields nothing if no match'''
+        self.assertEqual(list(self.data_objs["data_obj"].iter_descendants(
+            name="non_existant_name")), [])
+
+    def test_dobj_iter_descendants_invalid_params(self):
+        '''Validate iter_descendants fails immediately on invalid params'''
+        self.assertRaises(ValueError,
+            self.data_objs["data_obj"].iter_descendants)
+        self.assertRaises(ValueError,
+            self.data_objs["data_obj"].iter_descendants,
+            class_type=SimpleDataObject, max_depth=-1)
+        self.assertRaises(ValueError,
+            self.data_objs["data_obj"].iter_descendants,
+            class_type=SimpleDataObject, max_count=0)
+
 if __name__ == '__main__':
     unittest.main()
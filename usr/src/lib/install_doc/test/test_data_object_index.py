@@ -0,0 +1,211 @@
+#!/usr/bin/python
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+'''Tests for the DataObject tree index'''
+
+import copy
+import pickle
+import unittest
+
+from solaris_install.data_object import DataObject, DataObjectBase
+from solaris_install.data_object.cache import DataObjectCache
+from simple_data_object import create_simple_data_obj_tree, SimpleDataObject, \
+    SimpleDataObject2, SimpleDataObject3, SimpleDataObject4, SimpleDataObject5
+
+
+class DynamicNameDataObject(SimpleDataObject):
+    '''DataObject that overrides the name property, like target's BE'''
+
+    def __init__(self, name):
+        super(DynamicNameDataObject, self).__init__(name)
+        self.current_name = name
+
+    @property
+    def name(self):
+        return self.current_name
+
+
+class TestDataObjectIndex(unittest.TestCase):
+    '''Tests for the DataObject tree index'''
+
+    CLASSES = [None, DataObjectBase, DataObject, SimpleDataObject,
+               SimpleDataObject2, SimpleDataObject3, SimpleDataObject4,
+               SimpleDataObject5, DynamicNameDataObject]
+
+    def setUp(self):
+        '''Create tree of data objects to test on'''
+        self.data_objs = create_simple_data_obj_tree()
+        self.root = self.data_objs["data_obj"]
+
+    def tearDown(self):
+        '''Clean up references to objects'''
+        self.root = None
+        self.data_objs = None
+        del self.data_objs
+
+    def all_searches(self):
+        '''Run every search, on every object, returning list of results'''
+        names = set([None, "no_such_name"])
+        names.update(obj.name for obj in self.data_objs.values())
+        objs = [self.root] + self.root.get_descendants(
+            class_type=DataObjectBase)
+
+        results = list()
+        for obj in objs:
+            for name in sorted(names):
+                for class_type in self.CLASSES:
+                    if name is None and class_type is None:
+                        continue
+                    for max_depth in (None, 0, 1, 2, 3):
+                        for max_count in (None, 1, 2):
+                            results.append(obj.get_descendants(name=name,
+                                class_type=class_type, max_depth=max_depth,
+                                max_count=max_count))
+        return results
+
+    def assert_same_as_walk(self):
+        '''Compare indexed search results with those from walking the tree'''
+        self.assertTrue(self.root.indexed)
+        indexed = self.all_searches()
+        self.root.disable_index()
+        self.assertFalse(self.root.indexed)
+        walked = self.all_searches()
+        self.root.enable_index()
+
+        self.assertEquals(len(indexed), len(walked))
+        for (index_result, walk_result) in zip(indexed, walked):
+            self.assertEquals(index_result, walk_result)
+
+    def test_index_enable(self):
+        '''Validate an index is only enabled on the root'''
+        self.assertFalse(self.root.indexed)
+        self.root.enable_index()
+        self.assertTrue(self.root.indexed)
+        self.assertTrue(self.data_objs["child_5_2_3_3"].indexed)
+        self.assertEquals(len(self.root._index),
+            len(self.root.get_descendants(class_type=DataObjectBase)) + 1)
+        self.assertRaises(ValueError,
+            self.data_objs["child_1"].enable_index)
+
+    def test_index_search_same_as_walk(self):
+        '''Validate indexed searches match walking the tree, in order'''
+        self.root.enable_index()
+        self.assert_same_as_walk()
+
+    def test_index_lookup_used(self):
+        '''Validate the index is used for searching by name'''
+        self.root.enable_index()
+        found = self.root._index.lookup(self.root, name="child_5_2_3_3")
+        self.assertEquals(found, [self.data_objs["child_5_2_3_3"],
+            self.data_objs["child_5_2_3_3_same_name"]])
+
+    def test_index_after_insert(self):
+        '''Validate index is updated by insert_children()'''
+        self.root.enable_index()
+        new_obj = SimpleDataObject5("child_5_2_3_3")
+        new_obj.insert_children(SimpleDataObject5("new_child"))
+        self.data_objs["child_5_2_3"].insert_children(new_obj,
+            before=self.data_objs["child_5_2_3_1"])
+        self.data_objs["child_2"].insert_children(
+            SimpleDataObject5("new_child"), after=self.data_objs["child_2_1"])
+        self.data_objs["child_1"].insert_children(
+            DynamicNameDataObject("new_child"))
+
+        self.assertEquals(
+            self.root.get_descendants(name="child_5_2_3_3")[0], new_obj)
+        self.assertEquals(
+            len(self.root.get_descendants(name="new_child")), 3)
+        self.assert_same_as_walk()
+
+    def test_index_after_delete(self):
+        '''Validate index is updated by delete_children() and delete()'''
+        self.root.enable_index()
+        self.data_objs["child_5_2"].delete_children(name="child_5_2_3")
+        self.data_objs["child_3_1"].delete()
+        self.root.delete_children(class_type=SimpleDataObject2)
+
+        self.assertEquals(self.root.get_descendants(name="child_5_2_3_1"), [])
+        self.assertEquals(self.root.get_descendants(name="child_3_1_1"), [])
+        self.assertFalse(self.data_objs["child_1_1"].indexed)
+        self.assert_same_as_walk()
+
+    def test_index_after_rename(self):
+        '''Validate index follows changes to an object's name'''
+        self.root.enable_index()
+        self.data_objs["child_4"]._name = "renamed"
+        dynamic = DynamicNameDataObject("dynamic")
+        self.data_objs["child_2_1"].insert_children(dynamic)
+        dynamic.current_name = "renamed"
+
+        self.assertEquals(self.root.get_descendants(name="renamed"),
+            [dynamic, self.data_objs["child_4"]])
+        self.assertEquals(self.root.get_descendants(name="child_4"), [])
+        self.assert_same_as_walk()
+
+    def test_index_after_sort(self):
+        '''Validate index copes with children being re-ordered in place'''
+        self.root.enable_index()
+        self.root.get_descendants(name="child_5_2_3_3")
+        self.data_objs["child_5_2_3"]._children.reverse()
+        self.root._children.reverse()
+
+        self.assertEquals(self.root.get_descendants(name="child_5_2_3_3"),
+            [self.data_objs["child_5_2_3_3_same_name"],
+             self.data_objs["child_5_2_3_3"]])
+        self.assert_same_as_walk()
+
+    def test_index_not_copied(self):
+        '''Validate copies and pickles of an indexed tree have no index'''
+        self.root.enable_index()
+
+        for new_root in (copy.copy(self.root), copy.deepcopy(self.root),
+                         pickle.loads(pickle.dumps(self.root))):
+            self.assertFalse(new_root.indexed)
+            self.assertTrue(new_root._get_index() is None)
+
+        self.assertTrue(self.root.indexed)
+
+    def test_index_cache(self):
+        '''Validate the DataObjectCache is indexed, including snapshots'''
+        doc = DataObjectCache()
+        self.assertTrue(doc.persistent.indexed)
+        doc.persistent.insert_children(self.root)
+        self.assertTrue(self.data_objs["child_5_2_3_3"].indexed)
+        self.assertEquals(
+            doc.get_descendants(name="child_5_2_3_3", max_count=1),
+            [self.data_objs["child_5_2_3_3"]])
+
+        snapshot = pickle.dumps(doc.persistent)
+        doc.persistent.delete_children()
+        self.assertEquals(doc.get_descendants(name="child_5_2_3_3"), [])
+        self.assertEquals(len(doc._index), 3)
+
+        doc.persistent.insert_children(
+            pickle.loads(snapshot).children)
+        self.assertEquals(len(doc.get_descendants(name="child_5_2_3_3")), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
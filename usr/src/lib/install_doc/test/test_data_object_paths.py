@@ -28,7 +28,7 @@
 import unittest
 
 from solaris_install.data_object import ObjectNotFoundError, PathError, \
-    DataObjectBase
+    DataObjectBase, DataObjectPath
 import simple_data_object
 
 
@@ -642,6 +642,42 @@ class  TestDataObjectPaths(unittest.TestCase):
             " value2=%{//child_5_2_1.name}"),
             "value1=child_3_1_1 value2=child_5_2_1")
 
+    def test_dobj_path_compile_cached(self):
+        '''Validate compiled paths are cached and re-used'''
+        DataObjectPath.clear_cache()
+        path_string = "//child_5_2_3[@simple_data_object.SimpleDataObject4]"
+        path = DataObjectPath.compile(path_string)
+        self.assertTrue(path is DataObjectPath.compile(path_string))
+        self.assertEqual(path.find(self.data_objs["data_obj"]),
+            [self.data_objs["child_5_2_3"]])
+        self.assertEqual(path.find(self.data_objs["child_5"]),
+            [self.data_objs["child_5_2_3"]])
+        self.assertEqual(path.find(self.data_objs["child_1"]), [])
+
+    def test_dobj_path_compile_cache_size(self):
+        '''Validate least recently used paths are dropped from the cache'''
+        DataObjectPath.clear_cache()
+        first = DataObjectPath.compile("/child_1")
+        second = DataObjectPath.compile("/child_2")
+        for count in range(DataObjectPath.CACHE_SIZE - 1):
+            DataObjectPath.compile("/child_2/%d" % (count))
+            # Keep using first, so it is not dropped.
+            self.assertTrue(first is DataObjectPath.compile("/child_1"))
+
+        self.assertTrue(first is DataObjectPath.compile("/child_1"))
+        self.assertFalse(second is DataObjectPath.compile("/child_2"))
+
+    def test_dobj_path_compile_invalid(self):
+        '''Validate invalid paths fail to compile, and aren't cached'''
+        self.assertRaises(PathError, DataObjectPath.compile, "child_1")
+        self.assertRaises(PathError, DataObjectPath.compile, "child_1")
+
+    def test_dobj_path_compile_class_resolved_on_use(self):
+        '''Validate class names are only resolved when a path is used'''
+        path = DataObjectPath.compile("/child_1/[@not_loaded.Class]")
+        self.assertEqual(path.find(self.data_objs["child_2"]), [])
+        self.assertRaises(PathError, path.find, self.data_objs["data_obj"])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,206 @@
+#!/usr/bin/python
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+'''Tests for keeping DataObject attributes in slots'''
+
+import copy
+import gc
+import pickle
+import unittest
+
+from solaris_install.data_object import DataObject, ObjectNotFoundError
+from simple_data_object import SimpleDataObject
+
+
+class SlotsDataObject(SimpleDataObject):
+    '''DataObject declaring slots for its own attributes'''
+    __slots__ = ("size", "action")
+
+    def __init__(self, name):
+        super(SlotsDataObject, self).__init__(name)
+        self.size = 0
+        self.action = "create"
+
+
+class PlainDataObject(DataObject):
+    '''DataObject declaring slots for all of its attributes'''
+    __slots__ = ("size",)
+
+    def __init__(self, name):
+        super(PlainDataObject, self).__init__(name)
+        self.size = 0
+
+    @classmethod
+    def can_handle(cls, xml_node):
+        '''Doesn't import any XML'''
+        return False
+
+    @classmethod
+    def from_xml(cls, xml_node):
+        '''Doesn't import any XML'''
+        return None
+
+    def to_xml(self):
+        '''Doesn't generate any XML'''
+        return None
+
+
+def has_dict(obj):
+    '''Returns True if obj has a dictionary, without creating one'''
+    return [ref for ref in gc.get_referents(obj) if isinstance(ref, dict)] \
+        != []
+
+
+class TestDataObjectSlots(unittest.TestCase):
+    '''Tests for keeping DataObject attributes in slots'''
+
+    def setUp(self):
+        '''Create a small tree of objects'''
+        self.root = SimpleDataObject("root")
+        self.child = SlotsDataObject("child")
+        self.leaf = SimpleDataObject("leaf")
+        self.root.insert_children(self.child)
+        self.child.insert_children(self.leaf)
+
+    def tearDown(self):
+        '''Clean up references to objects'''
+        self.root = None
+        self.child = None
+        self.leaf = None
+
+    def test_no_children_shared(self):
+        '''Validate objects without children share the empty children'''
+        other = SimpleDataObject("other")
+        self.assertTrue(other._children is self.leaf._children)
+        self.assertEqual(other.children, [])
+
+        other.children.append(self.leaf)
+        self.assertEqual(self.leaf.children, [])
+
+        other.insert_children(SimpleDataObject("new"))
+        self.assertEqual(len(other.children), 1)
+        self.assertEqual(self.leaf.children, [])
+
+        # Nothing to delete, so not an error.
+        self.leaf.delete_children(other, not_found_is_err=True)
+        self.assertRaises(ObjectNotFoundError, other.delete_children,
+                          self.leaf, not_found_is_err=True)
+
+    def test_no_dictionary(self):
+        '''Validate objects only have a dictionary for other attributes'''
+        self.assertFalse(has_dict(self.leaf))
+        self.assertFalse(has_dict(self.child))
+
+        pickle.dumps(self.root)
+        copy.copy(self.child)
+        self.assertFalse(has_dict(self.leaf))
+        self.assertFalse(has_dict(self.child))
+
+        self.child.other = "value"
+        self.assertTrue(has_dict(self.child))
+        self.assertEqual(self.child.__dict__, {"other": "value"})
+
+    def test_state(self):
+        '''Validate the state pickled is as it was before slots were used'''
+        self.child.other = "value"
+        state = self.child.__getstate__()
+        self.assertEqual(sorted(state.keys()),
+            ["_children", "_name", "_parent", "action",
+             "generates_xml_for_children", "other", "size"])
+        self.assertEqual(state["_parent"], None)
+        self.assertEqual(state["_children"], [self.leaf])
+        self.assertEqual(self.leaf.__getstate__()["_children"], [])
+
+    def test_load_state_without_slots(self):
+        '''Validate loading the state of an object pickled without slots'''
+        leaf = SimpleDataObject.__new__(SimpleDataObject)
+        leaf.__setstate__({"_name": "leaf", "_parent": None, "_children": [],
+                           "generates_xml_for_children": False})
+        child = SlotsDataObject.__new__(SlotsDataObject)
+        child.__setstate__({"_name": "child", "_parent": None,
+                            "_children": [leaf],
+                            "generates_xml_for_children": False,
+                            "size": 10, "action": "preserve",
+                            "other": "value"})
+
+        self.assertEqual(child.name, "child")
+        self.assertEqual(child.size, 10)
+        self.assertEqual(child.other, "value")
+        self.assertEqual(child.children, [leaf])
+        self.assertTrue(leaf.parent is child)
+        self.assertFalse(has_dict(leaf))
+
+    def test_copies(self):
+        '''Validate copies have the same attributes'''
+        self.child.other = "value"
+        for new_root in (pickle.loads(pickle.dumps(self.root)),
+                         copy.deepcopy(self.root)):
+            self.assertEqual(str(new_root), str(self.root))
+            new_child = new_root.get_first_child()
+            self.assertTrue(new_child.parent is new_root)
+            self.assertEqual((new_child.size, new_child.action,
+                              new_child.other), (0, "create", "value"))
+
+        new_child = copy.copy(self.child)
+        self.assertEqual(new_child.name, "child")
+        self.assertEqual(new_child.other, "value")
+        self.assertEqual(new_child.parent, None)
+        self.assertEqual(new_child.children, [])
+
+    def test_plain_no_dictionary(self):
+        '''Validate objects with slots for everything have no dictionary'''
+        plain = PlainDataObject("plain")
+        self.assertFalse(hasattr(plain, "__dict__"))
+        self.assertRaises(AttributeError, setattr, plain, "other", "value")
+
+        self.child.insert_children(plain)
+        self.root.enable_index()
+        self.assertTrue(plain.indexed)
+        plain._name = "renamed"
+        self.assertEqual(self.root.find_path("//renamed"), [plain])
+
+        plain.size = 10
+        for new_plain in (copy.copy(plain), copy.deepcopy(plain),
+                          pickle.loads(pickle.dumps(plain))):
+            self.assertFalse(hasattr(new_plain, "__dict__"))
+            self.assertEqual((new_plain.name, new_plain.size),
+                             ("renamed", 10))
+            self.assertFalse(new_plain.indexed)
+
+    def test_subclass_without_slots(self):
+        '''Validate sub-classes without slots have a dictionary'''
+        class NoSlotsDataObject(SlotsDataObject):
+            '''Sub-class not declaring slots'''
+            pass
+
+        obj = NoSlotsDataObject("obj")
+        obj.other = "value"
+        self.assertTrue(isinstance(obj, DataObject))
+        self.assertEqual(obj.__dict__, {"other": "value"})
+        self.assertEqual(obj.size, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
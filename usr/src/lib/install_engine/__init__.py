@@ -28,16 +28,21 @@
 Class representing the Installation Execution Engine
 '''
 
+import cProfile
 import decimal
 import glob
 import imp
 import inspect
+import json
 import logging
 import os
+import Queue
 import shutil
 import string
+import sys
 import tempfile
 import threading
+import time
 import warnings
 
 import osol_install.errsvc as errsvc
@@ -48,7 +53,10 @@ from logging import CRITICAL, ERROR, WARNING, INFO, DEBUG, NOTSET
 from osol_install.install_utils import get_argspec
 from solaris_install.data_object import DataObject
 from solaris_install.data_object.cache import DataObjectCache
-from solaris_install.engine.checkpoint_data import CheckpointData
+from solaris_install.engine.checkpoint_data import CheckpointData, \
+     CheckpointRegistrationData
+from solaris_install.engine.profile import CheckpointProfile, ResourceUsage, \
+    TimingHistory
 from solaris_install.logger import InstallLogger, LogInitError, \
      INSTALL_LOGGER_NAME
 from solaris_install.target.logical import Filesystem
@@ -117,6 +125,8 @@ class EngineData(DataObject):
        engine related data
     '''
 
+    XML_TAGS = ()
+
     def __init__(self):
         DataObject.__init__(self, InstallEngine.ENGINE_DOC_ROOT)
 
@@ -167,7 +177,8 @@ class InstallEngine(object):
         start = threading.Thread.run
 
     def __new__(cls, default_log, loglevel=None, debug=False,
-        exclusive_rw=False, dataset=None, stop_on_error=True):
+        exclusive_rw=False, dataset=None, stop_on_error=True,
+        delta_snapshots=False, max_workers=1):
 
         if InstallEngine._instance is None:
             return object.__new__(cls)
@@ -176,7 +187,8 @@ class InstallEngine(object):
                                  InstallEngine._instance)
 
     def __init__(self, default_log, loglevel=None, debug=False,
-        exclusive_rw=False, dataset=None, stop_on_error=True):
+        exclusive_rw=False, dataset=None, stop_on_error=True,
+        delta_snapshots=False, max_workers=1):
         ''' Initializes the InstallEngine
 
         Input:
@@ -211,6 +223,19 @@ class InstallEngine(object):
               if a checkpoint fails.  This value can be set at a later time,
               if not set here.
 
+            - delta_snapshots: Optional.  Default to False.
+              If true, DataObjectCache snapshots taken between checkpoints
+              only store the parts of the DataObjectCache which changed
+              since the previous snapshot.  This value can be set at a
+              later time, if not set here.
+
+            - max_workers: Optional.  Default to 1.
+              Maximum number of checkpoints to execute at the same time.
+              Checkpoints registered with depends_on may be executed in
+              parallel with other checkpoints they don't depend on, when
+              this is greater than 1.  This value can be set at a later
+              time, if not set here.
+
         Output:
             None
 
@@ -230,7 +255,31 @@ class InstallEngine(object):
         self._dataset = None
         self.dataset = dataset
         self.stop_on_error = stop_on_error
-        self.__currently_executing = None
+        self.delta_snapshots = delta_snapshots
+        self.max_workers = max_workers
+
+        # If set, the path of a file to write a JSON report of the time
+        # and resources used by each checkpoint to, after executing them.
+        self.timing_report = None
+
+        # If set, the directory to save cProfile statistics of each
+        # checkpoint's execution in, as <checkpoint name>.prof
+        self.profile_dir = None
+
+        # If set, the path of a file to keep a history of how long each
+        # checkpoint took to execute in.  Progress is then estimated from
+        # how long checkpoints took before, instead of their
+        # get_progress_estimate().
+        self.timing_history = None
+
+        # Checkpoints being executed, keyed by the thread executing them.
+        self.__executing = dict()
+        self.__canceled = list()
+
+        # TimingHistory loaded from the timing_history file, and the
+        # CheckpointData of the checkpoints being executed.
+        self.__history = None
+        self.__exec_list = list()
 
         # Use 8 decimal precision for progress.  Using less precision
         # will cause problems when the estimated progress for some
@@ -297,7 +346,8 @@ class InstallEngine(object):
 
     def register_checkpoint(self, checkpoint_name, module_path,
                             checkpoint_class_name, insert_before=None,
-                            loglevel=None, args=(), kwargs=None):
+                            loglevel=None, args=(), kwargs=None,
+                            depends_on=None):
         '''Input:
             * checkpoint_name(required): Name used for referring to the
               checkpoint after registration.  This name must be unique among
@@ -344,6 +394,16 @@ class InstallEngine(object):
               be the order in which they are passed.  By default, no keyword
               arguments are passed.
 
+            * depends_on(optional): Names of the checkpoints which must
+              complete before this checkpoint is executed.  The named
+              checkpoints must have been registered before this
+              checkpoint's position in the list.  If depends_on is None
+              or not specified, this checkpoint depends on the checkpoint
+              registered immediately before it, so checkpoints are
+              executed one at a time, in registration order.  Checkpoints
+              which don't depend on each other may be executed in
+              parallel, if the engine's max_workers is greater than 1.
+
         Output:
             None
 
@@ -358,6 +418,9 @@ class InstallEngine(object):
             * UnknownChkptError: Name specified in insert_before argument
               is not found.
 
+            * ChkptRegistrationError: A name specified in the depends_on
+              argument is not registered before this checkpoint.
+
             * ChkptExecutedError: The checkpoint specified in the
               insert_before argument has been executed.
 
@@ -405,6 +468,7 @@ class InstallEngine(object):
         LOGGER.debug("kwargs: " + str(kwargs))
         LOGGER.debug("insert_before: " + str(insert_before))
         LOGGER.debug("log_level: " + str(loglevel))
+        LOGGER.debug("depends_on: " + str(depends_on))
         LOGGER.debug("=============================")
 
         # Go through list of existing checkpoints, and make sure the name
@@ -430,6 +494,19 @@ class InstallEngine(object):
             raise ChkptRegistrationError("insert_before checkpoint: " + \
                 insert_before + "is not a valid checkpoint")
 
+        if depends_on is not None:
+            if isinstance(depends_on, basestring):
+                depends_on = (depends_on,)
+            depends_on = tuple(depends_on)
+
+            registered_before = [cp.name for cp in
+                                 self._checkpoints[:insert_index]]
+            for dep_name in depends_on:
+                if dep_name not in registered_before:
+                    raise ChkptRegistrationError("depends_on checkpoint: " +
+                        str(dep_name) + " is not registered before " +
+                        checkpoint_name)
+
         if module_path.startswith('/'):
             mod_name = os.path.basename(module_path)
             mod_path = os.path.dirname(module_path)
@@ -439,7 +516,7 @@ class InstallEngine(object):
 
         chkp_data = CheckpointData(checkpoint_name, mod_name, mod_path,
                                    checkpoint_class_name, loglevel,
-                                   args, kwargs)
+                                   args, kwargs, depends_on)
 
         chkp_data.validate_checkpoint_info()
 
@@ -454,7 +531,8 @@ class InstallEngine(object):
                             dry_run=False, callback=None):
         ''' Execute all checkpoints in registration order, from start_from to
             pause_before.  The checkpoint specified at pause_before is not
-            executed.
+            executed.  Checkpoints registered with depends_on may be
+            executed in parallel, up to the engine's max_workers at a time.
 
         Input:
 
@@ -650,7 +728,8 @@ class InstallEngine(object):
         prev_completed_cp = None
         if engine_doc_root is not None:
             # Get list of previously successfully executed checkpoints from doc
-            prev_completed_cp = engine_doc_root.get_children()
+            prev_completed_cp = engine_doc_root.get_children(
+                class_type=CheckpointRegistrationData)
 
         if prev_completed_cp is None:
             prev_completed_cp = []
@@ -723,14 +802,32 @@ class InstallEngine(object):
             # need to normalize
             return cp_prog
 
-        cp_data = self.get_cp_data(self.__currently_executing.name)
-        cp_data.prog_reported = decimal.Decimal(cp_prog)
-        normalized_prog = (int)(cp_prog * cp_data.prog_est_ratio)
-
-        LOGGER.debug("progress: %s, reported %s, normalized %s, total=%s" %
-                     (self.__currently_executing.name, cp_prog,
-                     str(normalized_prog),
-                     str(self.__current_completed + normalized_prog)))
+        with self._checkpoint_lock:
+            executing = dict(self.__executing)
+
+        checkpoint = executing.get(threading.current_thread())
+        if checkpoint is None and len(executing) == 1:
+            # Reported from a thread started by the executing checkpoint.
+            checkpoint = executing.values()[0]
+
+        cp_name = None
+        if checkpoint is not None:
+            cp_name = checkpoint.name
+            cp_data = self.get_cp_data(cp_name)
+            cp_data.prog_reported = decimal.Decimal(cp_prog)
+
+        # Checkpoints executing in parallel each add their own progress.
+        normalized_prog = 0
+        for executing_cp in executing.itervalues():
+            cp_data = self.get_cp_data(executing_cp.name)
+            normalized_prog += (int)(cp_data.prog_reported *
+                                     cp_data.prog_est_ratio)
+
+        LOGGER.debug("progress: %s, reported %s, normalized %s, total=%s, "
+                     "remaining %.1fs" %
+                     (cp_name, cp_prog, str(normalized_prog),
+                     str(self.__current_completed + normalized_prog),
+                     self.get_remaining_time() or 0.0))
 
         return(str(int(self.__current_completed + normalized_prog)))
 
@@ -785,7 +882,7 @@ class InstallEngine(object):
 
         status = InstallEngine.EXEC_SUCCESS
         failed_checkpoint_list = []
-        completed = False
+        start_time = time.time()
 
         # Make sure to always start at 0 progress
         self.__current_completed = 0
@@ -800,89 +897,415 @@ class InstallEngine(object):
             LOGGER.debug(failed_init_cp + " checkpoint failed to initialize")
             callback(InstallEngine.CP_INIT_FAILED, [failed_init_cp])
             with self._checkpoint_lock:
-                self.__currently_executing = None
+                self.__executing.clear()
             return
 
         try:
-            for checkpoint in checkpoints:
-                with self._checkpoint_lock:
-                    # Determine whether the execution has
-                    # been canceled. (Acquire the lock to ensure that
-                    # cancel_checkpoints() isn't attempting to cancel
-                    # __currently_executing).
-                    if self._cancel_event.is_set():
-                        status = InstallEngine.EXEC_CANCELED
-                        failed_checkpoint_list.append(
-                            self.__currently_executing.name)
+            status = self.__schedule_checkpoints(checkpoints, dry_run,
+                                                 failed_checkpoint_list)
+        except BaseException as exception:
+            # Fatal error in InstallEngine - abort regardless of issue
+            LOGGER.exception("Aborting: Internal error in InstallEngine")
+            status = InstallEngine.FATAL_INTERNAL
+            error_info = errsvc.ErrorInfo(status, liberrsvc.ES_ERR)
+            error_info.set_error_data(liberrsvc.ES_DATA_EXCEPTION,
+                                      exception)
+            failed_checkpoint_list.insert(0, status)
+            # If we're in the main thread, raise this fatal error up.
+            if isinstance(self.checkpoint_thread,
+                          InstallEngine._PseudoThread):
+                raise
+        finally:
+            with self._checkpoint_lock:
+                self.__executing.clear()
+            self.__write_timing_report(checkpoint_data_list, status,
+                                       time.time() - start_time)
+            if not dry_run:
+                self.__record_history(checkpoint_data_list)
+
+        callback(status, failed_checkpoint_list)
+
+    def get_timing_report(self, checkpoint_data_list=None):
+        '''Returns a dictionary reporting the time and resources used by
+        the latest execution of checkpoints, suitable for encoding as JSON.
+
+        Input:
+            * checkpoint_data_list: optional.  The CheckpointData of the
+              checkpoints to report on.  Defaults to all the registered
+              checkpoints.
+
+        Output:
+            * A dictionary with:
+                > checkpoints: A list of dictionaries of the time and
+                  resources used by each of the checkpoints which have
+                  been executed, in registration order.  See
+                  solaris_install.engine.profile.CheckpointProfile
+                > load_time, wall_time, cpu_time, snapshot_time: totals
+                  for those checkpoints.
+        '''
+        if checkpoint_data_list is None:
+            checkpoint_data_list = self._checkpoints
+
+        profiles = [cp_data.profile for cp_data in checkpoint_data_list
+                    if cp_data.profile is not None and
+                    cp_data.profile.wall_time is not None]
+
+        report = dict()
+        report["checkpoints"] = [profile.to_dict() for profile in profiles]
+        for field in ("load_time", "wall_time", "cpu_time", "snapshot_time"):
+            report[field] = sum(getattr(profile, field)
+                                for profile in profiles)
+        return report
+
+    def __write_timing_report(self, checkpoint_data_list, status, elapsed):
+        '''THIS IS A PRIVATE METHOD
+
+        Logs the timing report for the checkpoints just executed, and
+        writes it to the timing_report file, if that is set.
+        '''
+        report = self.get_timing_report(checkpoint_data_list)
+        report["status"] = status
+        report["elapsed_time"] = elapsed
+
+        LOGGER.debug("Checkpoint timing report: %s",
+                     json.dumps(report, sort_keys=True))
+
+        if self.timing_report is None:
+            return
+
+        try:
+            with open(self.timing_report, "w") as report_file:
+                json.dump(report, report_file, indent=4, sort_keys=True)
+        except (IOError, OSError) as err:
+            LOGGER.warning("Unable to write checkpoint timing report to "
+                           "%s: %s", self.timing_report, err)
+
+    def __record_history(self, checkpoint_data_list):
+        '''THIS IS A PRIVATE METHOD
+
+        Adds how long each of the checkpoints which completed took to the
+        timing history, and saves it, if timing_history is set.
+        '''
+        if self.__history is None:
+            return
+
+        for cp_data in checkpoint_data_list:
+            profile = cp_data.profile
+            if profile is None or not profile.completed:
+                continue
+            self.__history.record(TimingHistory.get_key(cp_data),
+                                  profile.wall_time, profile.input_size)
+        self.__history.save()
+
+    def get_remaining_time(self):
+        '''Returns the estimated number of seconds of checkpoint execution
+        remaining, based on the progress estimates of the checkpoints being
+        executed, and the progress they have reported.  Where checkpoints
+        are executed in parallel, this is the sum of their times.
+
+        The estimates are only in seconds on this system when they are
+        learned from the timing_history.  Returns None if checkpoints
+        aren't being executed.
+        '''
+        if not self.__exec_list:
+            return None
+
+        remaining = 0.0
+        for cp_data in self.__exec_list:
+            profile = cp_data.profile
+            if profile is None or profile.wall_time is not None:
+                # Not loaded yet, or already executed.
+                continue
+            reported = min(float(cp_data.prog_reported), 100.0)
+            remaining += float(cp_data.prog_est) * (100.0 - reported) / 100.0
+        return remaining
+
+    def __schedule_checkpoints(self, checkpoints, dry_run,
+                               failed_checkpoint_list):
+        '''THIS IS A PRIVATE METHOD
+
+        Executes the checkpoints, each one once all the checkpoints it
+        depends on have finished, running up to max_workers of them at the
+        same time.  With a max_workers of 1, checkpoints are executed one
+        at a time, in the order given, by the calling thread.
+
+        DataObjectCache snapshots, for resuming at a checkpoint, are only
+        taken when every checkpoint before it has finished, and none after
+        it has started, so that they hold the same state as they would if
+        checkpoints were executed one at a time.  Checkpoints started while
+        others are still executing can't be resumed from.
+
+        Checkpoints are recorded as executed in the engine's DOC root in
+        the order given, regardless of the order they finish in.
+
+        Names of failed or canceled checkpoints are appended to
+        failed_checkpoint_list.  Returns the status of the execution.
+        '''
+        status = InstallEngine.EXEC_SUCCESS
+        order = [checkpoint.name for checkpoint in checkpoints]
+        depends = self.__get_dependencies(order)
+        max_workers = max(self.max_workers or 1, 1)
+        parallel = max_workers > 1
+
+        pending = list(checkpoints)
+        finished = set()
+        results = Queue.Queue()
+        workers = dict()
+        recorded = 0
+        last_finished = None
+        stopping = False
+
+        # Look up the engine's DOC root now, before any checkpoints might
+        # be changing the DOC in other threads.
+        engine_doc_root = self._engine_doc_root
+
+        with self._checkpoint_lock:
+            self.__canceled = list()
+
+        try:
+            while pending or workers:
+                # Start any checkpoints that are ready to execute.
+                while (pending and not stopping and
+                       len(workers) < max_workers):
+                    checkpoint = self.__next_ready(pending, depends, finished)
+                    if checkpoint is None:
                         break
-                    self.__currently_executing = checkpoint
+                    cp_data = self.get_cp_data(checkpoint.name)
+
+                    if parallel:
+                        thread = threading.Thread(
+                            target=self.__execute_checkpoint,
+                            name=InstallEngine.CP_THREAD + "." +
+                                 checkpoint.name,
+                            args=(checkpoint, dry_run, results))
+                    else:
+                        thread = threading.current_thread()
+
+                    with self._checkpoint_lock:
+                        # Determine whether the execution has
+                        # been canceled. (Acquire the lock to ensure that
+                        # cancel_checkpoints() isn't attempting to cancel
+                        # the executing checkpoints).
+                        if self._cancel_event.is_set():
+                            status = InstallEngine.EXEC_CANCELED
+                            stopping = True
+                            if self.__canceled:
+                                failed_checkpoint_list.extend(self.__canceled)
+                            elif last_finished is not None:
+                                failed_checkpoint_list.append(last_finished)
+                            break
+                        self.__executing[thread] = checkpoint
+
+                    # Take a snapshot of the state before executing the
+                    # checkpoint.  This snapshot, which is associated with
+                    # the checkpoint's name, is for resuming at the named
+                    # checkpoint.
+                    if status is InstallEngine.EXEC_SUCCESS:
+                        if (not workers and len(finished) == recorded and
+                            order[recorded] == checkpoint.name):
+                            self.__profile_snapshot(cp_data.profile,
+                                                    cp_data=cp_data)
+                        else:
+                            cp_data.data_cache_path = None
+                            cp_data.zfs_snap = None
+
+                    pending.remove(checkpoint)
+                    cp_data.prog_reported = decimal.Decimal('0')
+                    if workers:
+                        for name in workers.keys() + [checkpoint.name]:
+                            self.get_cp_data(name).profile.parallel = True
+                    workers[checkpoint.name] = thread
+                    if parallel:
+                        thread.start()
+                    else:
+                        self.__execute_checkpoint(checkpoint, dry_run,
+                                                  results)
+
+                if not workers:
+                    # Nothing is executing, and nothing more can be started.
+                    break
+
+                # Wait for a checkpoint to finish.
+                (checkpoint, exc_info) = results.get()
                 cp_data = self.get_cp_data(checkpoint.name)
+                thread = workers.pop(checkpoint.name)
+                if parallel:
+                    thread.join()
 
-                # Take a snapshot of the state before executing the checkpoint.
-                # This snapshot, which is associated with the checkpoint's
-                # name, is for resuming at the named checkpoint.
-                if status is InstallEngine.EXEC_SUCCESS:
-                    self.snapshot(cp_data=cp_data)
-
-                try:
-                    LOGGER.debug("Executing %s checkpoint", checkpoint.name)
-                    checkpoint.execute(dry_run)
-                except BaseException as exception:
-                    LOGGER.exception("Error occurred during execution "
-                                     "of '%s' checkpoint." % checkpoint.name)
-                    completed = False
+                with self._checkpoint_lock:
+                    # Determine whether the execution was canceled while
+                    # this checkpoint was executing.  If so, don't start
+                    # any more, and report the ones which were canceled.
+                    if (self._cancel_event.is_set() and
+                        status is not InstallEngine.EXEC_CANCELED):
+                        status = InstallEngine.EXEC_CANCELED
+                        stopping = True
+                        if self.__canceled:
+                            failed_checkpoint_list.extend(self.__canceled)
+                        else:
+                            failed_checkpoint_list.append(checkpoint.name)
+
+                if exc_info is not None:
                     error_info = errsvc.ErrorInfo(checkpoint.name,
                                                   liberrsvc.ES_ERR)
                     error_info.set_error_data(liberrsvc.ES_DATA_EXCEPTION,
-                                              exception)
-                    failed_checkpoint_list.append(checkpoint.name)
-                    status = InstallEngine.EXEC_FAILED
+                                              exc_info[1])
+                    if checkpoint.name not in failed_checkpoint_list:
+                        failed_checkpoint_list.append(checkpoint.name)
+                    if status is not InstallEngine.EXEC_CANCELED:
+                        status = InstallEngine.EXEC_FAILED
                     if self.stop_on_error:
+                        stopping = True
                         if (self.debug and
                             isinstance(self.checkpoint_thread,
                                        InstallEngine._PseudoThread)):
-                            raise
+                            raise exc_info[0], exc_info[1], exc_info[2]
                         else:
-                            break
-                else:
-                    # Checkpoint completed successfully without exceptions
-                    completed = True
-
-                self._engine_doc_root.insert_children(cp_data.cp_info)
-                cp_data.completed = completed
+                            with self._checkpoint_lock:
+                                del self.__executing[thread]
+                            continue
+
+                finished.add(checkpoint.name)
+                last_finished = checkpoint.name
+                cp_data.completed = exc_info is None
+                cp_data.profile.completed = cp_data.completed
+
+                # Record executed checkpoints, and how long they took, in
+                # the DOC in the order they were given.
+                while recorded < len(order) and order[recorded] in finished:
+                    recorded_data = self.get_cp_data(order[recorded])
+                    engine_doc_root.insert_children([recorded_data.cp_info,
+                                                     recorded_data.profile])
+                    recorded += 1
 
                 # Inform logger that the checkpoint has completed.
                 # This is to ensure that progress is being reported
                 # even if checkpoints don't report progress themselves
                 if cp_data.prog_reported < 100:
+                    cp_data.prog_reported = decimal.Decimal("100")
                     LOGGER.report_progress(msg=cp_data.name + " completed.",
                                            progress=100)
 
+                with self._checkpoint_lock:
+                    del self.__executing[thread]
+
                 # keep track of completed percentage
                 self.__current_completed += cp_data.prog_est_ratio * 100
 
-                # Take a snapshot of the state after executing the checkpoint.
-                # if it is successful.
-                if status is InstallEngine.EXEC_SUCCESS:
-                    self.snapshot(self._get_completed_name(cp_data.name))
-
-        except BaseException as exception:
-            # Fatal error in InstallEngine - abort regardless of issue
-            LOGGER.exception("Aborting: Internal error in InstallEngine")
-            status = InstallEngine.FATAL_INTERNAL
-            error_info = errsvc.ErrorInfo(status, liberrsvc.ES_ERR)
-            error_info.set_error_data(liberrsvc.ES_DATA_EXCEPTION,
-                                      exception)
-            failed_checkpoint_list.insert(0, status)
-            # If we're in the main thread, raise this fatal error up.
-            if isinstance(self.checkpoint_thread,
-                          InstallEngine._PseudoThread):
-                raise
+                # Take a snapshot of the state after executing the checkpoint
+                # if it is successful, and no others have executed since.
+                if (status is InstallEngine.EXEC_SUCCESS and not workers and
+                    len(finished) == recorded and
+                    order[recorded - 1] == checkpoint.name):
+                    self.__profile_snapshot(cp_data.profile,
+                        snapname=self._get_completed_name(cp_data.name))
         finally:
-            with self._checkpoint_lock:
-                self.__currently_executing = None
+            if workers:
+                # Only on an error in the engine, or when re-raising a
+                # checkpoint's error.  Don't leave checkpoints executing.
+                with self._checkpoint_lock:
+                    for checkpoint in self.__executing.values():
+                        checkpoint.cancel()
+                for thread in workers.values():
+                    if thread is not threading.current_thread():
+                        thread.join()
 
-        callback(status, failed_checkpoint_list)
+        return status
+
+    def __get_dependencies(self, order):
+        '''THIS IS A PRIVATE METHOD
+
+        Returns a dictionary of the names of the checkpoints each of the
+        checkpoints named in order depends on, leaving out those not in
+        order, which have already completed.
+        '''
+        depends = dict()
+        for (index, name) in enumerate(order):
+            depends_on = self.get_cp_data(name).depends_on
+            if depends_on is None:
+                depends_on = order[max(index - 1, 0):index]
+            depends[name] = set(depends_on).intersection(order[:index])
+        return depends
+
+    @staticmethod
+    def __next_ready(pending, depends, finished):
+        '''THIS IS A PRIVATE METHOD
+
+        Returns the first checkpoint in pending which has all the
+        checkpoints it depends on finished, or None if there isn't one.
+        '''
+        for checkpoint in pending:
+            if depends[checkpoint.name].issubset(finished):
+                return checkpoint
+        return None
+
+    def __profile_snapshot(self, profile, snapname=None, cp_data=None):
+        '''THIS IS A PRIVATE METHOD
+
+        Takes a snapshot, adding the time taken and the size of the DOC
+        snapshot to the given CheckpointProfile.
+        '''
+        start = time.time()
+        self.snapshot(snapname=snapname, cp_data=cp_data)
+        profile.snapshot_time += time.time() - start
+
+        if cp_data is not None:
+            snapname = cp_data.name
+        try:
+            profile.snapshot_bytes += os.path.getsize(
+                self.get_cache_filename(snapname))
+        except OSError:
+            # Nothing was written, e.g. when testing with a mock DOC.
+            pass
+
+    def __execute_checkpoint(self, checkpoint, dry_run, results):
+        '''THIS IS A PRIVATE METHOD
+
+        Executes a single checkpoint, putting the checkpoint and the
+        exception information for any error it raised, or None, on the
+        results queue.  The time and resources used are recorded in the
+        checkpoint's CheckpointProfile, along with cProfile statistics if
+        profile_dir is set.
+        '''
+        profile = self.get_cp_data(checkpoint.name).profile
+        profiler = None
+        if self.profile_dir is not None:
+            profiler = cProfile.Profile()
+
+        exc_info = None
+        start = ResourceUsage()
+        try:
+            LOGGER.debug("Executing %s checkpoint", checkpoint.name)
+            if profiler is not None:
+                profiler.runcall(checkpoint.execute, dry_run)
+            else:
+                checkpoint.execute(dry_run)
+        except BaseException:
+            LOGGER.exception("Error occurred during execution "
+                             "of '%s' checkpoint." % checkpoint.name)
+            exc_info = sys.exc_info()
+
+        profile.record_usage(start, ResourceUsage())
+        LOGGER.debug("%s checkpoint took %.2f seconds, %.2f CPU seconds",
+                     checkpoint.name, profile.wall_time, profile.cpu_time)
+        if profile.throughput is not None:
+            LOGGER.debug("%s checkpoint processed %s units of input, %.2f "
+                         "per second", checkpoint.name, profile.input_size,
+                         profile.throughput)
+
+        if profiler is not None:
+            profile_path = os.path.join(self.profile_dir,
+                                        checkpoint.name + ".prof")
+            try:
+                if not os.path.exists(self.profile_dir):
+                    os.makedirs(self.profile_dir)
+                profiler.dump_stats(profile_path)
+                profile.profile_path = profile_path
+            except (IOError, OSError) as err:
+                LOGGER.warning("Unable to save profile of %s checkpoint to "
+                               "%s: %s", checkpoint.name, profile_path, err)
+
+        results.put((checkpoint, exc_info))
 
     def snapshot(self, snapname=None, cp_data=None):
         '''Snapshots the current DOC state (and ZFS dataset, if it exists)'''
@@ -893,7 +1316,8 @@ class InstallEngine(object):
 
         filename = self.get_cache_filename(snapshot_name)
         LOGGER.debug("Snapshotting DOC to %s", filename)
-        self.data_object_cache.take_snapshot(filename)
+        self.data_object_cache.take_snapshot(filename,
+                                             delta=self.delta_snapshots)
         if cp_data is not None:
             cp_data.data_cache_path = filename
 
@@ -933,6 +1357,18 @@ class InstallEngine(object):
         total_estimate = decimal.Decimal('0')
         self.exec_prep = True
 
+        self.__history = None
+        if self.timing_history is not None:
+            self.__history = TimingHistory(self.timing_history)
+        self.__exec_list = checkpoint_data_list
+
+        # Estimates learned from the timing history, and the static
+        # estimates of the same checkpoints, used to scale the static
+        # estimates of checkpoints without a history.
+        learned = dict()
+        learned_total = 0.0
+        static_total = 0.0
+
         num_cp_to_load = float(len(checkpoint_data_list))
         num_cp_loaded = 0
 
@@ -942,9 +1378,12 @@ class InstallEngine(object):
                 InstallEngine.EXEC_PREP_RATIO * 100)
             LOGGER.report_progress(msg=InstallEngine.PREP_MSG,
                                    progress=load_prog)
+            cp_data.profile = CheckpointProfile(cp_data.name)
+            load_start = time.time()
             try:
                 checkpoint = cp_data.load_checkpoint()
                 prog_est = checkpoint.get_progress_estimate()
+                cp_data.profile.input_size = checkpoint.get_input_size()
             except BaseException as exception:
                 LOGGER.exception("Uncaught exception from '%s' checkpoint init"
                                      % cp_data.name)
@@ -952,16 +1391,42 @@ class InstallEngine(object):
                 error_info.set_error_data(liberrsvc.ES_DATA_EXCEPTION,
                                           exception)
                 return ([], cp_data.name)
+            cp_data.profile.load_time = time.time() - load_start
 
             if prog_est <= 0:
                 # Take care of the case where get_progress_estimate() returning
                 # invalid value
                 prog_est = 1
             cp_data.prog_est = decimal.Decimal(str(prog_est))
-            total_estimate += cp_data.prog_est
+            cp_data.prog_reported = decimal.Decimal('0')
+
+            if self.__history is not None:
+                estimate = self.__history.estimate(
+                    TimingHistory.get_key(cp_data),
+                    cp_data.profile.input_size)
+                if estimate is not None and estimate > 0:
+                    learned[cp_data.name] = estimate
+                    learned_total += estimate
+                    static_total += prog_est
+
             execute_these.append(checkpoint)
             num_cp_loaded += 1
 
+        # Checkpoints without a history are assumed to run as much faster
+        # or slower than their static estimates as those with one did.
+        scale = 1.0
+        if learned_total > 0 and static_total > 0:
+            scale = learned_total / static_total
+
+        for cp_data in checkpoint_data_list:
+            if cp_data.name in learned:
+                estimate = learned[cp_data.name]
+            else:
+                estimate = float(cp_data.prog_est) * scale
+            cp_data.prog_est = decimal.Decimal(str(estimate))
+            cp_data.profile.estimate = estimate
+            total_estimate += cp_data.prog_est
+
         self.exec_prep = False
         self.__current_completed += InstallEngine.EXEC_PREP_RATIO_DECIMAL * 100
 
@@ -1208,11 +1673,15 @@ class InstallEngine(object):
         '''
 
         with self._checkpoint_lock:
-            # Use the _checkpoint_lock to ensure that
-            # __currently_executing doesn't change after being canceled.
+            # Use the _checkpoint_lock to ensure that the executing
+            # checkpoints don't change after being canceled.
             self._cancel_event.set()
-            if self.__currently_executing is not None:
-                self.__currently_executing.cancel()
+            executing = [checkpoint.name for checkpoint in
+                         self.__executing.itervalues()]
+            self.__canceled = [cp.name for cp in self._checkpoints
+                               if cp.name in executing]
+            for checkpoint in self.__executing.itervalues():
+                checkpoint.cancel()
 
         if self.checkpoint_thread is not None:
             self.checkpoint_thread.join()
@@ -21,7 +21,7 @@
 #
 
 #
-# Copyright (c) 2010, 2011, Oracle and/or its affiliates. All rights reserved.
+# Copyright (c) 2010, 2012, Oracle and/or its affiliates. All rights reserved.
 #
 
 '''
@@ -75,6 +75,23 @@ class AbstractCheckpoint(object):
 
         raise NotImplementedError
 
+    def get_input_size(self):
+        ''' Returns the size of the input the checkpoint will process, such
+            as the number of bytes or packages to transfer, or None if the
+            time it takes doesn't depend on its input.  The engine records
+            how long checkpoints take for their input size, to estimate how
+            long they will take next time.  Called after
+            get_progress_estimate().
+
+        Input:
+            None
+        Output:
+            The size of the checkpoint's input, or None.
+        Raise:
+            None
+        '''
+        return None
+
     @abc.abstractmethod
     def execute(self, dry_run=False):
         ''' This function is required to be implemented by all subclasses
@@ -21,7 +21,7 @@
 #
 
 #
-# Copyright (c) 2010, 2011, Oracle and/or its affiliates. All rights reserved.
+# Copyright (c) 2010, 2012, Oracle and/or its affiliates. All rights reserved.
 #
 
 '''
@@ -107,6 +107,8 @@ def validate_function_args(func, args, kwargs):
 
 class CheckpointRegistrationData(DataObject):
     ''' All values stored here are provided during checkpoint registration '''
+    XML_TAGS = ()
+
     def __init__(self, name, mod_name, module_path, checkpoint_class_name,
                  loglevel, args, kwargs):
 
@@ -160,7 +162,7 @@ class CheckpointData(object):
         used by engine.  The values here are not stored in the DOC '''
 
     def __init__(self, name, mod_name, module_path, checkpoint_class_name,
-                 loglevel, args, kwargs):
+                 loglevel, args, kwargs, depends_on=None):
 
         self.cp_info = CheckpointRegistrationData(name, mod_name, module_path,
                                                   checkpoint_class_name,
@@ -175,6 +177,14 @@ class CheckpointData(object):
         self.prog_est = decimal.Decimal('0')
         self.prog_est_ratio = decimal.Decimal('0')
         self.prog_reported = decimal.Decimal('0')
+
+        # CheckpointProfile of the checkpoint's latest execution.
+        self.profile = None
+
+        # Names of the checkpoints this checkpoint depends on.  None means
+        # it depends on the checkpoint registered immediately before it.
+        self.depends_on = depends_on
+
         if args:
             self.args = args
         else:
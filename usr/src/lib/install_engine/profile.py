@@ -0,0 +1,254 @@
+#!/usr/bin/python
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+
+'''
+Classes for recording the time and resources used by checkpoints
+'''
+
+import errno
+import json
+import logging
+import os
+import platform
+import resource
+import time
+
+from solaris_install.data_object import DataObject
+from solaris_install.logger import INSTALL_LOGGER_NAME
+
+# ru_maxrss is in pages on Solaris, and in kilobytes elsewhere.
+if platform.system() == "SunOS":
+    _RSS_KB = resource.getpagesize() / 1024.0
+else:
+    _RSS_KB = 1
+
+
+class ResourceUsage(object):
+    ''' The time and resources used so far by this process, including
+        any child processes which have been waited for.
+    '''
+
+    def __init__(self):
+        self.wall_time = time.time()
+
+        self_usage = resource.getrusage(resource.RUSAGE_SELF)
+        child_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+        self.cpu_time = (self_usage.ru_utime + self_usage.ru_stime +
+                         child_usage.ru_utime + child_usage.ru_stime)
+        self.blocks_out = self_usage.ru_oublock + child_usage.ru_oublock
+        self.max_rss = int(max(self_usage.ru_maxrss, child_usage.ru_maxrss) *
+                           _RSS_KB)
+
+
+class CheckpointProfile(DataObject):
+    ''' The time and resources used to load and execute a checkpoint.
+
+        Resource usage is measured for the whole process, so where
+        checkpoints are executed in parallel, the CPU time and blocks
+        written of each include those of the others executing at the
+        same time.  Such checkpoints have the parallel attribute set.
+    '''
+
+    # Attributes, in the order they're reported in.
+    FIELDS = ("name", "completed", "parallel", "load_time", "estimate",
+              "wall_time", "cpu_time", "max_rss", "blocks_out",
+              "input_size", "throughput", "snapshot_time", "snapshot_bytes",
+              "profile_path")
+
+    XML_TAGS = ()
+
+    def __init__(self, cp_name):
+        DataObject.__init__(self, cp_name)
+
+        self.completed = False
+        self.parallel = False
+
+        # Seconds taken to instantiate the checkpoint and get its
+        # progress estimate.
+        self.load_time = 0.0
+
+        # Seconds the checkpoint was estimated to take, and the size of
+        # its input, as reported by get_input_size(), if it has one.
+        self.estimate = None
+        self.input_size = None
+
+        # Seconds taken by execute(), the CPU seconds used by it, the peak
+        # resident set size of the process, in kilobytes, when it finished,
+        # and the number of blocks written during it.
+        self.wall_time = None
+        self.cpu_time = None
+        self.max_rss = None
+        self.blocks_out = None
+
+        # Seconds taken to snapshot the DOC and ZFS dataset, before and
+        # after execute(), and the size of the DOC snapshots.
+        self.snapshot_time = 0.0
+        self.snapshot_bytes = 0
+
+        # cProfile statistics of execute(), if they were collected.
+        self.profile_path = None
+
+    def record_usage(self, start, end):
+        ''' Records the resources used between two ResourceUsages '''
+        self.wall_time = end.wall_time - start.wall_time
+        self.cpu_time = end.cpu_time - start.cpu_time
+        self.max_rss = end.max_rss
+        self.blocks_out = end.blocks_out - start.blocks_out
+
+    @property
+    def throughput(self):
+        ''' Input processed per second by execute(), or None if unknown '''
+        if not self.input_size or not self.wall_time:
+            return None
+        return self.input_size / self.wall_time
+
+    def to_dict(self):
+        ''' Returns a dictionary of the profile, suitable for a report '''
+        return dict((field, getattr(self, field))
+                    for field in CheckpointProfile.FIELDS)
+
+    def to_xml(self):
+        ''' Data to be used by engine only, will not be written to XML '''
+        return None
+
+    @classmethod
+    def from_xml(cls, xml_node):
+        ''' Data to be used by engine only, will not be retrieved XML '''
+        return None
+
+    @classmethod
+    def can_handle(cls, xml_node):
+        ''' Data to be used by engine only, will not be retrieved XML '''
+        return False
+
+    def __repr__(self):
+        return "CheckpointProfile: %s: wall %s, cpu %s, load %s, snapshot %s" \
+            % (self.name, self.wall_time, self.cpu_time, self.load_time,
+               self.snapshot_time)
+
+
+def _median(values):
+    ''' Returns the median of a non-empty list of numbers '''
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+class TimingHistory(object):
+    ''' How long checkpoints took to execute in previous installs and image
+        builds, kept in a JSON file, for estimating how long they will take
+        to execute next time.
+
+        Entries are keyed by the checkpoint's name, module and class, and
+        record the wall time taken and the checkpoint's input size, if it
+        has one.  Only the most recent MAX_ENTRIES of each are kept.
+    '''
+
+    VERSION = 1
+    MAX_ENTRIES = 10
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = dict()
+        self.load()
+
+    @staticmethod
+    def get_key(cp_data):
+        ''' Returns the key to record the given CheckpointData under '''
+        return "%s:%s.%s" % (cp_data.name, cp_data.cp_info.mod_name,
+                             cp_data.cp_info.checkpoint_class_name)
+
+    def load(self):
+        ''' Reads the history from the file, if there is one.  A history
+            which can't be read, or is of a different version, is ignored.
+        '''
+        logger = logging.getLogger(INSTALL_LOGGER_NAME)
+        self.entries = dict()
+        try:
+            with open(self.path, "r") as history_file:
+                history = json.load(history_file)
+        except IOError as err:
+            if err.errno != errno.ENOENT:
+                logger.warning("Unable to read checkpoint timing history "
+                               "from %s: %s", self.path, err)
+            return
+        except ValueError as err:
+            logger.warning("Ignoring invalid checkpoint timing history in "
+                           "%s: %s", self.path, err)
+            return
+
+        if not isinstance(history, dict) or \
+            history.get("version") != TimingHistory.VERSION:
+            logger.warning("Ignoring checkpoint timing history of an "
+                           "unknown version in %s", self.path)
+            return
+        self.entries = history.get("checkpoints", dict())
+
+    def save(self):
+        ''' Writes the history to the file, replacing it atomically '''
+        logger = logging.getLogger(INSTALL_LOGGER_NAME)
+        history = {"version": TimingHistory.VERSION,
+                   "checkpoints": self.entries}
+        temp_path = self.path + ".new"
+        try:
+            dir_name = os.path.dirname(self.path)
+            if dir_name and not os.path.exists(dir_name):
+                os.makedirs(dir_name)
+            with open(temp_path, "w") as history_file:
+                json.dump(history, history_file, indent=4, sort_keys=True)
+            os.rename(temp_path, self.path)
+        except (IOError, OSError) as err:
+            logger.warning("Unable to save checkpoint timing history to "
+                           "%s: %s", self.path, err)
+
+    def record(self, key, wall_time, input_size=None):
+        ''' Adds an execution of a checkpoint to the history '''
+        entries = self.entries.setdefault(key, list())
+        entries.append([wall_time, input_size])
+        del entries[:-TimingHistory.MAX_ENTRIES]
+
+    def estimate(self, key, input_size=None):
+        ''' Returns the number of seconds the checkpoint is expected to take,
+            or None if it hasn't been executed before.
+
+            Where both input_size and previous input sizes are known, the
+            estimate is the median time per unit of input multiplied by
+            input_size.  Otherwise it is the median time taken.
+        '''
+        entries = self.entries.get(key)
+        if not entries:
+            return None
+
+        if input_size:
+            rates = [float(wall_time) / size for (wall_time, size) in entries
+                     if size]
+            if rates:
+                return _median(rates) * input_size
+
+        return _median([wall_time for (wall_time, size) in entries])
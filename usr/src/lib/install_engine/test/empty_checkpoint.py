@@ -22,12 +22,13 @@
 #
 
 #
-# Copyright (c) 2010, Oracle and/or its affiliates. All rights reserved.
+# Copyright (c) 2010, 2012, Oracle and/or its affiliates. All rights reserved.
 #
 
 ''' Checkpoint to used for all the test cases '''
 
 from solaris_install.engine.checkpoint import AbstractCheckpoint
+import threading
 import time
 
 class EmptyCheckpoint(AbstractCheckpoint):
@@ -59,6 +60,34 @@ class EmptyCheckpoint(AbstractCheckpoint):
                 else:
                     time.sleep(2)
 
+class ParallelEmptyCheckpoint(EmptyCheckpoint):
+
+    ''' A checkpoint that waits, for up to 10 seconds, until wait_for
+        ParallelEmptyCheckpoints have been executing at the same time
+    '''
+
+    condition = threading.Condition()
+    executing = 0
+    max_executing = 0
+
+    def __init__(self, cp_name, wait_for=1):
+        ''' Class initializer method '''
+        EmptyCheckpoint.__init__(self, cp_name)
+        self.wait_for = wait_for
+
+    def execute(self, dry_run=False):
+        ''' Count the checkpoints executing, and wait for the others '''
+        cls = ParallelEmptyCheckpoint
+        with cls.condition:
+            cls.executing += 1
+            cls.max_executing = max(cls.max_executing, cls.executing)
+            cls.condition.notify_all()
+
+            end = time.time() + 10
+            while cls.max_executing < self.wait_for and time.time() < end:
+                cls.condition.wait(1)
+            cls.executing -= 1
+
 class FailureEmptyCheckpoint(AbstractCheckpoint):
 
     ''' A checkpoint that will throw exception in execute '''
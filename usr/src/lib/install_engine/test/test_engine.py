@@ -27,6 +27,7 @@
 
 '''Some unit tests to cover engine functionality'''
 
+import json
 import logging
 import os
 import sys
@@ -48,6 +49,7 @@ from empty_checkpoint import EmptyCheckpoint
 from solaris_install.engine.test.engine_test_utils import reset_engine, \
     get_new_engine_instance
 from solaris_install.data_object import DataObject
+from solaris_install.engine.profile import TimingHistory
 
 _THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(_THIS_DIR)
@@ -84,7 +86,7 @@ class MockDOC(object):
         on the actual DataObjectCache class for testing.
     '''
 
-    def take_snapshot(self, dummy):
+    def take_snapshot(self, dummy, delta=False):
         self.snapshotted = dummy
 
     def insert_children(self, dummy):
@@ -855,6 +857,140 @@ class EngineExecuteTests(EngineCheckpointsBase):
         self.assertNotEqual(cp, None)
         self.assertEqual(cp.name, expected_failed_cp[0])
 
+    def reg_parallel_checkpoints(self, names, wait_for, depends_on):
+        '''Register ParallelEmptyCheckpoints, and reset their counters'''
+        for name in names:
+            self.engine.register_checkpoint(name, self.cp_data_args[0],
+                                            "ParallelEmptyCheckpoint",
+                                            kwargs={"wait_for": wait_for},
+                                            depends_on=depends_on)
+
+        # Other tests may have the engine load empty_checkpoint again, so
+        # count using the class the engine loaded, not the one imported.
+        cp_data = self.engine.get_cp_data(names[0])
+        self.parallel_class = cp_data.checkpoint_class
+        self.parallel_class.executing = 0
+        self.parallel_class.max_executing = 0
+
+    def test_parallel_execute(self):
+        '''Validate independent checkpoints are executed in parallel'''
+        names = ["para1", "para2", "para3"]
+        self.reg_parallel_checkpoints(names, 3, ["five"])
+        self.engine.register_checkpoint("after", *self.cp_data_args,
+                                        depends_on=names)
+        self.engine.max_workers = 3
+
+        status, failed = self.engine.execute_checkpoints(dry_run=True)
+
+        self.assertEquals(status, self.engine.EXEC_SUCCESS)
+        self.assertEqual(0, len(failed))
+        self.assertEqual(self.parallel_class.max_executing, 3)
+        self.assertEqual(self.engine.get_first_incomplete(), None)
+
+        # Only checkpoints started with nothing else executing can be
+        # resumed from.
+        self.assertNotEqual(self.engine.get_cp_data("para1").data_cache_path,
+                            None)
+        self.assertEqual(self.engine.get_cp_data("para2").data_cache_path,
+                         None)
+        self.assertEqual(self.engine.get_cp_data("para3").data_cache_path,
+                         None)
+        self.assertNotEqual(self.engine.get_cp_data("after").data_cache_path,
+                            None)
+
+    def test_parallel_default_sequential(self):
+        '''Validate checkpoints without depends_on are executed in order'''
+        self.reg_parallel_checkpoints(["para1", "para2", "para3"], 1, None)
+        self.engine.max_workers = 3
+
+        status, failed = self.engine.execute_checkpoints(dry_run=True)
+
+        self.assertEquals(status, self.engine.EXEC_SUCCESS)
+        self.assertEqual(self.parallel_class.max_executing, 1)
+        for cp_data in self.engine._checkpoints:
+            self.assertNotEqual(cp_data.data_cache_path, None)
+
+    def test_parallel_cp_failed(self):
+        '''Validate checkpoints depending on a failed one are not executed'''
+        self.reg_parallel_checkpoints(["para1"], 1, ["two"])
+        self.engine.register_checkpoint("failed1", *self.failed_cp_data_args,
+                                        depends_on=["two"])
+        self.engine.register_checkpoint("after", *self.cp_data_args,
+                                        depends_on=["failed1"])
+        self.engine.max_workers = 2
+
+        status, failed = self.engine.execute_checkpoints(dry_run=True)
+
+        self.check_expected_failures(["failed1"], status, failed)
+        self.assertTrue(self.engine.get_cp_data("para1").completed)
+        self.assertFalse(self.engine.get_cp_data("after").completed)
+
+    def test_timing_report(self):
+        '''Validate a timing report and profiles are written for each
+           checkpoint'''
+        tmp_dir = tempfile.mkdtemp(prefix="engine_timing_test")
+        try:
+            self.engine.timing_report = os.path.join(tmp_dir, "timing.json")
+            self.engine.profile_dir = os.path.join(tmp_dir, "profiles")
+
+            status, failed = self.engine.execute_checkpoints(dry_run=True)
+            self.assertEquals(status, self.engine.EXEC_SUCCESS)
+
+            with open(self.engine.timing_report) as report_file:
+                report = json.load(report_file)
+
+            self.assertEqual(report["status"], self.engine.EXEC_SUCCESS)
+            self.assertEqual(self.name_list,
+                [profile["name"] for profile in report["checkpoints"]])
+            for profile in report["checkpoints"]:
+                self.assertTrue(profile["completed"])
+                self.assertTrue(profile["wall_time"] >= 0)
+                self.assertTrue(os.path.exists(profile["profile_path"]))
+
+            report = self.engine.get_timing_report()
+            self.assertEqual(len(report["checkpoints"]), len(self.name_list))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_timing_history(self):
+        '''Validate progress is estimated from the timing history'''
+        tmp_dir = tempfile.mkdtemp(prefix="engine_history_test")
+        try:
+            self.engine.timing_history = os.path.join(tmp_dir, "history.json")
+
+            status, failed = self.engine.execute_checkpoints()
+            self.assertEquals(status, self.engine.EXEC_SUCCESS)
+            with open(self.engine.timing_history) as history_file:
+                history = json.load(history_file)
+            self.assertEqual(len(history["checkpoints"]), len(self.name_list))
+
+            # Execute the same checkpoints again with a new engine, which
+            # estimates them from the history of the first execution.
+            timing_history = self.engine.timing_history
+            self.tearDown()
+            self.setUp()
+            self.engine.timing_history = timing_history
+
+            status, failed = self.engine.execute_checkpoints()
+            self.assertEquals(status, self.engine.EXEC_SUCCESS)
+            for name in self.name_list:
+                cp_data = self.engine.get_cp_data(name)
+                key = TimingHistory.get_key(cp_data)
+                self.assertEqual(cp_data.profile.estimate,
+                                 history["checkpoints"][key][0][0])
+            self.assertEqual(self.engine.get_remaining_time(), 0)
+
+            with open(timing_history) as history_file:
+                history = json.load(history_file)
+            for name in self.name_list:
+                cp_data = self.engine.get_cp_data(name)
+                key = TimingHistory.get_key(cp_data)
+                entries = history["checkpoints"][key]
+                self.assertEqual(len(entries), 2)
+                self.assertEqual(entries[1][0], cp_data.profile.wall_time)
+        finally:
+            shutil.rmtree(tmp_dir)
+
     def test_nothing_to_exec(self):
         '''Validate a warning is issued when there's no checkpoint to execute'''
         with warnings.catch_warnings(record=True) as w:
@@ -1343,6 +1479,43 @@ class EngineRegisterTests(EngineTest):
 
         self.check_result(self.test_chkpt_list)
 
+    def test_reg_depends_on_ok(self):
+        '''Verify that register checkpoints with depends_on works.'''
+
+        first = self.test_chkpt_list[0]
+        self.engine.register_checkpoint(first.name, self.cp_path,
+            first.cp_info.checkpoint_class_name)
+
+        for chkpt in self.test_chkpt_list[1:3]:
+            self.engine.register_checkpoint(chkpt.name, self.cp_path,
+                chkpt.cp_info.checkpoint_class_name, depends_on=["one"])
+
+        self.engine.register_checkpoint("another", self.cp_path,
+            "EmptyCheckpoint", insert_before="three", depends_on="two")
+
+        self.assertEqual(self.engine._checkpoints[0].depends_on, None)
+        self.assertEqual(self.engine._checkpoints[1].depends_on, ("one",))
+        self.assertEqual(self.engine._checkpoints[2].depends_on, ("two",))
+        self.assertEqual(self.engine._checkpoints[3].depends_on, ("one",))
+
+    def test_reg_depends_on_invalid_name(self):
+        '''Verify that register a checkpoint depending on one not registered
+           before it fails.'''
+
+        for chkpt in self.test_chkpt_list:
+            self.engine.register_checkpoint(chkpt.name, self.cp_path,
+                chkpt.cp_info.checkpoint_class_name)
+
+        self.assertRaises(engine.ChkptRegistrationError,
+            self.engine.register_checkpoint, "another", self.cp_path,
+            "EmptyCheckpoint", depends_on=["invalid_name"])
+
+        self.assertRaises(engine.ChkptRegistrationError,
+            self.engine.register_checkpoint, "another", self.cp_path,
+            "EmptyCheckpoint", insert_before="three", depends_on=["four"])
+
+        self.check_result(self.test_chkpt_list)
+
     def test_reg_insert_before_and_loglevel(self):
         '''Verify that register a checkpoint with both loglevel and insert_before argument works.'''
 
@@ -1557,6 +1730,35 @@ class EngineCancelTests(EngineCheckpointsBase):
         self.assertEqual(self.engine.get_first_incomplete(), None)
         self.assertEqual(self.engine.checkpoint_thread, None)
 
+    def test_cancel_parallel(self):
+        '''Test InstallEngine.cancel_checkpoints with checkpoints executing
+           in parallel'''
+        names = ["cancel1", "cancel2"]
+        for name in names:
+            self.engine.register_checkpoint(name, *self.cp_data_args,
+                                            kwargs={"wait_for_cancel": True},
+                                            depends_on=["one"])
+        self.engine.max_workers = 2
+
+        self.engine.execute_checkpoints(callback=self._exec_cp_callback,
+                                        dry_run=True)
+
+        # Wait a little bit so we get to the checkpoints we expect to cancel
+        self.callback_executed.wait(5)
+
+        self.engine.cancel_checkpoints()
+
+        self.callback_executed.wait(10)
+        self.assertTrue(self.callback_executed.is_set(),
+                        "Callback wasn't called-back")
+        self.engine.checkpoint_thread.join(15)
+
+        self.assertEqual(self.callback_results[0], self.engine.EXEC_CANCELED,
+                          "Engine did not return EXEC_CANCELED")
+
+        # Names of both checkpoints canceled should be returned.
+        self.assertEqual(names, self.callback_results[1])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,176 @@
+#!/usr/bin/python
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+
+'''Some unit tests to cover functionality in profile.py file'''
+
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import unittest
+
+from solaris_install.engine.profile import CheckpointProfile, \
+    ResourceUsage, TimingHistory
+
+
+class CheckpointProfileTest(unittest.TestCase):
+
+    ''' Test recording the time and resources used by checkpoints '''
+
+    def test_resource_usage(self):
+        ''' Verify ResourceUsage measures time and CPU used '''
+        start = ResourceUsage()
+        end_time = time.time() + 0.2
+        while time.time() < end_time:
+            pass
+        end = ResourceUsage()
+
+        self.assertTrue(end.wall_time - start.wall_time >= 0.2)
+        self.assertTrue(end.cpu_time > start.cpu_time)
+        self.assertTrue(end.max_rss > 0)
+        self.assertTrue(end.blocks_out >= start.blocks_out)
+
+    def test_record_usage(self):
+        ''' Verify CheckpointProfile records the difference in usage '''
+        start = ResourceUsage()
+        end = ResourceUsage()
+        end.wall_time = start.wall_time + 10
+        end.cpu_time = start.cpu_time + 4
+        end.blocks_out = start.blocks_out + 100
+
+        profile = CheckpointProfile("cp_one")
+        self.assertEqual(profile.wall_time, None)
+        profile.record_usage(start, end)
+
+        self.assertAlmostEqual(profile.wall_time, 10)
+        self.assertAlmostEqual(profile.cpu_time, 4)
+        self.assertEqual(profile.blocks_out, 100)
+        self.assertEqual(profile.max_rss, end.max_rss)
+
+    def test_to_dict(self):
+        ''' Verify a CheckpointProfile can be reported as JSON '''
+        profile = CheckpointProfile("cp_one")
+        profile.record_usage(ResourceUsage(), ResourceUsage())
+        profile.load_time = 1.5
+        profile.snapshot_time = 0.5
+
+        report = json.loads(json.dumps(profile.to_dict()))
+        self.assertEqual(sorted(report.keys()),
+                         sorted(CheckpointProfile.FIELDS))
+        self.assertEqual(report["name"], "cp_one")
+        self.assertEqual(report["load_time"], 1.5)
+        self.assertEqual(report["snapshot_time"], 0.5)
+        self.assertFalse(report["parallel"])
+
+    def test_not_in_xml(self):
+        ''' Verify a CheckpointProfile is kept in DOC snapshots only '''
+        profile = CheckpointProfile("cp_one")
+        profile.record_usage(ResourceUsage(), ResourceUsage())
+        self.assertEqual(profile.to_xml(), None)
+        self.assertFalse(CheckpointProfile.can_handle(None))
+
+        copy = pickle.loads(pickle.dumps(profile))
+        self.assertEqual(copy.to_dict(), profile.to_dict())
+
+
+class TimingHistoryTest(unittest.TestCase):
+
+    ''' Test learning how long checkpoints take from previous executions '''
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(prefix="timing_history_test")
+        self.path = os.path.join(self.tmp_dir, "history", "timing.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_no_history(self):
+        ''' Verify there's no estimate without a history '''
+        history = TimingHistory(self.path)
+        self.assertEqual(history.estimate("cp_one"), None)
+        self.assertEqual(history.estimate("cp_one", 100), None)
+
+    def test_estimate_median(self):
+        ''' Verify estimates are the median time taken '''
+        history = TimingHistory(self.path)
+        for wall_time in (10, 50, 12):
+            history.record("cp_one", wall_time)
+        self.assertEqual(history.estimate("cp_one"), 12)
+        history.record("cp_one", 14)
+        self.assertEqual(history.estimate("cp_one"), 13)
+
+    def test_estimate_by_size(self):
+        ''' Verify estimates scale with the input size '''
+        history = TimingHistory(self.path)
+        history.record("cp_one", 10, 1000)
+        history.record("cp_one", 30, 2000)
+        history.record("cp_one", 20, 2000)
+        self.assertEqual(history.estimate("cp_one", 4000), 40)
+        # Without a size, the median time taken.
+        self.assertEqual(history.estimate("cp_one"), 20)
+
+    def test_max_entries(self):
+        ''' Verify only the most recent executions are kept '''
+        history = TimingHistory(self.path)
+        for wall_time in range(TimingHistory.MAX_ENTRIES + 5):
+            history.record("cp_one", wall_time)
+        self.assertEqual(len(history.entries["cp_one"]),
+                         TimingHistory.MAX_ENTRIES)
+        self.assertEqual(history.entries["cp_one"][0][0], 5)
+
+    def test_save_and_load(self):
+        ''' Verify the history is kept between instances '''
+        history = TimingHistory(self.path)
+        history.record("cp_one", 10, 1000)
+        history.save()
+
+        self.assertEqual(TimingHistory(self.path).estimate("cp_one", 500), 5)
+
+    def test_invalid_history(self):
+        ''' Verify an unreadable or different version history is ignored '''
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as history_file:
+            history_file.write("not json")
+        self.assertEqual(TimingHistory(self.path).entries, dict())
+
+        with open(self.path, "w") as history_file:
+            json.dump({"version": TimingHistory.VERSION + 1,
+                       "checkpoints": {"cp_one": [[10, None]]}}, history_file)
+        self.assertEqual(TimingHistory(self.path).entries, dict())
+
+    def test_throughput(self):
+        ''' Verify the throughput of a checkpoint with an input size '''
+        profile = CheckpointProfile("cp_one")
+        self.assertEqual(profile.throughput, None)
+        profile.wall_time = 4.0
+        profile.input_size = 1000
+        self.assertEqual(profile.throughput, 250)
+
+
+if __name__ == '__main__':
+    unittest.main()
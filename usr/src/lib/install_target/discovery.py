@@ -33,9 +33,12 @@ import copy
 import optparse
 import os
 import platform
+import Queue
 import re
 import sys
 import tempfile
+import threading
+import time
 
 import solaris_install.target.vdevs as vdevs
 
@@ -54,6 +57,7 @@ from solaris_install.target.logical import BE, Filesystem, Logical, Zpool, Zvol
 from solaris_install.target.physical import Disk, DiskProp, DiskGeometry, \
     DiskKeyword, Iscsi, GPTPartition, Partition, Slice
 from solaris_install.target.size import Size
+from solaris_install.target.zfs_state import ZFSState, current as zfs_current
 
 
 CROINFO = "/usr/sbin/croinfo"
@@ -69,6 +73,12 @@ SVCS = "/usr/bin/svcs"
 SVCADM = "/usr/sbin/svcadm"
 UMOUNT = "/usr/sbin/umount"
 ZFS = "/usr/sbin/zfs"
+
+# number of threads to discover drives with, and seconds after which a
+# drive still being discovered is skipped, unless TargetDiscovery is given
+# others
+DEFAULT_WORKERS = 4
+DEFAULT_DRIVE_TIMEOUT = 300
 ZPOOL = "/usr/sbin/zpool"
 ZVOL_PATH = "/dev/zvol/dsk"
 ZVOL_RPATH = "/dev/zvol/rdsk"
@@ -104,7 +114,16 @@ class TargetDiscovery(Checkpoint):
     """ Discover all logical and physical devices on the system.
     """
 
-    def __init__(self, name, search_name=None, search_type=None):
+    def __init__(self, name, search_name=None, search_type=None,
+                 workers=DEFAULT_WORKERS,
+                 drive_timeout=DEFAULT_DRIVE_TIMEOUT):
+        """ workers - number of threads to discover drives with, 1 to
+        discover them one at a time in the calling thread
+
+        drive_timeout - with more than one worker, the number of seconds
+        after which a drive which is still being discovered is skipped, or
+        None to wait for every drive
+        """
         super(TargetDiscovery, self).__init__(name)
 
         self.dry_run = False
@@ -125,8 +144,19 @@ class TargetDiscovery(Checkpoint):
 
         # eeprom diag mode and bootdisk value
         self.sparc_diag_mode = False
+        self.sparc_diag_checked = False
         self.bootdisk = None
 
+        # output of 'iscsiadm list target -S', if there are any Iscsi objects
+        self.iscsi_targets = None
+
+        # concurrent discovery of drives
+        self.workers = max(workers, 1)
+        self.drive_timeout = drive_timeout
+
+        # list of (drive name, seconds taken to discover it)
+        self.drive_times = list()
+
         # kernel architecture
         self.arch = platform.processor()
 
@@ -175,16 +205,20 @@ class TargetDiscovery(Checkpoint):
             self.logger.debug("disk '%s' is offline" % drive.name)
             return None
 
+        # look up the aliases once, as each lookup returns new descriptors
+        # which have to read their attributes again
+        aliases = drive.aliases
+
         # set the wwn string, including lun if available
-        wwn = getattr(drive.aliases[0].attributes, "wwn", None)
+        wwn = getattr(aliases[0].attributes, "wwn", None)
         if wwn is not None:
-            lun = getattr(drive.aliases[0].attributes, "lun", None)
+            lun = getattr(aliases[0].attributes, "lun", None)
             if lun is not None:
                 new_disk.wwn = "%s,%d" % (wwn, lun)
             else:
                 new_disk.wwn = wwn
 
-        for alias in drive.aliases:
+        for alias in aliases:
             if self.verify_disk_read(alias.name,
                                      drive_media.attributes.blocksize):
                 new_disk.active_ctds.append(alias.name)
@@ -200,7 +234,7 @@ class TargetDiscovery(Checkpoint):
         # set the new_disk ctd string
         if new_disk.wwn is None:
             # use the only alias name
-            new_disk.ctd = drive.aliases[0].name
+            new_disk.ctd = aliases[0].name
         else:
             # use the first active ctd
             new_disk.ctd = new_disk.active_ctds[0]
@@ -222,19 +256,7 @@ class TargetDiscovery(Checkpoint):
         # check for SPARC eeprom settings which would interfere with finding
         # the boot disk
         if self.arch == "sparc":
-            if not self.sparc_diag_mode:
-                # check eeprom settings
-                cmd = [EEPROM, "diag-switch?"]
-                p = run(cmd)
-                diag_switch_value = p.stdout.partition("=")[2]
-                if diag_switch_value.strip().lower() == "true":
-                    # set a variable so we don't check every single disk and
-                    # log a message
-                    self.sparc_diag_mode = True
-                    self.logger.info("Unable to determine bootdisk with " + \
-                                     "diag-switch? eeprom setting set to " + \
-                                     "'true'.  Please set diag-switch? " + \
-                                     "to false and reboot the system")
+            self.check_sparc_diag_mode()
 
         # check for the bootdisk
         if not self.sparc_diag_mode:
@@ -249,12 +271,8 @@ class TargetDiscovery(Checkpoint):
             # check for any Iscsi object in the DOC.  If found, change the
             # dev_type from 'scsi' to 'iSCSI' to allow the installers finer
             # granularity when choosing these types of LUNs
-            iscsi_check = self.doc.get_descendants(class_type=Iscsi)
-            if iscsi_check:
-                cmd = [ISCSIADM, "list", "target", "-S"]
-                p = run(cmd)
-                if new_disk.ctd in p.stdout:
-                    new_disk.disk_prop.dev_type = "iSCSI"
+            if new_disk.ctd in self.get_iscsi_targets():
+                new_disk.disk_prop.dev_type = "iSCSI"
 
         new_disk.disk_prop.dev_vendor = drive_attributes.vendor_id
 
@@ -343,6 +361,155 @@ class TargetDiscovery(Checkpoint):
 
         return new_disk
 
+    def check_sparc_diag_mode(self):
+        """ check_sparc_diag_mode() - check the eeprom diag-switch? setting
+        once, setting sparc_diag_mode if it would interfere with finding the
+        boot disk
+        """
+        if self.sparc_diag_checked:
+            return
+        self.sparc_diag_checked = True
+
+        cmd = [EEPROM, "diag-switch?"]
+        p = run(cmd)
+        diag_switch_value = p.stdout.partition("=")[2]
+        if diag_switch_value.strip().lower() == "true":
+            self.sparc_diag_mode = True
+            self.logger.info("Unable to determine bootdisk with " + \
+                             "diag-switch? eeprom setting set to " + \
+                             "'true'.  Please set diag-switch? " + \
+                             "to false and reboot the system")
+
+    def get_iscsi_targets(self):
+        """ get_iscsi_targets() - return the output of 'iscsiadm list target
+        -S', looked up once per execution, or an empty string if there are no
+        Iscsi objects in the DOC
+        """
+        if self.iscsi_targets is None:
+            if self.doc.get_descendants(class_type=Iscsi):
+                cmd = [ISCSIADM, "list", "target", "-S"]
+                p = run(cmd)
+                self.iscsi_targets = p.stdout
+            else:
+                self.iscsi_targets = ""
+        return self.iscsi_targets
+
+    def discover_disks(self, drives):
+        """ discover_disks() - method to discover a list of drives, with a
+        pool of self.workers threads if more than one.  Returns a list of the
+        result of discover_disk() for each drive, in the same order as drives.
+
+        With more than one worker, a drive still being discovered after
+        self.drive_timeout seconds is logged and skipped (its result is None),
+        and another thread is started in place of the one discovering it.
+
+        drives - list of physical drives to discover
+        """
+        if self.workers == 1 or len(drives) < 2:
+            new_disks = list()
+            for drive in drives:
+                start = time.time()
+                new_disks.append(self.discover_disk(drive))
+                self.record_drive_time(drive, time.time() - start)
+            return new_disks
+
+        # look up everything discover_disk() caches before starting the
+        # workers, so they only read it
+        if self.arch == "sparc":
+            self.check_sparc_diag_mode()
+        if self.bootdisk is None:
+            self.bootdisk = devinfo.get_curr_bootdisk()
+        self.get_iscsi_targets()
+
+        work = Queue.Queue()
+        done = Queue.Queue()
+        for index, drive in enumerate(drives):
+            work.put((index, drive))
+
+        # start time of each drive a worker has taken from the queue
+        started = dict()
+
+        def worker():
+            """ discover drives from the work queue until it is empty
+            """
+            while True:
+                try:
+                    index, drive = work.get_nowait()
+                except Queue.Empty:
+                    return
+                started[index] = time.time()
+                try:
+                    done.put((index, self.discover_disk(drive), None))
+                except BaseException:
+                    done.put((index, None, sys.exc_info()))
+
+        threads = list()
+
+        def start_worker():
+            """ start a worker thread which won't block exiting """
+            thread = threading.Thread(target=worker,
+                name="TargetDiscovery.%d" % len(threads))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        for _none in range(min(self.workers, len(drives))):
+            start_worker()
+
+        new_disks = [None] * len(drives)
+        remaining = set(range(len(drives)))
+        try:
+            while remaining:
+                timeout = None
+                if self.drive_timeout is not None:
+                    running = [started[index] for index in remaining
+                               if index in started]
+                    if running:
+                        timeout = max(min(running) + self.drive_timeout -
+                                      time.time(), 0)
+                    else:
+                        timeout = self.drive_timeout
+                try:
+                    index, new_disk, exc_info = done.get(timeout=timeout)
+                except Queue.Empty:
+                    now = time.time()
+                    for index in sorted(remaining):
+                        if index in started and \
+                           now - started[index] >= self.drive_timeout:
+                            self.logger.warning("Skipping disk '%s' which "
+                                "was not discovered within %s seconds" %
+                                (drives[index].name, self.drive_timeout))
+                            remaining.remove(index)
+                            start_worker()
+                    continue
+
+                # skip drives which finished after timing out
+                if index not in remaining:
+                    continue
+                remaining.remove(index)
+                if exc_info is not None:
+                    raise exc_info[0], exc_info[1], exc_info[2]
+                new_disks[index] = new_disk
+                self.record_drive_time(drives[index],
+                                       time.time() - started[index])
+        finally:
+            # don't discover any more drives if stopped early
+            while True:
+                try:
+                    work.get_nowait()
+                except Queue.Empty:
+                    break
+
+        return new_disks
+
+    def record_drive_time(self, drive, seconds):
+        """ record_drive_time() - method to log and keep the time taken to
+        discover a drive
+        """
+        self.logger.debug("discovered disk '%s' in %.3f seconds" %
+                          (drive.name, seconds))
+        self.drive_times.append((drive.name, seconds))
+
     def verify_disk_read(self, ctd, blocksize):
         """
         verify_disk_read() - method to verify a low-level read from the raw ctd
@@ -571,15 +738,17 @@ class TargetDiscovery(Checkpoint):
         logical.noswap = True
         logical.nodump = True
 
-        # retreive the list of zpools
-        cmd = [ZPOOL, "list", "-H", "-o", "name"]
-        p = run(cmd)
-
-        # Get the list of zpools
-        zpool_list = p.stdout.splitlines()
+        # retrieve all zpools and datasets at once, from the ZFSState in
+        # use if there is one
+        state = zfs_current()
+        if state is None:
+            state = ZFSState()
+        elif not state.props_known:
+            # read the properties forgotten since the last change again
+            state.load()
 
         # walk the list and populate the DOC
-        for zpool_name in zpool_list:
+        for zpool_name in state.get_pool_names():
             # if the user has specified a specific search name, only run
             # discovery on that particular pool name
             if search_name and zpool_name != search_name:
@@ -593,49 +762,32 @@ class TargetDiscovery(Checkpoint):
             logical.insert_children(zpool)
 
             # check to see if the zpool is the boot pool
-            cmd = [ZPOOL, "list", "-H", "-o", "bootfs", zpool_name]
-            p = run(cmd)
-            if p.stdout.rstrip() != "-":
+            if state.get_pool_prop(zpool_name, "bootfs") != "-":
                 zpool.is_root = True
 
-            # get the mountpoint of the zpool
-            cmd = [ZFS, "get", "-H", "-o", "value", "mountpoint", zpool_name]
-            p = run(cmd)
-            zpool.mountpoint = p.stdout.strip()
+            # get the mountpoint of the zpool, or an empty string if the
+            # top level dataset isn't listed
+            zpool.mountpoint = state.get_dataset_prop(zpool_name,
+                                                      "mountpoint") or ""
 
             # set the vdev_mapping on each physical object in the DOC tree for
             # this zpool
             self.set_vdev_map(zpool)
 
-            # for each zpool, get all of its datasets.  Switch to the C locale
-            # so we don't have issues with LC_NUMERIC settings
-            cmd = [ZFS, "list", "-r", "-H", "-o",
-                   "name,type,used,mountpoint", zpool_name]
-            p = run(cmd, env={"LC_ALL": "C"})
-
-            # walk each dataset and create the appropriate DOC objects for
-            # each.  Skip the first line of list output, as the top level
-            # dataset (also the dataset with the same name as that of the
-            # zpool) may have a different mountpoint than the zpool.
-            for dataset in p.stdout.rstrip().split("\n")[1:]:
-                try:
-                    name, ds_type, ds_size, mountpoint = dataset.split(None, 3)
-                except ValueError as err:
-                    # trap on ValueError so any inconsistencies are captured
-                    self.logger.debug("Unable to process dataset: %r" %
-                                      dataset)
-                    self.logger.debug(str(err))
-                    continue
-
+            # walk each dataset of the zpool and create the appropriate DOC
+            # objects for each.  The top level dataset (also the dataset with
+            # the same name as that of the zpool) isn't included, as it may
+            # have a different mountpoint than the zpool.
+            for name, props in state.get_datasets(zpool_name):
                 # fix the name field to remove the name of the pool
                 name = name.partition(zpool_name + "/")[2]
 
-                if ds_type == "filesystem":
+                if props["type"] == "filesystem":
                     obj = Filesystem(name)
-                    obj.mountpoint = mountpoint
-                elif ds_type == "volume":
+                    obj.mountpoint = props["mountpoint"]
+                elif props["type"] == "volume":
                     obj = Zvol(name)
-                    obj.size = Size(ds_size)
+                    obj.size = Size.from_bytes(props["used"])
 
                     # check for swap/dump.  If there's a match, set the zvol
                     # 'use' attribute and the noswap/nodump attribute of
@@ -745,8 +897,12 @@ class TargetDiscovery(Checkpoint):
         add_physical - boolean value to signal if physical targets should be
         added to the DOC.
         """
+        start = time.time()
+        del self.drive_times[:]
+
         # to find all the drives on the system, first start with the
         # controllers
+        drives = list()
         for controller in diskmgt.descriptors_by_type(const.CONTROLLER):
             # skip USB floppy controllers
             if controller.floppy_controller:
@@ -757,24 +913,25 @@ class TargetDiscovery(Checkpoint):
                 self.discover_pseudo(controller)
             else:
                 # extract every drive on the given controller
-                for drive in controller.drives:
-                    # query libdiskmgt for the drive's information
-                    new_disk = self.discover_disk(drive)
+                drives.extend(controller.drives)
 
-                    # skip invalid drives and CDROM drives
-                    if new_disk is None or new_disk.iscdrom:
-                        continue
+        # query libdiskmgt for each drive's information
+        for new_disk in self.discover_disks(drives):
+            # skip invalid drives and CDROM drives
+            if new_disk is None or new_disk.iscdrom:
+                continue
 
-                    if add_physical:
-                        self.root.insert_children(new_disk)
+            if add_physical:
+                self.root.insert_children(new_disk)
 
         # extract all of the devpaths from all of the drives already inserted
-        devpath_list = [disk.devpath for disk in
-                        self.root.get_descendants(class_type=Disk)]
+        devpaths = set(disk.devpath for disk in
+                       self.root.get_descendants(class_type=Disk))
 
         # now walk all the drives in the system to make sure we pick up any
         # disks which have no controller (OVM Xen disks)
         self.logger.debug("Adding drives without controllers to the DOC")
+        drives = list()
         for drive in diskmgt.descriptors_by_type(const.DRIVE):
             # skip drives that have controllers.  They would have already been
             # discovered above.
@@ -785,19 +942,27 @@ class TargetDiscovery(Checkpoint):
             if drive.attributes.opath.startswith(ZVOL_RPATH):
                 continue
 
-            new_disk = self.discover_disk(drive)
+            drives.append(drive)
 
+        for new_disk in self.discover_disks(drives):
             # skip invalid drives and CDROM drives
             if new_disk is None or new_disk.iscdrom or new_disk.ctd == "dump":
                 continue
 
             # skip any disk we've already discovered
-            if new_disk.devpath in devpath_list:
+            if new_disk.devpath in devpaths:
                 continue
 
             if add_physical:
                 self.root.insert_children(new_disk)
 
+        if self.drive_times:
+            slowest = max(self.drive_times, key=lambda entry: entry[1])
+            self.logger.debug("Discovered %d drives in %.3f seconds, "
+                              "slowest was '%s' in %.3f seconds" %
+                              (len(self.drive_times), time.time() - start,
+                               slowest[0], slowest[1]))
+
     def setup_iscsi(self):
         """ set up the iSCSI initiator appropriately (if specified)
         such that any physical/logical iSCSI devices can be discovered.
@@ -878,18 +1043,15 @@ class TargetDiscovery(Checkpoint):
         # setup iSCSI so that all iSCSI physical and logical devices can be
         # discovered
         self.setup_iscsi()
+        self.iscsi_targets = None
 
         # check to see if the user specified a search_type
         if self.search_type == DISK_SEARCH_NAME:
             if isinstance(self.search_name, list):
-                for name in self.search_name:
-                    drive = retrieve_drive(name)
-                    new_disk = self.discover_disk(drive)
-                    if new_disk is not None:
-                        self.root.insert_children(new_disk)
+                drives = [retrieve_drive(name) for name in self.search_name]
             else:
-                drive = retrieve_drive(self.search_name)
-                new_disk = self.discover_disk(drive)
+                drives = [retrieve_drive(self.search_name)]
+            for new_disk in self.discover_disks(drives):
                 if new_disk is not None:
                     self.root.insert_children(new_disk)
 
@@ -992,6 +1154,13 @@ if __name__ == "__main__":
                           help="print all output from libdiskmgt")
         parser.add_option("--xml", dest="xml", action="store_true",
                           help="print DOC xml")
+        parser.add_option("-w", "--workers", dest="workers", type="int",
+                          default=DEFAULT_WORKERS,
+                          help="number of threads to discover drives with")
+        parser.add_option("-t", "--timeout", dest="timeout", type="float",
+                          default=DEFAULT_DRIVE_TIMEOUT,
+                          help="seconds after which to skip a drive, with "
+                          "more than one worker")
         options, args = parser.parse_args()
 
         # only run target discovery if the user requests something out of the
@@ -1210,7 +1379,8 @@ if __name__ == "__main__":
 
     # set up Target Discovery and execute it, finding the entire system
     InstallEngine()
-    TD = TargetDiscovery("Test TD")
+    TD = TargetDiscovery("Test TD", workers=options.workers,
+                         drive_timeout=options.timeout)
 
     # set dry_run to True so we don't label any drives on SPARC
     TD.execute(dry_run=True)
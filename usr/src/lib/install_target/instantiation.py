@@ -42,6 +42,7 @@ from solaris_install.target.logical import BE, DatasetOptions, Filesystem, \
     Options, PoolOptions, Vdev, Zvol, Zpool
 from solaris_install.target.physical import Disk, GPTPartition, Partition, \
     Slice
+from solaris_install.target.zfs_state import ZFSState
 
 
 class TargetInstantiation(Checkpoint):
@@ -435,23 +436,26 @@ class TargetInstantiation(Checkpoint):
 
         self.parse_doc()
 
-        # destroy swap and dump devices first
-        self.destroy_swap()
+        # check which pools and datasets exist from one snapshot of them,
+        # rather than running zpool or zfs for each one
+        with ZFSState():
+            # destroy swap and dump devices first
+            self.destroy_swap()
 
-        self.destroy_dump()
+            self.destroy_dump()
 
-        # destroy other logical devices
-        self.destroy_logicals()
+            # destroy other logical devices
+            self.destroy_logicals()
 
-        # destroy and then create physical devices
-        self.setup_physical()
+            # destroy and then create physical devices
+            self.setup_physical()
 
-        # set up logical devices (zpool, zvol, zfs, BE)
-        if self.logical_list:
-            self.create_logicals()
+            # set up logical devices (zpool, zvol, zfs, BE)
+            if self.logical_list:
+                self.create_logicals()
 
-        # lastly set up swap and dump devices
-        # since swap zvol can be defined as "max" size,
-        # it should be created in last.
-        self.create_dump()
-        self.create_swap()
+            # lastly set up swap and dump devices
+            # since swap zvol can be defined as "max" size,
+            # it should be created in last.
+            self.create_dump()
+            self.create_swap()
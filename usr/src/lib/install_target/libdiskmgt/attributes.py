@@ -31,10 +31,14 @@ All DMDescriptors have an attributes property.
 The attributes is an NVList. These classes simply know the correct keys
 for each type of NVList attribute.
 
+DMDescriptor.attributes returns a DMAttrSnapshot of the NVList, a Python
+copy with the same properties, so repeated lookups don't go through ctypes.
+
 NOTE: when subclassing libnvpair.nvl.NVList it is imperative to
       set the _type_ of the class for ctypes.
 """
 
+import collections
 import ctypes as C
 import numbers
 
@@ -643,3 +647,77 @@ class DMSliceAttr(NVList):
         rlist.append("\tdevt = %d" % (self.devt))
         rlist.append("\tdeviceid = %s" % (self.deviceid))
         return "\n".join(rlist)
+
+
+class DMAttrSnapshot(collections.Mapping):
+    """
+    A copy of a descriptor's attributes NVList in a Python dictionary, so
+    each attribute can be read without another call into libnvpair.
+
+    Subclasses have the same properties as the NVList class they copy, which
+    look up their NVKeys in the dictionary instead of the NVList.
+
+    DMAttrSnapshot(NVList) -> DMAttrSnapshot
+    """
+    def __init__(self, nvlist):
+        # keep the NVList, which owns the memory of any nested NVList values
+        self._nvlist = nvlist
+        self._values = dict()
+        if nvlist:
+            for key, val in nvlist.iteritems():
+                self._values[(key.name, key.datatype)] = val
+
+    def __getitem__(self, key):
+        """x.__getitem__(y) <==> x[y]"""
+        name, datatype = key
+        try:
+            return self._values[(name, datatype)]
+        except KeyError:
+            # as with NVList.lookup_boolean(), a missing boolean is False
+            if datatype == DATA_TYPE_BOOLEAN:
+                return False
+            raise KeyError(name)
+
+    def __iter__(self):
+        """x.__iter__() <==> iter(x)"""
+        return (NVKey(name, datatype) for (name, datatype) in self._values)
+
+    def __len__(self):
+        """x.__len__() <==> len(x)"""
+        return len(self._values)
+
+
+def _snapshot_class(attr_class):
+    """
+    _snapshot_class(NVList subclass) -> DMAttrSnapshot subclass with the
+    NVKeys, properties and __repr__ of attr_class.
+    """
+    members = dict()
+    for name, value in vars(attr_class).iteritems():
+        if isinstance(value, (NVKey, property)) or name == "__repr__":
+            members[name] = value
+    members["__doc__"] = "DMAttrSnapshot of a %s" % attr_class.__name__
+    members["__module__"] = attr_class.__module__
+    return type(attr_class.__name__ + "Snapshot", (DMAttrSnapshot,), members)
+
+
+DMDriveAttrSnapshot = _snapshot_class(DMDriveAttr)
+DMControllerAttrSnapshot = _snapshot_class(DMControllerAttr)
+DMMediaAttrSnapshot = _snapshot_class(DMMediaAttr)
+DMPathAttrSnapshot = _snapshot_class(DMPathAttr)
+DMAliasAttrSnapshot = _snapshot_class(DMAliasAttr)
+DMBusAttrSnapshot = _snapshot_class(DMBusAttr)
+DMPartAttrSnapshot = _snapshot_class(DMPartAttr)
+DMSliceAttrSnapshot = _snapshot_class(DMSliceAttr)
+
+# The snapshot class of each attributes NVList class.
+SNAPSHOT_TYPE = {
+    DMDriveAttr: DMDriveAttrSnapshot,
+    DMControllerAttr: DMControllerAttrSnapshot,
+    DMMediaAttr: DMMediaAttrSnapshot,
+    DMPathAttr: DMPathAttrSnapshot,
+    DMAliasAttr: DMAliasAttrSnapshot,
+    DMBusAttr: DMBusAttrSnapshot,
+    DMPartAttr: DMPartAttrSnapshot,
+    DMSliceAttr: DMSliceAttrSnapshot,
+}
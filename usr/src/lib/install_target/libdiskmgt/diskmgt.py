@@ -37,7 +37,7 @@ from solaris_install.target.cgc import CTypesStructureRef
 from solaris_install.target.libdiskmgt import cfunc, const, cstruct
 from solaris_install.target.libdiskmgt.attributes import DMDriveAttr, \
     DMControllerAttr, DMMediaAttr, DMSliceAttr, DMPartAttr, DMPathAttr, \
-    DMAliasAttr, DMBusAttr
+    DMAliasAttr, DMBusAttr, SNAPSHOT_TYPE
 from solaris_install.target.libnvpair.cfunc import nvlist_free
 
 """
@@ -66,6 +66,9 @@ DKIOCSETWCE = (0x04 << 8) | 37
 DKIOCGMEDIAINFO = (0x04 << 8) | 42
 DKC_CDROM = 1
 
+# Incremented by cache_update(), so descriptors re-read their attributes.
+_cache_generation = 0
+
 
 class DMDescriptor(cstruct.dm_desc):
     """DMDescriptor Base class"""
@@ -125,7 +128,31 @@ class DMDescriptor(cstruct.dm_desc):
 
     @property
     def attributes(self):
-        """attributes of this descriptor, an NVList or None"""
+        """attributes of this descriptor, a DMAttrSnapshot or None
+
+        The attributes are read from libdiskmgt once, and kept until
+        cache_update() is called.
+        """
+        try:
+            generation, snapshot = self._attributes
+            if generation == _cache_generation:
+                return snapshot
+        except AttributeError:
+            pass
+
+        attr = self.nvlist_attributes
+        if attr is None:
+            snapshot = None
+        else:
+            snapshot = SNAPSHOT_TYPE[type(self).ATYPE](attr)
+        self._attributes = (_cache_generation, snapshot)
+        return snapshot
+
+    @property
+    def nvlist_attributes(self):
+        """attributes of this descriptor, read from libdiskmgt as an NVList,
+        or None
+        """
         # Subclasses must set ATYPE.
         try:
             atype = type(self).ATYPE
@@ -582,8 +609,10 @@ def cache_update(event_type=const.DM_EV_DISK_ADD, devname=None):
     """ Rebuild libdiskmgt's controller and drive cache.  This is done so new
     drives (mapped iSCSI LUNs) can be added after local discovery has started.
     """
+    global _cache_generation
 
     cfunc.dm_cache_update(event_type, devname)
+    _cache_generation += 1
 
 
 # Used to change the result of a call to a C function.
@@ -52,264 +52,294 @@ from solaris_install.target.libnvpair import const, cfunc, cstruct
 ENOTSUP = 48  # errno should have this.
 
 
-class NVPair(C.POINTER(cstruct.nvpair)):
-    """ctypes pointer to nvpair_t with methods"""
-    _type_ = cstruct.nvpairp
+def _raise_not_implemented(nvpair):
+    """raise error as the datatype is not yet implemented"""
+    typestr = const.DATA_TYPE_MAP[nvpair.datatype]
+    raise NotImplementedError(typestr)
 
-    @property
-    def name(self):
-        """name of this NVPair, always an ASCII str"""
-        return cfunc.nvpair_name(self)
 
-    @property
-    def datatype(self):
-        """datatype of this NVPair, an int in data_type_enum"""
-        return cfunc.nvpair_type(self)
+class _ScalarValue(object):
+    """decorator for getting a scalar value from an NVPair."""
+    def __init__(self, cfunction):
+        """initialize decorator"""
+        self.cfunction = cfunction
 
-    @property
-    def datatype_str(self):
-        """datatype of this NVPair represented as a str"""
-        return const.DATA_TYPE_MAP[self.datatype]
+    def __call__(self, pyfunction):
+        """return function that calls cfunction with correct
+           datatype"""
+        def scalar_value_wrapper(nvpair):
+            """wrapper function"""
+            # The datatype is the second arg to the cfunction stored in
+            # argtypes as a C.POINTER
+            value = self.cfunction.argtypes[1]._type_()
+            err = self.cfunction(nvpair, C.byref(value))
+            # possible errors are EINVAL or ENOTSUP, neither should
+            # happen because we have hidden the ability to call the
+            # wrong value function from the user.
+            if err != 0:
+                raise OSError(err, "NVPair.value(): %s" %
+                              (os.strerror(err)))
+            return value.value
+        return scalar_value_wrapper
 
-    @property
-    def value(self):
-        """value stored in NVPair"""
-        # This is huge to make it magically return the right Python thing
 
-        def raise_not_implemented(nvpair):
-            """raise error as the datatype is not yet implemented"""
-            typestr = const.DATA_TYPE_MAP[self.datatype]
-            raise NotImplementedError(typestr)
+def _return_true(nvpair):
+    """return_true(NVPair) -> True"""
+    return True
 
-        class ScalarValue(object):
-            """decorator for getting a scalar value from an NVPair."""
-            def __init__(self, cfunction):
-                """initialize decorator"""
-                self.cfunction = cfunction
-
-            def __call__(self, pyfunction):
-                """return function that calls cfunction with correct
-                   datatype"""
-                def scalar_value_wrapper(nvpair):
-                    """wrapper function"""
-                    # The datatype is the second arg to the cfunction stored in
-                    # argtypes as a C.POINTER
-                    value = self.cfunction.argtypes[1]._type_()
-                    err = self.cfunction(nvpair, C.byref(value))
-                    # possible errors are EINVAL or ENOTSUP, neither should
-                    # happen because we have hidden the ability to call the
-                    # wrong value function from the user.
-                    if err != 0:
-                        raise OSError(err, "NVPair.value(): %s" %
-                                      (os.strerror(err)))
-                    return value.value
-                return scalar_value_wrapper
-
-        def return_true(nvpair):
-            """return_true(NVPair) -> True"""
-            return True
 
-        def value_boolean_value(nvpair):
-            """value_boolean_value(NVPair) -> bool"""
-            val = C.c_int()
-            err = cfunc.nvpair_value_boolean_value(nvpair, C.byref(val))
-            if err != 0:
-                raise OSError(err, "NVPair.value(): %s" % (os.strerror(err)))
-            return val.value == 1  # turn it into a bool
+def _value_boolean_value(nvpair):
+    """value_boolean_value(NVPair) -> bool"""
+    val = C.c_int()
+    err = cfunc.nvpair_value_boolean_value(nvpair, C.byref(val))
+    if err != 0:
+        raise OSError(err, "NVPair.value(): %s" % (os.strerror(err)))
+    return val.value == 1  # turn it into a bool
 
-        @ScalarValue(cfunc.nvpair_value_byte)
-        def value_byte(nvpair):
-            """value_byte(NVPair) -> int"""
 
-        @ScalarValue(cfunc.nvpair_value_int8)
-        def value_int8(nvpair):
-            """value_int8(NVPair) -> int"""
+@_ScalarValue(cfunc.nvpair_value_byte)
+def _value_byte(nvpair):
+    """value_byte(NVPair) -> int"""
 
-        @ScalarValue(cfunc.nvpair_value_uint8)
-        def value_uint8(nvpair):
-            """value_uint8(NVPair) -> int"""
 
-        @ScalarValue(cfunc.nvpair_value_int16)
-        def value_int16(nvpair):
-            """value_int16(NVPair) -> int"""
+@_ScalarValue(cfunc.nvpair_value_int8)
+def _value_int8(nvpair):
+    """value_int8(NVPair) -> int"""
 
-        @ScalarValue(cfunc.nvpair_value_uint16)
-        def value_uint16(nvpair):
-            """value_uint16(NVPair) -> int"""
 
-        @ScalarValue(cfunc.nvpair_value_int32)
-        def value_int32(nvpair):
-            """value_int32(NVPair) -> int"""
+@_ScalarValue(cfunc.nvpair_value_uint8)
+def _value_uint8(nvpair):
+    """value_uint8(NVPair) -> int"""
 
-        @ScalarValue(cfunc.nvpair_value_uint32)
-        def value_uint32(nvpair):
-            """value_uint32(NVPair) -> int"""
 
-        @ScalarValue(cfunc.nvpair_value_int64)
-        def value_int64(nvpair):
-            """value_int64(NVPair) -> long"""
+@_ScalarValue(cfunc.nvpair_value_int16)
+def _value_int16(nvpair):
+    """value_int16(NVPair) -> int"""
 
-        @ScalarValue(cfunc.nvpair_value_uint64)
-        def value_uint64(nvpair):
-            """value_uint64(NVPair) -> long"""
 
-        @ScalarValue(cfunc.nvpair_value_string)
-        def value_string(nvpair):
-            """value_string(NVPair) -> str"""
+@_ScalarValue(cfunc.nvpair_value_uint16)
+def _value_uint16(nvpair):
+    """value_uint16(NVPair) -> int"""
 
-        @ScalarValue(cfunc.nvpair_value_double)
-        def value_double(nvpair):
-            """value_double(NVPair) -> float"""
 
-        def value_nvlist(nvpair):
-            """value_nvlist(NVPair) -> NVList"""
-            val = NVList.__new__(NVList)
-            err = cfunc.nvpair_value_nvlist(nvpair, C.byref(val))
-            if err != 0:
-                raise OSError(err, "NVPair.value(): %s" % (os.strerror(err)))
-            # GC ALERT: must add ref to original nvlist (which nvpair better
-            #           have)
-            val._ref = nvpair._ref
-            return val
-
-        class ArrayValue(object):
-            """decorator for getting an array value from an NVPair."""
-            def __init__(self, cfunction):
-                """initialize decorator"""
-                self.cfunction = cfunction
-
-            def __call__(self, pyfunction):
-                """return function that calls cfunction with correct
-                   datatype"""
-                def array_value_wrapper(nvpair):
-                    """wrapper function"""
-                    # The datatype is the second arg to the cfunction stored in
-                    # argtypes as a C.POINTER
-                    nelem = C.c_uint()
-                    pvalue = self.cfunction.argtypes[1]._type_()
-                    err = self.cfunction(nvpair, C.byref(pvalue),
-                                         C.byref(nelem))
-                    # possible errors are EINVAL or ENOTSUP, neither should
-                    # happen because we have hidden the ability to call the
-                    # wrong value function from the user.
-                    if err != 0:
-                        raise OSError(err, "NVPair.value(): %s" %
-                                      (os.strerror(err)))
-                    rlist = list()
-                    for idx in xrange(nelem.value):
-                        rlist.append(pvalue[idx])
-                    return tuple(rlist)
-                return array_value_wrapper
-
-        def value_boolean_array(nvpair):
-            """value_boolean_array(NVPair) -> tuple of bool"""
-            nelem = C.c_uint()
-            pvalue = C.POINTER(C.c_int)()
-            err = cfunc.nvpair_value_boolean_array(nvpair,
-                                                   C.byref(pvalue),
-                                                   C.byref(nelem))
-            if err != 0:
-                raise OSError(err, "NVPair.value(): %s" % (os.strerror(err)))
-            rlist = list()
-            for idx in xrange(nelem.value):
-                rlist.append(pvalue[idx] == 1)  # why we can't use decorator
-            return tuple(rlist)
+@_ScalarValue(cfunc.nvpair_value_int32)
+def _value_int32(nvpair):
+    """value_int32(NVPair) -> int"""
 
-        @ArrayValue(cfunc.nvpair_value_byte_array)
-        def value_byte_array(nvpair):
-            """value_byte_array(NVPair) -> tuple of int"""
 
-        @ArrayValue(cfunc.nvpair_value_int8_array)
-        def value_int8_array(nvpair):
-            """value_int8_array(NVPair) -> tuple of int"""
+@_ScalarValue(cfunc.nvpair_value_uint32)
+def _value_uint32(nvpair):
+    """value_uint32(NVPair) -> int"""
 
-        @ArrayValue(cfunc.nvpair_value_uint8_array)
-        def value_uint8_array(nvpair):
-            """value_uint8_array(NVPair) -> tuple of int"""
 
-        @ArrayValue(cfunc.nvpair_value_int16_array)
-        def value_int16_array(nvpair):
-            """value_int16_array(NVPair) -> tuple of int"""
+@_ScalarValue(cfunc.nvpair_value_int64)
+def _value_int64(nvpair):
+    """value_int64(NVPair) -> long"""
 
-        @ArrayValue(cfunc.nvpair_value_uint16_array)
-        def value_uint16_array(nvpair):
-            """value_uint16_array(NVPair) -> tuple of int"""
 
-        @ArrayValue(cfunc.nvpair_value_int32_array)
-        def value_int32_array(nvpair):
-            """value_int32_array(NVPair) -> tuple of int"""
+@_ScalarValue(cfunc.nvpair_value_uint64)
+def _value_uint64(nvpair):
+    """value_uint64(NVPair) -> long"""
 
-        @ArrayValue(cfunc.nvpair_value_uint32_array)
-        def value_uint32_array(nvpair):
-            """value_uint32_array(NVPair) -> tuple of int"""
 
-        @ArrayValue(cfunc.nvpair_value_int64_array)
-        def value_int64_array(nvpair):
-            """value_int64_array(NVPair) -> tuple of int"""
+@_ScalarValue(cfunc.nvpair_value_string)
+def _value_string(nvpair):
+    """value_string(NVPair) -> str"""
 
-        @ArrayValue(cfunc.nvpair_value_uint64_array)
-        def value_uint64_array(nvpair):
-            """value_uint64_array(NVPair) -> tuple of int"""
 
-        @ArrayValue(cfunc.nvpair_value_string_array)
-        def value_string_array(nvpair):
-            """value_string_array(NVPair) -> tuple of str"""
+@_ScalarValue(cfunc.nvpair_value_double)
+def _value_double(nvpair):
+    """value_double(NVPair) -> float"""
 
-        def value_nvlist_array(nvpair):
-            """value_nvlist_array(NVPair) -> tuple of NVList"""
-            nelem = C.c_uint()
-            pvalue = C.POINTER(NVList)()
 
-            # correct the arg type from nvlistp to NVList
-            oarg = cfunc.nvpair_value_nvlist_array.argtypes
-            narg = list(oarg)
-            narg[1] = C.POINTER(C.POINTER(NVList))
-            cfunc.nvpair_value_nvlist_array.argtypes = narg
+def _value_nvlist(nvpair):
+    """value_nvlist(NVPair) -> NVList"""
+    val = NVList.__new__(NVList)
+    err = cfunc.nvpair_value_nvlist(nvpair, C.byref(val))
+    if err != 0:
+        raise OSError(err, "NVPair.value(): %s" % (os.strerror(err)))
+    # GC ALERT: must add ref to original nvlist (which nvpair better
+    #           have)
+    val._ref = nvpair._ref
+    return val
+
+
+class _ArrayValue(object):
+    """decorator for getting an array value from an NVPair."""
+    def __init__(self, cfunction):
+        """initialize decorator"""
+        self.cfunction = cfunction
 
-            err = cfunc.nvpair_value_nvlist_array(nvpair,
-                                                  C.byref(pvalue),
-                                                  C.byref(nelem))
+    def __call__(self, pyfunction):
+        """return function that calls cfunction with correct
+           datatype"""
+        def array_value_wrapper(nvpair):
+            """wrapper function"""
+            # The datatype is the second arg to the cfunction stored in
+            # argtypes as a C.POINTER
+            nelem = C.c_uint()
+            pvalue = self.cfunction.argtypes[1]._type_()
+            err = self.cfunction(nvpair, C.byref(pvalue),
+                                 C.byref(nelem))
+            # possible errors are EINVAL or ENOTSUP, neither should
+            # happen because we have hidden the ability to call the
+            # wrong value function from the user.
             if err != 0:
-                raise OSError(err, "NVPair.value(): %s" % (os.strerror(err)))
+                raise OSError(err, "NVPair.value(): %s" %
+                              (os.strerror(err)))
             rlist = list()
-            # GC ALERT: must add ref to original nvlist (which nvpair better
-            #           have)
             for idx in xrange(nelem.value):
-                pvalue[idx]._ref = nvpair._ref  # why we can't use decorator
                 rlist.append(pvalue[idx])
             return tuple(rlist)
+        return array_value_wrapper
+
+
+def _value_boolean_array(nvpair):
+    """value_boolean_array(NVPair) -> tuple of bool"""
+    nelem = C.c_uint()
+    pvalue = C.POINTER(C.c_int)()
+    err = cfunc.nvpair_value_boolean_array(nvpair,
+                                           C.byref(pvalue),
+                                           C.byref(nelem))
+    if err != 0:
+        raise OSError(err, "NVPair.value(): %s" % (os.strerror(err)))
+    rlist = list()
+    for idx in xrange(nelem.value):
+        rlist.append(pvalue[idx] == 1)  # why we can't use decorator
+    return tuple(rlist)
+
 
-        value_function = { \
-            const.DATA_TYPE_BOOLEAN:       return_true,  # exist means True
-            const.DATA_TYPE_BOOLEAN_VALUE: value_boolean_value,
-            const.DATA_TYPE_BYTE:          value_byte,
-            const.DATA_TYPE_INT8:          value_int8,
-            const.DATA_TYPE_UINT8:         value_uint8,
-            const.DATA_TYPE_INT16:         value_int16,
-            const.DATA_TYPE_UINT16:        value_uint16,
-            const.DATA_TYPE_INT32:         value_int32,
-            const.DATA_TYPE_UINT32:        value_uint32,
-            const.DATA_TYPE_INT64:         value_int64,
-            const.DATA_TYPE_UINT64:        value_uint64,
-            const.DATA_TYPE_STRING:        value_string,
-            const.DATA_TYPE_NVLIST:        value_nvlist,
-            const.DATA_TYPE_BOOLEAN_ARRAY: value_boolean_array,
-            const.DATA_TYPE_BYTE_ARRAY:    value_byte_array,
-            const.DATA_TYPE_INT8_ARRAY:    value_int8_array,
-            const.DATA_TYPE_UINT8_ARRAY:   value_uint8_array,
-            const.DATA_TYPE_INT16_ARRAY:   value_int16_array,
-            const.DATA_TYPE_UINT16_ARRAY:  value_uint16_array,
-            const.DATA_TYPE_INT32_ARRAY:   value_int32_array,
-            const.DATA_TYPE_UINT32_ARRAY:  value_uint32_array,
-            const.DATA_TYPE_INT64_ARRAY:   value_int64_array,
-            const.DATA_TYPE_UINT64_ARRAY:  value_uint64_array,
-            const.DATA_TYPE_STRING_ARRAY:  value_string_array,
-            const.DATA_TYPE_NVLIST_ARRAY:  value_nvlist_array,
-            const.DATA_TYPE_DOUBLE:        value_double,
-            #const.DATA_TYPE_HRTIME:       None, # value_hrtime
-        }.get(self.datatype, raise_not_implemented)
-
-        return value_function(self)
+@_ArrayValue(cfunc.nvpair_value_byte_array)
+def _value_byte_array(nvpair):
+    """value_byte_array(NVPair) -> tuple of int"""
+
+
+@_ArrayValue(cfunc.nvpair_value_int8_array)
+def _value_int8_array(nvpair):
+    """value_int8_array(NVPair) -> tuple of int"""
+
+
+@_ArrayValue(cfunc.nvpair_value_uint8_array)
+def _value_uint8_array(nvpair):
+    """value_uint8_array(NVPair) -> tuple of int"""
+
+
+@_ArrayValue(cfunc.nvpair_value_int16_array)
+def _value_int16_array(nvpair):
+    """value_int16_array(NVPair) -> tuple of int"""
+
+
+@_ArrayValue(cfunc.nvpair_value_uint16_array)
+def _value_uint16_array(nvpair):
+    """value_uint16_array(NVPair) -> tuple of int"""
+
+
+@_ArrayValue(cfunc.nvpair_value_int32_array)
+def _value_int32_array(nvpair):
+    """value_int32_array(NVPair) -> tuple of int"""
+
+
+@_ArrayValue(cfunc.nvpair_value_uint32_array)
+def _value_uint32_array(nvpair):
+    """value_uint32_array(NVPair) -> tuple of int"""
+
+
+@_ArrayValue(cfunc.nvpair_value_int64_array)
+def _value_int64_array(nvpair):
+    """value_int64_array(NVPair) -> tuple of int"""
+
+
+@_ArrayValue(cfunc.nvpair_value_uint64_array)
+def _value_uint64_array(nvpair):
+    """value_uint64_array(NVPair) -> tuple of int"""
+
+
+@_ArrayValue(cfunc.nvpair_value_string_array)
+def _value_string_array(nvpair):
+    """value_string_array(NVPair) -> tuple of str"""
+
+
+def _value_nvlist_array(nvpair):
+    """value_nvlist_array(NVPair) -> tuple of NVList"""
+    nelem = C.c_uint()
+    pvalue = C.POINTER(NVList)()
+
+    # correct the arg type from nvlistp to NVList
+    oarg = cfunc.nvpair_value_nvlist_array.argtypes
+    narg = list(oarg)
+    narg[1] = C.POINTER(C.POINTER(NVList))
+    cfunc.nvpair_value_nvlist_array.argtypes = narg
+
+    err = cfunc.nvpair_value_nvlist_array(nvpair,
+                                          C.byref(pvalue),
+                                          C.byref(nelem))
+    if err != 0:
+        raise OSError(err, "NVPair.value(): %s" % (os.strerror(err)))
+    rlist = list()
+    # GC ALERT: must add ref to original nvlist (which nvpair better
+    #           have)
+    for idx in xrange(nelem.value):
+        pvalue[idx]._ref = nvpair._ref  # why we can't use decorator
+        rlist.append(pvalue[idx])
+    return tuple(rlist)
+
+
+# The function returning the value of an NVPair of each datatype.
+_VALUE_FUNCTIONS = { \
+    const.DATA_TYPE_BOOLEAN:       _return_true,  # exist means True
+    const.DATA_TYPE_BOOLEAN_VALUE: _value_boolean_value,
+    const.DATA_TYPE_BYTE:          _value_byte,
+    const.DATA_TYPE_INT8:          _value_int8,
+    const.DATA_TYPE_UINT8:         _value_uint8,
+    const.DATA_TYPE_INT16:         _value_int16,
+    const.DATA_TYPE_UINT16:        _value_uint16,
+    const.DATA_TYPE_INT32:         _value_int32,
+    const.DATA_TYPE_UINT32:        _value_uint32,
+    const.DATA_TYPE_INT64:         _value_int64,
+    const.DATA_TYPE_UINT64:        _value_uint64,
+    const.DATA_TYPE_STRING:        _value_string,
+    const.DATA_TYPE_NVLIST:        _value_nvlist,
+    const.DATA_TYPE_BOOLEAN_ARRAY: _value_boolean_array,
+    const.DATA_TYPE_BYTE_ARRAY:    _value_byte_array,
+    const.DATA_TYPE_INT8_ARRAY:    _value_int8_array,
+    const.DATA_TYPE_UINT8_ARRAY:   _value_uint8_array,
+    const.DATA_TYPE_INT16_ARRAY:   _value_int16_array,
+    const.DATA_TYPE_UINT16_ARRAY:  _value_uint16_array,
+    const.DATA_TYPE_INT32_ARRAY:   _value_int32_array,
+    const.DATA_TYPE_UINT32_ARRAY:  _value_uint32_array,
+    const.DATA_TYPE_INT64_ARRAY:   _value_int64_array,
+    const.DATA_TYPE_UINT64_ARRAY:  _value_uint64_array,
+    const.DATA_TYPE_STRING_ARRAY:  _value_string_array,
+    const.DATA_TYPE_NVLIST_ARRAY:  _value_nvlist_array,
+    const.DATA_TYPE_DOUBLE:        _value_double,
+    #const.DATA_TYPE_HRTIME:       None, # value_hrtime
+}
+
+
+class NVPair(C.POINTER(cstruct.nvpair)):
+    """ctypes pointer to nvpair_t with methods"""
+    _type_ = cstruct.nvpairp
+
+    @property
+    def name(self):
+        """name of this NVPair, always an ASCII str"""
+        return cfunc.nvpair_name(self)
+
+    @property
+    def datatype(self):
+        """datatype of this NVPair, an int in data_type_enum"""
+        return cfunc.nvpair_type(self)
+
+    @property
+    def datatype_str(self):
+        """datatype of this NVPair represented as a str"""
+        return const.DATA_TYPE_MAP[self.datatype]
+
+    @property
+    def value(self):
+        """value stored in NVPair"""
+        return _VALUE_FUNCTIONS.get(self.datatype,
+                                    _raise_not_implemented)(self)
 
     def __repr__(self):
         """x.__repr__() <==> repr(x)"""
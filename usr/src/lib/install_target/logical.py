@@ -36,6 +36,7 @@ from solaris_install import CalledProcessError, Popen
 from solaris_install.data_object import DataObject, ParsingError
 from solaris_install.data_object.data_dict import DataObjectDict
 from solaris_install.logger import INSTALL_LOGGER_NAME as ILN
+from solaris_install.target import zfs_state
 from solaris_install.target.size import Size
 from solaris_install.target.shadow.logical import ShadowLogical
 from solaris_install.target.shadow.zpool import ShadowZpool
@@ -58,6 +59,8 @@ DEFAULT_BE_NAME = "solaris"
 class Logical(DataObject):
     """ logical DOC node definition
     """
+    XML_TAGS = ("logical",)
+
     def __init__(self, name):
         super(Logical, self).__init__(name)
 
@@ -137,6 +140,8 @@ class Logical(DataObject):
 class Zpool(DataObject):
     """ zpool DOC node definition
     """
+    XML_TAGS = ("zpool",)
+
     def __init__(self, name, vdev_list=None, mountpoint=None):
         super(Zpool, self).__init__(name)
 
@@ -202,6 +207,10 @@ class Zpool(DataObject):
     def exists(self):
         """ property to check for the existance of the zpool
         """
+        state = zfs_state.current()
+        if state is not None:
+            return state.pool_exists(self.name)
+
         cmd = [ZPOOL, "list", self.name]
         p = Popen.check_call(cmd, stdout=Popen.STORE, stderr=Popen.STORE,
                              check_result=Popen.ANY)
@@ -232,6 +241,7 @@ class Zpool(DataObject):
         if not dry_run:
             Popen.check_call(cmd, stdout=Popen.STORE, stderr=Popen.STORE,
                              logger=ILN)
+            zfs_state.changed()
 
     def get(self, propname="all"):
         """ get() - method to return a specific zpool property.
@@ -239,6 +249,12 @@ class Zpool(DataObject):
         propname - name of the property to return.  If the user does not
         specify a propname, return all pool properties
         """
+        state = zfs_state.current()
+        if state is not None:
+            value = state.get_pool_prop(self.name, propname)
+            if value is not None:
+                return {propname: value}
+
         cmd = [ZPOOL, "get", propname, self.name]
         p = Popen.check_call(cmd, stdout=Popen.STORE, stderr=Popen.STORE,
                              logger=ILN)
@@ -283,6 +299,7 @@ class Zpool(DataObject):
         if not dry_run:
             Popen.check_call(cmd, stdout=Popen.STORE, stderr=Popen.STORE,
                              logger=ILN)
+            zfs_state.created(self.name, is_pool=True)
 
     def destroy(self, dry_run, force=False):
         """ method to destroy the zpool
@@ -296,6 +313,7 @@ class Zpool(DataObject):
             if not dry_run:
                 Popen.check_call(cmd, stdout=Popen.STORE, stderr=Popen.STORE,
                                  logger=ILN)
+                zfs_state.destroyed(self.name, is_pool=True)
 
     def add_vdev(self, label, redundancy):
         """ add_vdev() - method to create a Vdev object and add it as a child
@@ -384,6 +402,8 @@ class Zpool(DataObject):
 class Vdev(DataObject):
     """ vdev DOC node definition
     """
+    XML_TAGS = ("vdev",)
+
     def __init__(self, name):
         super(Vdev, self).__init__(name)
 
@@ -417,6 +437,8 @@ class Vdev(DataObject):
 class Filesystem(DataObject):
     """ Filesystem DOC node definition
     """
+    XML_TAGS = ("filesystem",)
+
     def __init__(self, name):
         super(Filesystem, self).__init__(name)
 
@@ -511,6 +533,7 @@ class Filesystem(DataObject):
         cmd = [ZFS, "snapshot", snap]
         Popen.check_call(cmd, stdout=Popen.STORE, stderr=Popen.STORE,
                          logger=ILN)
+        zfs_state.changed()
 
     def snapname(self, short_name):
         '''Returns the full (dataset@snapshot) name based on the given
@@ -539,6 +562,7 @@ class Filesystem(DataObject):
         cmd.append(self.snapname(to_snapshot))
         Popen.check_call(cmd, stdout=Popen.STORE, stderr=Popen.STORE,
                          logger=ILN)
+        zfs_state.changed()
 
     def set(self, prop, value, dry_run):
         """ method to set a property on the ZFS filesystem
@@ -547,10 +571,19 @@ class Filesystem(DataObject):
         if not dry_run:
             Popen.check_call(cmd, stdout=Popen.STORE, stderr=Popen.STORE,
                              logger=ILN)
+            zfs_state.changed()
 
     def get(self, prop):
         """ method to return the value for a ZFS property of the filesystem
         """
+        # sizes are kept as integers in the ZFSState, but are returned here
+        # as zfs shows them
+        state = zfs_state.current()
+        if state is not None and prop not in zfs_state.INTEGER_PROPS:
+            value = state.get_dataset_prop(self.full_name, prop)
+            if value is not None:
+                return value
+
         cmd = [ZFS, "get", "-H", "-o", "value", prop, self.full_name]
         p = Popen.check_call(cmd, stdout=Popen.STORE, stderr=Popen.STORE,
                              stderr_loglevel=logging.DEBUG, logger=ILN)
@@ -572,6 +605,7 @@ class Filesystem(DataObject):
             if not dry_run:
                 Popen.check_call(cmd, stdout=Popen.STORE, stderr=Popen.STORE,
                                  logger=ILN, env={"LC_ALL": "C"})
+                zfs_state.created(self.full_name)
 
     def destroy(self, dry_run, snapshot=None, recursive=False):
         """ destroy the filesystem
@@ -588,11 +622,19 @@ class Filesystem(DataObject):
 
                 Popen.check_call(cmd, stdout=Popen.STORE, stderr=Popen.STORE,
                                  logger=ILN)
+                if snapshot is not None:
+                    zfs_state.changed()
+                else:
+                    zfs_state.destroyed(self.full_name)
 
     @property
     def exists(self):
         """ property to check for the existance of the filesystem
         """
+        state = zfs_state.current()
+        if state is not None and "@" not in self.full_name:
+            return state.dataset_exists(self.full_name)
+
         cmd = [ZFS, "list", self.full_name]
         p = Popen.check_call(cmd, stdout=Popen.STORE, stderr=Popen.STORE,
                              check_result=Popen.ANY)
@@ -602,6 +644,8 @@ class Filesystem(DataObject):
 class Zvol(DataObject):
     """ Zvol DOC node definition
     """
+    XML_TAGS = ("zvol",)
+
     def __init__(self, name):
         super(Zvol, self).__init__(name)
 
@@ -681,6 +725,10 @@ class Zvol(DataObject):
     def exists(self):
         """ property to check for the existance of the zvol
         """
+        state = zfs_state.current()
+        if state is not None:
+            return state.dataset_exists(self.full_name)
+
         cmd = [ZFS, "list", self.full_name]
         p = Popen.check_call(cmd, stdout=Popen.STORE, stderr=Popen.STORE,
                              check_result=Popen.ANY)
@@ -699,8 +747,17 @@ class Zvol(DataObject):
                 # Size of zvol is capped to 90 % to avoid full zpool
                 # issues.
                 if self.parent is not None:
-                    fs = Filesystem(self.parent.name)
-                    fs_size = Size(fs.get("available"))
+                    state = zfs_state.current()
+                    if state is not None:
+                        available = state.get_dataset_prop(self.parent.name,
+                                                           "available")
+                    else:
+                        available = None
+                    if available is not None:
+                        fs_size = Size.from_bytes(available)
+                    else:
+                        fs = Filesystem(self.parent.name)
+                        fs_size = Size(fs.get("available"))
                     zvol_size = str(int(fs_size.get(Size.mb_units) * 0.9)) + \
                                     "M"
                     self.size = Size(zvol_size)
@@ -718,6 +775,7 @@ class Zvol(DataObject):
             if not dry_run:
                 Popen.check_call(cmd, stdout=Popen.STORE, stderr=Popen.STORE,
                                  logger=ILN, env={"LC_ALL": "C"})
+                zfs_state.created(self.full_name)
 
                 # check the "use" attribute
                 if self.use == "swap":
@@ -785,6 +843,7 @@ class Zvol(DataObject):
                     cmd = [ZFS, "destroy", self.full_name]
                     Popen.check_call(cmd, stdout=Popen.STORE,
                                      stderr=Popen.STORE, logger=ILN)
+                    zfs_state.destroyed(self.full_name)
 
     def __repr__(self):
         return "Zvol: name=%s; action=%s; use=%s; size=%s" % \
@@ -883,6 +942,8 @@ class DatasetOptions(Options):
 class BE(DataObject):
     """ be DOC node definition
     """
+    XML_TAGS = ("be",)
+
     def __init__(self, initial_name=None):
         if initial_name is None:
             initial_name = DEFAULT_BE_NAME
@@ -951,6 +1012,7 @@ class BE(DataObject):
                 shared_fs_list=shared_fs_list,
                 shared_fs_zfs_properties=shared_fs_zfs_properties,
                 allow_auto_naming=allow_auto_naming)
+            zfs_state.invalidate()
 
             # If auto-naming is allowed, the processes of initialize a new BE
             # may have ended up creating a different name.  We reap that
@@ -974,12 +1036,14 @@ class BE(DataObject):
         """
         if not dry_run:
             be_destroy(self.name)
+            zfs_state.invalidate()
 
     def activate(self, dry_run):
         """ method to activate a BE.
         """
         if not dry_run:
             be_activate(self.name)
+            zfs_state.invalidate()
 
     def mount(self, mountpoint, dry_run, altpool=None):
         """ method to mount a BE.
@@ -988,6 +1052,7 @@ class BE(DataObject):
             if not os.path.exists(mountpoint):
                 os.makedirs(mountpoint)
             be_mount(self.name, mountpoint, altpool)
+            zfs_state.changed()
             self.mountpoint = mountpoint
 
     def unmount(self, dry_run, altpool=None):
@@ -995,6 +1060,7 @@ class BE(DataObject):
         """
         if not dry_run:
             be_unmount(self.name, altpool)
+            zfs_state.changed()
             self.mountpoint = None
 
 
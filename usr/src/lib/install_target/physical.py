@@ -180,6 +180,12 @@ class NoGPTPartitionSlotsFree(Exception):
 
 
 class GPTPartition(DataObject):
+    # Discovery creates many of these, so keep their attributes in slots.
+    __slots__ = ("action", "force", "size", "start_sector", "_guid", "uguid",
+                 "flag", "in_use", "in_zpool", "in_vdev",
+                 "_is_pcfs_formatted", "size_in_sectors")
+    XML_TAGS = ("gpt_partition",)
+
     def __init__(self, name):
         super(GPTPartition, self).__init__(name)
         # set the default partition type to Solaris
@@ -572,6 +578,13 @@ class Partition(DataObject):
     # extended partition.
     EXTENDED_ID_LIST = [5, 12, 15]
 
+    # callers set other attributes of their own, e.g. type
+    __slots__ = ("action", "validate_children", "part_type", "bootid",
+                 "is_linux_swap", "size", "start_sector", "in_zpool",
+                 "in_vdev", "_is_pcfs_formatted", "size_in_sectors",
+                 "__dict__")
+    XML_TAGS = ("partition",)
+
     def __init__(self, name, validate_children=True):
         super(Partition, self).__init__(name)
         self.action = "create"
@@ -842,10 +855,10 @@ class Partition(DataObject):
                 # do not correct for holes that start at 0
                 if usage[i] == 0:
                     holes.append(HoleyObject(
-                        usage[i], Size(str(size - 1) + Size.sector_units)))
+                        usage[i], Size.from_sectors(size - 1)))
                 else:
                     holes.append(HoleyObject(
-                        usage[i] + 1, Size(str(size - 1) + Size.sector_units)))
+                        usage[i] + 1, Size.from_sectors(size - 1)))
 
             # step across the size of the child
             i += 2
@@ -955,8 +968,8 @@ class Partition(DataObject):
         """ remaining_space() - instance property to return a Size object of
         the remaining overall space available on the Partition
         """
-        return Size(str(self.size.sectors - \
-            sum([c.size.sectors for c in self._children])) + Size.sector_units)
+        return Size.from_sectors(self.size.sectors - \
+            sum([c.size.sectors for c in self._children]))
 
     @property
     def is_pcfs_formatted(self):
@@ -1058,6 +1071,8 @@ class HoleyObject(DataObject):
     """ class definition for HoleyObject
     """
 
+    XML_TAGS = ()
+
     def __init__(self, start_sector, size):
         super(HoleyObject, self).__init__("hole")
         self.start_sector = start_sector
@@ -1084,6 +1099,10 @@ class Slice(DataObject):
     """ class definition for Slice objects
     """
 
+    __slots__ = ("action", "force", "is_swap", "size", "start_sector", "tag",
+                 "flag", "in_use", "in_zpool", "in_vdev", "size_in_sectors")
+    XML_TAGS = ("slice",)
+
     def __init__(self, name):
         super(Slice, self).__init__(name)
 
@@ -1233,6 +1252,15 @@ class Disk(DataObject):
 
     reserved_guids = (efi_const.EFI_RESERVED,)
 
+    # callers set other attributes of their own, e.g. use_whole_segment
+    __slots__ = ("validate_children", "disk_prop", "disk_keyword", "ctd",
+                 "volid", "devpath", "devid", "receptacle", "opath", "wwn",
+                 "iscdrom", "requires_mbr_efi_partition", "geometry",
+                 "kernel_arch", "in_zpool", "in_vdev", "_whole_disk",
+                 "_label", "write_cache", "_sysboot_guid", "_required_guids",
+                 "active_ctds", "passive_ctds", "__dict__")
+    XML_TAGS = ("disk",)
+
     def __init__(self, name, validate_children=True):
         """ constructor for the class
         """
@@ -1490,9 +1518,7 @@ class Disk(DataObject):
         blocks = 1 + 1 + \
             (efi_const.EFI_MIN_ARRAY_SIZE / self.geometry.blocksize)
 
-        return Size(str(blocks) + \
-                    Size.sector_units,
-                    blocksize=self.geometry.blocksize)
+        return Size.from_sectors(blocks, blocksize=self.geometry.blocksize)
 
     @property
     def gpt_backup_table_size(self):
@@ -1505,9 +1531,7 @@ class Disk(DataObject):
         blocks = 1 + \
             (efi_const.EFI_MIN_ARRAY_SIZE / self.geometry.blocksize)
 
-        return Size(str(blocks) + \
-                    Size.sector_units,
-                    blocksize=self.geometry.blocksize)
+        return Size.from_sectors(blocks, blocksize=self.geometry.blocksize)
 
     @property
     def gpt_partitions(self):
@@ -2472,7 +2496,7 @@ class Disk(DataObject):
             # alignment unit
             if size >= min_block_count:
                 holes.append(HoleyObject(start_sector + 1,
-                    Size(str(size) + Size.sector_units)))
+                    Size.from_sectors(size)))
 
             # step across the size of the child
             i += 2
@@ -2523,10 +2547,10 @@ class Disk(DataObject):
                 # do not correct for holes that start at 0
                 if start_sector == 0:
                     holes.append(HoleyObject(start_sector,
-                        Size(str(size - 1) + Size.sector_units)))
+                        Size.from_sectors(size - 1)))
                 else:
                     holes.append(HoleyObject(start_sector + 1,
-                        Size(str(size - 1) + Size.sector_units)))
+                        Size.from_sectors(size - 1)))
 
             # step across the size of the child
             i += 2
@@ -2546,22 +2570,20 @@ class Disk(DataObject):
 
                 # reset the attributes of the hole
                 hole.start_sector = new_start_sector
-                hole.size = Size(str(hole.size.sectors - difference) + \
-                                 Size.sector_units)
+                hole.size = Size.from_sectors(hole.size.sectors - difference)
 
             # check the start_sector of the gap.  If it starts at zero, adjust
             # it to start at the first cylinder boundary
             if hole.start_sector == 0:
                 hole.start_sector = self.geometry.cylsize
-                hole.size = \
-                    Size(str(hole.size.sectors - self.geometry.cylsize) + \
-                         Size.sector_units)
+                hole.size = Size.from_sectors(
+                    hole.size.sectors - self.geometry.cylsize)
 
             # adjust the size down to the nearest end cylinder
             if hole.size.sectors % self.geometry.cylsize != 0:
                 new_size = (hole.size.sectors / self.geometry.cylsize) * \
                            self.geometry.cylsize
-                hole.size = Size(str(new_size) + Size.sector_units)
+                hole.size = Size.from_sectors(new_size)
 
             # finally, re-check the size of the hole.  If it's smaller than a
             # cylinder, do not add it to the list
@@ -2650,8 +2672,7 @@ class Disk(DataObject):
             if size > LOGICAL_ADJUSTMENT:
                 # set the start_sector of the hole to include the offset.
                 start_sector = usage[i] + LOGICAL_ADJUSTMENT
-                size_obj = Size(str(size - 1 - LOGICAL_ADJUSTMENT) + \
-                                Size.sector_units)
+                size_obj = Size.from_sectors(size - 1 - LOGICAL_ADJUSTMENT)
                 holes.append(HoleyObject(start_sector, size_obj))
 
             # step across the size of the child
@@ -3037,8 +3058,7 @@ class Disk(DataObject):
             new_geometry.nheads = nhead
             new_geometry.nsectors = nsect
             self.geometry = new_geometry
-            self.disk_prop.dev_size = Size(str(ncyl * nhead * nsect) +
-                                           Size.sector_units)
+            self.disk_prop.dev_size = Size.from_sectors(ncyl * nhead * nsect)
 
             # update the label
             self.label = "VTOC"
@@ -3096,8 +3116,8 @@ class Disk(DataObject):
         """ remaining_space() - instance property to return a Size object of
         the remaining overall space available on the Disk
         """
-        return Size(str(self.disk_prop.dev_size.sectors - \
-            sum([c.size.sectors for c in self._children])) + Size.sector_units)
+        return Size.from_sectors(self.disk_prop.dev_size.sectors - \
+            sum([c.size.sectors for c in self._children]))
 
 
 class DiskGeometry(object):
@@ -3166,6 +3186,8 @@ class Iscsi(DataObject):
 
     ISCSI_DEFAULT_PORT = "3260"
 
+    XML_TAGS = ("iscsi",)
+
     def __init__(self, name):
         super(Iscsi, self).__init__(name)
 
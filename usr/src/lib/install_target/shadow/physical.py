@@ -23,6 +23,9 @@
 #
 # Copyright (c) 2011, 2012, Oracle and/or its affiliates. All rights reserved.
 #
+import bisect
+import weakref
+
 import osol_install.errsvc as errsvc
 
 from solaris_install.target.libadm.const import FD_NUMPART, MAX_EXT_PARTS, \
@@ -42,6 +45,110 @@ LOGICAL_ADJUSTMENT = 63
 # blogs.oracle.com/dlutz/entry/partition_alignment_guidelines_for_unified
 EFI_BLOCKSIZE_LCM = (128 * 1024)
 
+# Index of the discovered disks, keyed by the discovered Target object.  See
+# _get_discovered_disk_index()
+_DISCOVERED_DISK_INDEXES = weakref.WeakKeyDictionary()
+
+# Disk attributes used by Disk.name_matches()
+DISK_NAME_ATTRS = ("ctd", "volid", "devpath", "devid", "opath", "wwn",
+                   "receptacle")
+
+
+class IntervalIndex(object):
+    """ IntervalIndex - class to hold the sector ranges of the objects in a
+    ShadowPhysical list, sorted by start sector, so that the objects
+    overlapping a given range can be found without checking every object.
+
+    Each range is stored along with the highest end sector of all the ranges
+    which start at or before it.  A search walks back from the last range
+    starting within the given range, stopping as soon as that highest end
+    sector falls before the given range.
+    """
+
+    def __init__(self):
+        self.starts = list()
+        self.ends = list()
+        self.objs = list()
+
+        # max_ends[i] is the highest of ends[:i + 1], valid below self.dirty
+        self.max_ends = list()
+        self.dirty = 0
+
+    def __len__(self):
+        return len(self.objs)
+
+    def add(self, start, end, obj):
+        """ add() - method to add obj with a range of start to end
+        """
+        pos = bisect.bisect_right(self.starts, start)
+        self.starts.insert(pos, start)
+        self.ends.insert(pos, end)
+        self.objs.insert(pos, obj)
+        self.dirty = min(self.dirty, pos)
+
+    def remove(self, start, obj):
+        """ remove() - method to remove obj, added with a range beginning at
+        start.  Returns False if obj was not found.
+        """
+        pos = bisect.bisect_left(self.starts, start)
+        while pos < len(self.starts) and self.starts[pos] == start:
+            if self.objs[pos] is obj:
+                del self.starts[pos]
+                del self.ends[pos]
+                del self.objs[pos]
+                self.dirty = min(self.dirty, pos)
+                return True
+            pos += 1
+        return False
+
+    def overlapping(self, start, end):
+        """ overlapping() - method to return the objects whose range shares
+        at least one sector with start to end
+        """
+        if self.dirty < len(self.ends):
+            del self.max_ends[self.dirty:]
+            for pos in xrange(self.dirty, len(self.ends)):
+                if pos == 0 or self.ends[pos] > self.max_ends[pos - 1]:
+                    self.max_ends.append(self.ends[pos])
+                else:
+                    self.max_ends.append(self.max_ends[pos - 1])
+        self.dirty = len(self.ends)
+
+        found = list()
+        pos = bisect.bisect_right(self.starts, end) - 1
+        while pos >= 0 and self.max_ends[pos] >= start:
+            if self.ends[pos] >= start:
+                found.append(self.objs[pos])
+            pos -= 1
+        return found
+
+
+def _get_discovered_disk_index(discovered, disks):
+    """ _get_discovered_disk_index() - function to return a dictionary mapping
+    each (attribute, value) used by Disk.name_matches() to the positions of
+    the disks in the list of discovered disks which have it.  Active ctds are
+    mapped with an attribute of "active_ctds".
+
+    The dictionary is cached for the discovered Target object and rebuilt when
+    the list of disks changes.
+    """
+    disk_ids = [id(disk) for disk in disks]
+    cached = _DISCOVERED_DISK_INDEXES.get(discovered)
+    if cached is not None and cached[0] == disk_ids:
+        return cached[1]
+
+    index = dict()
+    for pos, disk in enumerate(disks):
+        for attr in DISK_NAME_ATTRS:
+            value = getattr(disk, attr)
+            if value is not None:
+                index.setdefault((attr, value), list()).append(pos)
+        for ctd in disk.active_ctds:
+            index.setdefault(("active_ctds", ctd), list()).append(pos)
+
+    _DISCOVERED_DISK_INDEXES[discovered] = (disk_ids, index)
+    return index
+
 
 class ShadowPhysical(ShadowList):
     """ ShadowPhysical - class to hold and validate Physical objects
@@ -208,6 +315,102 @@ class ShadowPhysical(ShadowList):
             self.value = "There is already an extended partition set for " + \
                          "this Disk"
 
+    # IntervalIndex of the sector ranges of the objects in the shadow list,
+    # and a dictionary of the objects by name.  Both are built when first
+    # needed, kept up to date by validated inserts and removals, and dropped
+    # when the shadow list is changed any other way.  Objects are not moved
+    # once inserted; resize() deletes the object and inserts a new one.
+    _intervals = None
+    _names = None
+
+    def __getstate__(self):
+        """ drop the indexes when copying or pickling; they are rebuilt by
+        the copy when needed
+        """
+        state = self.__dict__.copy()
+        state.pop("_intervals", None)
+        state.pop("_names", None)
+        return state
+
+    def __setitem__(self, index, value):
+        self.drop_index()
+        ShadowList.__setitem__(self, index, value)
+
+    def __delitem__(self, index):
+        if self._intervals is not None:
+            if isinstance(index, slice):
+                self.drop_index()
+            else:
+                self.unindex(self._shadow[index])
+        ShadowList.__delitem__(self, index)
+
+    @staticmethod
+    def sector_range(obj):
+        """ sector_range() - method to return the lowest and highest of the
+        first and last sectors of a physical object
+        """
+        start = obj.start_sector
+        end = start + obj.size.sectors - 1
+        return min(start, end), max(start, end)
+
+    def build_index(self):
+        """ build_index() - method to build the IntervalIndex and name
+        dictionary of the objects in the shadow list, if not already built
+        """
+        if self._intervals is None:
+            self._intervals = IntervalIndex()
+            self._names = dict()
+            for obj in self._shadow:
+                self.index_obj(obj)
+
+    def drop_index(self):
+        """ drop_index() - method to drop the IntervalIndex and name
+        dictionary, so they are rebuilt when next needed
+        """
+        self._intervals = None
+        self._names = None
+
+    def index_obj(self, obj):
+        """ index_obj() - method to add an inserted object to the indexes
+        """
+        start, end = self.sector_range(obj)
+        self._intervals.add(start, end, obj)
+        self._names.setdefault(obj.name, list()).append(obj)
+
+    def unindex(self, obj):
+        """ unindex() - method to remove an object being removed from the
+        shadow list from the indexes
+        """
+        named = self._names.get(obj.name, list())
+        if obj in named and \
+           self._intervals.remove(self.sector_range(obj)[0], obj):
+            named.remove(obj)
+        else:
+            # obj was changed in place since it was indexed
+            self.drop_index()
+
+    def overlap_candidates(self, start, end):
+        """ overlap_candidates() - method to return the objects in the shadow
+        list whose sector range could overlap with start to end, in shadow
+        list order.  Callers still apply their own overlap checks.
+        """
+        self.build_index()
+        low, high = min(start, end), max(start, end)
+        candidates = self._intervals.overlapping(low, high)
+        if len(candidates) > 1:
+            candidates.sort(key=self._shadow.index)
+        return candidates
+
+    def name_in_use(self, name):
+        """ name_in_use() - method to return True if an object with the given
+        name, not marked for deletion, is in the shadow list
+        """
+        self.build_index()
+        for obj in self._names.get(name, list()):
+            if obj.action != "delete":
+                return True
+        return False
+
     def in_use_check(self, value):
         """ in_use_check() - method to query the "discovered" DOC tree
         for in_use conflicts.
@@ -235,20 +438,31 @@ class ShadowPhysical(ShadowList):
         disks = discovered[0].get_descendants(name="disk",
             not_found_is_err=False)
 
-        # Look through the discovered disks and match it with ours
-        for disk in disks:
-            if disk.name_matches(desired_disk):
-                # Find the matching slice/(gpt)partition object and make
-                # sure we're comparing apples to apples.
-                partyslices = disk.get_descendants(name=value.name)
-                if not partyslices:
-                    break
+        # Find the discovered disks matching ours, in the order they were
+        # discovered, using the index of their names rather than comparing
+        # against every disk.
+        disk_index = _get_discovered_disk_index(discovered[0], disks)
+        matching = set(disk_index.get(("active_ctds", desired_disk.ctd),
+                                      list()))
+        for attr in DISK_NAME_ATTRS:
+            value_attr = getattr(desired_disk, attr)
+            if value_attr is not None:
+                matching.update(disk_index.get((attr, value_attr), list()))
+
+        for pos in sorted(matching):
+            disk = disks[pos]
+
+            # Find the matching slice/(gpt)partition object and make
+            # sure we're comparing apples to apples.
+            partyslices = disk.get_descendants(name=value.name)
+            if not partyslices:
+                break
 
-                for partyslice in partyslices:
-                    if partyslice.__class__.__name__ == \
-                        value.__class__.__name__:
-                        in_use = partyslice.in_use
-                        break
+            for partyslice in partyslices:
+                if partyslice.__class__.__name__ == \
+                    value.__class__.__name__:
+                    in_use = partyslice.in_use
+                    break
 
             if in_use:
                 break
@@ -312,7 +526,7 @@ class ShadowPhysical(ShadowList):
         cb_end = value.start_sector + value.size.sectors - 1
 
         # verify each slice does not overlap with any other slice
-        for slc in self._shadow:
+        for slc in self.overlap_candidates(cb_start, cb_end):
             # if slice 2 is being inserted into a VTOC labeled disk, do not
             # check for overlap
             if label == "VTOC" and int(value.name) == 2:
@@ -340,8 +554,7 @@ class ShadowPhysical(ShadowList):
             self.set_error(self.TooManySlicesError())
 
         # check for duplicate slice.name values
-        if value.name in [slc.name for slc in self._shadow \
-                          if slc.action != "delete"]:
+        if self.name_in_use(value.name):
             self.set_error(self.DuplicateSliceNameError(value.name))
 
         # check for in_zpool overlap
@@ -372,7 +585,7 @@ class ShadowPhysical(ShadowList):
             self.set_error(self.SliceInUseError(stats))
 
         # insert the corrected Slice object
-        ShadowList.insert(self, index, value)
+        self.insert_indexed(index, value)
 
     def insert_gptpartition(self, index, value):
         """ insert_gptpartition() - override method for validation of
@@ -440,7 +653,7 @@ class ShadowPhysical(ShadowList):
         new_end = value.start_sector + value.size.sectors - 1
 
         # verify each GPT partition does not overlap with any other
-        for gpart in self._shadow:
+        for gpart in self.overlap_candidates(new_start, new_end):
 
             # calculate the range of each GPT partition already inserted
             start = gpart.start_sector
@@ -460,8 +673,7 @@ class ShadowPhysical(ShadowList):
             self.set_error(self.TooManyGPTPartitionsError())
 
         # check for duplicate gptpartition.name values
-        if value.name in [gpart.name for gpart in self._shadow \
-                          if gpart.action != "delete"]:
+        if self.name_in_use(value.name):
             self.set_error(self.DuplicateGPTPartitionNameError(value.name))
 
         # check for in_zpool overlap
@@ -482,7 +694,7 @@ class ShadowPhysical(ShadowList):
             self.set_error(self.GPTPartitionInUseError(stats))
 
         # insert the corrected GPTPartition object
-        ShadowList.insert(self, index, value)
+        self.insert_indexed(index, value)
 
     def insert_partition(self, index, value):
         """ insert_partition() - override method for validation of
@@ -592,7 +804,7 @@ class ShadowPhysical(ShadowList):
                         value.start_sector = extended_part.start_sector + \
                                              LOGICAL_ADJUSTMENT
                         new_size = value.size.sectors - LOGICAL_ADJUSTMENT
-                        value.size = Size(str(new_size) + Size.sector_units)
+                        value.size = Size.from_sectors(new_size)
                 else:
                     diff = value.start_sector - closest_endpoint
                     # make sure there's at least 63 sectors between logical
@@ -601,7 +813,7 @@ class ShadowPhysical(ShadowList):
                         value.start_sector += LOGICAL_ADJUSTMENT - diff
 
                         new_size = value.size.sectors - LOGICAL_ADJUSTMENT
-                        value.size = Size(str(new_size) + Size.sector_units)
+                        value.size = Size.from_sectors(new_size)
 
         # check the bootid attibute on primary partitions for multiple active
         # partitions
@@ -619,9 +831,16 @@ class ShadowPhysical(ShadowList):
         p_start = value.start_sector
         p_end = p_start + value.size.sectors - 1
 
-        # walk each inserted partition already in the shadow list to ensure the
-        # partition we're trying to insert doesn't cross boundaries.
-        for partition in self._shadow:
+        # walk each inserted partition which could overlap the one we're
+        # trying to insert, allowing for the buffer around logical partitions,
+        # to ensure it doesn't cross boundaries.  Logical partitions are also
+        # checked against every extended partition.
+        candidates = self.overlap_candidates(min(p_start, p_end),
+            max(p_start, p_end) + LOGICAL_ADJUSTMENT)
+        if value.is_logical:
+            candidates = [p for p in self._shadow
+                          if p.is_extended or p in candidates]
+        for partition in candidates:
             # start and end points of the partition to check
             if partition.is_primary:
                 start = partition.start_sector
@@ -670,8 +889,7 @@ class ShadowPhysical(ShadowList):
             p_size = value.start_sector + value.size.sectors
 
         # check that the name of the partition is not already in the list
-        if value.name in [p.name for p in self._shadow \
-                          if p.action != "delete"]:
+        if self.name_in_use(value.name):
             self.set_error(self.DuplicatePartitionNameError(value.name))
 
         # if this is an extended partition, verify there are no other
@@ -705,13 +923,22 @@ class ShadowPhysical(ShadowList):
                 self.set_error(self.OverlappingPartitionVdevError())
 
         # insert the partition
+        self.insert_indexed(index, value)
+
+    def insert_indexed(self, index, value):
+        """ insert_indexed() - method to insert a validated object into the
+        shadow list and add it to the indexes
+        """
         ShadowList.insert(self, index, value)
+        if self._intervals is not None:
+            self.index_obj(value)
 
     def insert(self, index, value):
         # check the container object's adjust_boundaries attribute.  If False,
         # simply insert the object into the shadow list
         if hasattr(self.container, "validate_children") and \
            not self.container.validate_children:
+            self.drop_index()
             ShadowList.insert(self, index, value)
         else:
             # reset the errsvc for Physical errors
@@ -772,21 +999,19 @@ class ShadowPhysical(ShadowList):
             # adjust the size down by the same amount
             difference = new_start_sector - value.start_sector
             value.start_sector = new_start_sector
-            value.size = Size(str(value.size.sectors - difference) + \
-                              Size.sector_units)
+            value.size = Size.from_sectors(value.size.sectors - difference)
 
         # check the start_sector of the object.  If it starts at zero, adjust
         # it to start at the first cylinder boundary instead so as not to
         # clobber the disk label
         if value.start_sector == 0:
             value.start_sector = cyl_boundary
-            value.size = Size(str(value.size.sectors - cyl_boundary) + \
-                              Size.sector_units)
+            value.size = Size.from_sectors(value.size.sectors - cyl_boundary)
 
         # adjust the size down to the nearest end cylinder
         if value.size.sectors % cyl_boundary != 0:
             new_size = (value.size.sectors / cyl_boundary) * cyl_boundary
-            value.size = Size(str(new_size) + Size.sector_units)
+            value.size = Size.from_sectors(new_size)
 
         # x86 specific check for slices and partitions
         if arch == "x86":
@@ -804,7 +1029,7 @@ class ShadowPhysical(ShadowList):
             if (disk_size - value.size.sectors) / cyl_boundary < max_cyl:
                 end_cylinder = ((disk_size / cyl_boundary) - max_cyl) * \
                                cyl_boundary
-                value.size = Size(str(end_cylinder) + Size.sector_units)
+                value.size = Size.from_sectors(end_cylinder)
 
         return value
 
@@ -852,9 +1077,8 @@ class ShadowPhysical(ShadowList):
         if value.start_sector < min_start_sector:
             difference = min_start_sector - value.start_sector
             value.start_sector = min_start_sector
-            value.size = Size(str(value.size.sectors - difference) + \
-                              Size.sector_units,
-                              blocksize=block_size)
+            value.size = Size.from_sectors(value.size.sectors - difference,
+                                           blocksize=block_size)
 
         # Round the start_sector up to the next block_multiplier boundary
         # This provides ample space for the EFI disk label and EFI partition
@@ -864,9 +1088,8 @@ class ShadowPhysical(ShadowList):
                                block_multiplier) + block_multiplier
             difference = new_start_sector - value.start_sector
             value.start_sector = new_start_sector
-            value.size = Size(str(value.size.sectors - difference) + \
-                              Size.sector_units,
-                              blocksize=block_size)
+            value.size = Size.from_sectors(value.size.sectors - difference,
+                                           blocksize=block_size)
 
         # Check to make sure the GPT partition doesn't extend into or beyond
         # where the secondary/backup GPT header is stored:
@@ -874,16 +1097,15 @@ class ShadowPhysical(ShadowList):
         bkup_start = disk_size - self.container.gpt_backup_table_size.sectors
         if bkup_start <= end_sector:
             # adjust the size down so it doesn't corrupt the backup EFI label
-            value.size = Size(str(bkup_start - value.start_sector - 1) + \
-                              Size.sector_units,
-                              blocksize=block_size)
+            value.size = Size.from_sectors(
+                bkup_start - value.start_sector - 1, blocksize=block_size)
 
         # adjust the size down to the nearest whole multiple of
         # block_multiplier to make partition end on a physical block boundary
         if value.size.sectors % block_multiplier != 0:
-            value.size = Size(str((value.size.sectors / block_multiplier) * \
-                              block_multiplier) + Size.sector_units,
-                              blocksize=block_size)
+            value.size = Size.from_sectors(
+                (value.size.sectors / block_multiplier) * block_multiplier,
+                blocksize=block_size)
 
         return value
 
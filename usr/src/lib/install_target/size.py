@@ -119,11 +119,49 @@ class Size(object):
         else:
             self.byte_value = long(value * Size.units[suffix.lower()])
 
+    @classmethod
+    def from_bytes(cls, byte_value, blocksize=512):
+        """ from_bytes() - alternate constructor for a Size of a number of
+        bytes, without building and parsing a humanreadable string
+
+        byte_value - number of bytes, an int or long
+        blocksize - the size of a sector, in bytes
+        """
+        return cls._from_value(byte_value, Size.byte_units, byte_value,
+                               blocksize)
+
+    @classmethod
+    def from_sectors(cls, sectors, blocksize=512):
+        """ from_sectors() - alternate constructor for a Size of a number of
+        sectors, without building and parsing a humanreadable string
+
+        sectors - number of sectors, an int or long
+        blocksize - the size of a sector, in bytes
+        """
+        return cls._from_value(sectors, Size.sector_units,
+                               sectors * blocksize, blocksize)
+
+    @classmethod
+    def _from_value(cls, value, suffix, byte_value, blocksize):
+        """ _from_value() - create a Size of byte_value, which could have been
+        parsed from the humanreadable value and suffix
+        """
+        if value < 0:
+            # Size() can't parse negative values either
+            raise ValueError("unable to process a size value of '%s%s'" % \
+                             (value, suffix))
+
+        size = cls.__new__(cls)
+        size.humanreadable = str(value) + suffix
+        size.blocksize = blocksize
+        size.byte_value = long(byte_value)
+        return size
+
     @property
     def sectors(self):
         """ class property to allow fast conversion to sector units
         """
-        return self.get(self.sector_units)
+        return self.byte_value / self.blocksize
 
     def get(self, units=byte_units):
         """ get() - method to return the size in a unit specified
@@ -166,29 +204,54 @@ class Size(object):
         return s
 
     def __cmp__(self, other):
-        if self.get(units=Size.byte_units) < other.get(units=Size.byte_units):
-            return -1
-        elif self.get(units=Size.byte_units) > \
-             other.get(units=Size.byte_units):
-            return 1
-        elif self.get(units=Size.byte_units) == \
-             other.get(units=Size.byte_units):
-            return 0
+        return cmp(self.byte_value, other.byte_value)
+
+    def __eq__(self, other):
+        if not isinstance(other, Size):
+            return NotImplemented
+        return self.byte_value == other.byte_value
+
+    def __ne__(self, other):
+        if not isinstance(other, Size):
+            return NotImplemented
+        return self.byte_value != other.byte_value
+
+    def __lt__(self, other):
+        if not isinstance(other, Size):
+            return NotImplemented
+        return self.byte_value < other.byte_value
+
+    def __le__(self, other):
+        if not isinstance(other, Size):
+            return NotImplemented
+        return self.byte_value <= other.byte_value
+
+    def __gt__(self, other):
+        if not isinstance(other, Size):
+            return NotImplemented
+        return self.byte_value > other.byte_value
+
+    def __ge__(self, other):
+        if not isinstance(other, Size):
+            return NotImplemented
+        return self.byte_value >= other.byte_value
 
-        raise TypeError("Size value is being compared to non-Size value")
+    def __hash__(self):
+        return hash(self.byte_value)
 
     def __add__(self, other):
         """ eumulated method for adding two Size objects
         """
-        return Size(str(self.byte_value + other.byte_value) + Size.byte_units)
+        return Size.from_bytes(self.byte_value + other.byte_value)
 
     def __sub__(self, other):
         """ eumulated method for subtracting two Size objects
         """
-        return Size(str(self.byte_value - other.byte_value) + Size.byte_units)
+        return Size.from_bytes(self.byte_value - other.byte_value)
 
     def __iadd__(self, other):
-        """ eumulated method for the augmented assignment for +=
+        """ eumulated method for the augmented assignment for +=.  A new Size
+        is returned, as a Size is hashed by its value.
         """
-        self.byte_value += other.byte_value
-        return self
+        return Size.from_bytes(self.byte_value + other.byte_value,
+                               self.blocksize)
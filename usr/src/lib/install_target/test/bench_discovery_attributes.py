@@ -0,0 +1,197 @@
+#!/usr/bin/python2.6
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+'''Micro-benchmark of TargetDiscovery.discover_disks() reading libdiskmgt
+descriptor attributes, with and without attribute snapshots.
+
+Discovers drives from a mocked libdiskmgt, where each descriptor builds a
+new NVList of its attributes every time they are read, as
+dm_get_attributes() does, using:
+
+    nvlist      - DMDescriptor.attributes returning that NVList, looking up
+                  each attribute in it through libnvpair.
+
+    snapshot    - DMDescriptor.attributes returning a DMAttrSnapshot, read
+                  from the NVList once per descriptor.
+
+Run directly on a system with libnvpair, not as part of the test suite:
+
+    python bench_discovery_attributes.py [drives]
+'''
+
+import sys
+import time
+
+from solaris_install.engine.test import engine_test_utils
+from solaris_install.target.discovery import TargetDiscovery
+from solaris_install.target.libdiskmgt import const, diskmgt
+from solaris_install.target.libdiskmgt.attributes import DMAliasAttr, \
+    DMControllerAttr, DMDriveAttr, DMMediaAttr
+from solaris_install.target.libnvpair.const import DATA_TYPE_BOOLEAN, \
+    DATA_TYPE_STRING, DATA_TYPE_UINT32, DATA_TYPE_UINT64
+
+# NVList method adding a value of each datatype.
+ADD_VALUE = {
+    DATA_TYPE_BOOLEAN: lambda nvl, name, val: nvl.add_boolean(name),
+    DATA_TYPE_STRING: lambda nvl, name, val: nvl.add_string(name, val),
+    DATA_TYPE_UINT32: lambda nvl, name, val: nvl.add_uint32(name, val),
+    DATA_TYPE_UINT64: lambda nvl, name, val: nvl.add_uint64(name, val),
+}
+
+
+class MockDescriptorMixin(object):
+    '''Descriptor with a name, and attributes read from a dictionary of
+    NVKey to value, rather than from libdiskmgt'''
+    def setup(self, name, values):
+        self.mock_name = name
+        self.mock_values = values
+        return self
+
+    @property
+    def name(self):
+        return self.mock_name
+
+    @property
+    def nvlist_attributes(self):
+        nvl = self.ATYPE()
+        for key, val in self.mock_values.iteritems():
+            ADD_VALUE[key.datatype](nvl, key.name, val)
+        return nvl
+
+
+class MockAlias(MockDescriptorMixin, diskmgt.DMAlias):
+    pass
+
+
+class MockController(MockDescriptorMixin, diskmgt.DMController):
+    pass
+
+
+class MockMedia(MockDescriptorMixin, diskmgt.DMMedia):
+    @property
+    def partitions(self):
+        return ()
+
+    @property
+    def slices(self):
+        return ()
+
+
+class MockDrive(MockDescriptorMixin, diskmgt.DMDrive):
+    '''Drive which returns new alias, controller and media descriptors each
+    time they are looked up, as libdiskmgt does'''
+    @property
+    def aliases(self):
+        return (MockAlias(self.value).setup(self.ctd, {
+            DMAliasAttr.WWN: "5000c500%08x" % self.value,
+            DMAliasAttr.LUN: 0}),)
+
+    @property
+    def controllers(self):
+        return (MockController(self.value).setup("/devices/scsi_vhci", {
+            DMControllerAttr.CTYPE: const.CTYPE_SCSI,
+            DMControllerAttr.MULTIPLEX: True}),)
+
+    @property
+    def media(self):
+        return MockMedia(self.value).setup(self.ctd, {
+            DMMediaAttr.MTYPE: const.MT_FIXED,
+            DMMediaAttr.BLOCKSIZE: 512,
+            DMMediaAttr.SIZE: 143349312,
+            DMMediaAttr.START: 0,
+            DMMediaAttr.NACCESSIBLE: 143349312,
+            DMMediaAttr.NCYLINDERS: 8921,
+            DMMediaAttr.NHEADS: 255,
+            DMMediaAttr.NSECTORS: 63,
+            DMMediaAttr.LABEL: "DEFAULT cyl 8921 alt 2 hd 255 sec 63",
+            DMMediaAttr.FDISK: True})
+
+    @property
+    def cdrom(self):
+        return False
+
+
+class MockDiscovery(TargetDiscovery):
+    '''TargetDiscovery which doesn't read the drives'''
+    def verify_disk_read(self, ctd, blocksize):
+        return True
+
+
+def mock_drives(count):
+    '''Create count mocked drives'''
+    drives = list()
+    for number in range(count):
+        drive = MockDrive(number + 1)
+        drive.ctd = "c0t5000C500%08Xd0" % (number + 1)
+        drive.setup("/devices/scsi_vhci/disk@g5000c500%08x" % (number + 1), {
+            DMDriveAttr.STATUS: const.DRIVE_UP,
+            DMDriveAttr.DRVTYPE: const.DT_FIXED,
+            DMDriveAttr.VENDOR_ID: "SEAGATE",
+            DMDriveAttr.PRODUCT_ID: "ST973402SSUN72G",
+            DMDriveAttr.OPATH: "/dev/rdsk/%sp0" % drive.ctd})
+        drives.append(drive)
+    return drives
+
+
+def discover(drives):
+    '''Discover the drives, returning the time taken and the Disks'''
+    td = MockDiscovery("bench TD")
+    td.bootdisk = "c0t0d0"
+    td.sparc_diag_checked = True
+    td.iscsi_targets = ""
+    start = time.time()
+    disks = td.discover_disks(drives)
+    return time.time() - start, disks
+
+
+def run(drive_count=500):
+    '''Time discovering the drives, with and without snapshots'''
+    engine = engine_test_utils.get_new_engine_instance()
+    try:
+        print "%d drives" % drive_count
+
+        snapshot_attributes = diskmgt.DMDescriptor.attributes
+        diskmgt.DMDescriptor.attributes = \
+            property(lambda descriptor: descriptor.nvlist_attributes)
+        try:
+            nvlist, nvlist_disks = discover(mock_drives(drive_count))
+        finally:
+            diskmgt.DMDescriptor.attributes = snapshot_attributes
+        snapshot, snapshot_disks = discover(mock_drives(drive_count))
+
+        # Check both discover the same disks.
+        assert [str(disk) for disk in nvlist_disks] == \
+               [str(disk) for disk in snapshot_disks]
+
+        print "%-8s %12s %12s %8s" % \
+            ("test", "nvlist(s)", "snapshot(s)", "speedup")
+        print "%-8s %12.4f %12.4f %7.1fx" % ("discover", nvlist, snapshot,
+                                             nvlist / snapshot)
+    finally:
+        engine_test_utils.reset_engine(engine)
+
+
+if __name__ == '__main__':
+    run(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,124 @@
+#!/usr/bin/python2.6
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+'''Micro-benchmark of laying out a GPT disk of 128 partitions, with Size
+arithmetic parsing strings or working on integers.
+
+Each run adds 128 GPT partitions to a disk, leaving a gap after each of
+them, and then finds the gaps and the remaining space on the disk, using:
+
+    parsed      - Size.from_sectors(), from_bytes() and the sectors property
+                  replaced by formatting and parsing humanreadable strings,
+                  as Size used to.
+
+    native      - Size working on the integer sector and byte counts.
+
+Run directly, not as part of the test suite:
+
+    python bench_size.py [runs]
+'''
+
+import sys
+import time
+
+import osol_install.errsvc as errsvc
+
+from solaris_install.target.physical import Disk, DiskGeometry, DiskProp
+from solaris_install.target.size import Size
+
+BLOCKSIZE = 512
+GBSECTOR = long(1024 * 1024 * 1024 / BLOCKSIZE)  # 1GB of 512B sectors
+PARTITIONS = 128
+
+
+def parsed_from_bytes(cls, byte_value, blocksize=512):
+    '''Size.from_bytes() by parsing a string'''
+    return cls(str(byte_value) + Size.byte_units, blocksize=blocksize)
+
+
+def parsed_from_sectors(cls, sectors, blocksize=512):
+    '''Size.from_sectors() by parsing a string'''
+    return cls(str(sectors) + Size.sector_units, blocksize=blocksize)
+
+
+def layout():
+    '''Lay out a GPT disk, returning the sizes of its gaps and the remaining
+    space, in sectors'''
+    disk = Disk("bench disk")
+    disk.ctd = "c0t0d0"
+    disk.geometry = DiskGeometry(BLOCKSIZE, None)
+    disk.label = "GPT"
+    disk.disk_prop = DiskProp()
+    disk.disk_prop.dev_size = Size.from_sectors(GBSECTOR * PARTITIONS * 2)
+    disk.disk_prop.blocksize = BLOCKSIZE
+
+    for index in range(PARTITIONS):
+        disk.add_gptpartition(index, GBSECTOR * (2 * index + 1), 1,
+                              Size.gb_units, force=True)
+
+    gaps = [gap.size.sectors for gap in disk.get_gaps()]
+    remaining = disk.remaining_space.sectors
+
+    # most of the partitions have invalid names, which isn't of interest
+    errsvc.clear_error_list()
+    return gaps, remaining
+
+
+def time_layout(runs):
+    '''Time laying out the disk runs times'''
+    start = time.time()
+    for run_number in range(runs):
+        result = layout()
+    return time.time() - start, result
+
+
+def run(runs=20):
+    '''Time laying out the disk, parsing and not parsing strings'''
+    print "%d runs of %d GPT partitions" % (runs, PARTITIONS)
+
+    from_bytes = Size.__dict__["from_bytes"]
+    from_sectors = Size.__dict__["from_sectors"]
+    sectors = Size.__dict__["sectors"]
+    Size.from_bytes = classmethod(parsed_from_bytes)
+    Size.from_sectors = classmethod(parsed_from_sectors)
+    Size.sectors = property(lambda size: size.get(Size.sector_units))
+    try:
+        parsed, parsed_result = time_layout(runs)
+    finally:
+        Size.from_bytes = from_bytes
+        Size.from_sectors = from_sectors
+        Size.sectors = sectors
+    native, native_result = time_layout(runs)
+
+    # Check both lay out the disk the same way.
+    assert parsed_result == native_result
+
+    print "%-8s %12s %12s %8s" % ("test", "parsed(s)", "native(s)", "speedup")
+    print "%-8s %12.4f %12.4f %7.1fx" % ("layout", parsed, native,
+                                         parsed / native)
+
+
+if __name__ == '__main__':
+    run(*[int(arg) for arg in sys.argv[1:2]])
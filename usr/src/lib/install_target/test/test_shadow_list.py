@@ -669,6 +669,28 @@ class TestGPTPartition(unittest.TestCase):
         self.disk.add_gptpartition(1, 0, 2, Size.gb_units)
         self.assertFalse(errsvc._ERRORS)
 
+    def test_overlap_after_resize(self):
+        # add 3 adjacent 1GB GPT partitions, starting at 1GB
+        self.disk.add_gptpartition(0, self.gbsector, 1, Size.gb_units)
+        p1 = self.disk.add_gptpartition(1, self.gbsector * 2, 1,
+                                        Size.gb_units)
+        self.disk.add_gptpartition(2, self.gbsector * 3, 1, Size.gb_units)
+        self.assertFalse(errsvc._ERRORS)
+
+        # shrink the middle GPT partition, then fill the space it freed
+        p1.resize(self.gbsector / 2, size_units=Size.sector_units)
+        self.disk.add_gptpartition(3, self.gbsector * 5 / 2,
+            self.gbsector / 2, Size.sector_units)
+        self.assertFalse(errsvc._ERRORS)
+
+        # a GPT partition spanning the last two overlaps both of them
+        self.disk.add_gptpartition(4, self.gbsector * 11 / 4,
+            self.gbsector / 2, Size.sector_units)
+        self.assertEqual(len(errsvc._ERRORS), 2)
+        for error in errsvc._ERRORS:
+            self.assertTrue(isinstance(error.error_data[ES_DATA_EXCEPTION],
+                            ShadowPhysical.OverlappingGPTPartitionError))
+
 
 class Test128KBlockSizeGPTPartition(TestGPTPartition):
     """ This unittest class is identical to TestGPTPartition except
@@ -2511,6 +2533,8 @@ class TestInUse(unittest.TestCase):
         target_desired = Target(Target.DESIRED)
         self.doc.persistent.insert_children(target_discovered)
         self.doc.volatile.insert_children(target_desired)
+        self.target_discovered = target_discovered
+        self.target_desired = target_desired
 
         # construct a 100GB disk DOC object
         disk = Disk("disk")  # Must be "disk" or shadow validation won't see it
@@ -2577,14 +2601,50 @@ class TestInUse(unittest.TestCase):
         s.delete()
         self.assertFalse(errsvc._ERRORS)
 
+    def test_add_slice_in_use_by_active_ctd(self):
+        # construct a second discovered disk with an active ctd alias, and a
+        # desired disk named by that alias
+        disks = list()
+        for ctd in ["c23456t0d0", "c34567t0d0"]:
+            disk = Disk("disk")
+            disk.ctd = ctd
+            disk.geometry = DiskGeometry(BLOCKSIZE, CYLSIZE)
+            disk.label = "VTOC"
+            disk.disk_prop = DiskProp()
+            disk.disk_prop.dev_size = Size(
+                str(GBSECTOR * 100) + Size.sector_units)
+            disk.disk_prop.blocksize = BLOCKSIZE
+            disks.append(disk)
+        discovered_disk, desired_disk = disks
+        discovered_disk.active_ctds = [desired_disk.ctd]
+        self.target_discovered.insert_children(discovered_disk)
+        self.target_desired.insert_children(desired_disk)
+
+        slc = discovered_disk.add_slice(1, 0, 1, Size.gb_units)
+        slc.in_use = {'used_by': ['active_zpool'], 'used_name': ['zpool']}
+        slc.action = "preserve"
+
+        # the first discovered disk's slice 1 is not in use
+        self.disk.add_slice(1, 0, 1, Size.gb_units)
+        self.assertFalse(errsvc._ERRORS)
+
+        desired_disk.add_slice(1, 0, 1, Size.gb_units)
+        self.assertEqual(len(errsvc._ERRORS), 1)
+        error = errsvc._ERRORS[0]
+        self.assertTrue(isinstance(error.error_data[ES_DATA_EXCEPTION],
+            ShadowPhysical.SliceInUseError))
+
 
 class TestSize(unittest.TestCase):
     def test_add_size(self):
         size1 = Size("1024mb")
         size2 = Size("1024mb")
         self.assertEqual(size1 + size2, Size("2gb"))
+        size3 = size1
         size1 += Size("3gb")
         self.assertEqual(size1, Size("4gb"))
+        self.assertEqual(size3, Size("1gb"))
+        self.assertEqual(len(set([size1, size3, Size("4gb")])), 2)
 
     def test_sub_size(self):
         size1 = Size("4096mb")
@@ -2599,6 +2659,32 @@ class TestSize(unittest.TestCase):
         size2 = Size(str(sectors) + Size.sector_units, BLOCKSIZE_4K)
         self.assertEqual(size1.byte_value * 8, size2.byte_value)
 
+    def test_from_sectors(self):
+        sectors = 244190646
+        size1 = Size.from_sectors(sectors)
+        size2 = Size.from_sectors(sectors, BLOCKSIZE_4K)
+        self.assertEqual(size1, Size(str(sectors) + Size.sector_units))
+        self.assertEqual(size1.sectors, sectors)
+        self.assertEqual(size2.sectors, sectors)
+        self.assertEqual(size1.byte_value * 8, size2.byte_value)
+
+    def test_from_bytes(self):
+        size = Size.from_bytes(8192, BLOCKSIZE_4K)
+        self.assertEqual(size, Size("8kb"))
+        self.assertEqual(size.sectors, 2)
+        self.assertRaises(ValueError, Size.from_bytes, -1)
+
+    def test_compare_size(self):
+        self.assertTrue(Size("1024mb") == Size("1gb"))
+        self.assertTrue(Size("1gb") != Size("2gb"))
+        self.assertTrue(Size("1gb") < Size("2gb") <= Size("2048mb"))
+        self.assertTrue(Size("2gb") > Size("1gb") >= Size("1024mb"))
+        self.assertEqual(hash(Size("1024mb")), hash(Size("1gb")))
+        self.assertEqual(len(set([Size("1024mb"), Size("1gb")])), 1)
+
+    def test_sub_size_negative(self):
+        self.assertRaises(ValueError, Size("1gb").__sub__, Size("2gb"))
+
 
 class Test4KBlocksize(unittest.TestCase):
     def setUp(self):
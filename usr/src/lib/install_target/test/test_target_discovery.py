@@ -0,0 +1,123 @@
+#!/usr/bin/python
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+
+'''Tests for discovering drives concurrently in TargetDiscovery'''
+
+import threading
+import time
+import unittest
+
+from solaris_install.engine.test import engine_test_utils
+from solaris_install.target.discovery import DEFAULT_DRIVE_TIMEOUT, \
+    DEFAULT_WORKERS, TargetDiscovery
+
+
+class FakeDrive(object):
+    '''A drive which takes delay seconds to discover'''
+    def __init__(self, name, delay=0.0, error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+
+
+class FakeDiscovery(TargetDiscovery):
+    '''TargetDiscovery with discover_disk() replaced, returning the name of
+    each drive'''
+    def discover_disk(self, drive):
+        if drive.error is not None:
+            raise drive.error
+        time.sleep(drive.delay)
+        self.threads.add(threading.current_thread().name)
+        return drive.name
+
+
+class TestDiscoverDisks(unittest.TestCase):
+    def setUp(self):
+        self.engine = engine_test_utils.get_new_engine_instance()
+
+    def tearDown(self):
+        engine_test_utils.reset_engine()
+
+    def get_discovery(self, workers, drive_timeout=None):
+        td = FakeDiscovery("test TD", workers=workers,
+                           drive_timeout=drive_timeout)
+        # don't look up the bootdisk, eeprom or iSCSI targets
+        td.bootdisk = "c0t0d0"
+        td.sparc_diag_checked = True
+        td.iscsi_targets = ""
+        td.threads = set()
+        return td
+
+    def test_serial(self):
+        '''discover drives in order in the calling thread'''
+        td = self.get_discovery(1)
+        drives = [FakeDrive("c0t%dd0" % i) for i in range(5)]
+        self.assertEqual(td.discover_disks(drives),
+                         [drive.name for drive in drives])
+        self.assertEqual(td.threads,
+                         set([threading.current_thread().name]))
+        self.assertEqual([name for (name, seconds) in td.drive_times],
+                         [drive.name for drive in drives])
+
+    def test_parallel_order(self):
+        '''concurrently discovered drives are returned in order'''
+        td = self.get_discovery(4)
+        # the first drives finish last
+        drives = [FakeDrive("c0t%dd0" % i, 0.01 * (10 - i))
+                  for i in range(10)]
+        self.assertEqual(td.discover_disks(drives),
+                         [drive.name for drive in drives])
+        self.assertTrue(len(td.threads) > 1)
+        self.assertEqual(sorted(name for (name, seconds) in td.drive_times),
+                         sorted(drive.name for drive in drives))
+
+    def test_defaults(self):
+        '''drives are discovered concurrently unless told otherwise'''
+        td = FakeDiscovery("test TD")
+        self.assertEqual(td.workers, DEFAULT_WORKERS)
+        self.assertEqual(td.drive_timeout, DEFAULT_DRIVE_TIMEOUT)
+        self.assertTrue(td.workers > 1)
+
+    def test_timeout(self):
+        '''drives slower than the timeout are skipped'''
+        td = self.get_discovery(2, drive_timeout=0.2)
+        drives = [FakeDrive("c0t0d0"), FakeDrive("c0t1d0", 2.0),
+                  FakeDrive("c0t2d0"), FakeDrive("c0t3d0")]
+        start = time.time()
+        self.assertEqual(td.discover_disks(drives),
+                         ["c0t0d0", None, "c0t2d0", "c0t3d0"])
+        self.assertTrue(time.time() - start < 1.0)
+
+    def test_error(self):
+        '''errors discovering a drive are raised'''
+        td = self.get_discovery(2)
+        drives = [FakeDrive("c0t0d0"), FakeDrive("c0t1d0", error=OSError()),
+                  FakeDrive("c0t2d0")]
+        self.assertRaises(OSError, td.discover_disks, drives)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+#!/usr/bin/python
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+
+'''Tests for the ZFSState snapshot of zpools and datasets'''
+
+import threading
+import unittest
+
+from solaris_install.target import zfs_state
+from solaris_install.target.logical import Filesystem, Zpool, Zvol
+from solaris_install.target.zfs_state import ZFSState, ZFS_LIST, ZPOOL_LIST
+
+ZPOOL_OUTPUT = "rpool\trpool/ROOT/solaris\n" \
+               "tank\t-\n"
+
+ZFS_OUTPUT = "rpool\tfilesystem\t22011707392\t43057479680\t/rpool\n" \
+             "rpool/ROOT\tfilesystem\t5583457484\t43057479680\tlegacy\n" \
+             "rpool/ROOT/solaris\tfilesystem\t5583457484\t43057479680\t/\n" \
+             "rpool/dump\tvolume\t4294967296\t43057479680\t-\n" \
+             "rpool/swap\tvolume\t2211908157\t43057479680\t-\n" \
+             "tank\tfilesystem\t102400\t107374182400\t/tank\n" \
+             "tank/home dir\tfilesystem\t31744\t107374182400\t" \
+             "/export/home dir\n"
+
+
+class CannedCommands(object):
+    '''Returns canned output for the zpool and zfs list commands, counting
+    how many times each is run'''
+    def __init__(self):
+        self.commands = list()
+
+    def __call__(self, cmd):
+        self.commands.append(cmd)
+        if cmd == ZPOOL_LIST:
+            return ZPOOL_OUTPUT
+        if cmd == ZFS_LIST:
+            return ZFS_OUTPUT
+        raise AssertionError("unexpected command %s" % cmd)
+
+
+class TestZFSState(unittest.TestCase):
+    def setUp(self):
+        self.commands = CannedCommands()
+        self.state = ZFSState(run_command=self.commands)
+
+    def test_lazy_load(self):
+        '''nothing is run until needed, then only once'''
+        self.assertEqual(self.commands.commands, [])
+        self.assertTrue(self.state.pool_exists("rpool"))
+        self.assertTrue(self.state.dataset_exists("rpool/swap"))
+        self.assertFalse(self.state.dataset_exists("rpool/export"))
+        self.assertEqual(self.state.get_pool_names(), ["rpool", "tank"])
+        self.assertEqual(self.commands.commands, [ZPOOL_LIST, ZFS_LIST])
+
+    def test_props(self):
+        '''properties are parsed from the list output'''
+        self.assertEqual(self.state.get_pool_prop("rpool", "bootfs"),
+                         "rpool/ROOT/solaris")
+        self.assertEqual(self.state.get_pool_prop("tank", "bootfs"), "-")
+        self.assertEqual(self.state.get_dataset_prop("tank/home dir",
+                                                     "mountpoint"),
+                         "/export/home dir")
+        self.assertEqual(self.state.get_dataset_prop("rpool/dump", "used"),
+                         4294967296)
+        self.assertEqual(self.state.get_dataset_prop("tank", "available"),
+                         107374182400)
+        self.assertEqual(self.state.get_dataset_prop("rpool", "compression"),
+                         None)
+        self.assertEqual([name for name, props in
+                          self.state.get_datasets("rpool")],
+                         ["rpool/ROOT", "rpool/ROOT/solaris", "rpool/dump",
+                          "rpool/swap"])
+
+    def test_changes(self):
+        '''changes are tracked without listing again'''
+        self.state.load()
+        self.state.created("rpool/export")
+        self.state.created("new", is_pool=True)
+        self.state.destroyed("rpool/ROOT")
+        self.state.destroyed("tank", is_pool=True)
+        self.assertTrue(self.state.dataset_exists("rpool/export"))
+        self.assertTrue(self.state.pool_exists("new"))
+        self.assertTrue(self.state.dataset_exists("new"))
+        self.assertFalse(self.state.dataset_exists("rpool/ROOT"))
+        self.assertFalse(self.state.dataset_exists("rpool/ROOT/solaris"))
+        self.assertFalse(self.state.pool_exists("tank"))
+        self.assertFalse(self.state.dataset_exists("tank/home dir"))
+        self.assertEqual(len(self.commands.commands), 2)
+
+        # property values are forgotten on any change
+        self.assertEqual(self.state.get_dataset_prop("rpool", "available"),
+                         None)
+        self.state.get_datasets("rpool")
+        self.assertEqual(len(self.commands.commands), 4)
+
+    def test_created_parents(self):
+        '''datasets created by 'zfs create -p' with a child are recorded'''
+        self.state.load()
+        self.state.created("tank/export/home/user")
+        for name in ("tank/export", "tank/export/home",
+                     "tank/export/home/user"):
+            self.assertTrue(self.state.dataset_exists(name))
+        self.assertFalse(self.state.pool_exists("tank/export"))
+
+    def test_invalidate(self):
+        '''invalidate() lists everything again'''
+        self.state.load()
+        self.state.invalidate()
+        self.assertTrue(self.state.pool_exists("tank"))
+        self.assertEqual(len(self.commands.commands), 4)
+
+
+class TestLogicalZFSState(unittest.TestCase):
+    '''Zpool, Filesystem and Zvol use the ZFSState in use'''
+    def setUp(self):
+        self.commands = CannedCommands()
+
+    def test_exists(self):
+        '''exists and get() are answered from the ZFSState'''
+        with ZFSState(run_command=self.commands) as state:
+            self.assertEqual(zfs_state.current(), state)
+            self.assertTrue(Zpool("tank").exists)
+            self.assertFalse(Zpool("dozer").exists)
+            self.assertTrue(Filesystem("tank/home dir").exists)
+            self.assertFalse(Filesystem("tank/export").exists)
+            self.assertTrue(Zvol("rpool/swap").exists)
+            self.assertEqual(Filesystem("rpool").get("mountpoint"),
+                             "/rpool")
+            self.assertEqual(Zpool("rpool").get("bootfs"),
+                             {"bootfs": "rpool/ROOT/solaris"})
+        self.assertEqual(zfs_state.current(), None)
+        self.assertEqual(len(self.commands.commands), 2)
+
+    def test_threads(self):
+        '''threads share the ZFSState in use, which is listed only once'''
+        seen = list()
+
+        def discover():
+            state = zfs_state.current()
+            seen.append((state, state.pool_exists("tank")))
+
+        with ZFSState(run_command=self.commands) as state:
+            threads = [threading.Thread(target=discover) for i in xrange(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(seen, [(state, True)] * 4)
+        self.assertEqual(len(self.commands.commands), 2)
+
+    def test_dry_run(self):
+        '''dry run changes aren't recorded'''
+        with ZFSState(run_command=self.commands):
+            fs = Filesystem("tank/export")
+            fs.create(dry_run=True)
+            self.assertFalse(fs.exists)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,312 @@
+#!/usr/bin/python
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+""" zfs_state.py - snapshot of the zpools and ZFS datasets on the system.
+
+A ZFSState reads all zpools and datasets, with the properties target
+discovery needs, with one 'zpool list' and one 'zfs list', instead of
+running zpool and zfs once or more for each pool and dataset.
+
+While a ZFSState is in use ("with ZFSState():"), the exists properties and
+get() methods of the Zpool, Filesystem and Zvol objects in logical.py are
+answered from it.  The create, destroy and set methods there report what
+they changed with the functions at the end of this module, so that the
+snapshot stays correct without being read again.
+
+The lists are read with -p, so sizes are exact numbers of bytes, and are
+kept as integers.
+"""
+
+import threading
+
+from solaris_install import run
+
+ZFS = "/usr/sbin/zfs"
+ZPOOL = "/usr/sbin/zpool"
+
+# zpool and dataset properties in the snapshot
+POOL_PROPS = ("name", "bootfs")
+DATASET_PROPS = ("name", "type", "used", "available", "mountpoint")
+
+# properties which are numbers of bytes
+INTEGER_PROPS = ("used", "available")
+
+ZPOOL_LIST = [ZPOOL, "list", "-H", "-p", "-o", ",".join(POOL_PROPS)]
+ZFS_LIST = [ZFS, "list", "-H", "-p", "-t", "filesystem,volume", "-o",
+            ",".join(DATASET_PROPS)]
+
+# the ZFSState in use, if any, which is replaced and read under _lock as
+# discovery may run in more than one thread
+_current = None
+_lock = threading.Lock()
+
+
+def run_command(cmd):
+    """ run_command() - run a zpool or zfs command in the C locale and
+    return its output
+    """
+    p = run(cmd, env={"LC_ALL": "C"})
+    return p.stdout
+
+
+class ZFSState(object):
+    """ ZFSState - the zpools and datasets on the system and some of their
+    properties, read the first time they're needed.
+
+    Existence is tracked through changes made with logical.py.  Property
+    values are forgotten on any change, as a create, destroy or set can
+    change the properties of other datasets (used, available, inherited
+    values), so get_pool_prop() and get_dataset_prop() return None after a
+    change and the caller has to ask zpool or zfs.
+
+    The properties in INTEGER_PROPS are returned as integers.  A ZFSState
+    can be used from more than one thread.
+    """
+
+    def __init__(self, run_command=run_command):
+        """ run_command - function to run a command and return its output,
+        replaced to test with canned output
+        """
+        self.run_command = run_command
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.props_known = False
+
+        # pool or dataset name: dictionary of properties, in 'zfs list'
+        # order
+        self.pool_names = list()
+        self.pools = dict()
+        self.dataset_names = list()
+        self.datasets = dict()
+
+    def __enter__(self):
+        global _current
+        with _lock:
+            self._previous = _current
+            _current = self
+        return self
+
+    def __exit__(self, *exc_info):
+        global _current
+        with _lock:
+            _current = self._previous
+            self._previous = None
+
+    def __repr__(self):
+        return "ZFSState: pools=%s; datasets=%d; loaded=%s" % \
+            (self.pool_names, len(self.dataset_names), self.loaded)
+
+    @staticmethod
+    def _parse(output, props):
+        """ _parse() - parse 'zpool list -Hp' or 'zfs list -Hp' output of the
+        properties props into a list of names and dictionary of properties
+        """
+        names = list()
+        values = dict()
+        for line in output.splitlines():
+            fields = line.split("\t")
+            if len(fields) != len(props):
+                continue
+            names.append(fields[0])
+            values[fields[0]] = dict(zip(props[1:], fields[1:]))
+            for prop in INTEGER_PROPS:
+                if values[fields[0]].get(prop, "").isdigit():
+                    values[fields[0]][prop] = int(values[fields[0]][prop])
+        return names, values
+
+    def load(self):
+        """ load() - read all pools and datasets
+        """
+        with self._lock:
+            self.pool_names, self.pools = \
+                self._parse(self.run_command(ZPOOL_LIST), POOL_PROPS)
+            self.dataset_names, self.datasets = \
+                self._parse(self.run_command(ZFS_LIST), DATASET_PROPS)
+            self.loaded = True
+            self.props_known = True
+
+    def invalidate(self):
+        """ invalidate() - forget everything, to be read again when next
+        needed
+        """
+        with self._lock:
+            self.loaded = False
+            self.props_known = False
+            self.pool_names = list()
+            self.pools = dict()
+            self.dataset_names = list()
+            self.datasets = dict()
+
+    def _check_loaded(self):
+        """ load the snapshot if it hasn't been yet """
+        with self._lock:
+            if not self.loaded:
+                self.load()
+
+    def get_pool_names(self):
+        """ get_pool_names() - return the names of all pools
+        """
+        with self._lock:
+            self._check_loaded()
+            return list(self.pool_names)
+
+    def pool_exists(self, name):
+        """ pool_exists() - return True if the pool exists
+        """
+        with self._lock:
+            self._check_loaded()
+            return name in self.pools
+
+    def dataset_exists(self, name):
+        """ dataset_exists() - return True if the filesystem or volume exists
+        """
+        with self._lock:
+            self._check_loaded()
+            return name in self.datasets
+
+    def get_pool_prop(self, name, prop):
+        """ get_pool_prop() - return a property of a pool, or None if it
+        isn't known
+        """
+        with self._lock:
+            self._check_loaded()
+            return self.pools.get(name, {}).get(prop)
+
+    def get_dataset_prop(self, name, prop):
+        """ get_dataset_prop() - return a property of a dataset, or None if it
+        isn't known
+        """
+        with self._lock:
+            self._check_loaded()
+            return self.datasets.get(name, {}).get(prop)
+
+    def get_datasets(self, pool_name):
+        """ get_datasets() - return a list of (name, properties) of the
+        datasets in a pool, other than its top level dataset, in 'zfs list'
+        order
+        """
+        with self._lock:
+            # read the properties again if they've been forgotten
+            if not self.props_known:
+                self.load()
+            prefix = pool_name + "/"
+            return [(name, dict(self.datasets[name]))
+                    for name in self.dataset_names
+                    if name.startswith(prefix)]
+
+    def _forget_props(self):
+        """ forget all property values, keeping which pools and datasets
+        exist
+        """
+        self.props_known = False
+        for props in self.pools.itervalues():
+            props.clear()
+        for props in self.datasets.itervalues():
+            props.clear()
+
+    def created(self, name, is_pool=False):
+        """ created() - record that a pool or dataset was created, along
+        with any of its parent datasets which didn't exist ('zfs create -p')
+        """
+        with self._lock:
+            if not self.loaded:
+                return
+            self._forget_props()
+            if is_pool and name not in self.pools:
+                self.pool_names.append(name)
+                self.pools[name] = dict()
+            components = name.split("/")
+            for i in xrange(1, len(components) + 1):
+                dataset = "/".join(components[:i])
+                if dataset not in self.datasets:
+                    self.dataset_names.append(dataset)
+                    self.datasets[dataset] = dict()
+
+    def destroyed(self, name, is_pool=False):
+        """ destroyed() - record that a pool or dataset, and any datasets
+        below it, were destroyed
+        """
+        with self._lock:
+            if not self.loaded:
+                return
+            self._forget_props()
+            if is_pool and name in self.pools:
+                self.pool_names.remove(name)
+                del self.pools[name]
+            prefix = name + "/"
+            for dataset in [dataset for dataset in self.dataset_names
+                            if dataset == name or dataset.startswith(prefix)]:
+                self.dataset_names.remove(dataset)
+                del self.datasets[dataset]
+
+    def changed(self):
+        """ changed() - record that a property of a pool or dataset was set
+        """
+        with self._lock:
+            if self.loaded:
+                self._forget_props()
+
+
+def current():
+    """ current() - return the ZFSState in use, or None
+    """
+    with _lock:
+        return _current
+
+
+def invalidate():
+    """ invalidate() - forget the ZFSState in use, if any, after changes
+    which weren't made through logical.py (e.g., by libbe)
+    """
+    state = current()
+    if state is not None:
+        state.invalidate()
+
+
+def created(name, is_pool=False):
+    """ created() - record the creation of a pool or dataset, and of any
+    parent datasets created with it, in the ZFSState in use, if any
+    """
+    state = current()
+    if state is not None:
+        state.created(name, is_pool)
+
+
+def destroyed(name, is_pool=False):
+    """ destroyed() - record the destruction of a pool or dataset in the
+    ZFSState in use, if any
+    """
+    state = current()
+    if state is not None:
+        state.destroyed(name, is_pool)
+
+
+def changed():
+    """ changed() - record setting a pool or dataset property in the ZFSState
+    in use, if any
+    """
+    state = current()
+    if state is not None:
+        state.changed()
@@ -44,8 +44,11 @@ from solaris_install.transfer.info import Destination
 from solaris_install.transfer.info import Dir
 from solaris_install.transfer.info import Software
 from solaris_install.transfer.info import Source
-from solaris_install.transfer.info import ACTION, CONTENTS, CPIO_ARGS, SIZE
+from solaris_install.transfer.info import ACTION, CONTENTS, COPY_METHOD, \
+    COPY_WORKERS, CPIO_ARGS, SIZE
+from solaris_install.transfer.filecopy import FileCopier
 from solaris_install.transfer.prog import ProgressMon
+from solaris_install.transfer.scan import TreeScanner, rounded_size
 
 
 class AbstractCPIO(Checkpoint):
@@ -57,6 +60,8 @@ class AbstractCPIO(Checkpoint):
     DEF_CPIO_ARGS = "-pdum"
     DEFAULT_PROG_EST = 10
     DEFAULT_SIZE = 1000   # Default size of a transfer in kbytes
+    SCAN_WORKERS = 4      # Default number of threads building file lists
+    DEF_COPY_WORKERS = 4  # Default number of threads copying files in-process
 
     def __init__(self, name):
         super(AbstractCPIO, self).__init__(name)
@@ -88,6 +93,18 @@ class AbstractCPIO(Checkpoint):
         # Progress monitor handle
         self.pmon = None
 
+        # Number of threads to scan directory trees with when building
+        # file lists.  1 scans in the checkpoint's thread.
+        self.scan_workers = self.SCAN_WORKERS
+
+        # Inode number and size of the files listed by build_file_list(),
+        # keyed by path relative to the source, so they aren't stat'd
+        # again when sorting.
+        self._file_info = dict()
+
+        # Size in bytes of the files in each sorted file list written.
+        self._list_sizes = dict()
+
     def get_size(self, need_parse_input=True):
         '''Compute the size of the transfer specified'''
 
@@ -126,17 +143,20 @@ class AbstractCPIO(Checkpoint):
                     old_size = size
                     file_list = transfer.get(CONTENTS)
 
-                    with open(file_list, 'r') as filehandle:
-                        # Determine the file size for each file listed and sum
-                        # the sizes.
-                        try:
-                            size = size + sum(map(file_size,
-                                             [os.path.join(self.src,
-                                                           f.rstrip())
-                                             for f in filehandle.readlines()]))
-                        except OSError:
-                            # If the file doesn't exist that's OK.
-                            pass
+                    if file_list in self._list_sizes:
+                        # Sized when the list was sorted.
+                        size += self._list_sizes[file_list]
+                    else:
+                        with open(file_list, 'r') as filehandle:
+                            # Determine the file size for each file listed
+                            # and sum the sizes.
+                            try:
+                                size = size + sum(map(file_size,
+                                    [os.path.join(self.src, f.rstrip())
+                                     for f in filehandle.readlines()]))
+                            except OSError:
+                                # If the file doesn't exist that's OK.
+                                pass
                     self.logger.debug("Size calculated at runtime: %d bytes",
                                       (size - old_size))
 
@@ -169,6 +189,13 @@ class AbstractCPIO(Checkpoint):
         self.give_progress = True
         return progress_estimate
 
+    def get_input_size(self):
+        '''Returns the size of the transfer in kilobytes, if known'''
+        if not self.distro_size or self.distro_size == self.DEFAULT_SIZE:
+            # The source wasn't available to size.
+            return None
+        return self.distro_size
+
     def cancel(self):
         '''Cancel the transfer in progress'''
         self._cancel_event = True
@@ -221,6 +248,7 @@ class AbstractCPIO(Checkpoint):
                         self.logger.debug("Removing temp content file: %s",
                                           content_file)
                         os.unlink(content_file)
+                    self._list_sizes.pop(content_file, None)
         except OSError:
             pass
 
@@ -281,99 +309,70 @@ class AbstractCPIO(Checkpoint):
         '''Sort the entries in the file by inode. Place
            the sorted results in the file
         '''
+        with open(infile, 'r') as filehandle:
+            self.sort_list_by_inode([fname.rstrip() for fname in filehandle],
+                                    outfile)
+
+    def sort_list_by_inode(self, names, outfile):
+        '''Sort the list of file names by inode. Place the sorted results
+           in the file, and record the total size of the files listed.
+           Files listed by build_file_list() aren't stat'd again, and files
+           which can't be stat'd are left out.
+           Returns the total size of the files listed, in bytes.
+        '''
         # Sort the entries by inode
         tmp_flist = []
-        with open(infile, 'r') as filehandle:
-            for fname in filehandle.readlines():
-                fname = fname.rstrip()
+        total_size = 0
+        for fname in names:
+            info = self._file_info.get(fname)
+            if info is None:
                 try:
                     st1 = os.lstat(os.path.join(self.src, fname))
-                    tmp_flist.append((st1.st_ino, fname))
                 except OSError, msg:
                     self.logger.debug("CPIO transfer error processing %s",
                                       fname)
                     self.logger.debug(msg)
+                    continue
+                info = (st1.st_ino, rounded_size(st1.st_size))
+            tmp_flist.append((info[0], fname))
+            total_size += info[1]
 
         tmp_flist.sort(key=operator.itemgetter(0))
         with open(outfile, 'a') as filehandle:
             for entry in map(operator.itemgetter(1), tmp_flist):
                 filehandle.write(entry + "\n")
 
+        self._list_sizes[outfile] = total_size
+        return total_size
+
     def build_file_list(self, src, flist):
         '''Method to build a list of files to be transferred from the specified
            source. All files in the directory tree rooted at src are included.
+           The inode number and size of each file is recorded for
+           sort_list_by_inode().
            Input: src: src of the tree to walk
-           output_file : file to place the sorted file list into.
+           flist: list to append the file names, relative to the source,
+           to.
         '''
         self.logger.debug("CPIO Transfer: building the file list")
 
-        # Walk the source to get the list of files to be transferred.
-        st2 = os.stat(src)
-
         if "./" not in flist:
             flist.append("./")
 
         self.logger.debug("building file list %s", src)
 
-        st1 = os.lstat(src)
-
         # Compute the relative source and append to the file list
-        flist.append(src.partition(self.src)[2].lstrip("/"))
-
-        # Walk the source in order to put all dirs and files in the list to be
-        # transfered.
-        for root, dirs, files in os.walk(src):
-            self.check_cancel_event()
-
-            rmlist = []
-            # Process the dirs
-            for dir_name in dirs:
-                # Full path name of the directory
-                dir_full_path = os.path.join(root, dir_name)
-
-                # Directory relative to the src passed in.
-                dir_rel_to_src = os.path.join(
-                    root.partition(self.src)[2].lstrip("/"), dir_name)
-                # Write the inode for the dir and the path relative to the src
-                # to the list to be cpio'd.
-                st1 = os.lstat(dir_full_path)
-
-                # Store the inode number and the directory relative to the
-                # source to the list to be cpio'd. Store as a tuple.
-                flist.append(dir_rel_to_src)
-
-                # Identify the directories that we do not want to traverse.
-                # These are those that can't be read for some reason or those
-                # holding other mounted filesystems. Place these dirs in
-                # rmlist.
-                try:
-                    st1 = os.stat(dir_full_path)
-                except OSError:
-                    rmlist.append(dir_name)
-                    continue
-
-                # Emulate nftw(..., FTW_MOUNT) for directories
-                if st1.st_dev != st2.st_dev:
-                    rmlist.append(dir_name)
-
-            # Remove the dirs specified above.
-            for dir_remove in rmlist:
-                dirs.remove(dir_remove)
-
-            # Process the files.
-            for name in files:
-                self.check_cancel_event()
-                # Full path name for file.
-                file_full_path = os.path.join(root, name)
-
-                # File name relative to the source.
-                file_rel_to_src = os.path.join(
-                    root.partition(self.src)[2].lstrip("/"), name)
-                st1 = os.lstat(file_full_path)
+        src_rel = src.partition(self.src)[2].lstrip("/")
+        st1 = os.lstat(src)
+        flist.append(src_rel)
+        self._file_info[src_rel] = (st1.st_ino, rounded_size(st1.st_size))
 
-                # Store the inode number and the filename relative to the
-                # source to the list to be cpio'd. Store as a tuple.
-                flist.append(file_rel_to_src)
+        # Scan the source in order to put all dirs and files in the list to
+        # be transfered, stat'ing each once.
+        scanner = TreeScanner(self.scan_workers, self.check_cancel_event)
+        for (inode, size, rel_path) in scanner.scan(src, src_rel):
+            flist.append(rel_path)
+            self._file_info[rel_path] = (inode, size)
 
     def transfer_filelist(self, file_list, cpio_args):
         '''Method to transfer the files listed in file_list to the
@@ -402,6 +401,48 @@ class AbstractCPIO(Checkpoint):
             cpio_proc.wait()
             self.cpio_process = None
 
+    def _uses_builtin_copy(self, trans):
+        '''Returns True if the transfer's files are copied in-process.
+           The cpio utility is still used for non-default cpio arguments.
+        '''
+        if trans.get(COPY_METHOD) != CPIO.COPY_BUILTIN:
+            return False
+        if trans.get(CPIO_ARGS) != self.DEF_CPIO_ARGS:
+            self.logger.debug("Using %s for cpio arguments %s",
+                              self.CPIO, trans.get(CPIO_ARGS))
+            return False
+        return True
+
+    def copy_filelist(self, file_list, workers=None):
+        '''Method to transfer the files listed in file_list to the
+           indicated destination in-process, with the given number of
+           threads, instead of with the cpio utility.  The files are
+           copied as "cpio -pdum" would copy them.
+        '''
+        if workers is None:
+            workers = self.DEF_COPY_WORKERS
+        self.logger.debug("Copying files in %s with %d threads",
+                          file_list, workers)
+        if self.dry_run:
+            return
+
+        progress = None
+        if self.pmon is not None and self.pmon.fed:
+            pmon = self.pmon
+            progress = lambda name, size: pmon.update(rounded_size(size))
+
+        copier = FileCopier(self.src, self.dst, workers, logger=self.logger,
+                            canceled=lambda: self._cancel_event,
+                            progress=progress)
+        with open(file_list, 'r') as filehandle:
+            errors = copier.copy_list(filehandle)
+
+        self.logger.debug("Copied %d files, %d bytes", copier.files_copied,
+                          copier.bytes_copied)
+        if errors:
+            self.logger.warning("%d files could not be copied to %s",
+                                len(errors), self.dst)
+
     def run_exec_file(self, file_name):
         '''Run the executable file specified'''
         self.logger.debug("Running %s", file_name)
@@ -429,18 +470,21 @@ class AbstractCPIO(Checkpoint):
                         bflist.pop(bflist.index(item))
                         self.build_file_list(os.path.join(self.src,
                             item.rstrip()), bflist)
-                tmp_file = tempfile.mktemp()
-                with open(tmp_file, 'w') as filehandle:
-                    for file_name in bflist:
-                        filehandle.write(file_name + "\n")
-                fl_data = tmp_file
-            sorted_file = tempfile.mktemp()
-            try:
-                self.sort_by_inode(fl_data, sorted_file)
-                os.unlink(fl_data)
-            except OSError:
-                os.unlink(sorted_file)
-                sorted_file = fl_data
+                sorted_file = tempfile.mktemp()
+                try:
+                    self.sort_list_by_inode([file_name.rstrip() for
+                                             file_name in bflist],
+                                            sorted_file)
+                finally:
+                    self._file_info = dict()
+            else:
+                sorted_file = tempfile.mktemp()
+                try:
+                    self.sort_by_inode(fl_data, sorted_file)
+                    os.unlink(fl_data)
+                except OSError:
+                    os.unlink(sorted_file)
+                    sorted_file = fl_data
             self.logger.debug("File List: %s", sorted_file)
             return sorted_file
         elif trans.action == "uninstall":
@@ -489,8 +533,12 @@ class AbstractCPIO(Checkpoint):
 
             # Start up the ProgressMon to report progress while the actual
             # transfer is taking place.
+            # Files copied in-process are reported as they're copied.
             self.pmon = ProgressMon(logger=self.logger)
-            self.pmon.startmonitor(self.dst, self.distro_size)
+            self.pmon.startmonitor(self.dst, self.distro_size,
+                fed=all(self._uses_builtin_copy(trans)
+                        for trans in self._transfer_list
+                        if trans.get(ACTION) == "install"))
 
         for trans in self._transfer_list:
             # Before starting any transforms, installs or uninstalls, first
@@ -507,8 +555,12 @@ class AbstractCPIO(Checkpoint):
                 continue
             if trans.get(ACTION) == "install":
                 self.logger.info("Transferring files to %s", self.dst)
-                self.transfer_filelist(trans.get(CONTENTS),
-                                       trans.get(CPIO_ARGS))
+                if self._uses_builtin_copy(trans):
+                    self.copy_filelist(trans.get(CONTENTS),
+                                       trans.get(COPY_WORKERS))
+                else:
+                    self.transfer_filelist(trans.get(CONTENTS),
+                                           trans.get(CPIO_ARGS))
 
             elif trans.get(ACTION) == "uninstall":
                 self.logger.debug("Removing specified files "
@@ -612,6 +664,8 @@ class TransferCPIO(AbstractCPIO):
             else:
                 trans_attr[CONTENTS] = None
             trans_attr[ACTION] = trans.action
+            trans_attr[COPY_METHOD] = trans.copy_method
+            trans_attr[COPY_WORKERS] = trans.copy_workers
 
             self._transfer_list.append(trans_attr)
 
@@ -628,6 +682,8 @@ class TransferCPIOAttr(AbstractCPIO):
         self.action = None
         self.type = None
         self.contents = None
+        self.copy_method = None
+        self.copy_workers = None
         self._transfer_list = list()
 
     def _parse_input(self):
@@ -645,4 +701,6 @@ class TransferCPIOAttr(AbstractCPIO):
         trans_attr[CPIO_ARGS] = self.cpio_args
         trans_attr[CONTENTS] = self.parse_transfer_node(self)
         trans_attr[ACTION] = self.action
+        trans_attr[COPY_METHOD] = self.copy_method
+        trans_attr[COPY_WORKERS] = self.copy_workers
         self._transfer_list.append(trans_attr)
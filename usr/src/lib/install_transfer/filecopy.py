@@ -0,0 +1,261 @@
+#!/usr/bin/python
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+
+'''In-process file copier for the CPIO transfer checkpoint'''
+import errno
+import os
+import stat
+import threading
+import Queue
+
+
+class FileCopier(object):
+    '''The FileCopier class copies a list of files from a source directory
+       to a destination directory with a pool of threads, preserving what
+       "cpio -pdum" does:
+
+       - directories are created as needed
+       - existing files are replaced unconditionally
+       - modification and access times are retained
+       - modes, and ownership when run as root, are retained
+       - hard links between the files listed are kept as links
+       - symbolic links, device nodes and FIFOs are recreated, not copied
+
+       Files which can't be copied are skipped, as cpio skips them, and
+       returned by copy_list().
+    '''
+
+    BUFFER_SIZE = 1024 * 1024
+    QUEUE_SIZE = 1024
+
+    def __init__(self, src, dst, workers=4, logger=None, canceled=None,
+                 progress=None):
+        '''Input: src, dst - the directories to copy from and to
+                  workers - number of threads to copy with
+                  logger - logger to log skipped files to
+                  canceled - optional function returning True when the
+                  copy should stop
+                  progress - optional function called with the path and
+                  size in bytes of each file copied
+        '''
+        self.src = src
+        self.dst = dst
+        self.workers = max(workers, 1)
+        self.logger = logger
+        self.canceled = canceled
+        self.progress = progress
+
+        self.bytes_copied = 0
+        self.files_copied = 0
+
+        self._lock = threading.Lock()
+        self._errors = list()
+        self._directories = list()
+        # Destination path of the first copy of each hard linked file,
+        # and an Event set once it has been copied, keyed by device and
+        # inode.
+        self._links = dict()
+        self._preserve_owner = os.geteuid() == 0
+
+    def copy_list(self, names):
+        '''Copy the files named, relative to the source, in the order
+           given.  Attributes of directories are set once everything has
+           been copied, so they aren't changed by files written to them.
+           Returns a list of (name, error) for the files not copied.
+        '''
+        work = Queue.Queue(FileCopier.QUEUE_SIZE)
+        threads = [threading.Thread(target=self.__worker, args=(work,),
+                                    name="FileCopier.%d" % i)
+                   for i in range(self.workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        try:
+            for name in names:
+                if self.canceled is not None and self.canceled():
+                    break
+                name = name.rstrip("\n")
+                if name:
+                    work.put(name)
+        finally:
+            for thread in threads:
+                work.put(None)
+            for thread in threads:
+                thread.join()
+
+        # Deepest first, so setting a parent's times comes last.
+        self._directories.sort(key=lambda item: item[0].count(os.sep),
+                               reverse=True)
+        for (dst_path, st1) in self._directories:
+            try:
+                self.__set_attributes(dst_path, st1)
+            except OSError as err:
+                self._errors.append((dst_path, err))
+
+        return self._errors
+
+    def __worker(self, work):
+        '''THIS IS A PRIVATE METHOD
+
+        Copies the files named in the work queue until given None.
+        '''
+        while True:
+            name = work.get()
+            if name is None:
+                return
+            if self.canceled is not None and self.canceled():
+                continue
+            try:
+                size = self.__copy(name)
+            except (IOError, OSError) as err:
+                if self.logger is not None:
+                    self.logger.debug("Unable to copy %s: %s", name, err)
+                with self._lock:
+                    self._errors.append((name, err))
+                continue
+
+            with self._lock:
+                self.files_copied += 1
+                self.bytes_copied += size
+            if self.progress is not None:
+                self.progress(name, size)
+
+    def __copy(self, name):
+        '''THIS IS A PRIVATE METHOD
+
+        Copies a single file, returning the number of bytes copied.
+        '''
+        src_path = os.path.normpath(os.path.join(self.src, name))
+        dst_path = os.path.normpath(os.path.join(self.dst, name))
+        st1 = os.lstat(src_path)
+        mode = st1.st_mode
+
+        if stat.S_ISDIR(mode):
+            self.__makedirs(dst_path)
+            with self._lock:
+                self._directories.append((dst_path, st1))
+            return 0
+
+        self.__makedirs(os.path.dirname(dst_path))
+
+        link_event = None
+        if st1.st_nlink > 1:
+            key = (st1.st_dev, st1.st_ino)
+            with self._lock:
+                first = self._links.get(key)
+                if first is None:
+                    link_event = threading.Event()
+                    self._links[key] = (dst_path, link_event)
+            if first is not None:
+                first[1].wait()
+                self.__remove(dst_path)
+                os.link(first[0], dst_path)
+                return 0
+
+        try:
+            self.__remove(dst_path)
+            if stat.S_ISREG(mode):
+                size = self.__copy_data(src_path, dst_path)
+            elif stat.S_ISLNK(mode):
+                os.symlink(os.readlink(src_path), dst_path)
+                if self._preserve_owner:
+                    os.lchown(dst_path, st1.st_uid, st1.st_gid)
+                return 0
+            elif stat.S_ISCHR(mode) or stat.S_ISBLK(mode):
+                os.mknod(dst_path, mode, st1.st_rdev)
+                size = 0
+            elif stat.S_ISFIFO(mode):
+                os.mkfifo(dst_path)
+                size = 0
+            else:
+                # Sockets and doors can't be copied.
+                raise OSError(errno.ENOTSUP, "Unsupported file type",
+                              src_path)
+            self.__set_attributes(dst_path, st1)
+        finally:
+            if link_event is not None:
+                link_event.set()
+
+        return size
+
+    @staticmethod
+    def __copy_data(src_path, dst_path):
+        '''THIS IS A PRIVATE METHOD
+
+        Copies the contents of a regular file, returning the size copied.
+        '''
+        size = 0
+        with open(src_path, "rb") as src_file:
+            dst_fd = os.open(dst_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL,
+                             0600)
+            with os.fdopen(dst_fd, "wb") as dst_file:
+                while True:
+                    buf = src_file.read(FileCopier.BUFFER_SIZE)
+                    if not buf:
+                        break
+                    dst_file.write(buf)
+                    size += len(buf)
+        return size
+
+    def __set_attributes(self, dst_path, st1):
+        '''THIS IS A PRIVATE METHOD
+
+        Sets the ownership, mode and times of a copied file or directory.
+        '''
+        if self._preserve_owner:
+            os.chown(dst_path, st1.st_uid, st1.st_gid)
+        # After chown(), which clears the set-id bits.
+        os.chmod(dst_path, stat.S_IMODE(st1.st_mode))
+        os.utime(dst_path, (st1.st_atime, st1.st_mtime))
+
+    @staticmethod
+    def __makedirs(path):
+        '''THIS IS A PRIVATE METHOD
+
+        Creates the directory, and any parents, if they don't exist.
+        '''
+        try:
+            os.makedirs(path)
+        except OSError as err:
+            if err.errno != errno.EEXIST or not os.path.isdir(path):
+                raise
+
+    @staticmethod
+    def __remove(path):
+        '''THIS IS A PRIVATE METHOD
+
+        Removes an existing file, for cpio -u.  Directories are kept.
+        '''
+        try:
+            if stat.S_ISDIR(os.lstat(path).st_mode):
+                return
+        except OSError as err:
+            if err.errno == errno.ENOENT:
+                return
+            raise
+        os.unlink(path)
@@ -33,6 +33,8 @@ from solaris_install.data_object import DataObject, ParsingError
 ACTION = "action"
 APP_CALLBACK = "app_callback"
 CONTENTS = "contents"
+COPY_METHOD = "copy_method"
+COPY_WORKERS = "copy_workers"
 CPIO_ARGS = "cpio_args"
 INSTALL = "install"
 IPS = "IPS"
@@ -66,6 +68,11 @@ class Software(DataObject):
     SOFTWARE_NAME_LABEL = "name"
     SOFTWARE_TYPE_LABEL = "type"
 
+    # As for the other classes here, attributes are kept in slots rather
+    # than a dictionary where possible, see DataObjectBase.
+    __slots__ = ("tran_type",)
+    XML_TAGS = (SOFTWARE_LABEL,)
+
     def __init__(self, name=None, type="IPS"):
         '''Initialize the DataObject object with name software
            and create a transfer object with the specified name.
@@ -154,6 +161,7 @@ class Software(DataObject):
                     transfer_obj.action = action
                     if size is not None:
                         transfer_obj.size = int(size)
+                    CPIOSpec.copy_options_from_xml(sub, transfer_obj)
 
                 elif val == "SVR4":
                     transfer_obj = SVR4Spec()
@@ -182,6 +190,9 @@ class Source(DataObject):
     '''
     SOURCE_LABEL = "source"
 
+    __slots__ = ()
+    XML_TAGS = (SOURCE_LABEL,)
+
     def __init__(self):
         super(Source, self).__init__(Source.SOURCE_LABEL)
 
@@ -214,6 +225,9 @@ class Destination(DataObject):
     '''
     DESTINATION_LABEL = "destination"
 
+    __slots__ = ()
+    XML_TAGS = (DESTINATION_LABEL,)
+
     def __init__(self):
         super(Destination, self).__init__(Destination.DESTINATION_LABEL)
 
@@ -245,6 +259,9 @@ class Dir(DataObject):
     DIR_LABEL = "dir"
     DIR_PATH_LABEL = "path"
 
+    __slots__ = ("dir_path",)
+    XML_TAGS = (DIR_LABEL,)
+
     def __init__(self, path):
         super(Dir, self).__init__(Dir.DIR_LABEL)
         self.dir_path = path
@@ -283,6 +300,9 @@ class Image(DataObject):
     IMAGE_ACTION_LABEL = "action"
     IMAGE_INDEX_LABEL = "index"
 
+    __slots__ = ("img_root", "action", "index")
+    XML_TAGS = (IMAGE_LABEL,)
+
     def __init__(self, img_root, action, index=False):
         super(Image, self).__init__(Image.IMAGE_LABEL)
         self.img_root = img_root
@@ -348,6 +368,9 @@ class ImType(DataObject):
     IMTYPE_COMPLETENESS_LABEL = "completeness"
     IMTYPE_ZONE_LABEL = "zone"
 
+    __slots__ = ("completeness", "zone")
+    XML_TAGS = (IMTYPE_LABEL,)
+
     def __init__(self, completeness, zone=False):
         super(ImType, self).__init__(ImType.IMTYPE_LABEL)
         self.completeness = completeness
@@ -389,6 +412,9 @@ class Facet(DataObject):
     FACET_LABEL = "facet"
     FACET_SET_LABEL = "set"
 
+    __slots__ = ("facet_name", "val")
+    XML_TAGS = (FACET_LABEL,)
+
     def __init__(self, facet, val=True):
         super(Facet, self).__init__(Facet.FACET_LABEL)
         self.facet_name = facet
@@ -428,6 +454,9 @@ class Property(DataObject):
     PROPERTY_LABEL = "property"
     PROPERTY_VAL_LABEL = "val"
 
+    __slots__ = ("prop_name", "val")
+    XML_TAGS = (PROPERTY_LABEL,)
+
     def __init__(self, prop, val):
         super(Property, self).__init__(Property.PROPERTY_LABEL)
         self.prop_name = prop
@@ -468,6 +497,11 @@ class CPIOSpec(DataObject):
         contents    A file containing files/dirs or a list
                     containing the list of files/dirs to be transferred or
                     removed.
+        copy_method How files are installed: "cpio", with /usr/bin/cpio,
+                    which is the default, or "builtin", copying them
+                    in-process with copy_workers threads.
+        copy_workers The number of threads copying files with the builtin
+                    copy_method.
     '''
     # Default CPIO values
     DEF_INSTALL_LIST = ".transfer/install_list"
@@ -478,15 +512,48 @@ class CPIOSpec(DataObject):
     CPIOSPEC_ACTION_LABEL = "action"
     CPIOSPEC_NAME_LABEL = "name"
     CPIOSPEC_SIZE_LABEL = "size"
+    CPIOSPEC_COPY_METHOD_LABEL = "copy_method"
+    CPIOSPEC_COPY_WORKERS_LABEL = "copy_workers"
     INSTALL = "install"
     UNINSTALL = "uninstall"
+    COPY_CPIO = "cpio"
+    COPY_BUILTIN = "builtin"
 
-    def __init__(self, action=None, contents=None, size=None):
+    # callers set other attributes of their own, e.g. type
+    __slots__ = ("action", "contents", "size", "copy_method", "copy_workers",
+                 "__dict__")
+    XML_TAGS = ()
+
+    def __init__(self, action=None, contents=None, size=None,
+                 copy_method=None, copy_workers=None):
 
         super(CPIOSpec, self).__init__(CPIOSpec.TRANSFER_LABEL)
         self.action = action
         self.contents = contents
         self.size = size
+        self.copy_method = copy_method
+        self.copy_workers = copy_workers
+
+    @staticmethod
+    def copy_options_from_xml(element, transfer_obj):
+        '''Set the copy_method and copy_workers of transfer_obj from the
+           attributes of a software_data element, if present.
+        '''
+        copy_method = element.get(CPIOSpec.CPIOSPEC_COPY_METHOD_LABEL)
+        if copy_method is not None:
+            if copy_method not in (CPIOSpec.COPY_CPIO,
+                                   CPIOSpec.COPY_BUILTIN):
+                raise ParsingError("Invalid CPIO copy_method: %s" %
+                                   copy_method)
+            transfer_obj.copy_method = copy_method
+
+        copy_workers = element.get(CPIOSpec.CPIOSPEC_COPY_WORKERS_LABEL)
+        if copy_workers is not None:
+            try:
+                transfer_obj.copy_workers = int(copy_workers)
+            except ValueError:
+                raise ParsingError("Invalid CPIO copy_workers: %s" %
+                                   copy_workers)
 
     def to_xml(self):
         '''Method to transfer the DOC CPIO checkpoint information
@@ -532,6 +599,12 @@ class CPIOSpec(DataObject):
         element.set(CPIOSpec.CPIOSPEC_ACTION_LABEL, action)
         if self.size is not None:
             element.set(CPIOSpec.CPIOSPEC_SIZE_LABEL, str(self.size))
+        if self.copy_method is not None:
+            element.set(CPIOSpec.CPIOSPEC_COPY_METHOD_LABEL,
+                        self.copy_method)
+        if self.copy_workers is not None:
+            element.set(CPIOSpec.CPIOSPEC_COPY_WORKERS_LABEL,
+                        str(self.copy_workers))
 
         # action is either install or uninstall.
         # If a name has been specified, place the files or
@@ -574,6 +647,7 @@ class CPIOSpec(DataObject):
                 file_list.append(name.text.strip('"\n\t '))
             transfer_obj.contents = file_list
         transfer_obj.action = action
+        CPIOSpec.copy_options_from_xml(element, transfer_obj)
 
         return transfer_obj
 
@@ -585,6 +659,9 @@ class P5ISpec(DataObject):
     P5I_TRANSFER_LABEL = "transfer"
     P5I_SOFTWARE_DATA_LABEL = "software_data"
 
+    __slots__ = ("purge_history",)
+    XML_TAGS = ()
+
     def __init__(self, purge_history=False):
         super(P5ISpec, self).__init__(P5ISpec.P5I_TRANSFER_LABEL)
         self.purge_history = purge_history
@@ -633,6 +710,10 @@ class IPSSpec(DataObject):
     INSTALL = "install"
     UNINSTALL = "uninstall"
 
+    __slots__ = ("action", "contents", "reject_list", "app_callback",
+                 "purge_history")
+    XML_TAGS = ()
+
     def __init__(self, action=None, contents=None, reject_list=None,
                  app_callback=None, purge_history=False):
         super(IPSSpec, self).__init__(IPSSpec.IPS_TRANSFER_LABEL)
@@ -710,6 +791,9 @@ class SVR4Spec(DataObject):
     INSTALL = "install"
     UNINSTALL = "uninstall"
 
+    __slots__ = ("action", "contents")
+    XML_TAGS = ()
+
     def __init__(self, action=None, contents=None):
         super(SVR4Spec, self).__init__(SVR4Spec.SVR4_TRANSFER_LABEL)
         self.action = action
@@ -762,6 +846,9 @@ class Args(DataObject):
     ARGS_LABEL = "args"
     ARGS_DICT_LABEL = "arg_dict"
 
+    __slots__ = ("arg_dict",)
+    XML_TAGS = (ARGS_LABEL,)
+
     def __init__(self, arg_dict=None):
         super(Args, self).__init__(Args.ARGS_LABEL)
         self.arg_dict = arg_dict
@@ -795,6 +882,9 @@ class Publisher(DataObject):
     PUBLISHER_LABEL = "publisher"
     PUB_NAME_LABEL = "name"
 
+    __slots__ = ("publisher",)
+    XML_TAGS = (PUBLISHER_LABEL,)
+
     def __init__(self, publisher_name=None):
         super(Publisher, self).__init__(Publisher.PUBLISHER_LABEL)
         self.publisher = publisher_name
@@ -833,6 +923,9 @@ class Origin(DataObject):
     ORIGIN_LABEL = "origin"
     ORIGIN_NAME_LABEL = "name"
 
+    __slots__ = ("origin",)
+    XML_TAGS = (ORIGIN_LABEL,)
+
     def __init__(self, origin_name=None):
         super(Origin, self).__init__(Origin.ORIGIN_LABEL)
         self.origin = origin_name
@@ -869,6 +962,9 @@ class Mirror(DataObject):
     MIRROR_LABEL = "mirror"
     MIRROR_NAME_LABEL = "name"
 
+    __slots__ = ("mirror",)
+    XML_TAGS = (MIRROR_LABEL,)
+
     def __init__(self, mirror_name=None):
         super(Mirror, self).__init__(Mirror.MIRROR_LABEL)
         self.mirror = mirror_name
@@ -74,6 +74,30 @@ misc.setlocale(locale.LC_ALL, "")
 gettext.install("pkg", "/usr/share/locale")
 
 
+class ProgressMonTracker(progress.NullProgressTracker):
+    '''IPS progress tracker which reports what IPS downloads to a
+       ProgressMon, once one has been given as pmon.
+    '''
+
+    def __init__(self):
+        progress.NullProgressTracker.__init__(self)
+        self.pmon = None
+
+    def download_set_goal(self, npkgs, nfiles, nbytes):
+        '''The size of the download becomes the size of the transfer'''
+        progress.NullProgressTracker.download_set_goal(self, npkgs, nfiles,
+                                                       nbytes)
+        if self.pmon is not None:
+            self.pmon.set_distrosize(nbytes / 1024)
+
+    def download_add_progress(self, nfiles, nbytes, cachehit=False):
+        '''Report the files and bytes downloaded'''
+        progress.NullProgressTracker.download_add_progress(self, nfiles,
+                                                           nbytes, cachehit)
+        if self.pmon is not None:
+            self.pmon.update(nbytes, nfiles)
+
+
 class AbstractIPS(Checkpoint):
     '''Subclass for transfer IPS checkpoint'''
     __metaclass__ = abc.ABCMeta
@@ -151,7 +175,12 @@ class AbstractIPS(Checkpoint):
         logt = progress.CommandLineProgressTracker(print_engine=pe)
         trackers.append(logt)
 
+        # Feeds the progress monitor with what is downloaded
+        self.pmon_tracker = ProgressMonTracker()
+        trackers.append(self.pmon_tracker)
+
         self.prog_tracker = progress.MultiProgressTracker(trackers)
+        self._default_tracker = self.prog_tracker
 
         # local attributes used to create the publisher.
         self._publ = None
@@ -194,6 +223,12 @@ class AbstractIPS(Checkpoint):
         self.give_progress = True
         return progress_estimate
 
+    def get_input_size(self):
+        '''Returns the estimated size of the transfer, based on the
+           number of packages to install.
+        '''
+        return self.distro_size or None
+
     def cancel(self):
         '''Cancel the transfer in progress'''
         self._cancel_event = True
@@ -372,7 +407,14 @@ class AbstractIPS(Checkpoint):
             # Start up the ProgressMon to report progress
             # while the actual transfer is taking place.
             self.pmon = ProgressMon(logger=self.logger)
-            self.pmon.startmonitor(self.dst, self.distro_size, 0, 100)
+            # Unless the image args replaced the progress tracker, IPS
+            # reports what it downloads, rather than the file system being
+            # monitored.
+            fed = self.prog_tracker is self._default_tracker
+            if fed:
+                self.pmon_tracker.pmon = self.pmon
+            self.pmon.startmonitor(self.dst, self.distro_size, 0, 100,
+                                   fed=fed)
 
         if self.img_action == self.EXISTING and self._publ \
            and not self.dry_run:
@@ -650,6 +692,7 @@ class AbstractIPS(Checkpoint):
             self.pmon.done = True
             self.pmon.wait()
             self.pmon = None
+            self.pmon_tracker.pmon = None
 
     def set_image_args(self):
         '''Set the image args we need set because the information
@@ -21,7 +21,7 @@
 #
 
 #
-# Copyright (c) 2010, 2011, Oracle and/or its affiliates. All rights reserved.
+# Copyright (c) 2010, 2012, Oracle and/or its affiliates. All rights reserved.
 #
 
 '''Progress monitor for the transfer checkpoint'''
@@ -33,9 +33,17 @@ import threading
 class ProgressMon(object):
     '''The ProgressMon class contains methods to monitor the
        progress of the transfer.
+
+       Transfers which know how much they have transferred report it with
+       update(), and are started with startmonitor(..., fed=True).  For
+       others, progress is estimated from the growth of the destination
+       file system, as reported by statvfs().  Progress is reported at
+       most once every sleep_for seconds, and only when it changes.
     '''
     def __init__(self, distrosize=0, initpct=0, endpct=0, done=0, logger=None,
                  sleep_for=.5):
+        self._done_event = threading.Event()
+        self._lock = threading.Lock()
         self.distrosize = distrosize
         self.initpct = initpct
         self.endpct = endpct
@@ -45,16 +53,44 @@ class ProgressMon(object):
         self.thread1 = None
         self.prog_init_completed = False
 
-    def startmonitor(self, filesys, distrosize, initpct=0, endpct=100):
+        # Whether progress is fed through update(), and the amount
+        # transferred so far, in bytes and files, if it is.
+        self.fed = False
+        self.bytes_done = 0
+        self.files_done = 0
+
+        # When monitoring started, and the kilobytes transferred since.
+        self.start_time = None
+        self.transferred = 0
+
+    def _get_done(self):
+        '''True once the transfer has finished'''
+        return self._done_event.is_set()
+
+    def _set_done(self, done):
+        '''Setting done to True stops monitoring'''
+        if done:
+            self._done_event.set()
+        else:
+            self._done_event.clear()
+
+    done = property(_get_done, _set_done)
+
+    def startmonitor(self, filesys, distrosize, initpct=0, endpct=100,
+                     fed=False):
         '''Start a thread to monitor the progress populating a file system.
            Input: filesys - file system to monitor
                   distrosize - full distro size in kilobytes
                   initpct - base percent value from which to start calculating
                   endpct - percentage value at which to stop calculating
+                  fed - True if the transfer will report what it has
+                        transferred with update(), instead of the file
+                        system being monitored.
         '''
         self.distrosize = distrosize
         self.initpct = initpct
         self.endpct = endpct
+        self.fed = fed
         self.done = False
         self.thread1 = threading.Thread(target=self.__progressthread,
                                         args=(filesys, ))
@@ -63,6 +99,22 @@ class ProgressMon(object):
         while not self.prog_init_completed:
             time.sleep(0.5)
 
+    def update(self, nbytes, nfiles=1):
+        '''Report that the transfer has completed another nbytes bytes,
+           in nfiles files.  May be called from any thread.
+        '''
+        with self._lock:
+            self.bytes_done += nbytes
+            self.files_done += nfiles
+
+    def set_distrosize(self, distrosize):
+        '''Replace the estimated size of the transfer with distrosize
+           kilobytes, once the transfer knows it.  May be called from any
+           thread.
+        '''
+        with self._lock:
+            self.distrosize = distrosize
+
     def wait(self, timeout=120):
         '''Wait until the thread whose join() method is called terminates.
 
@@ -78,6 +130,26 @@ class ProgressMon(object):
         if self.thread1.isAlive():
             self.logger.debug("Progress monitoring thread is not terminated.")
 
+    def get_throughput(self):
+        '''Returns the average kilobytes transferred per second so far, or
+           None if nothing has been transferred yet.
+        '''
+        if self.start_time is None or self.transferred <= 0:
+            return None
+        elapsed = time.time() - self.start_time
+        if elapsed <= 0:
+            return None
+        return self.transferred / elapsed
+
+    def get_remaining_time(self):
+        '''Returns the estimated number of seconds until the transfer is
+           complete, at the throughput so far, or None if unknown.
+        '''
+        throughput = self.get_throughput()
+        if throughput is None:
+            return None
+        return max(self.distrosize - self.transferred, 0) / throughput
+
     def __fssize(self, filesystem):
         '''Find the current size of the specified file system.
            Input: filesystem  - filesystem to find size of.
@@ -97,8 +169,10 @@ class ProgressMon(object):
         initsize = None
 
         try:
-            while initsize is None:
+            while not self.fed and initsize is None and not self.done:
                 initsize = self.__fssize(filesystem)
+                if initsize is None:
+                    self._done_event.wait(self.sleep_for)
         except Exception as ex:
             # set this flag so the startmonitor() function won't hang
             self.prog_init_completed = True
@@ -106,44 +180,62 @@ class ProgressMon(object):
 
         totpct = self.endpct - self.initpct
         prevpct = -1
+        self.start_time = time.time()
 
         self.prog_init_completed = True
 
         # Loop until the user aborts or we're done transferring.
         # Keep track of the percentage done and lets the user know
         # how far the transfer has progressed.
-        while True:
-
-            if self.done:
-                return
-
-            # Compute increase in filesystem size
-            fssz = self.__fssize(filesystem)
-            if fssz is None:
-                continue
-            fsgain = fssz - initsize
+        while not self.done:
+
+            with self._lock:
+                distrosize = max(self.distrosize, 1)
+                fed_gain = self.bytes_done / 1024
+            if self.fed:
+                gain = fed_gain
+            else:
+                # Compute increase in filesystem size
+                fssz = self.__fssize(filesystem)
+                if fssz is None:
+                    gain = 0
+                else:
+                    gain = fssz - initsize
 
             # in case there's a negative change in file system size, because
             # files are deleted, skip over so we don't report negative
             # progress
-            if fsgain <= 0:
-                continue
-
-            # Compute percentage transferred
-            actualpct = fsgain * 100 / self.distrosize
-
-            # Compute the percentage transfer in terms of the perc range.
-            pct = fsgain * totpct / self.distrosize + self.initpct
-
-            # Do not exceed the limit.
-            if pct >= self.endpct or actualpct > 100:
-                pct = self.endpct
-
-            # If the percentage has changed at all, log the progress
-            if pct != prevpct:
-                self.logger.report_progress("Transferring contents", int(pct))
-                prevpct = pct
-
-            if pct >= self.endpct or self.done:
-                return
-            time.sleep(self.sleep_for)
+            if gain > 0:
+                self.transferred = gain
+
+                # Compute percentage transferred
+                actualpct = gain * 100 / distrosize
+
+                # Compute the percentage transfer in terms of the perc range.
+                pct = gain * totpct / distrosize + self.initpct
+
+                # Do not exceed the limit.
+                if pct >= self.endpct or actualpct > 100:
+                    pct = self.endpct
+
+                # If the percentage has changed at all, log the progress
+                if pct != prevpct:
+                    self.logger.report_progress("Transferring contents",
+                                                int(pct))
+                    self.__log_rate()
+                    prevpct = pct
+
+                if pct >= self.endpct:
+                    return
+
+            self._done_event.wait(self.sleep_for)
+
+    def __log_rate(self):
+        '''Log the throughput and estimated time remaining'''
+        throughput = self.get_throughput()
+        if throughput is None:
+            return
+        self.logger.debug("Transferred %d of %d KB, %d files, %.1f KB/s, "
+                          "%.0f seconds remaining", self.transferred,
+                          self.distrosize, self.files_done, throughput,
+                          self.get_remaining_time())
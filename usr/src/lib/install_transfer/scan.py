@@ -0,0 +1,205 @@
+#!/usr/bin/python
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+
+'''Directory tree scanner for the transfer checkpoints'''
+import os
+import stat
+import sys
+import threading
+import Queue
+
+
+def rounded_size(st_size):
+    '''Returns st_size rounded up to a multiple of 1024, as
+       osol_install.install_utils.file_size() does.
+    '''
+    if st_size % 1024 == 0:
+        return st_size
+    return ((st_size / 1024) + 1) * 1024
+
+
+class TreeScanner(object):
+    '''The TreeScanner class walks a directory tree, calling lstat() once
+       for each entry, and records each entry's inode number, size and
+       path relative to the top of the tree.
+
+       Entries are listed in the same order os.walk() would visit them,
+       with the directories in each directory before the files.  As for
+       os.walk(), symbolic links to directories are listed with the
+       directories, which costs a stat() of each symbolic link as well.
+       Symbolic links, directories which can't be read and directories on
+       other file systems than the top of the tree are listed, but not
+       descended in to.  Entries which can't be stat'd are skipped.
+
+       With more than one worker, directories are read and their entries
+       stat'd by a pool of threads, which can overlap the I/O of
+       different subtrees.  The entries listed are the same.
+    '''
+
+    def __init__(self, workers=1, cancel_check=None):
+        '''Input: workers - number of threads to scan with, 1 to scan
+                  in the calling thread
+                  cancel_check - optional function called before each
+                  directory is processed
+        '''
+        self.workers = max(workers, 1)
+        self.cancel_check = cancel_check
+
+    def scan(self, top, rel_top=""):
+        '''Scan the tree under top, not including top itself.
+           Input: top - the directory to scan
+                  rel_top - path of top to list entries relative to
+           Output: a list of (inode, size, relative path) tuples, with the
+                  size rounded up to a multiple of 1024.
+           Raises: OSError if top can't be stat'd
+        '''
+        top_dev = os.stat(top).st_dev
+        if self.workers > 1:
+            results = self.__scan_parallel(top, rel_top, top_dev)
+        else:
+            results = dict()
+            pending = [(top, rel_top)]
+            while pending:
+                if self.cancel_check is not None:
+                    self.cancel_check()
+                (path, rel_path) = pending.pop()
+                results[path] = self.__scan_dir(path, rel_path, top_dev)
+                pending.extend(results[path][1])
+
+        # Put the entries of each directory in os.walk() order.
+        entries = list()
+        stack = [top]
+        while stack:
+            (dir_entries, subdirs) = results.pop(stack.pop())
+            entries.extend(dir_entries)
+            stack.extend(path for (path, rel_path) in reversed(subdirs))
+        return entries
+
+    @staticmethod
+    def __scan_dir(path, rel_path, top_dev):
+        '''THIS IS A PRIVATE METHOD
+
+        Returns the entries of a single directory, and the (path,
+        relative path) of the subdirectories to descend in to.
+        '''
+        dirs = list()
+        files = list()
+        subdirs = list()
+        try:
+            names = os.listdir(path)
+        except OSError:
+            # os.walk() skips directories which can't be read.
+            return (dirs, subdirs)
+
+        for name in names:
+            full_path = os.path.join(path, name)
+            entry_rel_path = os.path.join(rel_path, name)
+            try:
+                st1 = os.lstat(full_path)
+            except OSError:
+                # Removed since the directory was read.
+                continue
+
+            entry = (st1.st_ino, rounded_size(st1.st_size), entry_rel_path)
+            is_link = stat.S_ISLNK(st1.st_mode)
+            if is_link:
+                # os.walk() lists symbolic links to directories with the
+                # directories, and those it can't follow with the files.
+                try:
+                    is_dir = stat.S_ISDIR(os.stat(full_path).st_mode)
+                except OSError:
+                    is_dir = False
+            else:
+                is_dir = stat.S_ISDIR(st1.st_mode)
+
+            if is_dir:
+                dirs.append(entry)
+                # Emulate nftw(..., FTW_MOUNT) for directories
+                if not is_link and st1.st_dev == top_dev:
+                    subdirs.append((full_path, entry_rel_path))
+            else:
+                files.append(entry)
+
+        dirs.extend(files)
+        return (dirs, subdirs)
+
+    def __scan_parallel(self, top, rel_top, top_dev):
+        '''THIS IS A PRIVATE METHOD
+
+        Scans the directories under top with a pool of worker threads.
+        Returns a dictionary of the results of __scan_dir() for each
+        directory, keyed by its path.
+        '''
+        work = Queue.Queue()
+        done = Queue.Queue()
+
+        def worker():
+            '''Scan directories from the work queue until given None'''
+            while True:
+                item = work.get()
+                if item is None:
+                    return
+                try:
+                    done.put((item[0], self.__scan_dir(item[0], item[1],
+                                                       top_dev), None))
+                except BaseException:
+                    done.put((item[0], None, sys.exc_info()))
+
+        threads = [threading.Thread(target=worker, name="TreeScanner.%d" % i)
+                   for i in range(self.workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        results = dict()
+        work.put((top, rel_top))
+        outstanding = 1
+        try:
+            while outstanding:
+                (path, result, exc_info) = done.get()
+                outstanding -= 1
+                if exc_info is not None:
+                    raise exc_info[0], exc_info[1], exc_info[2]
+                if self.cancel_check is not None:
+                    self.cancel_check()
+                results[path] = result
+                for subdir in result[1]:
+                    work.put(subdir)
+                    outstanding += 1
+        finally:
+            # Don't scan any more directories if stopped early.
+            while True:
+                try:
+                    work.get_nowait()
+                except Queue.Empty:
+                    break
+            for thread in threads:
+                work.put(None)
+            for thread in threads:
+                thread.join()
+
+        return results
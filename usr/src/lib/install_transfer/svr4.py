@@ -20,7 +20,7 @@
 # CDDL HEADER END
 #
 #
-# Copyright (c) 2010, 2011, Oracle and/or its affiliates. All rights reserved.
+# Copyright (c) 2010, 2012, Oracle and/or its affiliates. All rights reserved.
 #
 '''Transfer SVR4 checkpoint. Sub-class of the checkpoint class'''
 
@@ -82,6 +82,9 @@ class AbstractSVR4(AbstractCheckpoint):
     # Used to split a URL into its components.
     URL_RE = re.compile("(\w*)://([^/]*)((/.*)*)")
 
+    # pkgadd output for each package installed
+    INSTALLED_RE = re.compile("^Installation of <([^>]+)> was successful")
+
     # Constants related to types of package sources.
     LOCAL_DIR_TYPE = "Local Directory"
     LOCAL_DSTR_TYPE = "Local Datastream"
@@ -117,6 +120,8 @@ class AbstractSVR4(AbstractCheckpoint):
         # Use for progress reporting
         self.total_size = -1
         self.give_progress = False
+        # Size in Kb of each package to install, where known.
+        self.pkg_sizes = dict()
         self.svr4_process = None
         self._cancel_event = False
 
@@ -248,6 +253,7 @@ class AbstractSVR4(AbstractCheckpoint):
             else:
                 if not bad_pkg_names:
                     total_size += pkg_dict[pkg_name]
+                    self.pkg_sizes[pkg_name] = pkg_dict[pkg_name]
                     self.logger.debug("Found SVR4 pkg to "
                                      "install: %s, size: %sKb" %
                                      (pkg_name, pkg_dict[pkg_name]))
@@ -293,6 +299,7 @@ class AbstractSVR4(AbstractCheckpoint):
                 self.logger.debug("Found SVR4 pkg to install: %s, size: %sKb" %
                                  (pkgroot, pkg_size))
                 total_size += pkg_size
+                self.pkg_sizes[pkg] = pkg_size
 
         # Dump the wad of missing package names.
         if bad_pkg_names:
@@ -315,6 +322,12 @@ class AbstractSVR4(AbstractCheckpoint):
         self.give_progress = True
         return progress_estimate
 
+    def get_input_size(self):
+        '''Returns the size of the packages to transfer, if known'''
+        if self.total_size <= 0:
+            return None
+        return self.total_size
+
     def execute(self, dry_run=False):
         '''Execute method for the SVR4 checkpoint module. Will read the
            input parameters and perform the specified transfer.
@@ -394,7 +407,10 @@ class AbstractSVR4(AbstractCheckpoint):
             # file system.  If this is not the case (as may be when testing
             # this module in abnormal conditions), startmonitor will hang.
             # Just create the self.dst as a directory in this case.
-            self.pmon.startmonitor(self.dst, self.total_size, 0, 100)
+            # Progress is reported as each package is installed when all
+            # their sizes are known.
+            self.pmon.startmonitor(self.dst, self.total_size, 0, 100,
+                                   fed=self._sizes_known())
 
         # Perform the transfer specific operations.
 
@@ -448,6 +464,7 @@ class AbstractSVR4(AbstractCheckpoint):
                         if not pkgoutput.strip():
                             continue
                         self.logger.debug("%s", pkgoutput)
+                        self._report_installed(pkgoutput)
                     self.svr4_process = None
 
         finally:
@@ -456,6 +473,29 @@ class AbstractSVR4(AbstractCheckpoint):
                 self.pmon.wait()
                 self.pmon = None
 
+    def _sizes_known(self):
+        '''Returns True if the sizes of all the packages to install are
+           known, so progress can be reported as each is installed.
+        '''
+        for trans_val in self._transfer_list:
+            if trans_val.get(ACTION) != 'install':
+                continue
+            for pkg in trans_val.get(CONTENTS):
+                if pkg not in self.pkg_sizes:
+                    return False
+        return True
+
+    def _report_installed(self, pkgoutput):
+        '''Report the progress of a package being installed, from a line
+           of pkgadd output.
+        '''
+        if self.pmon is None or not self.pmon.fed:
+            return
+        match = AbstractSVR4.INSTALLED_RE.match(pkgoutput)
+        if match and match.group(1) in self.pkg_sizes:
+            self.pmon.update(self.pkg_sizes[match.group(1)] *
+                             AbstractSVR4.BYTES_PER_KB)
+
     def _validate_input(self):
         '''Check the required input parameters and verify that
            they are set appropriately.
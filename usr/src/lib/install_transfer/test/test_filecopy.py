@@ -0,0 +1,157 @@
+#!/usr/bin/python
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+
+
+'''In-process file copier Unit Tests'''
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from solaris_install.transfer.filecopy import FileCopier
+
+
+class TestFileCopier(unittest.TestCase):
+    '''Test copying lists of files as cpio -pdum does'''
+
+    NAMES = ["./", "a", "a/b", "a/b/one", "a/two", "a/link", "a/symlink",
+             "a/fifo", "ro", "ro/three", "c/d/four"]
+
+    def setUp(self):
+        self.src = tempfile.mkdtemp(prefix="file_copier_src_")
+        self.dst = tempfile.mkdtemp(prefix="file_copier_dst_")
+        for dir_path in ("a/b", "ro", "c/d"):
+            os.makedirs(self.src_path(dir_path))
+        for (number, file_path) in enumerate(("a/b/one", "a/two",
+                                              "ro/three", "c/d/four")):
+            with open(self.src_path(file_path), "w") as filehandle:
+                filehandle.write("%d" % number * 100000 * number)
+            os.utime(self.src_path(file_path), (1000000, 2000000 + number))
+        os.chmod(self.src_path("a/two"), 0640)
+        os.link(self.src_path("a/two"), self.src_path("a/link"))
+        os.symlink("b/one", self.src_path("a/symlink"))
+        os.mkfifo(self.src_path("a/fifo"))
+        os.utime(self.src_path("ro"), (1000000, 3000000))
+        os.chmod(self.src_path("ro"), 0555)
+
+    def tearDown(self):
+        os.chmod(self.src_path("ro"), 0755)
+        if os.path.exists(os.path.join(self.dst, "ro")):
+            os.chmod(os.path.join(self.dst, "ro"), 0755)
+        shutil.rmtree(self.src)
+        shutil.rmtree(self.dst)
+
+    def src_path(self, name):
+        '''Returns the path of a file in the source'''
+        return os.path.join(self.src, name)
+
+    def assert_copied(self, name):
+        '''Check the file was copied with the same type and attributes'''
+        st1 = os.lstat(self.src_path(name))
+        st2 = os.lstat(os.path.join(self.dst, name))
+        self.assertEqual(stat.S_IFMT(st1.st_mode), stat.S_IFMT(st2.st_mode))
+        if stat.S_ISLNK(st1.st_mode):
+            self.assertEqual(os.readlink(self.src_path(name)),
+                             os.readlink(os.path.join(self.dst, name)))
+            return
+        self.assertEqual(stat.S_IMODE(st1.st_mode),
+                         stat.S_IMODE(st2.st_mode))
+        self.assertEqual(int(st1.st_mtime), int(st2.st_mtime))
+        if stat.S_ISREG(st1.st_mode):
+            self.assertEqual(st1.st_size, st2.st_size)
+            with open(self.src_path(name)) as src_file:
+                with open(os.path.join(self.dst, name)) as dst_file:
+                    self.assertEqual(src_file.read(), dst_file.read())
+
+    def check_copy(self, workers):
+        '''Check the files listed are copied with their attributes'''
+        copier = FileCopier(self.src, self.dst, workers)
+        self.assertEqual(copier.copy_list(self.NAMES), [])
+        for name in self.NAMES:
+            self.assert_copied(name)
+        self.assertEqual(copier.files_copied, len(self.NAMES))
+        self.assertEqual(copier.bytes_copied,
+            sum(os.lstat(self.src_path(name)).st_size
+                for name in ("a/b/one", "a/two", "ro/three", "c/d/four")))
+
+    def test_copy(self):
+        '''Test copying with several threads'''
+        self.check_copy(4)
+
+    def test_copy_one_worker(self):
+        '''Test copying with a single thread'''
+        self.check_copy(1)
+
+    def test_hard_link(self):
+        '''Test hard links between the files listed are kept'''
+        FileCopier(self.src, self.dst, 4).copy_list(self.NAMES)
+        self.assertEqual(os.lstat(os.path.join(self.dst, "a/two")).st_ino,
+                         os.lstat(os.path.join(self.dst, "a/link")).st_ino)
+
+    def test_parents_created(self):
+        '''Test parent directories not listed are created'''
+        FileCopier(self.src, self.dst).copy_list(["c/d/four"])
+        self.assertTrue(os.path.isdir(os.path.join(self.dst, "c/d")))
+        self.assert_copied("c/d/four")
+
+    def test_replace_existing(self):
+        '''Test existing files are replaced unconditionally'''
+        os.makedirs(os.path.join(self.dst, "a"))
+        with open(os.path.join(self.dst, "a/two"), "w") as filehandle:
+            filehandle.write("newer")
+        os.symlink("elsewhere", os.path.join(self.dst, "a/symlink"))
+        FileCopier(self.src, self.dst).copy_list(["a/two", "a/symlink"])
+        self.assert_copied("a/two")
+        self.assert_copied("a/symlink")
+
+    def test_errors(self):
+        '''Test files which can't be copied are skipped and returned'''
+        copier = FileCopier(self.src, self.dst, 2)
+        errors = copier.copy_list(["a/two", "missing", "a/b/one"])
+        self.assertEqual([name for (name, err) in errors], ["missing"])
+        self.assert_copied("a/two")
+        self.assert_copied("a/b/one")
+
+    def test_canceled(self):
+        '''Test nothing more is copied once canceled'''
+        copier = FileCopier(self.src, self.dst, 2, canceled=lambda: True)
+        copier.copy_list(self.NAMES)
+        self.assertEqual(copier.files_copied, 0)
+
+    def test_progress(self):
+        '''Test progress is reported for each file'''
+        copied = list()
+        copier = FileCopier(self.src, self.dst, 4,
+            progress=lambda name, size: copied.append((name, size)))
+        copier.copy_list(self.NAMES)
+        self.assertEqual(sorted(name for (name, size) in copied),
+                         sorted(self.NAMES))
+
+
+if __name__ == '__main__':
+    unittest.main()
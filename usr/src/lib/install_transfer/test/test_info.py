@@ -31,7 +31,9 @@ import os
 import shutil
 import tempfile
 import unittest
+from lxml import etree
 from pkg.client.api import IMG_TYPE_PARTIAL
+from solaris_install.data_object import ParsingError
 from solaris_install.engine import InstallEngine
 from solaris_install.logger import InstallLogger
 from solaris_install.transfer.info import Args
@@ -295,6 +297,28 @@ class TestCPIOInfoFunctions(unittest.TestCase):
                 self.assertEqual(tr.action, "transform")
                 self.assertEqual(tr.contents, "/usr/share/media_transform")
 
+    def test_copy_method_from_xml(self):
+        '''Test the copy method and workers are read from the manifest'''
+        element = etree.fromstring('''
+            <software name="transfer-root" type="CPIO">
+              <software_data action="install" copy_method="builtin"
+                             copy_workers="8">
+                <name>./</name>
+              </software_data>
+              <software_data action="uninstall">
+                <name>etc/motd</name>
+              </software_data>
+            </software>''')
+        soft = Software.from_xml(element)
+        (install, uninstall) = soft.get_children("transfer", CPIOSpec)
+        self.assertEqual(install.copy_method, CPIOSpec.COPY_BUILTIN)
+        self.assertEqual(install.copy_workers, 8)
+        self.assertEqual(uninstall.copy_method, None)
+        self.assertEqual(uninstall.copy_workers, None)
+
+        element[0].set("copy_method", "tar")
+        self.assertRaises(ParsingError, Software.from_xml, element)
+
 
 class TestIPSInfoFunctions(unittest.TestCase):
     '''Tests that validate the IPS info functionality'''
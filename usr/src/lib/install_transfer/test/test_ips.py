@@ -47,6 +47,7 @@ from solaris_install.transfer.info import Software
 from solaris_install.transfer.info import Source
 from solaris_install.transfer.ips import TransferIPS
 from solaris_install.transfer.ips import TransferIPSAttr
+from solaris_install.transfer.prog import ProgressMon
 
 DRY_RUN = True
 
@@ -252,6 +253,20 @@ class TestIPSAttrFunctions(unittest.TestCase):
         self.assertTrue(estimate == self.tr_ips.DEFAULT_PROG_EST * \
             (len(self.tr_ips.contents) / self.tr_ips.DEFAULT_PKG_NUM))
 
+    def test_progress_tracker(self):
+        '''Test that what IPS downloads is reported to the progress
+           monitor
+        '''
+        pmon = ProgressMon()
+        tracker = self.tr_ips.pmon_tracker
+        tracker.download_set_goal(2, 3, 4096 * 1024)
+        tracker.pmon = pmon
+        tracker.download_set_goal(2, 3, 4096 * 1024)
+        tracker.download_add_progress(3, 1024 * 1024)
+        self.assertEqual(pmon.distrosize, 4096)
+        self.assertEqual(pmon.bytes_done, 1024 * 1024)
+        self.assertEqual(pmon.files_done, 3)
+
 
 class TestIPSFunctions(unittest.TestCase):
     IPS_IMG_DIR = "/rpool/test_ips"
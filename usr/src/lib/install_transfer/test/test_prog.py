@@ -0,0 +1,123 @@
+#!/usr/bin/python
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+
+
+'''Transfer progress monitor Unit Tests'''
+
+import tempfile
+import time
+import unittest
+
+from solaris_install.transfer.prog import ProgressMon
+
+
+class MockLogger(object):
+    '''Records the progress reported'''
+
+    def __init__(self):
+        self.reported = list()
+
+    def report_progress(self, msg, progress):
+        '''Record the progress'''
+        self.reported.append(progress)
+
+    def debug(self, *args):
+        '''Ignore debug messages'''
+        pass
+
+
+class TestProgressMon(unittest.TestCase):
+    '''Test monitoring transfer progress'''
+
+    def setUp(self):
+        self.logger = MockLogger()
+        self.pmon = ProgressMon(logger=self.logger, sleep_for=0.01)
+
+    def tearDown(self):
+        self.pmon.done = True
+        self.pmon.wait()
+
+    def wait_for(self, progress):
+        '''Wait for the progress to be reported'''
+        end_time = time.time() + 5
+        while progress not in self.logger.reported and time.time() < end_time:
+            time.sleep(0.01)
+        self.assertTrue(progress in self.logger.reported)
+
+    def test_fed_progress(self):
+        '''Test progress fed by the transfer is reported'''
+        self.pmon.startmonitor("/nonexistent", 1000, 0, 100, fed=True)
+        self.assertEqual(self.logger.reported, [])
+
+        self.pmon.update(250 * 1024)
+        self.pmon.update(250 * 1024, 10)
+        self.wait_for(50)
+        self.assertEqual(self.pmon.files_done, 11)
+        self.assertTrue(self.pmon.get_throughput() > 0)
+        self.assertTrue(self.pmon.get_remaining_time() >= 0)
+
+        self.pmon.update(2000 * 1024)
+        self.wait_for(100)
+        self.pmon.wait()
+        self.assertFalse(self.pmon.thread1.isAlive())
+
+    def test_distrosize_changed(self):
+        '''Test progress follows the size the transfer learns it has'''
+        self.pmon.startmonitor("/nonexistent", 100, 0, 100, fed=True)
+        self.pmon.set_distrosize(1000)
+        self.pmon.update(500 * 1024)
+        self.wait_for(50)
+        self.assertFalse(100 in self.logger.reported)
+
+        self.pmon.update(500 * 1024)
+        self.wait_for(100)
+        self.pmon.wait()
+
+    def test_range(self):
+        '''Test progress is reported within the range given'''
+        self.pmon.startmonitor("/nonexistent", 1000, 20, 60, fed=True)
+        self.pmon.update(500 * 1024)
+        self.wait_for(40)
+
+    def test_done(self):
+        '''Test monitoring stops promptly once done'''
+        self.pmon.sleep_for = 60
+        self.pmon.startmonitor(tempfile.gettempdir(), 1000)
+        start = time.time()
+        self.pmon.done = True
+        self.pmon.wait()
+        self.assertFalse(self.pmon.thread1.isAlive())
+        self.assertTrue(time.time() - start < 30)
+
+    def test_statvfs_fallback(self):
+        '''Test progress is estimated from the file system otherwise'''
+        self.pmon.startmonitor(tempfile.gettempdir(), 1000)
+        self.assertEqual(self.pmon.fed, False)
+        self.assertTrue(self.pmon.thread1.isAlive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/python
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+
+
+'''Transfer tree scanner Unit Tests'''
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from solaris_install.transfer.scan import TreeScanner, rounded_size
+
+
+def walk_entries(top, rel_top=""):
+    '''List the entries under top the way os.walk() visits them'''
+    entries = list()
+    for root, dirs, files in os.walk(top):
+        rel_root = os.path.join(rel_top, root[len(top):].lstrip("/"))
+        for name in dirs + files:
+            st1 = os.lstat(os.path.join(root, name))
+            entries.append((st1.st_ino, rounded_size(st1.st_size),
+                            os.path.join(rel_root, name)))
+    return entries
+
+
+class TestTreeScanner(unittest.TestCase):
+    '''Test scanning directory trees'''
+
+    def setUp(self):
+        self.top = tempfile.mkdtemp(prefix="tree_scanner_")
+        for dir_path in ("a/b/c", "a/d", "e", "f/g/h/i"):
+            os.makedirs(os.path.join(self.top, dir_path))
+        for (number, file_path) in enumerate(("a/one", "a/b/two",
+            "a/b/c/three", "e/four", "f/g/h/i/five", "six")):
+            with open(os.path.join(self.top, file_path), "w") as filehandle:
+                filehandle.write("x" * 1000 * number)
+        os.link(os.path.join(self.top, "a/one"),
+                os.path.join(self.top, "e/link"))
+        os.symlink(os.path.join(self.top, "e"),
+                   os.path.join(self.top, "a/symlink"))
+
+    def tearDown(self):
+        shutil.rmtree(self.top)
+
+    def test_same_as_walk(self):
+        '''Test the entries listed match os.walk()'''
+        entries = TreeScanner().scan(self.top, "top")
+        self.assertEqual(entries, walk_entries(self.top, "top"))
+
+    def test_order(self):
+        '''Test directories are listed before their contents'''
+        paths = [entry[2] for entry in TreeScanner().scan(self.top)]
+        self.assertEqual(sorted(paths[:4]), ["a", "e", "f", "six"])
+        for (index, path) in enumerate(paths):
+            parent = os.path.dirname(path)
+            if parent:
+                self.assertTrue(paths.index(parent) < index)
+
+    def test_parallel(self):
+        '''Test scanning with several threads lists the same entries'''
+        entries = TreeScanner().scan(self.top)
+        for workers in (2, 4, 16):
+            self.assertEqual(TreeScanner(workers).scan(self.top), entries)
+
+    def test_symlink_not_followed(self):
+        '''Test symbolic links to directories are listed, not descended'''
+        paths = [entry[2] for entry in TreeScanner(4).scan(self.top)]
+        self.assertTrue("a/symlink" in paths)
+        self.assertFalse("a/symlink/four" in paths)
+
+    def test_broken_symlink(self):
+        '''Test symbolic links which can't be followed are listed'''
+        os.symlink(os.path.join(self.top, "missing"),
+                   os.path.join(self.top, "a/broken"))
+        entries = TreeScanner().scan(self.top)
+        self.assertEqual(entries, walk_entries(self.top))
+        self.assertTrue("a/broken" in [entry[2] for entry in entries])
+
+    def test_sizes(self):
+        '''Test sizes are rounded up to multiples of 1024'''
+        for (inode, size, path) in TreeScanner().scan(self.top):
+            self.assertEqual(size % 1024, 0)
+            if path == "e/four":
+                self.assertEqual(size, 3072)
+
+    def test_cancel_check(self):
+        '''Test the cancel check is called for each directory'''
+        calls = list()
+        TreeScanner(cancel_check=lambda: calls.append(1)).scan(self.top)
+        self.assertEqual(len(calls), 10)
+
+    def test_cancel_check_raises(self):
+        '''Test an exception from the cancel check stops a parallel scan'''
+        def cancel():
+            '''Stop scanning'''
+            raise KeyboardInterrupt()
+        scanner = TreeScanner(4, cancel_check=cancel)
+        self.assertRaises(KeyboardInterrupt, scanner.scan, self.top)
+
+
+if __name__ == '__main__':
+    unittest.main()
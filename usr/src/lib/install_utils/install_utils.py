@@ -31,6 +31,8 @@ import inspect
 import select
 import string
 import crypt
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
 
 # =============================================================================
 # =============================================================================
@@ -514,6 +516,173 @@ def dir_size(rootpath):
     return (size)
 
 
+# Size and number of entries of a directory tree, as returned by dir_stats()
+DirStats = namedtuple("DirStats", "size entries")
+
+# Cache of dir_stats(): absolute path of each directory walked to the size
+# and number of the entries under it, not counting the directory itself
+__DIR_STATS = dict()
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def __walk_dir_stats(rootpath):
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    """ Walks rootpath, caching the size and number of the entries under it
+    and under every directory below it.  Directories which are cached
+    already are not walked again.
+
+    Args:
+      rootpath: absolute path of the directory to walk
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    # size and number of entries directly in each directory walked, in the
+    # order os.walk() returns them: every directory before those under it
+    totals = dict()
+    walked = list()
+
+    for root, subdirs, files in os.walk(rootpath):
+        size = 0
+        entries = len(files) + len(subdirs)
+        for filename in (files + subdirs):
+            abs_filename = root + "/" + filename
+            try:
+                size += file_size(abs_filename)
+            except OSError:
+                # No need to exit because can't get size of
+                # a file/dir, just print an error and continue
+                print >> sys.stderr, \
+                    ("Error getting information about "
+                     + abs_filename)
+                continue
+
+        # Use the cached totals of subdirectories rather than walking them.
+        # os.walk() doesn't walk symlinks to directories, so neither do we.
+        for subdir in subdirs[:]:
+            abs_subdir = os.path.join(root, subdir)
+            cached = __DIR_STATS.get(abs_subdir)
+            if cached is not None and not os.path.islink(abs_subdir):
+                size += cached[0]
+                entries += cached[1]
+                subdirs.remove(subdir)
+
+        totals[root] = [size, entries]
+        walked.append(root)
+
+    # Add the totals of each directory to its parent's, deepest first
+    for root in reversed(walked):
+        if root != rootpath:
+            parent = totals[os.path.dirname(root)]
+            parent[0] += totals[root][0]
+            parent[1] += totals[root][1]
+        __DIR_STATS[root] = tuple(totals[root])
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def dir_stats(rootpath, workers=1):
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    """ Returns the size of the given directory, as dir_size() does, and the
+    number of files and directories under it.
+
+    A single walk finds the size and number of entries of every directory
+    under rootpath, and these are cached, so asking again for rootpath or
+    any directory under it doesn't walk the tree again.  A later walk of a
+    directory above rootpath uses the cached values too.
+
+    The cached values are not checked against the tree, so they must be
+    dropped with invalidate_dir_stats() once anything under the directory
+    could have changed.
+
+    Args:
+      rootpath: root of the directory to calculate the size for
+      workers: number of threads walking the subdirectories of rootpath
+        concurrently, 0 for one per online CPU
+
+    Returns:
+      DirStats of the size of the directory contents in bytes, including
+      the directory itself, and the number of files and directories under
+      it, not counting the directory itself.
+
+    Raises:
+      OSError as returned from file_size
+      Exception: rootpath is not valid
+
+    """
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    rootpath = os.path.abspath(rootpath)
+
+    # Get the size of the root directory
+    size = file_size(rootpath)
+    if (size == 0):
+        # This indicates the root directory is not valid
+        raise Exception((rootpath + "is not valid"))
+
+    if rootpath not in __DIR_STATS:
+        if workers < 1:
+            workers = max(os.sysconf("SC_NPROCESSORS_ONLN"), 1)
+
+        if workers > 1:
+            # walk the subdirectories concurrently, then rootpath uses
+            # their cached totals
+            subdirs = list()
+            for filename in os.listdir(rootpath):
+                abs_filename = os.path.join(rootpath, filename)
+                if os.path.isdir(abs_filename) and \
+                   not os.path.islink(abs_filename) and \
+                   abs_filename not in __DIR_STATS:
+                    subdirs.append(abs_filename)
+
+            if len(subdirs) > 1:
+                pool = ThreadPool(min(workers, len(subdirs)))
+                try:
+                    pool.map(__walk_dir_stats, subdirs, chunksize=1)
+                finally:
+                    pool.close()
+                    pool.join()
+
+        __walk_dir_stats(rootpath)
+
+    contents_size, entries = __DIR_STATS[rootpath]
+    return DirStats(size + contents_size, entries)
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def invalidate_dir_stats(path=None):
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    """ Drops the values dir_stats() cached for path, every directory under
+    it and every directory above it, after path has been changed.
+
+    Args:
+      path: file or directory which has changed, or None to drop every
+        cached value
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    if path is None:
+        __DIR_STATS.clear()
+        return
+
+    path = os.path.abspath(path)
+    prefix = os.path.join(path, "")
+    for cached in __DIR_STATS.keys():
+        if cached == path or cached.startswith(prefix) or \
+           path.startswith(os.path.join(cached, "")):
+            del __DIR_STATS[cached]
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 def encrypt_password(plaintext, salt=None, alt_root="/", username=""):
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
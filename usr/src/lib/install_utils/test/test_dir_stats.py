@@ -0,0 +1,98 @@
+#!/usr/bin/python2.6
+#
+#
+# CDDL HEADER START
+#
+# The contents of this file are subject to the terms of the
+# Common Development and Distribution License (the "License").
+# You may not use this file except in compliance with the License.
+#
+# You can obtain a copy of the license at usr/src/OPENSOLARIS.LICENSE
+# or http://www.opensolaris.org/os/licensing.
+# See the License for the specific language governing permissions
+# and limitations under the License.
+#
+# When distributing Covered Code, include this CDDL HEADER in each
+# file and include the License file at usr/src/OPENSOLARIS.LICENSE.
+# If applicable, add the following below this CDDL HEADER, with the
+# fields enclosed by brackets "[]" replaced with your own identifying
+# information: Portions Copyright [yyyy] [name of copyright owner]
+#
+# CDDL HEADER END
+#
+
+#
+# Copyright (c) 2012, Oracle and/or its affiliates. All rights reserved.
+#
+
+'''Unit tests for dir_stats() and invalidate_dir_stats()'''
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from osol_install.install_utils import dir_size, dir_stats, \
+    invalidate_dir_stats
+
+
+class DirStatsTest(unittest.TestCase):
+
+    ''' Test dir_stats() against dir_size() and os.walk() '''
+
+    def setUp(self):
+        invalidate_dir_stats()
+        self.tdir = tempfile.mkdtemp(dir="/var/tmp", prefix="dir_stats_")
+        for path in ["a/b/c", "a/d", "e"]:
+            os.makedirs(os.path.join(self.tdir, path))
+        for path in ["f", "a/g", "a/b/h", "a/b/c/i", "e/j"]:
+            with open(os.path.join(self.tdir, path), "w") as fh:
+                fh.write("x" * 3000)
+        os.symlink("a", os.path.join(self.tdir, "k"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tdir, ignore_errors=True)
+        invalidate_dir_stats()
+
+    def check(self, path, workers=1):
+        ''' verify dir_stats() of path matches dir_size() and os.walk() '''
+        entries = 0
+        for _none, dirs, files in os.walk(path):
+            entries += len(dirs) + len(files)
+
+        stats = dir_stats(path, workers)
+        self.assertEqual(stats.size, dir_size(path))
+        self.assertEqual(stats.entries, entries)
+
+    def test_dir_stats(self):
+        '''Tests dir_stats of a tree and the directories under it'''
+        self.check(self.tdir)
+        for path in ["a", "a/b", "a/b/c", "a/d", "e"]:
+            self.check(os.path.join(self.tdir, path))
+
+    def test_dir_stats_cached_subdir(self):
+        '''Tests dir_stats uses the cached stats of a subdirectory'''
+        self.check(os.path.join(self.tdir, "a/b"))
+        self.check(self.tdir)
+
+    def test_dir_stats_workers(self):
+        '''Tests dir_stats with a pool of workers'''
+        self.check(self.tdir, 4)
+        self.check(os.path.join(self.tdir, "a"), 4)
+
+    def test_invalidate_dir_stats(self):
+        '''Tests invalidate_dir_stats drops the stats of a changed tree'''
+        self.check(self.tdir)
+        with open(os.path.join(self.tdir, "a/b/c/l"), "w") as fh:
+            fh.write("x" * 5000)
+        invalidate_dir_stats(os.path.join(self.tdir, "a/b/c/l"))
+        self.check(self.tdir)
+        self.check(os.path.join(self.tdir, "a/b/c"))
+
+        shutil.rmtree(os.path.join(self.tdir, "a/b"))
+        invalidate_dir_stats(os.path.join(self.tdir, "a/b"))
+        self.check(self.tdir)
+
+
+if __name__ == '__main__':
+    unittest.main()